@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+"""
+SHARED API CLIENT
+Async model-call core with a sync façade, shared by every model-calling code path
+
+create_kernel.py, run_stage1b.py and pipeline_worker.py all call Claude. The
+core is asynchronous: one AsyncAnthropic client per process, with a tuned
+connection pool, runs on a dedicated event-loop thread (core_loop()). Sync
+code calls it through run_sync() / create_message() / call_structured(), so
+the CLIs keep their blocking interface, while fan-out points (Stage 2B
+sections, Stage 1B devices) submit many coroutines at once with
+run_concurrently() - hundreds of requests can be in flight without a thread
+per request. MAX_IN_FLIGHT caps concurrent requests per process.
+
+The anthropic SDK is imported on first use, not at module import: it is by far
+the slowest import in the pipeline, and `--help`, checkpoint-only resumes and
+runs without an API key never need it.
+
+acreate_message() applies a call profile (call_profiles.py): model,
+max_tokens, timeout, temperature, and one retry on the fallback model. Every
+request is recorded in call_telemetry.TELEMETRY; profiles with
+hedge_percentile set send a duplicate request when the first is slower than
+that percentile of recent latencies, and the first response wins (the loser
+is cancelled). Concurrent byte-identical requests on the same client are
+coalesced: one call goes out and every caller receives its response (or its
+error). Request gates (add_request_gate) are awaited before each request;
+pipeline_worker.py registers job_scheduler.RateShares.gate so each job
+priority class stays within its share of the request budget. Once a CLI
+enables it, every request is also appended to the usage ledger
+(usage_ledger.py) with its token usage, latency, retry role and outcome.
+
+astream_message() streams a long generation (the ReasoningDoc) to a callback
+as it arrives.
+
+acall_structured() requests JSON output through a forced tool whose input
+schema comes from output_schemas.py, and repairs schema violations with one
+short follow-up call instead of regenerating the whole response.
+
+Clients whose messages.create is synchronous (the sync anthropic.Anthropic
+client from get_client(), test fakes) also work with the core: their calls
+run in the loop's worker threads.
+"""
+
+import asyncio
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+
+from call_telemetry import TELEMETRY
+from output_schemas import coerce, get_schema, tool_for, validate
+from usage_ledger import call_context, record_call
+
+# Connection pool for the shared async client. Keep-alive connections are
+# held longer than the SDK default (5s) so they survive the gaps between stages.
+MAX_CONNECTIONS = 200
+MAX_KEEPALIVE_CONNECTIONS = 50
+KEEPALIVE_EXPIRY = 60.0
+
+# Requests in flight at once across the process
+MAX_IN_FLIGHT = 64
+
+_client = None
+_async_client = None
+_client_lock = threading.Lock()
+
+_loop = None
+_loop_lock = threading.Lock()
+_slots = None  # asyncio.Semaphore(MAX_IN_FLIGHT), created on the core loop
+_request_gates = []  # async callables awaited before every request
+
+
+def _api_key() -> str:
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not api_key:
+        raise ValueError("ANTHROPIC_API_KEY environment variable not set")
+    return api_key
+
+
+def get_client():
+    """Return the process-wide sync Anthropic client (e.g. for the batches API)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                api_key = _api_key()
+                import anthropic
+                _client = anthropic.Anthropic(api_key=api_key)
+    return _client
+
+
+def get_async_client():
+    """Return the process-wide AsyncAnthropic client, creating it on first use.
+
+    Use it only on the core loop (through run_sync / run_concurrently or the
+    a* functions awaited from core-loop coroutines).
+    """
+    global _async_client
+    if _async_client is None:
+        with _client_lock:
+            if _async_client is None:
+                api_key = _api_key()
+                import anthropic
+                # httpx.Limits, taken from the SDK so httpx is not imported directly
+                limits = type(anthropic.DEFAULT_CONNECTION_LIMITS)(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=KEEPALIVE_EXPIRY,
+                )
+                _async_client = anthropic.AsyncAnthropic(
+                    api_key=api_key,
+                    http_client=anthropic.DefaultAsyncHttpxClient(limits=limits),
+                )
+    return _async_client
+
+
+def reset_client():
+    """Drop the shared clients (e.g. after the API key changes)."""
+    global _client, _async_client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        if _async_client is not None:
+            run_sync(_async_client.close())
+        _client = _async_client = None
+
+
+# ============================================================================
+# CORE LOOP
+# ============================================================================
+
+def core_loop() -> asyncio.AbstractEventLoop:
+    """The process-wide event loop running the async core (a daemon thread)."""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="api-core-loop", daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+def run_sync(coro):
+    """Run a coroutine on the core loop and block until it returns (sync façade)."""
+    loop = core_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_sync() called on the core loop; await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+async def _gather(coros, return_exceptions):
+    return await asyncio.gather(*coros, return_exceptions=return_exceptions)
+
+
+def run_concurrently(coros, return_exceptions: bool = False) -> list:
+    """Run coroutines concurrently on the core loop; results in input order."""
+    return run_sync(_gather(list(coros), return_exceptions))
+
+
+def add_request_gate(gate):
+    """Register an async callable awaited (on the core loop) before every request.
+
+    Gates run in the caller's context, e.g. job_scheduler.RateShares.gate
+    reads the job's priority class.
+    """
+    if gate not in _request_gates:
+        _request_gates.append(gate)
+
+
+def remove_request_gate(gate):
+    if gate in _request_gates:
+        _request_gates.remove(gate)
+
+
+def _in_flight_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(MAX_IN_FLIGHT)
+    return _slots
+
+
+# Errors that retry on a profile's fallback model: timeouts, connection
+# failures, unknown model, overload and server errors. Matched by name and
+# status so the anthropic SDK is not imported here.
+FALLBACK_STATUS_CODES = {404, 500, 502, 503, 504, 529}
+FALLBACK_ERROR_NAMES = {"APITimeoutError", "APIConnectionError"}
+
+
+def _should_fall_back(error: Exception) -> bool:
+    return (getattr(error, "status_code", None) in FALLBACK_STATUS_CODES
+            or type(error).__name__ in FALLBACK_ERROR_NAMES)
+
+
+async def _acreate(client, params: dict):
+    """messages.create on an async client, or in a worker thread for a sync one"""
+    create = client.messages.create
+    if inspect.iscoroutinefunction(inspect.unwrap(create)):
+        return await create(**params)
+    return await asyncio.to_thread(create, **params)
+
+
+def _sync_stream(manager, on_text):
+    with manager as stream:
+        for text in stream.text_stream:
+            on_text(text)
+        return stream.get_final_message()
+
+
+async def _astream(client, params: dict, on_text):
+    """messages.stream, passing each text delta to on_text; clients without
+    streaming (test fakes) deliver the whole text as one chunk"""
+    if not hasattr(client.messages, "stream"):
+        response = await _acreate(client, params)
+        for block in response.content:
+            if getattr(block, "text", None):
+                on_text(block.text)
+        return response
+    manager = client.messages.stream(**params)
+    if not hasattr(manager, "__aenter__"):
+        return await asyncio.to_thread(_sync_stream, manager, on_text)
+    async with manager as stream:
+        async for text in stream.text_stream:
+            on_text(text)
+        return await stream.get_final_message()
+
+
+async def _atimed_create(client, params: dict, name: str, on_text=None):
+    """One messages.create request (streamed to on_text if given), recorded
+    in the call telemetry and usage ledger"""
+    for gate in list(_request_gates):
+        await gate()
+    async with _in_flight_slots():
+        start = time.monotonic()
+        try:
+            if on_text is None:
+                response = await _acreate(client, params)
+            else:
+                response = await _astream(client, params, on_text)
+        except asyncio.CancelledError:
+            record_call(name, params["model"], 'cancelled', time.monotonic() - start)
+            raise
+        except Exception as e:
+            outcome = 'timeout' if type(e).__name__ == "APITimeoutError" else 'error'
+            TELEMETRY.record(name, outcome)
+            record_call(name, params["model"], outcome, time.monotonic() - start, error=e)
+            raise
+    latency = time.monotonic() - start
+    TELEMETRY.record(name, 'ok', latency)
+    record_call(name, params["model"], 'ok', latency, response)
+    return response
+
+
+async def _ahedged_create(client, params: dict, name: str, delay: float):
+    """Send a second identical request if the first has not answered after
+    delay seconds; return whichever succeeds first and cancel the other.
+
+    (A sync client's request cannot be aborted mid-flight; its result is
+    discarded when it finishes.)
+    """
+    primary = asyncio.ensure_future(_atimed_create(client, params, name))
+    done, _ = await asyncio.wait({primary}, timeout=delay)
+    if done:
+        return primary.result()
+
+    TELEMETRY.count(name, 'hedges')
+    print(f"  ⏱️ {name}: no response after {delay:.1f}s, sending hedge request")
+    with call_context(retry='hedge'):
+        hedge = asyncio.ensure_future(_atimed_create(client, params, name))
+    pending, error = {primary, hedge}, None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        TELEMETRY.count(name, 'hedge_wins')
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in (primary, hedge):
+            if not task.done():
+                task.cancel()
+
+
+async def _asend(client, profile: dict, params: dict):
+    name = profile.get("name", params["model"])
+    delay = None
+    if profile.get("hedge_percentile"):
+        delay = TELEMETRY.percentile(name, profile["hedge_percentile"])
+    if delay is None:
+        return await _atimed_create(client, params, name)
+    return await _ahedged_create(client, params, name, delay)
+
+
+async def _asend_with_fallback(client, profile: dict, params: dict):
+    try:
+        return await _asend(client, profile, params)
+    except Exception as e:
+        fallback = profile.get("fallback_model")
+        if not fallback or fallback == params["model"] or not _should_fall_back(e):
+            raise
+        print(f"  ⚠️ {params['model']} failed ({type(e).__name__}), retrying on {fallback}")
+        TELEMETRY.count(profile.get("name", params["model"]), 'fallbacks')
+        params["model"] = fallback
+        with call_context(retry='fallback'):
+            return await _asend(client, profile, params)
+
+
+# Single-flight: request key -> future of the call currently in flight
+# (only touched on the core loop)
+_in_flight = {}
+
+
+def _request_key(client, params: dict) -> str:
+    body = json.dumps(params, sort_keys=True, default=str)
+    return f"{id(client)}:{hashlib.sha256(body.encode('utf-8')).hexdigest()}"
+
+
+async def _acoalesced(key: str, name: str, factory):
+    """Await factory() unless an identical request is already in flight; then share its result"""
+    future = _in_flight.get(key)
+    if future is not None:
+        TELEMETRY.count(name, 'coalesced')
+        return await asyncio.shield(future)
+
+    future = _in_flight[key] = asyncio.get_running_loop().create_future()
+    try:
+        result = await factory()
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except BaseException as e:
+        future.set_exception(e)
+        future.exception()  # retrieved here, so an unshared failure is not logged twice
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        _in_flight.pop(key, None)
+
+
+def _message_params(profile: dict, kwargs: dict) -> dict:
+    params = {"model": profile["model"], "max_tokens": profile["max_tokens"]}
+    if profile.get("timeout"):
+        params["timeout"] = profile["timeout"]
+    if profile.get("temperature") is not None:
+        params["temperature"] = profile["temperature"]
+    params.update(kwargs)
+    return params
+
+
+async def acreate_message(client, profile: dict, **kwargs):
+    """messages.create with a call profile's settings, hedging, fallback model
+    and coalescing of concurrent identical requests (core-loop coroutine)"""
+    params = _message_params(profile, kwargs)
+    return await _acoalesced(_request_key(client, params), profile.get("name", params["model"]),
+                             lambda: _asend_with_fallback(client, profile, params))
+
+
+def create_message(client, profile: dict, **kwargs):
+    """Sync façade for acreate_message"""
+    return run_sync(acreate_message(client, profile, **kwargs))
+
+
+async def astream_message(client, profile: dict, on_text, **kwargs):
+    """Streamed messages.create with a call profile's settings: on_text gets
+    each text delta as it arrives (called on the core loop, or a worker
+    thread for a sync client); returns the final message.
+
+    Streams are never hedged, coalesced or retried on the fallback model -
+    their text has already been handed to on_text.
+    """
+    params = _message_params(profile, kwargs)
+    return await _atimed_create(client, params, profile.get("name", params["model"]), on_text)
+
+
+def stream_message(client, profile: dict, on_text, **kwargs):
+    """Sync façade for astream_message"""
+    return run_sync(astream_message(client, profile, on_text, **kwargs))
+
+
+class StructuredOutputError(ValueError):
+    """Model output still did not match its schema after the repair call"""
+
+    def __init__(self, message, errors=None, data=None):
+        super().__init__(message)
+        self.errors = errors or []
+        self.data = data
+
+
+def parse_json_text(text: str):
+    """Parse a text-mode JSON response, tolerating ``` fences and surrounding prose"""
+    cleaned = text.replace('```json\n', '').replace('```\n', '').replace('```', '').strip()
+    try:
+        return json.loads(cleaned)
+    except json.JSONDecodeError:
+        starts = [i for i in (cleaned.find('{'), cleaned.find('[')) if i >= 0]
+        if not starts:
+            raise
+        start = min(starts)
+        end = cleaned.rfind('}' if cleaned[start] == '{' else ']')
+        return json.loads(cleaned[start:end + 1])
+
+
+def _response_data(response, tool_name: str):
+    """Tool input from a response, or parsed JSON from its text blocks"""
+    texts = []
+    for block in response.content:
+        if getattr(block, "type", None) == "tool_use" and getattr(block, "name", tool_name) == tool_name:
+            return block.input
+        if getattr(block, "text", None):
+            texts.append(block.text)
+    return parse_json_text("\n".join(texts))
+
+
+async def acall_structured(client, prompt: str, schema_name: str, profile: dict,
+                    system: str = "", sections=None, repair: bool = True):
+    """Call the model with schema_name forced as a tool and return the parsed object
+
+    If the output is invalid JSON or fails the schema, one repair call sends
+    back just the errors and the previous output (not the original prompt),
+    asking for a corrected object. Raises StructuredOutputError if it is still
+    invalid.
+    """
+    tool = tool_for(schema_name, sections)
+    schema = get_schema(schema_name, sections)
+    kwargs = {
+        "tools": [tool],
+        "tool_choice": {"type": "tool", "name": tool["name"]},
+    }
+    if system:
+        kwargs["system"] = system
+
+    response = await acreate_message(client, profile, messages=[{"role": "user", "content": prompt}], **kwargs)
+    try:
+        data = coerce(schema_name, _response_data(response, tool["name"]))
+        errors = validate(data, schema)
+        previous = json.dumps(data, indent=2)
+    except (json.JSONDecodeError, ValueError) as e:
+        data = None
+        errors = [f"$: response was not valid JSON ({e})"]
+        previous = "\n".join(getattr(b, "text", "") for b in response.content)
+
+    if not errors:
+        return data
+    if not repair:
+        raise StructuredOutputError(f"{schema_name} output failed validation", errors, data)
+
+    print(f"  ⚠️ {schema_name}: {len(errors)} schema error(s), sending repair request")
+    repair_prompt = f"""Your previous output for the {tool['name']} tool did not match its schema.
+
+ERRORS:
+{chr(10).join(f"- {error}" for error in errors[:50])}
+
+PREVIOUS OUTPUT:
+{previous}
+
+Call the {tool['name']} tool again with the corrected object. Fix only the listed errors and keep every other value unchanged."""
+    with call_context(retry='repair'):
+        response = await acreate_message(client, profile, messages=[{"role": "user", "content": repair_prompt}], **kwargs)
+    try:
+        data = coerce(schema_name, _response_data(response, tool["name"]))
+    except (json.JSONDecodeError, ValueError) as e:
+        raise StructuredOutputError(f"{schema_name} repair response was not valid JSON: {e}", errors) from e
+    errors = validate(data, schema)
+    if errors:
+        raise StructuredOutputError(f"{schema_name} output still invalid after repair: {errors[:5]}", errors, data)
+    print(f"  ✓ {schema_name}: repaired")
+    return data
+
+
+def call_structured(client, prompt: str, schema_name: str, profile: dict,
+                    system: str = "", sections=None, repair: bool = True):
+    """Sync façade for acall_structured"""
+    return run_sync(acall_structured(client, prompt, schema_name, profile, system, sections, repair))
@@ -3,59 +3,234 @@
 Archive Versioning System
 Properly label and track file versions in the archive directory
 
+Archived content is stored once per unique file in a content-addressed blob
+store (archive/objects/<sha[:2]>/<sha256>[.gz]); archiving the same bytes again
+only adds a metadata row. Metadata lives in an indexed SQLite database
+(archive/archive_index.db), so listing versions and history lookups are
+indexed queries instead of rewriting one JSON file on every operation.
+An existing archive_metadata.json is imported automatically on first use.
+
 Usage:
     # Archive a file with version info
     python3 archive_versioning.py run_stage1a.py --version 5.0 --reason "Replaced by v5.1" --description "taxonomy fix"
-    
+
     # List archived versions of a file
     python3 archive_versioning.py --list run_stage1a
-    
+
+    # Find archived versions with the same content as a file
+    python3 archive_versioning.py --history run_stage1a.py
+
+    # Write an archived version back out
+    python3 archive_versioning.py --restore run_stage1a_v5_0_taxonomy_fix.py [--output restored.py]
+
     # Show archive metadata
     python3 archive_versioning.py --show-metadata
-    
+
+    # Move tracked plain-file copies in archive/ into the blob store
+    python3 archive_versioning.py --compact
+
     # Retroactively label existing archive files
     python3 archive_versioning.py --retroactive-label
 """
 
+import argparse
+import gzip
+import hashlib
 import json
+import shutil
+import sqlite3
 import sys
-import argparse
-from pathlib import Path
 from datetime import datetime
-from typing import Optional, Dict, List
-import shutil
+from pathlib import Path
+from typing import Dict, List, Optional
 
 ARCHIVE_DIR = Path("archive")
-METADATA_FILE = ARCHIVE_DIR / "archive_metadata.json"
+METADATA_FILE = ARCHIVE_DIR / "archive_metadata.json"  # legacy, imported into INDEX_DB
+INDEX_DB = ARCHIVE_DIR / "archive_index.db"
+OBJECTS_DIR = ARCHIVE_DIR / "objects"
+
+ARCHIVE_VERSION = "2.0"
 
 # Version naming pattern: filename_vX.Y.Z_[description].ext
 VERSION_PATTERN = "{base}_v{version}_{description}.{ext}"
 
+# Files under archive/ that are never archived content
+SKIP_FILES = {".DS_Store", "archive_metadata.json", "archive_index.db", "README.md", "commit_message.txt"}
 
-def load_metadata() -> Dict:
-    """Load archive metadata from JSON file"""
+VERSION_FIELDS = [
+    "base", "archived_name", "original_name", "version", "archived_date", "reason",
+    "description", "replaced_by", "notes", "file_size", "source_path", "sha256"
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    compressed INTEGER NOT NULL,
+    created TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS versions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    base TEXT NOT NULL,
+    archived_name TEXT NOT NULL UNIQUE,
+    original_name TEXT,
+    version TEXT,
+    archived_date TEXT NOT NULL,
+    reason TEXT,
+    description TEXT,
+    replaced_by TEXT,
+    notes TEXT,
+    file_size INTEGER,
+    source_path TEXT,
+    sha256 TEXT REFERENCES blobs(sha256)
+);
+CREATE INDEX IF NOT EXISTS idx_versions_base_date ON versions(base, archived_date);
+CREATE INDEX IF NOT EXISTS idx_versions_sha ON versions(sha256);
+"""
+
+
+# ============================================================================
+# METADATA INDEX
+# ============================================================================
+
+def connect_index() -> sqlite3.Connection:
+    """Open the metadata index, creating it (and importing legacy JSON) if needed"""
+    ARCHIVE_DIR.mkdir(exist_ok=True)
+    is_new = not INDEX_DB.exists()
+    conn = sqlite3.connect(INDEX_DB)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    if is_new:
+        now = datetime.now().isoformat()
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO meta VALUES ('archive_version', ?)", (ARCHIVE_VERSION,))
+            conn.execute("INSERT OR IGNORE INTO meta VALUES ('created', ?)", (now,))
+        migrate_legacy_metadata(conn)
+    return conn
+
+
+def _touch(conn: sqlite3.Connection):
+    conn.execute("INSERT OR REPLACE INTO meta VALUES ('last_updated', ?)", (datetime.now().isoformat(),))
+
+
+def load_legacy_metadata() -> Dict:
+    """Load the pre-index archive_metadata.json (empty structure if absent)"""
     if METADATA_FILE.exists():
         with open(METADATA_FILE, 'r', encoding='utf-8') as f:
             return json.load(f)
+    return {"files": {}}
+
+
+def migrate_legacy_metadata(conn: sqlite3.Connection) -> int:
+    """Import archive_metadata.json entries into the index (idempotent)"""
+    legacy = load_legacy_metadata()
+    imported = 0
+    with conn:
+        if legacy.get("created"):
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('created', ?)", (legacy["created"],))
+        for base, entries in legacy.get("files", {}).items():
+            for entry in entries:
+                row = {field: entry.get(field) for field in VERSION_FIELDS}
+                row["base"] = base
+                path = ARCHIVE_DIR / entry["archived_name"]
+                if path.is_file():
+                    row["sha256"] = hash_file(path)  # stays a plain file until --compact
+                cursor = conn.execute(
+                    f"INSERT OR IGNORE INTO versions ({', '.join(VERSION_FIELDS)}) "
+                    f"VALUES ({', '.join('?' for _ in VERSION_FIELDS)})",
+                    [row[field] for field in VERSION_FIELDS]
+                )
+                imported += cursor.rowcount
+        if imported:
+            _touch(conn)
+    if imported:
+        print(f"✓ Imported {imported} entries from {METADATA_FILE.name} into {INDEX_DB.name}")
+    return imported
+
+
+def load_metadata() -> Dict:
+    """Metadata in the legacy JSON shape ({"files": {base: [entries]}}), read from the index"""
+    conn = connect_index()
+    meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+    files = {}
+    for row in conn.execute("SELECT * FROM versions ORDER BY base, archived_date"):
+        entry = dict(row)
+        entry.pop("id")
+        files.setdefault(entry.pop("base"), []).append(entry)
+    conn.close()
     return {
-        "archive_version": "1.0",
-        "created": datetime.now().isoformat(),
-        "files": {}
+        "archive_version": meta.get("archive_version", ARCHIVE_VERSION),
+        "created": meta.get("created"),
+        "last_updated": meta.get("last_updated"),
+        "files": files,
     }
 
 
-def save_metadata(metadata: Dict):
-    """Save archive metadata to JSON file"""
-    metadata["last_updated"] = datetime.now().isoformat()
-    with open(METADATA_FILE, 'w', encoding='utf-8') as f:
-        json.dump(metadata, f, indent=2)
+# ============================================================================
+# BLOB STORE
+# ============================================================================
+
+def hash_file(file_path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def blob_path(sha256: str, compressed: bool) -> Path:
+    return OBJECTS_DIR / sha256[:2] / (sha256 + ('.gz' if compressed else ''))
 
 
+def store_blob(conn: sqlite3.Connection, source_path: Path, compress: bool = True) -> str:
+    """Store file content once under its hash; returns the sha256"""
+    sha256 = hash_file(source_path)
+    if conn.execute("SELECT 1 FROM blobs WHERE sha256 = ?", (sha256,)).fetchone():
+        print(f"  ✓ Content already archived ({sha256[:12]}), storing metadata only")
+        return sha256
+
+    target = blob_path(sha256, compress)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(target.name + '.tmp')
+    if compress:
+        with open(source_path, 'rb') as src, gzip.open(tmp, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+    else:
+        shutil.copy2(source_path, tmp)
+    tmp.replace(target)
+
+    conn.execute(
+        "INSERT INTO blobs VALUES (?, ?, ?, ?, ?)",
+        (sha256, source_path.stat().st_size, target.stat().st_size, int(compress), datetime.now().isoformat())
+    )
+    return sha256
+
+
+def read_blob(conn: sqlite3.Connection, sha256: str) -> Optional[bytes]:
+    row = conn.execute("SELECT compressed FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+    if row is None:
+        return None
+    path = blob_path(sha256, bool(row["compressed"]))
+    if row["compressed"]:
+        with gzip.open(path, 'rb') as f:
+            return f.read()
+    return path.read_bytes()
+
+
+# ============================================================================
+# ARCHIVING
+# ============================================================================
+
 def get_file_info(file_path: Path) -> tuple:
     """Extract base name, extension from file path"""
     stem = file_path.stem
     ext = file_path.suffix.lstrip('.')
-    
+
     # Try to extract base name if it already has version info
     # e.g., "run_stage1a_v5_1" -> "run_stage1a"
     parts = stem.split('_')
@@ -63,7 +238,7 @@ def get_file_info(file_path: Path) -> tuple:
         base = '_'.join(parts[:-1])
     else:
         base = stem
-    
+
     return base, ext
 
 
@@ -73,26 +248,33 @@ def generate_versioned_name(base: str, ext: str, version: str, description: str)
     clean_desc = "".join(c for c in description if c.isalnum() or c in (' ', '-', '_')).strip().replace(' ', '_')
     if not clean_desc:
         clean_desc = "archived"
-    
+
     # Normalize version (v5.0 -> v5_0, v5.1 -> v5_1)
     version_clean = version.replace('.', '_').replace('-', '_')
     if not version_clean.startswith('v'):
         version_clean = f"v{version_clean}"
-    
+
     return f"{base}_{version_clean}_{clean_desc}.{ext}"
 
 
+def _name_taken(conn: sqlite3.Connection, name: str) -> bool:
+    if conn.execute("SELECT 1 FROM versions WHERE archived_name = ?", (name,)).fetchone():
+        return True
+    return (ARCHIVE_DIR / name).exists()
+
+
 def archive_file(
     source_path: Path,
     version: str,
     reason: str,
     description: str = "",
     replaced_by: Optional[str] = None,
-    notes: str = ""
-) -> Path:
+    notes: str = "",
+    compress: bool = True
+) -> str:
     """
     Archive a file with proper versioning
-    
+
     Args:
         source_path: Path to file to archive
         version: Version number (e.g., "5.0", "5.1")
@@ -100,173 +282,256 @@ def archive_file(
         description: Short description for filename
         replaced_by: What version/file replaced this one
         notes: Additional notes
-    
+        compress: Gzip the stored blob (only applies to new content)
+
     Returns:
-        Path to archived file
+        Versioned name the file is archived under
     """
     if not source_path.exists():
         raise FileNotFoundError(f"Source file not found: {source_path}")
-    
-    # Load metadata
-    metadata = load_metadata()
-    
+
+    conn = connect_index()
+
     # Get file info
     base, ext = get_file_info(source_path)
-    
+
     # Generate versioned filename
     if not description:
         description = reason.lower().replace(' ', '_')[:30]
-    
+
     versioned_name = generate_versioned_name(base, ext, version, description)
-    archive_path = ARCHIVE_DIR / versioned_name
-    
+
     # Handle duplicates
     counter = 1
-    original_archive_path = archive_path
-    while archive_path.exists():
+    while _name_taken(conn, versioned_name):
         versioned_name = generate_versioned_name(base, ext, version, f"{description}_{counter}")
-        archive_path = ARCHIVE_DIR / versioned_name
         counter += 1
-    
-    # Copy file to archive
-    shutil.copy2(source_path, archive_path)
-    print(f"✓ Archived: {source_path.name} -> {archive_path.name}")
-    
-    # Update metadata
-    if base not in metadata["files"]:
-        metadata["files"][base] = []
-    
-    file_entry = {
-        "archived_name": archive_path.name,
-        "original_name": source_path.name,
-        "version": version,
-        "archived_date": datetime.now().isoformat(),
-        "reason": reason,
-        "description": description,
-        "replaced_by": replaced_by,
-        "notes": notes,
-        "file_size": archive_path.stat().st_size,
-        "source_path": str(source_path)
-    }
-    
-    metadata["files"][base].append(file_entry)
-    save_metadata(metadata)
-    
-    return archive_path
+
+    with conn:
+        sha256 = store_blob(conn, source_path, compress)
+        conn.execute(
+            f"INSERT INTO versions ({', '.join(VERSION_FIELDS)}) VALUES ({', '.join('?' for _ in VERSION_FIELDS)})",
+            (base, versioned_name, source_path.name, version, datetime.now().isoformat(), reason,
+             description, replaced_by, notes, source_path.stat().st_size, str(source_path), sha256)
+        )
+        _touch(conn)
+    conn.close()
+
+    print(f"✓ Archived: {source_path.name} -> {versioned_name} ({sha256[:12]})")
+    return versioned_name
+
+
+def restore_file(archived_name: str, output_path: Optional[Path] = None) -> Path:
+    """Write an archived version back to disk (default: ./<archived_name>)"""
+    conn = connect_index()
+    row = conn.execute("SELECT sha256 FROM versions WHERE archived_name = ?", (archived_name,)).fetchone()
+    if row is None:
+        conn.close()
+        raise FileNotFoundError(f"No archived version named: {archived_name}")
+
+    output_path = output_path or Path(Path(archived_name).name)
+    content = read_blob(conn, row["sha256"]) if row["sha256"] else None
+    conn.close()
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    if content is not None:
+        output_path.write_bytes(content)
+    elif (ARCHIVE_DIR / archived_name).is_file():
+        # Legacy entry still stored as a plain file
+        shutil.copy2(ARCHIVE_DIR / archived_name, output_path)
+    else:
+        raise FileNotFoundError(f"Content for {archived_name} is missing from the archive")
+
+    print(f"✓ Restored: {archived_name} -> {output_path}")
+    return output_path
+
+
+class _BlobMismatch(Exception):
+    """A just-stored blob did not read back with its hash (rolls back its row)"""
+
+
+def compact_archive() -> int:
+    """Move tracked plain-file copies in archive/ into the blob store"""
+    conn = connect_index()
+    moved, saved = 0, 0
+    rows = conn.execute("SELECT id, archived_name FROM versions").fetchall()
+    for row in rows:
+        path = ARCHIVE_DIR / row["archived_name"]
+        if not path.is_file():
+            continue
+        try:
+            with conn:
+                sha256 = store_blob(conn, path)
+                try:
+                    content = read_blob(conn, sha256)
+                except (OSError, EOFError):
+                    content = None
+                if content is None or hashlib.sha256(content).hexdigest() != sha256:
+                    raise _BlobMismatch(sha256)
+                conn.execute("UPDATE versions SET sha256 = ? WHERE id = ?", (sha256, row["id"]))
+                _touch(conn)
+        except _BlobMismatch:
+            # Never delete the plain copy unless the blob reads back intact
+            print(f"  ⚠️  {row['archived_name']}: stored blob does not verify, keeping the plain file")
+            continue
+        saved += path.stat().st_size
+        path.unlink()
+        moved += 1
+        print(f"  ✓ {row['archived_name']} -> objects/{sha256[:2]}/{sha256[:12]}…")
+
+    stored = conn.execute("SELECT COALESCE(SUM(stored_size), 0) FROM blobs").fetchone()[0]
+    conn.close()
+    print(f"\n✓ Compacted {moved} file(s): {saved:,} bytes of plain copies, blob store now {stored:,} bytes")
+    return moved
+
+
+# ============================================================================
+# QUERIES
+# ============================================================================
+
+def _print_entry(i: int, entry) -> None:
+    print(f"\n{i}. {entry['archived_name']}")
+    print(f"   Version: {entry['version']}")
+    print(f"   Date: {entry['archived_date']}")
+    print(f"   Reason: {entry['reason']}")
+    if entry['replaced_by']:
+        print(f"   Replaced by: {entry['replaced_by']}")
+    if entry['notes']:
+        print(f"   Notes: {entry['notes']}")
+    print(f"   Size: {entry['file_size'] or 0:,} bytes")
+    if entry['sha256']:
+        print(f"   Content: {entry['sha256'][:12]}")
+
+
+def get_versions(base_name: str) -> List[Dict]:
+    """Archived versions of a file, newest first"""
+    conn = connect_index()
+    rows = conn.execute(
+        "SELECT * FROM versions WHERE base = ? ORDER BY archived_date DESC", (base_name,)
+    ).fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
 
 
 def list_archived_versions(base_name: str):
     """List all archived versions of a file"""
-    metadata = load_metadata()
-    
-    if base_name not in metadata["files"]:
+    versions = get_versions(base_name)
+
+    if not versions:
         print(f"No archived versions found for: {base_name}")
         return
-    
-    versions = metadata["files"][base_name]
+
     print(f"\nArchived versions of '{base_name}':")
     print("=" * 80)
-    
-    for i, entry in enumerate(sorted(versions, key=lambda x: x["archived_date"], reverse=True), 1):
-        print(f"\n{i}. {entry['archived_name']}")
-        print(f"   Version: {entry['version']}")
-        print(f"   Date: {entry['archived_date']}")
-        print(f"   Reason: {entry['reason']}")
-        if entry.get('replaced_by'):
-            print(f"   Replaced by: {entry['replaced_by']}")
-        if entry.get('notes'):
-            print(f"   Notes: {entry['notes']}")
-        print(f"   Size: {entry['file_size']:,} bytes")
+
+    for i, entry in enumerate(versions, 1):
+        _print_entry(i, entry)
+
+
+def content_history(file_path: Path):
+    """List archived versions whose content is identical to file_path"""
+    sha256 = hash_file(file_path)
+    conn = connect_index()
+    rows = conn.execute(
+        "SELECT * FROM versions WHERE sha256 = ? ORDER BY archived_date DESC", (sha256,)
+    ).fetchall()
+    conn.close()
+
+    if not rows:
+        print(f"No archived version has the same content as {file_path} ({sha256[:12]})")
+        return
+
+    print(f"\nArchived versions identical to '{file_path}' ({sha256[:12]}):")
+    print("=" * 80)
+    for i, entry in enumerate(rows, 1):
+        _print_entry(i, entry)
 
 
 def show_metadata():
     """Display archive metadata summary"""
-    metadata = load_metadata()
-    
+    conn = connect_index()
+    meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+    per_file = conn.execute(
+        "SELECT base, COUNT(*) AS n FROM versions GROUP BY base ORDER BY base"
+    ).fetchall()
+    total_versions = sum(row["n"] for row in per_file)
+    blobs = conn.execute(
+        "SELECT COUNT(*) AS n, COALESCE(SUM(size), 0) AS size, COALESCE(SUM(stored_size), 0) AS stored FROM blobs"
+    ).fetchone()
+    logical = conn.execute(
+        "SELECT COALESCE(SUM(file_size), 0) FROM versions WHERE sha256 IN (SELECT sha256 FROM blobs)"
+    ).fetchone()[0]
+    conn.close()
+
     print("\n" + "=" * 80)
     print("ARCHIVE METADATA")
     print("=" * 80)
-    print(f"Created: {metadata.get('created', 'Unknown')}")
-    print(f"Last Updated: {metadata.get('last_updated', 'Unknown')}")
-    print(f"\nTotal files tracked: {len(metadata['files'])}")
-    
-    total_versions = sum(len(versions) for versions in metadata["files"].values())
+    print(f"Created: {meta.get('created', 'Unknown')}")
+    print(f"Last Updated: {meta.get('last_updated', 'Unknown')}")
+    print(f"\nTotal files tracked: {len(per_file)}")
     print(f"Total archived versions: {total_versions}")
-    
+    print(f"Unique blobs: {blobs['n']} ({blobs['size']:,} bytes, {blobs['stored']:,} bytes on disk)")
+    if logical:
+        print(f"Space saved by dedup/compression: {logical - blobs['stored']:,} bytes")
+
     print("\nFiles with archived versions:")
-    for base_name, versions in sorted(metadata["files"].items()):
-        print(f"  - {base_name}: {len(versions)} version(s)")
+    for row in per_file:
+        print(f"  - {row['base']}: {row['n']} version(s)")
 
 
 def retroactive_label():
     """Interactively label existing archive files"""
-    metadata = load_metadata()
-    
-    # Files to skip (system files, documentation, etc.)
-    skip_files = {".DS_Store", "archive_metadata.json", "README.md", "commit_message.txt"}
-    
-    # Find all files recursively in archive directory
+    conn = connect_index()
+    tracked = {row[0] for row in conn.execute("SELECT archived_name FROM versions")}
+
+    # Find all files recursively in archive directory (blob store excluded)
     archive_files = []
     for file_path in ARCHIVE_DIR.rglob("*"):
-        if file_path.is_file() and file_path.name not in skip_files:
-            archive_files.append(file_path)
-    
+        if not file_path.is_file() or file_path.name in SKIP_FILES:
+            continue
+        if OBJECTS_DIR in file_path.parents or "__pycache__" in file_path.parts:
+            continue
+        archive_files.append(file_path)
+
     print(f"\nFound {len(archive_files)} files in archive directory (including subdirectories)")
     print("=" * 80)
-    
+
     for file_path in sorted(archive_files):
         base, ext = get_file_info(file_path)
-        rel_path = file_path.relative_to(ARCHIVE_DIR)
-        rel_path_str = str(rel_path)
-        
-        # Check if already in metadata
-        already_tracked = False
-        if base in metadata["files"]:
-            for entry in metadata["files"][base]:
-                if entry["archived_name"] == rel_path_str or entry["archived_name"] == file_path.name:
-                    already_tracked = True
-                    break
-        
-        if already_tracked:
+        rel_path_str = str(file_path.relative_to(ARCHIVE_DIR))
+
+        if rel_path_str in tracked or file_path.name in tracked:
             print(f"✓ {rel_path_str} (already tracked)")
             continue
-        
+
         # Show relative path for files in subdirectories
         print(f"\n📄 {rel_path_str}")
         print(f"   Detected base name: {base}")
-        
+
         # Try to extract version from filename
         version = input("   Version (e.g., 5.0, 5.1, or 'skip'): ").strip()
         if version.lower() == 'skip':
             continue
-        
+
         reason = input("   Reason for archiving: ").strip()
         description = input("   Description (short, for filename): ").strip()
         replaced_by = input("   Replaced by (optional): ").strip() or None
         notes = input("   Additional notes (optional): ").strip()
-        
-        # Add to metadata
-        if base not in metadata["files"]:
-            metadata["files"][base] = []
-        
-        # Store relative path for files in subdirectories
-        file_entry = {
-            "archived_name": rel_path_str,
-            "original_name": file_path.name,  # We don't know original
-            "version": version,
-            "archived_date": datetime.fromtimestamp(file_path.stat().st_mtime).isoformat(),
-            "reason": reason,
-            "description": description,
-            "replaced_by": replaced_by,
-            "notes": notes,
-            "file_size": file_path.stat().st_size,
-            "source_path": "unknown (retroactive labeling)"
-        }
-        
-        metadata["files"][base].append(file_entry)
+
+        # Store relative path for files in subdirectories; the file stays in
+        # place until --compact moves it into the blob store
+        with conn:
+            conn.execute(
+                f"INSERT INTO versions ({', '.join(VERSION_FIELDS)}) VALUES ({', '.join('?' for _ in VERSION_FIELDS)})",
+                (base, rel_path_str, file_path.name, version,
+                 datetime.fromtimestamp(file_path.stat().st_mtime).isoformat(), reason, description,
+                 replaced_by, notes, file_path.stat().st_size, "unknown (retroactive labeling)",
+                 hash_file(file_path))
+            )
+            _touch(conn)
         print(f"   ✓ Added to metadata")
-    
-    save_metadata(metadata)
+
+    conn.close()
     print("\n✓ Metadata updated!")
 
 
@@ -276,72 +541,104 @@ def main():
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog=__doc__
     )
-    
+
     parser.add_argument(
         "file",
         nargs="?",
         help="File to archive (or base name for --list)"
     )
-    
+
     parser.add_argument(
         "--version", "-v",
         help="Version number (e.g., 5.0, 5.1)"
     )
-    
+
     parser.add_argument(
         "--reason", "-r",
         help="Reason for archiving"
     )
-    
+
     parser.add_argument(
         "--description", "-d",
         default="",
         help="Short description for filename"
     )
-    
+
     parser.add_argument(
         "--replaced-by",
         help="What version/file replaced this one"
     )
-    
+
     parser.add_argument(
         "--notes", "-n",
         default="",
         help="Additional notes"
     )
-    
+
+    parser.add_argument(
+        "--no-compress",
+        action="store_true",
+        help="Store new content uncompressed"
+    )
+
     parser.add_argument(
         "--list", "-l",
         action="store_true",
         help="List archived versions of a file"
     )
-    
+
+    parser.add_argument(
+        "--history",
+        metavar="FILE",
+        help="List archived versions with the same content as FILE"
+    )
+
+    parser.add_argument(
+        "--restore",
+        metavar="ARCHIVED_NAME",
+        help="Write an archived version back to disk"
+    )
+
+    parser.add_argument(
+        "--output", "-o",
+        help="Output path for --restore"
+    )
+
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Move tracked plain-file copies in archive/ into the blob store"
+    )
+
     parser.add_argument(
         "--show-metadata",
         action="store_true",
         help="Show archive metadata summary"
     )
-    
+
     parser.add_argument(
         "--retroactive-label",
         action="store_true",
         help="Interactively label existing archive files"
     )
-    
+
     args = parser.parse_args()
-    
-    # Ensure archive directory exists
-    ARCHIVE_DIR.mkdir(exist_ok=True)
-    
-    # Initialize metadata if it doesn't exist
-    if not METADATA_FILE.exists():
-        save_metadata(load_metadata())
-    
+
     # Handle different modes
     if args.retroactive_label:
         retroactive_label()
     elif args.show_metadata:
         show_metadata()
+    elif args.compact:
+        compact_archive()
+    elif args.restore:
+        try:
+            restore_file(args.restore, Path(args.output) if args.output else None)
+        except FileNotFoundError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+    elif args.history:
+        content_history(Path(args.history))
     elif args.list:
         if not args.file:
             print("Error: --list requires a base filename")
@@ -352,18 +649,20 @@ def main():
         if not args.version or not args.reason:
             print("Error: --version and --reason are required for archiving")
             sys.exit(1)
-        
+
         source_path = Path(args.file)
-        archive_path = archive_file(
+        archived_name = archive_file(
             source_path,
             args.version,
             args.reason,
             args.description,
             args.replaced_by,
-            args.notes
+            args.notes,
+            compress=not args.no_compress
         )
         print(f"\n✓ File archived successfully!")
-        print(f"  Location: {archive_path}")
+        print(f"  Name: {archived_name}")
+        print(f"  Restore with: python3 archive_versioning.py --restore {archived_name}")
     else:
         parser.print_help()
 
@@ -0,0 +1,542 @@
+#!/usr/bin/env python3
+"""
+BATCH RUNNER
+Message Batches mode for bulk Stage 2B device and Stage 1B worksheet generation
+
+Overnight re-generation across the library does not need interactive
+latency. Instead of one messages.create call per section/device, this script
+collects every pending request across books, submits them as Message Batches
+jobs, polls until they end and writes the results back:
+
+- Stage 2B: sections of --books whose Stage 0/1 checkpoints exist but that
+  have no kernel_stage2b_<section> checkpoint. Results are saved as section
+  checkpoints; the next `create_kernel.py` run merges them and finishes the
+  kernel without re-calling those sections.
+- Stage 1B: devices in --stage1b packages with no worksheet content (see
+  `run_stage1b.py --defer-worksheets`) or with the generic fallback content.
+  Results are written into the package JSON and the validation report is
+  regenerated.
+
+Each submission is recorded in outputs/batches/<name>.json (batch IDs and the
+target of every custom_id). Polling is resumable: results are applied once per
+custom_id, requests already in flight are not re-submitted, and failed,
+expired or schema-invalid results stay pending so the next submit picks them
+up again.
+
+--local runs batches through LocalBatchClient, an in-process stand-in that
+answers the batches API with ordinary messages.create calls (used by the
+tests and for dry runs against a fake client).
+
+Usage:
+    python3 batch_runner.py submit --books library.json --stage1b outputs/The_Giver_stage1b_v6_0.json
+    python3 batch_runner.py poll --wait
+    python3 batch_runner.py run --books library.json        # submit, wait and apply
+    python3 batch_runner.py status
+
+library.json:
+    [{"book_path": "books/Giver.pdf", "title": "The Giver", "author": "Lois Lowry", "edition": "2014"}]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional
+
+from api_client import _response_data, get_client
+from call_profiles import add_profile_arguments, profiles_from_args
+from create_kernel import Config, KernelCreator, load_protocols
+from output_schemas import coerce, get_schema, tool_for, validate
+from run_stage1b import build_worksheet_prompt, fallback_worksheet_content, generate_validation_report
+
+BATCH_DIR = Config.OUTPUTS_DIR / "batches"
+
+# Requests per submitted batch (the API accepts up to 100,000)
+MAX_BATCH_REQUESTS = 10000
+
+POLL_INTERVAL = 60  # seconds
+
+
+# ============================================================================
+# LOCAL STAND-IN
+# ============================================================================
+
+def _plain(value):
+    """SDK response objects -> JSON-compatible data"""
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if isinstance(value, SimpleNamespace):
+        value = vars(value)
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    return value
+
+
+def _namespace(value):
+    """JSON data -> attribute access, like the SDK's response objects
+    (tool_use "input" stays a dict, as in the SDK)"""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{k: v if k == "input" else _namespace(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_namespace(v) for v in value]
+    return value
+
+
+class LocalBatchClient:
+    """In-process stand-in for client.messages.batches
+
+    create() runs every request through the wrapped client's
+    messages.create and stores the results; the batch reports in_progress
+    for `polls_until_ended` retrieve() calls before it ends. With a
+    store_dir, batches survive between processes (poll in a later run).
+    """
+
+    def __init__(self, client, store_dir: Optional[Path] = None, polls_until_ended: int = 0):
+        self._client = client
+        self._store_dir = Path(store_dir) if store_dir else None
+        self._polls_until_ended = polls_until_ended
+        self._batches: Dict[str, Dict] = {}
+        self.messages = SimpleNamespace(create=client.messages.create, batches=self)
+
+    def _store(self, batch: Dict):
+        self._batches[batch["id"]] = batch
+        if self._store_dir:
+            self._store_dir.mkdir(parents=True, exist_ok=True)
+            with open(self._store_dir / f"{batch['id']}.json", 'w', encoding='utf-8') as f:
+                json.dump(batch, f)
+
+    def _load(self, batch_id: str) -> Dict:
+        if batch_id not in self._batches and self._store_dir:
+            path = self._store_dir / f"{batch_id}.json"
+            if path.exists():
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._batches[batch_id] = json.load(f)
+        if batch_id not in self._batches:
+            raise KeyError(f"Unknown batch {batch_id}")
+        return self._batches[batch_id]
+
+    @staticmethod
+    def _status(batch: Dict):
+        counts = {"processing": 0, "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0}
+        for result in batch["results"]:
+            counts[result["result"]["type"]] += 1
+        if batch["polls_left"] > 0:
+            counts = {**{k: 0 for k in counts}, "processing": len(batch["results"])}
+        return _namespace({
+            "id": batch["id"],
+            "processing_status": "in_progress" if batch["polls_left"] > 0 else "ended",
+            "request_counts": counts,
+        })
+
+    def create(self, requests: List[Dict]):
+        results = []
+        for request in requests:
+            try:
+                message = self._client.messages.create(**request["params"])
+                result = {"type": "succeeded", "message": _plain(message)}
+            except Exception as e:
+                result = {"type": "errored", "error": {"type": type(e).__name__, "message": str(e)}}
+            results.append({"custom_id": request["custom_id"], "result": result})
+        batch = {"id": f"msgbatch_local_{uuid.uuid4().hex[:16]}", "results": results,
+                 "polls_left": self._polls_until_ended}
+        self._store(batch)
+        return self._status(batch)
+
+    def retrieve(self, batch_id: str):
+        batch = self._load(batch_id)
+        status = self._status(batch)
+        if batch["polls_left"] > 0:
+            batch["polls_left"] -= 1
+            self._store(batch)
+        return status
+
+    def results(self, batch_id: str):
+        batch = self._load(batch_id)
+        if batch["polls_left"] > 0:
+            raise RuntimeError(f"Batch {batch_id} has not ended")
+        return iter(_namespace(batch["results"]))
+
+
+# ============================================================================
+# COLLECTING REQUESTS
+# ============================================================================
+
+def _custom_id(kind: str, target: Dict, prompt: str) -> str:
+    """Stable ID per target + prompt, so a changed prompt is a new request"""
+    digest = hashlib.sha1(json.dumps([target, prompt], sort_keys=True).encode('utf-8')).hexdigest()
+    return f"{kind}-{digest[:20]}"
+
+
+def _request_params(prompt: str, system_prompt: str, schema_name: str, profile: Dict) -> Dict:
+    """messages.create params for one batch request (batches take no timeout)"""
+    tool = tool_for(schema_name)
+    params = {
+        "model": profile["model"],
+        "max_tokens": profile["max_tokens"],
+        "messages": [{"role": "user", "content": prompt}],
+        "tools": [tool],
+        "tool_choice": {"type": "tool", "name": tool["name"]},
+    }
+    if system_prompt:
+        params["system"] = system_prompt
+    if profile.get("temperature") is not None:
+        params["temperature"] = profile["temperature"]
+    return params
+
+
+def load_library(path: str) -> List[Dict]:
+    """Book list: [{book_path, title, author, edition}] or {"books": [...]}"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    books = data.get("books", []) if isinstance(data, dict) else data
+    for book in books:
+        missing = [k for k in ("book_path", "title", "author", "edition") if not book.get(k)]
+        if missing:
+            raise ValueError(f"Library entry {book} is missing {', '.join(missing)}")
+    return books
+
+
+def _kernel_creator(book: Dict, client, protocols, call_profiles, book_text=None) -> KernelCreator:
+    return KernelCreator(book["book_path"], book["title"], book["author"], book["edition"],
+                         client=client, protocols=protocols, book_text=book_text,
+                         call_profiles=call_profiles)
+
+
+def collect_device_requests(books: List[Dict], client, call_profiles: Dict) -> List[Dict]:
+    """Pending Stage 2B section requests across books"""
+    requests = []
+    protocols = load_protocols() if books else {}
+    for book in books:
+        print(f"\n📖 {book['title']}")
+        creator = _kernel_creator(book, client, protocols, call_profiles)
+        pending = creator.pending_device_sections()
+        for item in pending:
+            target = {
+                "kind": "stage2b",
+                "book": {k: book[k] for k in ("book_path", "title", "author", "edition")},
+                "section": item["section"],
+                "chapter_range": item["chapter_range"],
+                "primary_chapter": item["primary_chapter"],
+            }
+            requests.append({
+                "custom_id": _custom_id("stage2b", target, item["prompt"]),
+                "params": _request_params(item["prompt"], item["system_prompt"], "stage2b_devices",
+                                          call_profiles["stage2b_section"]),
+                "target": target,
+            })
+        print(f"  ✓ {len(pending)} Stage 2B section(s) pending")
+    return requests
+
+
+def worksheet_pending(device: Dict) -> bool:
+    """True if a device has no worksheet content or only the generic fallback"""
+    content = device.get("worksheet_content")
+    return not content or content == fallback_worksheet_content(device.get("name", "Unknown Device"))
+
+
+def collect_worksheet_requests(stage1b_paths: List[str], call_profiles: Dict) -> List[Dict]:
+    """Pending worksheet content requests across Stage 1B packages"""
+    requests = []
+    for path in stage1b_paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            package = json.load(f)
+        count = 0
+        for week_index, week in enumerate(package.get("week_packages", [])):
+            for device_index, device in enumerate(week.get("micro_devices", [])):
+                if not worksheet_pending(device):
+                    continue
+                prompt, system_prompt = build_worksheet_prompt(device, week.get("macro_focus", ""),
+                                                               week.get("text_title", ""))
+                target = {
+                    "kind": "worksheet",
+                    "stage1b_path": str(path),
+                    "week_index": week_index,
+                    "device_index": device_index,
+                    "device_name": device.get("name", ""),
+                }
+                requests.append({
+                    "custom_id": _custom_id("worksheet", target, prompt),
+                    "params": _request_params(prompt, system_prompt, "worksheet_content",
+                                              call_profiles["worksheet_content"]),
+                    "target": target,
+                })
+                count += 1
+        print(f"\n📦 {path}: {count} worksheet(s) pending")
+    return requests
+
+
+# ============================================================================
+# STATE FILES
+# ============================================================================
+
+def _write_json_atomic(path: Path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def load_states(batch_dir: Path = BATCH_DIR) -> List[Dict]:
+    states = []
+    for path in sorted(batch_dir.glob("*.json")):
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        state["_path"] = str(path)
+        states.append(state)
+    return states
+
+
+def save_state(state: Dict):
+    _write_json_atomic(Path(state["_path"]), {k: v for k, v in state.items() if k != "_path"})
+
+
+def in_flight_ids(states: Iterable[Dict]) -> set:
+    return {cid for state in states for cid, entry in state["requests"].items()
+            if entry["status"] == "submitted"}
+
+
+# ============================================================================
+# SUBMIT / POLL / APPLY
+# ============================================================================
+
+def submit(batch_client, requests: List[Dict], batch_dir: Path = BATCH_DIR,
+           name: Optional[str] = None) -> Optional[Dict]:
+    """Submit requests not already in flight; returns the new state (None if nothing to do)"""
+    in_flight = in_flight_ids(load_states(batch_dir))
+    unique = {}
+    for request in requests:
+        if request["custom_id"] not in in_flight:
+            unique.setdefault(request["custom_id"], request)
+    skipped = len(requests) - len(unique)
+    if skipped:
+        print(f"  ⏭️ Skipping {skipped} request(s) already in flight or duplicated")
+    if not unique:
+        print("  ✓ Nothing to submit")
+        return None
+
+    name = name or datetime.now().strftime("batch_%Y%m%d_%H%M%S")
+    state = {
+        "name": name,
+        "created": datetime.now().isoformat(),
+        "batches": [],
+        "requests": {cid: {"target": r["target"], "status": "submitted", "error": None}
+                     for cid, r in unique.items()},
+        "_path": str(batch_dir / f"{name}.json"),
+    }
+    items = list(unique.values())
+    for start in range(0, len(items), MAX_BATCH_REQUESTS):
+        chunk = items[start:start + MAX_BATCH_REQUESTS]
+        batch = batch_client.messages.batches.create(
+            requests=[{"custom_id": r["custom_id"], "params": r["params"]} for r in chunk]
+        )
+        state["batches"].append({"id": batch.id, "status": batch.processing_status,
+                                 "custom_ids": [r["custom_id"] for r in chunk]})
+        print(f"  📤 Submitted {batch.id} ({len(chunk)} requests)")
+        save_state(state)
+    return state
+
+
+def _result_data(result, schema_name: str):
+    """Parsed, schema-checked tool input of a succeeded result; raises ValueError"""
+    data = coerce(schema_name, _response_data(result.message, f"record_{schema_name}"))
+    errors = validate(data, get_schema(schema_name))
+    if errors:
+        raise ValueError(f"schema errors: {errors[:5]}")
+    return data
+
+
+def _apply_results(state: Dict, batch: Dict, results, batch_client, call_profiles: Dict,
+                   book_cache: Dict) -> Dict:
+    """Write one ended batch's results to checkpoints/packages; returns status counts"""
+    counts = {"applied": 0, "failed": 0}
+    worksheets: Dict[str, Dict] = {}  # stage1b path -> {(week, device): content}
+
+    for item in results:
+        entry = state["requests"].get(item.custom_id)
+        if entry is None or entry["status"] != "submitted":
+            continue  # not ours, or already applied on an earlier poll
+        target = entry["target"]
+        schema_name = "stage2b_devices" if target["kind"] == "stage2b" else "worksheet_content"
+        try:
+            if item.result.type != "succeeded":
+                error = getattr(item.result, "error", None)
+                raise ValueError(f"{item.result.type} {getattr(error, 'message', error) or ''}".strip())
+            data = _result_data(item.result, schema_name)
+        except (ValueError, json.JSONDecodeError) as e:
+            entry.update(status="failed", error=str(e))
+            counts["failed"] += 1
+            continue
+
+        if target["kind"] == "stage2b":
+            book = target["book"]
+            if book["title"] not in book_cache:
+                # Only the checkpoint paths are needed; skip loading the book
+                protocols = next((c.protocols for c in book_cache.values()), None) or load_protocols()
+                book_cache[book["title"]] = _kernel_creator(book, batch_client, protocols, call_profiles,
+                                                         book_text="")
+            book_cache[book["title"]].save_section_devices(
+                target["section"], target["chapter_range"], target["primary_chapter"], data["devices"]
+            )
+        else:
+            worksheets.setdefault(target["stage1b_path"], {})[
+                (target["week_index"], target["device_index"], target["device_name"])] = data
+        entry.update(status="applied", error=None)
+        counts["applied"] += 1
+
+    for path, contents in worksheets.items():
+        moved = _apply_worksheets(Path(path), contents, state)
+        counts["applied"] -= moved
+        counts["failed"] += moved
+    batch["status"] = "applied"
+    return counts
+
+
+def _apply_worksheets(path: Path, contents: Dict, state: Dict) -> int:
+    """Write worksheet content into a Stage 1B package and regenerate its validation report
+
+    Returns the number of devices that moved since submission (left pending).
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        package = json.load(f)
+    written = moved = 0
+    for (week_index, device_index, device_name), content in contents.items():
+        try:
+            device = package["week_packages"][week_index]["micro_devices"][device_index]
+        except (KeyError, IndexError):
+            device = None
+        if device is None or device.get("name", "") != device_name:
+            print(f"  ⚠️ {path.name}: {device_name} moved since submission, left pending")
+            for entry in state["requests"].values():
+                t = entry["target"]
+                if t.get("stage1b_path") == str(path) and (t.get("week_index"), t.get("device_index")) == (week_index, device_index):
+                    entry.update(status="failed", error="device moved since submission")
+            moved += 1
+            continue
+        device["worksheet_content"] = content
+        written += 1
+    _write_json_atomic(path, package)
+
+    title = package.get("metadata", {}).get("text_title", "Unknown")
+    safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).strip().replace(' ', '_')
+    report_path = generate_validation_report(package, safe_title)
+    print(f"  ✅ {path.name}: {written} worksheet(s) written, report: {report_path}")
+    return moved
+
+
+def poll(batch_client, call_profiles: Dict, batch_dir: Path = BATCH_DIR, wait: bool = False,
+         interval: float = POLL_INTERVAL) -> Dict:
+    """Check every unapplied batch and apply those that have ended"""
+    totals = {"applied": 0, "failed": 0, "in_progress": 0}
+    book_cache: Dict[str, KernelCreator] = {}
+    while True:
+        totals["in_progress"] = 0
+        for state in load_states(batch_dir):
+            for batch in state["batches"]:
+                if batch["status"] == "applied":
+                    continue
+                status = batch_client.messages.batches.retrieve(batch["id"])
+                batch["status"] = status.processing_status
+                if status.processing_status != "ended":
+                    totals["in_progress"] += 1
+                    c = status.request_counts
+                    print(f"  ⏳ {batch['id']}: {c.processing} processing, {c.succeeded} succeeded, {c.errored} errored")
+                    continue
+                print(f"  📥 {batch['id']} ended, applying results...")
+                counts = _apply_results(state, batch, batch_client.messages.batches.results(batch["id"]),
+                                        batch_client, call_profiles, book_cache)
+                # Requests the batch never returned stay pending for the next submit
+                for cid in batch["custom_ids"]:
+                    if state["requests"][cid]["status"] == "submitted":
+                        state["requests"][cid].update(status="failed", error="no result returned")
+                        counts["failed"] += 1
+                totals["applied"] += counts["applied"]
+                totals["failed"] += counts["failed"]
+                print(f"  ✓ {counts['applied']} applied, {counts['failed']} failed")
+            save_state(state)
+        if not wait or not totals["in_progress"]:
+            break
+        time.sleep(interval)
+
+    if book_cache:
+        titles = ", ".join(f'"{t}"' for t in book_cache)
+        print(f"\n💡 Stage 2B section checkpoints written for {titles}; "
+              f"re-run create_kernel.py for each book to merge them and finish the kernel")
+    if totals["failed"]:
+        print(f"⚠️ {totals['failed']} request(s) failed and stay pending; run submit again to retry")
+    return totals
+
+
+def print_status(batch_dir: Path = BATCH_DIR):
+    states = load_states(batch_dir)
+    if not states:
+        print("No batch submissions")
+        return
+    print(f"{'Submission':<26} {'Batches':>7} {'Submitted':>9} {'Applied':>7} {'Failed':>6}")
+    print("-" * 60)
+    for state in states:
+        statuses = [e["status"] for e in state["requests"].values()]
+        print(f"{state['name']:<26} {len(state['batches']):>7} {statuses.count('submitted'):>9} "
+              f"{statuses.count('applied'):>7} {statuses.count('failed'):>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Bulk Stage 2B / worksheet generation through the Message Batches API',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('command', choices=['submit', 'poll', 'run', 'status'])
+    parser.add_argument('--books', type=str, help='Library JSON of books whose Stage 2B sections to generate')
+    parser.add_argument('--stage1b', nargs='+', default=[], help='Stage 1B package JSON files to fill in')
+    parser.add_argument('--name', type=str, help='Submission name (default: timestamp)')
+    parser.add_argument('--wait', action='store_true', help='poll: keep polling until every batch has ended')
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL, help='Seconds between polls')
+    parser.add_argument('--local', action='store_true',
+                        help='Use the in-process LocalBatchClient instead of the batches API')
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        print_status()
+        return
+
+    try:
+        call_profiles = profiles_from_args(args)
+        books = load_library(args.books) if args.books else []
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+    if args.command in ('submit', 'run') and not books and not args.stage1b:
+        parser.error('submit/run need --books and/or --stage1b')
+
+    client = get_client()
+    batch_client = LocalBatchClient(client, store_dir=BATCH_DIR / "local") if args.local else client
+
+    if args.command in ('submit', 'run'):
+        print("\n" + "="*80)
+        print("BATCH SUBMIT")
+        print("="*80)
+        requests = collect_device_requests(books, batch_client, call_profiles)
+        requests += collect_worksheet_requests(args.stage1b, call_profiles)
+        print(f"\n📋 {len(requests)} pending request(s)")
+        submit(batch_client, requests, name=args.name)
+
+    if args.command in ('poll', 'run'):
+        print("\n" + "="*80)
+        print("BATCH POLL")
+        print("="*80)
+        totals = poll(batch_client, call_profiles, wait=args.wait or args.command == 'run',
+                      interval=args.interval)
+        sys.exit(1 if totals["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+CALL PROFILES
+Per-stage model routing: model, max_tokens, timeout, temperature and fallback
+
+Every create_kernel.py call used Config.MODEL with 16,000 output tokens, and
+run_stage1b.py hard-coded the same model for small worksheet JSON. Each call
+site now names a profile from CALL_PROFILES; small structured tasks can run
+on a faster model with a smaller output cap without touching the heavy
+stages.
+
+Profile fields:
+    model           Model ID
+    max_tokens      Output cap
+    timeout         Request timeout in seconds
+    temperature     Sampling temperature (None = API default)
+    fallback_model  Retried once on timeouts, overload/5xx or an unknown
+                    model (None = no fallback)
+    hedge_percentile  Opt-in hedging: once a request has been outstanding
+                    longer than this percentile of the profile's recent
+                    latencies, send a duplicate and take the first response
+                    (None = off; see call_telemetry.py). Hedged calls can
+                    be billed twice.
+
+Overrides, in order: a JSON file of {profile: {field: value}}
+(--profiles-file), then --profile PROFILE.FIELD=VALUE flags.
+
+Usage:
+    python3 call_profiles.py
+    python3 create_kernel.py ... --profile stage2b_section.max_tokens=3000
+    python3 run_stage1b.py outputs/Book_stage1a_v6_0.json --profile worksheet_content.model=claude-sonnet-4-20250514
+    python3 create_kernel.py ... --profile stage2b_section.hedge_percentile=95
+"""
+
+import copy
+import json
+from typing import Dict, List, Optional
+
+DEFAULT_MODEL = "claude-sonnet-4-20250514"
+FAST_MODEL = "claude-3-5-haiku-20241022"
+
+CALL_PROFILES = {
+    # Kernel creation (create_kernel.py)
+    'stage0': {'model': DEFAULT_MODEL, 'max_tokens': 16000, 'timeout': 300, 'temperature': None, 'fallback_model': None, 'hedge_percentile': None},
+    'stage1': {'model': DEFAULT_MODEL, 'max_tokens': 16000, 'timeout': 300, 'temperature': None, 'fallback_model': None, 'hedge_percentile': None},
+    'stage2a': {'model': DEFAULT_MODEL, 'max_tokens': 16000, 'timeout': 300, 'temperature': None, 'fallback_model': None, 'hedge_percentile': None},
+    'stage2b_section': {'model': DEFAULT_MODEL, 'max_tokens': 4096, 'timeout': 180, 'temperature': None, 'fallback_model': None, 'hedge_percentile': None},
+    'reasoning_doc': {'model': DEFAULT_MODEL, 'max_tokens': 16000, 'timeout': 600, 'temperature': None, 'fallback_model': None, 'hedge_percentile': None},
+    # Stage 1B worksheet MC/sequencing JSON (run_stage1b.py)
+    'worksheet_content': {'model': FAST_MODEL, 'max_tokens': 2000, 'timeout': 60, 'temperature': None, 'fallback_model': DEFAULT_MODEL, 'hedge_percentile': None},
+}
+
+# Each profile carries its own name (the call telemetry key)
+for _name, _profile in CALL_PROFILES.items():
+    _profile['name'] = _name
+
+PROFILE_FIELDS = {
+    'model': str,
+    'max_tokens': int,
+    'timeout': float,
+    'temperature': float,
+    'fallback_model': str,
+    'hedge_percentile': float,
+}
+
+
+def _coerce_field(field: str, value):
+    if field not in PROFILE_FIELDS:
+        raise ValueError(f"Unknown profile field '{field}' (choose from {', '.join(PROFILE_FIELDS)})")
+    if value is None or (isinstance(value, str) and value.lower() in ('none', 'null', '')):
+        if field in ('model', 'max_tokens'):
+            raise ValueError(f"Profile field '{field}' cannot be empty")
+        return None
+    return PROFILE_FIELDS[field](value)
+
+
+def parse_profile_overrides(items: Optional[List[str]]) -> Dict[str, Dict]:
+    """Parse ["stage0.model=...", "worksheet_content.max_tokens=1500"] into nested overrides"""
+    overrides = {}
+    for item in items or []:
+        key, sep, value = item.partition('=')
+        profile, dot, field = key.strip().partition('.')
+        if not sep or not dot:
+            raise ValueError(f"Invalid profile override '{item}' (expected PROFILE.FIELD=VALUE)")
+        overrides.setdefault(profile, {})[field] = value.strip()
+    return overrides
+
+
+def load_call_profiles(overrides: Optional[Dict[str, Dict]] = None,
+                       profiles_file: Optional[str] = None) -> Dict[str, Dict]:
+    """CALL_PROFILES with file and per-run overrides applied (validated)"""
+    profiles = copy.deepcopy(CALL_PROFILES)
+    layers = []
+    if profiles_file:
+        with open(profiles_file, 'r', encoding='utf-8') as f:
+            layers.append(json.load(f))
+    if overrides:
+        layers.append(overrides)
+
+    for layer in layers:
+        for name, fields in layer.items():
+            if name not in profiles:
+                raise ValueError(f"Unknown call profile '{name}' (choose from {', '.join(profiles)})")
+            for field, value in fields.items():
+                profiles[name][field] = _coerce_field(field, value)
+    return profiles
+
+
+def add_profile_arguments(parser):
+    """Add --profile / --profiles-file to a stage script's argparse parser"""
+    parser.add_argument('--profile', action='append', metavar='PROFILE.FIELD=VALUE',
+                        help=f"Override a call profile field, e.g. worksheet_content.model={DEFAULT_MODEL} "
+                             f"(profiles: {', '.join(CALL_PROFILES)})")
+    parser.add_argument('--profiles-file', type=str,
+                        help='JSON file of {profile: {field: value}} overrides')
+
+
+def profiles_from_args(args) -> Dict[str, Dict]:
+    return load_call_profiles(parse_profile_overrides(args.profile), args.profiles_file)
+
+
+def main():
+    print(f"{'Profile':<18} {'Model':<28} {'max_tokens':>10} {'timeout':>8} {'temp':>5} {'hedge':>5}  Fallback")
+    print("-" * 96)
+    for name, p in CALL_PROFILES.items():
+        temperature = '-' if p['temperature'] is None else p['temperature']
+        hedge = f"p{p['hedge_percentile']:g}" if p['hedge_percentile'] else '-'
+        print(f"{name:<18} {p['model']:<28} {p['max_tokens']:>10,} {p['timeout']:>8} {temperature:>5} {hedge:>5}  "
+              f"{p['fallback_model'] or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+CALL TELEMETRY
+Per-profile latency, timeout, hedge, fallback and coalescing counters for model calls
+
+api_client.create_message records every request here under its call
+profile's name (call_profiles.py: one profile per stage). The latency
+samples also drive hedging: a profile with hedge_percentile set sends a
+duplicate request once the first has been outstanding longer than that
+percentile of the profile's recent latencies.
+
+Counters are process-wide and thread-safe. create_kernel.py and
+run_stage1b.py print a summary at the end of a run; pipeline_worker.py
+reports it on /health.
+"""
+
+import math
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+# Recent successful latencies kept per profile
+LATENCY_WINDOW = 200
+
+# Samples needed before a percentile (and so a hedge delay) is trusted
+MIN_SAMPLES = 8
+
+# 'coalesced' counts callers that shared another caller's in-flight request
+COUNTERS = ('calls', 'ok', 'timeouts', 'errors', 'hedges', 'hedge_wins', 'fallbacks', 'coalesced')
+
+
+class CallTelemetry:
+    """Thread-safe per-profile call counters and latency windows"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._window = window
+        self._lock = threading.Lock()
+        self._profiles: Dict[str, Dict] = {}
+
+    def _entry(self, profile: str) -> Dict:
+        if profile not in self._profiles:
+            self._profiles[profile] = {**{c: 0 for c in COUNTERS}, 'latencies': deque(maxlen=self._window)}
+        return self._profiles[profile]
+
+    def record(self, profile: str, outcome: str, latency: Optional[float] = None):
+        """One finished request: outcome is 'ok', 'timeout' or 'error'"""
+        with self._lock:
+            entry = self._entry(profile)
+            entry['calls'] += 1
+            entry[{'ok': 'ok', 'timeout': 'timeouts'}.get(outcome, 'errors')] += 1
+            if outcome == 'ok' and latency is not None:
+                entry['latencies'].append(latency)
+
+    def count(self, profile: str, counter: str):
+        with self._lock:
+            self._entry(profile)[counter] += 1
+
+    def percentile(self, profile: str, pct: float, min_samples: int = MIN_SAMPLES) -> Optional[float]:
+        """Latency percentile in seconds, or None until min_samples are recorded"""
+        with self._lock:
+            samples = sorted(self._entry(profile)['latencies'])
+        if not samples or len(samples) < min_samples:
+            return None
+        index = min(len(samples) - 1, max(0, math.ceil(pct / 100 * len(samples)) - 1))
+        return samples[index]
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            names = list(self._profiles)
+            result = {name: {c: self._profiles[name][c] for c in COUNTERS} for name in names}
+        for name in names:
+            for pct in (50, 90, 99):
+                value = self.percentile(name, pct, min_samples=1)
+                result[name][f'p{pct}'] = round(value, 2) if value is not None else None
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._profiles.clear()
+
+
+TELEMETRY = CallTelemetry()
+
+
+def format_summary(snapshot: Optional[Dict[str, Dict]] = None) -> str:
+    """Table of the snapshot for end-of-run output ('' when no calls were made)"""
+    snapshot = TELEMETRY.snapshot() if snapshot is None else snapshot
+    if not snapshot:
+        return ""
+
+    def seconds(value):
+        return '-' if value is None else f"{value:.1f}s"
+
+    lines = [f"{'Profile':<18} {'Calls':>5} {'Timeouts':>8} {'Errors':>6} {'Hedges':>6} {'Won':>4} "
+             f"{'Fallback':>8} {'Shared':>6} {'p50':>7} {'p90':>7} {'p99':>7}",
+             "-" * 95]
+    for name, s in snapshot.items():
+        lines.append(f"{name:<18} {s['calls']:>5} {s['timeouts']:>8} {s['errors']:>6} {s['hedges']:>6} "
+                     f"{s['hedge_wins']:>4} {s['fallbacks']:>8} {s['coalesced']:>6} {seconds(s['p50']):>7} "
+                     f"{seconds(s['p90']):>7} {seconds(s['p99']):>7}")
+    return "\n".join(lines)
@@ -16,28 +16,73 @@ v2.1 Changes:
 User reviews and approves each stage before continuing.
 """
 
-import anthropic
 import argparse
+import contextvars
+import copy
+import hashlib
 import json
 import os
 import re
+import socket
 import sys
+import threading
 import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
-import PyPDF2
 from typing import Dict, List, Optional
 
+from api_client import (
+    StructuredOutputError, acall_structured, acreate_message, get_async_client, run_concurrently, run_sync,
+    stream_message,
+)
+from call_profiles import add_profile_arguments, load_call_profiles, profiles_from_args
+from call_telemetry import format_summary
+from job_scheduler import check_cancelled
+from kernel_patch import make_patch, save_patch
+from output_schemas import coerce
+from passage_index import format_passages, index_for_book
+from structure_detection import climax_candidates, conventional_alignment, detect_structure
+from protocol_compiler import compile_stage_protocols
+from taxonomy_index import get_taxonomy_index, section_entries, section_slice
+from usage_ledger import call_context, enable_ledger
+
+try:
+    import fcntl  # advisory checkpoint locks (POSIX)
+except ImportError:
+    fcntl = None
+
 # Configuration
 class Config:
     """Configuration settings"""
     API_KEY = os.getenv("ANTHROPIC_API_KEY")
-    MODEL = "claude-sonnet-4-20250514"
-    MAX_TOKENS = 16000
+    # Model, max_tokens, timeout, temperature and fallback per call: see call_profiles.py
+    
+    # Minimum spacing between the last API call and the next API-calling stage
+    RATE_LIMIT_DELAY = 60
+    
+    # Stage 0 with confidently detected chapters: words sent per candidate climax chapter
+    STAGE0_CLIMAX_WINDOW_WORDS = 700
+    # ... taken from the chapter's passages that best match this query (passage_index.py)
+    STAGE0_CLIMAX_QUERY = ("suddenly realized truth decided finally screamed shouted cried death died dead killed "
+                           "blood fight ran escape fear terrified trembling heart pounding never again changed forever")
+    
+    # Stage 2B prompts get only the taxonomy entries for the section's tier (see taxonomy_index.py)
+    SECTION_TAXONOMY_SLICES = True
+    
+    # Streamed ReasoningDoc: progress line every N tokens (estimated from
+    # characters), and continuation calls when it stops at max_tokens
+    CHARS_PER_TOKEN = 3.5
+    STREAM_PROGRESS_TOKENS = 500
+    REASONING_DOC_CONTINUATIONS = 2
     
     # Directories
     PROTOCOLS_DIR = Path("protocols")
+    PROTOCOL_CACHE_DIR = PROTOCOLS_DIR / ".compiled"
     BOOKS_DIR = Path("books")
+    PASSAGE_CACHE_DIR = BOOKS_DIR / ".passages"
     KERNELS_DIR = Path("kernels")
     OUTPUTS_DIR = Path("outputs")
     
@@ -177,27 +222,163 @@ TIER_TO_FREYTAG = {
     5: 'resolution'
 }
 
+FREYTAG_SECTIONS = ['exposition', 'rising_action', 'climax', 'falling_action', 'resolution']
+
+# Checkpointed stages in pipeline order (see --from-stage)
+CHECKPOINT_STAGES = ['kernel_stage0', 'kernel_stage1', 'kernel_stage2a', 'kernel_stage2b']
+
+# Stages that can regenerate individual Freytag sections (see --sections)
+SECTIONED_STAGES = ['kernel_stage1', 'kernel_stage2b']
+
+# Kernel stage graph: stage -> (KernelCreator method, dependencies).
+# Stages whose dependencies are met run concurrently: 2A and 2B only read the
+# Stage 1 extracts and the book text. The POV filter that links them runs in
+# join_stage2 once both are done.
+STAGE_DAG = {
+    'Stage 0': ('stage0_structure_alignment', []),
+    'Stage 1': ('stage1_extract_freytag', ['Stage 0']),
+    'Stage 2A': ('stage2a_tag_macro', ['Stage 1']),
+    'Stage 2B': ('stage2b_tag_devices', ['Stage 1']),
+}
+
+# Checkpoint each graph stage builds; its lock is held while the stage runs
+STAGE_CHECKPOINTS = {
+    'Stage 0': 'kernel_stage0',
+    'Stage 1': 'kernel_stage1',
+    'Stage 2A': 'kernel_stage2a',
+    'Stage 2B': 'kernel_stage2b',
+}
+
+def checkpoint_key(title: str, stage_name: str) -> str:
+    """File-safe '<Title>_<stage>' name of a title's checkpoint; also the lock
+    key job_queue.py leases so two workers never build the same stage at once"""
+    safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).strip()
+    return f"{safe_title.replace(' ', '_')}_{stage_name}"
+
+
+def _normalize_chapter_range(chapter_range) -> str:
+    """Normalize a chapter range to numeric-only form: 'Chapters 1-3' -> '1-3', 7 -> '7'"""
+    if isinstance(chapter_range, (list, tuple)):
+        chapters = [int(c) for c in chapter_range]
+        if not chapters:
+            return ""
+        return str(chapters[0]) if len(chapters) == 1 else f"{min(chapters)}-{max(chapters)}"
+    value = str(chapter_range).strip()
+    value = re.sub(r'^(chapters?|ch\.?)\s*', '', value, flags=re.IGNORECASE)
+    value = re.sub(r'\s*[–—-]\s*', '-', value)
+    return value.strip()
+
+
+def load_protocols() -> Dict[str, str]:
+    """Load all protocol markdown files"""
+    print("\nðŸ“š Loading protocols...")
+    protocols = {}
+    
+    protocol_files = {
+        "structure_alignment": Config.STRUCTURE_ALIGNMENT,
+        "kernel_validation": Config.KERNEL_VALIDATION,
+        "kernel_enhancement": Config.KERNEL_ENHANCEMENT,
+        "artifact_1": Config.ARTIFACT_1,
+        "artifact_2": Config.ARTIFACT_2,
+        "lem": Config.LEM
+    }
+    
+    for key, filename in protocol_files.items():
+        filepath = Config.PROTOCOLS_DIR / filename
+        if not filepath.exists():
+            print(f"âš ï¸  Warning: {filename} not found, skipping...")
+            protocols[key] = ""
+            continue
+            
+        with open(filepath, 'r', encoding='utf-8') as f:
+            protocols[key] = f.read()
+        print(f"  âœ“ Loaded {filename}")
+    
+    return protocols
+
+
+def load_book_text(book_path) -> str:
+    """Load book text from PDF or txt file"""
+    book_path = Path(book_path)
+    print(f"\nðŸ“– Loading book: {book_path.name}")
+    
+    if book_path.suffix.lower() == '.pdf':
+        return _load_pdf_text(book_path)
+    elif book_path.suffix.lower() == '.txt':
+        with open(book_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    else:
+        raise ValueError(f"Unsupported file type: {book_path.suffix}")
+
+
+def _load_pdf_text(book_path: Path) -> str:
+    """Extract text from PDF"""
+    import PyPDF2  # deferred: .txt books and checkpoint-only runs never need it
+    
+    text = ""
+    with open(book_path, 'rb') as f:
+        pdf_reader = PyPDF2.PdfReader(f)
+        total_pages = len(pdf_reader.pages)
+        print(f"  ðŸ“„ Extracting text from {total_pages} pages...")
+        
+        for i, page in enumerate(pdf_reader.pages):
+            text += page.extract_text()
+            if (i + 1) % 50 == 0:
+                print(f"    Progress: {i + 1}/{total_pages} pages")
+    
+    print(f"  âœ“ Extracted {len(text):,} characters")
+    return text
+
+
 class KernelCreator:
     """Main class for creating kernel JSONs"""
     
-    def __init__(self, book_path: str, title: str, author: str, edition: str):
+    def __init__(self, book_path: str, title: str, author: str, edition: str,
+                 client=None, protocols: Optional[Dict[str, str]] = None,
+                 book_text: Optional[str] = None, local_stage1: bool = False,
+                 local_structure: bool = False, call_profiles: Optional[Dict[str, Dict]] = None,
+                 plan_only: bool = False):
+        """Set up a kernel build.
+        
+        client, protocols and book_text may be passed in by a long-running
+        caller (pipeline_worker.py) that keeps them warm between jobs; when
+        omitted they are created/loaded here as before.
+        
+        local_stage1 builds the Stage 1 extracts from the Stage 0 alignment
+        instead of making a model call (see _build_local_extracts).
+        local_structure skips the Stage 0 call when chapter headings are
+        detected confidently (see structure_detection.py).
+        call_profiles overrides the per-stage model settings (see
+        call_profiles.load_call_profiles).
+        plan_only builds prompts for pipeline_planner.py without ever
+        calling the model, so no API key is needed.
+        
+        Each run gets a run_id, recorded in the checkpoints it writes.
+        """
         self.book_path = Path(book_path)
         self.title = title
         self.author = author
         self.edition = edition
         self.total_chapters = None  # Will be set by Stage 0
-        
-        # Initialize API client
-        if not Config.API_KEY:
+        self.local_stage1 = local_stage1
+        self.local_structure = local_structure
+        self.call_profiles = call_profiles or load_call_profiles()
+        self.run_id = uuid.uuid4().hex[:12]
+        
+        # API client (shared per process) is created on first model call;
+        # fail fast here if there is no key to create it with
+        if client is None and not Config.API_KEY and not plan_only:
             raise ValueError("ANTHROPIC_API_KEY environment variable not set")
-        self.client = anthropic.Anthropic(api_key=Config.API_KEY)
+        self._client = client
         
         # Load protocols
-        self.protocols = self._load_protocols()
+        self.protocols = protocols if protocols is not None else self._load_protocols()
+        self._stage_protocols = None
         
         # Load book text
-        self.book_text = self._load_book()
+        self.book_text = book_text if book_text is not None else self._load_book()
         self.book_words = self.book_text.split()
+        self._passage_index = None
         
         # Storage for stage outputs
         self.structure_alignment = None
@@ -205,117 +386,231 @@ class KernelCreator:
         self.stage2a_macro = None
         self.stage2b_devices = None
         self.kernel = None
+        self.kernel_path = None
+        self.reasoning_doc_path = None
+        
+        # Sections to regenerate per stage (empty = normal whole-stage run)
+        self.section_targets = {}
+        
+        # Time of the most recent API response (rate limit spacing)
+        self._last_api_call = None
+        self._rate_limit_lock = threading.Lock()
+        # Per-thread flag: wait out the spacing before this stage's first call
+        self._stage_local = threading.local()
+    
+    @property
+    def client(self):
+        """API client (the shared async client), created on first use so
+        checkpoint-only resumes skip the SDK import"""
+        if self._client is None:
+            self._client = get_async_client()
+        return self._client
+    
+    @property
+    def stage_protocols(self):
+        """Per-stage compiled protocol sections, compiled on first use (see protocol_compiler.py)"""
+        if self._stage_protocols is None:
+            self._stage_protocols = compile_stage_protocols(self.protocols, Config.PROTOCOL_CACHE_DIR)
+        return self._stage_protocols
+    
+    @property
+    def passage_index(self):
+        """BM25 index over the book's passages, built on first use (see passage_index.py)"""
+        if self._passage_index is None:
+            self._passage_index = index_for_book(self.book_path, self.book_text, Config.PASSAGE_CACHE_DIR)
+        return self._passage_index
     
     def _get_checkpoint_path(self, stage_name: str) -> Path:
         """Get checkpoint file path for a stage."""
-        safe_title = "".join(c for c in self.title if c.isalnum() or c in (' ', '-', '_')).strip()
-        safe_title = safe_title.replace(' ', '_')
-        return Config.OUTPUTS_DIR / f"{safe_title}_{stage_name}.json"
+        return Config.OUTPUTS_DIR / f"{checkpoint_key(self.title, stage_name)}.json"
+    
+    @contextmanager
+    def _checkpoint_lock(self, stage_name: str):
+        """Hold the advisory lock on a stage's checkpoint while it is built.
+        
+        A second run for the same title (same outputs directory) blocks here
+        until the first finishes the stage, then loads its checkpoint instead
+        of paying for the stage again. No-op where fcntl is unavailable.
+        Lock files live in outputs/.locks/ so they never mix with the outputs.
+        """
+        if fcntl is None:
+            yield
+            return
+        path = Config.OUTPUTS_DIR / ".locks" / f"{checkpoint_key(self.title, stage_name)}.lock"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'a+', encoding='utf-8') as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                f.seek(0)
+                holder = f.read().strip() or "another run"
+                print(f"  ⏳ {stage_name} is being built by {holder} - waiting to reuse its checkpoint")
+                fcntl.flock(f, fcntl.LOCK_EX)
+            f.truncate(0)
+            f.write(f"run {self.run_id} (pid {os.getpid()} on {socket.gethostname()})")
+            f.flush()
+            try:
+                yield
+            finally:
+                f.truncate(0)
+                fcntl.flock(f, fcntl.LOCK_UN)
     
     def _save_checkpoint(self, stage_name: str, data: dict):
-        """Save stage output as checkpoint."""
+        """Save stage output as checkpoint (atomically, with this run's ID)."""
         path = self._get_checkpoint_path(stage_name)
         path.parent.mkdir(parents=True, exist_ok=True)
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2)
+        envelope = {
+            "_checkpoint": {"stage": stage_name, "run_id": self.run_id, "saved": datetime.now().isoformat()},
+            "data": data,
+        }
+        tmp_path = path.with_name(f"{path.name}.{self.run_id}.tmp")
+        check_cancelled()
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(envelope, f, indent=2)
+        os.replace(tmp_path, path)
         print(f"  💾 Checkpoint saved: {path.name}")
     
     def _load_checkpoint(self, stage_name: str) -> dict | None:
-        """Load checkpoint if exists and valid."""
+        """Load checkpoint if exists and valid.
+        
+        Checkpoints written before run IDs were recorded hold the stage
+        output directly and load as before.
+        """
         path = self._get_checkpoint_path(stage_name)
         if not path.exists():
             return None
         try:
             with open(path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-            print(f"  ✅ Loaded checkpoint: {path.name}")
-            return data
         except json.JSONDecodeError:
             print(f"  ⚠️ Invalid checkpoint, will regenerate: {path.name}")
             return None
+        if isinstance(data, dict) and set(data) == {"_checkpoint", "data"}:
+            run_id = data["_checkpoint"].get("run_id")
+            origin = "" if run_id == self.run_id else f" (run {run_id})"
+            print(f"  ✅ Loaded checkpoint: {path.name}{origin}")
+            return data["data"]
+        print(f"  ✅ Loaded checkpoint: {path.name}")
+        return data
     
     def _clear_checkpoints_from(self, stage_name: str):
-        """Clear this and all later checkpoints (for force restart)."""
-        stages = ['kernel_stage0', 'kernel_stage1', 'kernel_stage2a', 'kernel_stage2b']
+        """Clear this and all later checkpoints (for force restart).
+        
+        Each stage's files are deleted under its checkpoint lock, so a
+        concurrent run building or reading that stage is never cut short.
+        """
+        stages = CHECKPOINT_STAGES
         start_idx = stages.index(stage_name) if stage_name in stages else 0
         for stage in stages[start_idx:]:
-            path = self._get_checkpoint_path(stage)
-            if path.exists():
-                path.unlink()
-                print(f"  🗑️ Cleared checkpoint: {path.name}")
+            names = [stage]
+            if stage in SECTIONED_STAGES:
+                names += [f"{stage}_{section}" for section in FREYTAG_SECTIONS]
+            with self._checkpoint_lock(stage):
+                for name in names:
+                    path = self._get_checkpoint_path(name)
+                    if path.exists():
+                        path.unlink()
+                        print(f"  🗑️ Cleared checkpoint: {path.name}")
+    
+    def set_section_targets(self, sections: List[str], from_stage: Optional[str] = None):
+        """Regenerate only these Freytag sections in Stage 1 and Stage 2B.
         
-    def _load_protocols(self) -> Dict[str, str]:
-        """Load all protocol markdown files"""
-        print("\nðŸ“š Loading protocols...")
-        protocols = {}
-        
-        protocol_files = {
-            "structure_alignment": Config.STRUCTURE_ALIGNMENT,
-            "kernel_validation": Config.KERNEL_VALIDATION,
-            "kernel_enhancement": Config.KERNEL_ENHANCEMENT,
-            "artifact_1": Config.ARTIFACT_1,
-            "artifact_2": Config.ARTIFACT_2,
-            "lem": Config.LEM
+        Other sections are reused from checkpoints and merged with the new
+        results; Stage 2B post-processing is re-run on the merged devices.
+        save_kernel() also stores the change as a patch against the previous kernel.
+        With from_stage, sectioned stages before it are left untouched.
+        """
+        unknown = [s for s in sections if s not in FREYTAG_SECTIONS]
+        if unknown:
+            raise ValueError(f"Unknown sections: {unknown} (expected some of {FREYTAG_SECTIONS})")
+        
+        start_idx = CHECKPOINT_STAGES.index(from_stage) if from_stage in CHECKPOINT_STAGES else 0
+        self.section_targets = {
+            stage: list(sections) for stage in SECTIONED_STAGES
+            if CHECKPOINT_STAGES.index(stage) >= start_idx
         }
+        for stage, targets in self.section_targets.items():
+            print(f"  🎯 {stage}: regenerating {', '.join(targets)}")
         
-        for key, filename in protocol_files.items():
-            filepath = Config.PROTOCOLS_DIR / filename
-            if not filepath.exists():
-                print(f"âš ï¸  Warning: {filename} not found, skipping...")
-                protocols[key] = ""
-                continue
-                
-            with open(filepath, 'r', encoding='utf-8') as f:
-                protocols[key] = f.read()
-            print(f"  âœ“ Loaded {filename}")
-        
-        return protocols
+    def _load_protocols(self) -> Dict[str, str]:
+        """Load all protocol markdown files"""
+        return load_protocols()
     
     def _load_book(self) -> str:
         """Load book text from PDF or txt file"""
-        print(f"\nðŸ“– Loading book: {self.book_path.name}")
-        
-        if self.book_path.suffix.lower() == '.pdf':
-            return self._load_pdf()
-        elif self.book_path.suffix.lower() == '.txt':
-            with open(self.book_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        else:
-            raise ValueError(f"Unsupported file type: {self.book_path.suffix}")
-    
-    def _load_pdf(self) -> str:
-        """Extract text from PDF"""
-        text = ""
-        with open(self.book_path, 'rb') as f:
-            pdf_reader = PyPDF2.PdfReader(f)
-            total_pages = len(pdf_reader.pages)
-            print(f"  ðŸ“„ Extracting text from {total_pages} pages...")
-            
-            for i, page in enumerate(pdf_reader.pages):
-                text += page.extract_text()
-                if (i + 1) % 50 == 0:
-                    print(f"    Progress: {i + 1}/{total_pages} pages")
-        
-        print(f"  âœ“ Extracted {len(text):,} characters")
-        return text
+        return load_book_text(self.book_path)
+    
+    def _wait_before_first_call(self):
+        """Rate-limit spacing before this stage's first model call (see _rate_limit_wait)"""
+        if getattr(self._stage_local, 'wait_before_call', False):
+            self._stage_local.wait_before_call = False
+            self._rate_limit_wait()
+    
+    def _call_claude(self, prompt: str, system_prompt: str = "", profile: str = 'reasoning_doc') -> str:
+        """Call Claude API with given prompt, using the named call profile"""
+        self._wait_before_first_call()
+        return run_sync(self._acall_claude(prompt, system_prompt, profile))
     
-    def _call_claude(self, prompt: str, system_prompt: str = "") -> str:
-        """Call Claude API with given prompt, with automatic retry on rate limit"""
+    async def _acall_claude(self, prompt: str, system_prompt: str = "", profile: str = 'reasoning_doc') -> str:
+        """Async core of _call_claude (no rate-limit spacing; the caller waits first)"""
         print("\nðŸ¤– Calling Claude API...")
         
         messages = [{"role": "user", "content": prompt}]
         
-        response = self.client.messages.create(
-            model=Config.MODEL,
-            max_tokens=Config.MAX_TOKENS,
-            system=system_prompt if system_prompt else None,
-            messages=messages
-        )
+        kwargs = {"system": system_prompt} if system_prompt else {}
+        try:
+            response = await acreate_message(self.client, self.call_profiles[profile], messages=messages, **kwargs)
+        finally:
+            with self._rate_limit_lock:
+                self._last_api_call = time.monotonic()
         
         result = response.content[0].text
         print(f"  âœ“ Received {len(result):,} characters")
         return result
     
+    def _call_claude_structured(self, prompt: str, system_prompt: str, schema_name: str, profile: str,
+                                sections: Optional[List[str]] = None) -> Optional[dict]:
+        """Call Claude with an output schema (output_schemas.py) forced as a tool
+        
+        Returns the parsed object, or None if it still fails validation after
+        the repair call.
+        """
+        self._wait_before_first_call()
+        return run_sync(self._acall_claude_structured(prompt, system_prompt, schema_name, profile, sections))
+    
+    async def _acall_claude_structured(self, prompt: str, system_prompt: str, schema_name: str, profile: str,
+                                       sections: Optional[List[str]] = None) -> Optional[dict]:
+        """Async core of _call_claude_structured (no rate-limit spacing; the caller waits first)"""
+        print(f"\n🤖 Calling Claude API ({schema_name})...")
+        
+        try:
+            data = await acall_structured(self.client, prompt, schema_name, self.call_profiles[profile],
+                                          system=system_prompt, sections=sections)
+        except StructuredOutputError as e:
+            print(f"\n❌ Error: {e}")
+            return None
+        finally:
+            with self._rate_limit_lock:
+                self._last_api_call = time.monotonic()
+        
+        print(f"  ✓ Received {schema_name} ({len(json.dumps(data)):,} characters)")
+        return data
+    
+    def _rate_limit_wait(self):
+        """Wait until RATE_LIMIT_DELAY has passed since the last API call.
+        
+        Called lazily before a stage's first model call, so stages served from
+        checkpoints (or built locally) never wait.
+        """
+        with self._rate_limit_lock:
+            last_call = self._last_api_call
+        if last_call is None:
+            return
+        remaining = Config.RATE_LIMIT_DELAY - (time.monotonic() - last_call)
+        if remaining > 0:
+            print(f"\n⏳ Waiting {remaining:.0f} seconds (rate limit protection)...")
+            time.sleep(remaining)
+    
     def _validate_tier_alignment(self, devices):
         """Check that device examples are in tier-appropriate Freytag sections."""
         misaligned = []
@@ -445,11 +740,11 @@ class KernelCreator:
         
         return sample
     
-    def _create_chapter_samples(self) -> str:
+    def _create_chapter_samples(self, sections: Optional[List[str]] = None) -> str:
         """Create targeted samples from validated chapter alignment (Stage 0)
         
         Instead of beginning/middle/end, extract ~1000 words from each 
-        of the 5 primary chapters identified in Stage 0.
+        of the 5 primary chapters identified in Stage 0 (or only the given sections).
         Total: ~5K words instead of 45K words
         """
         if not self.structure_alignment:
@@ -459,6 +754,8 @@ class KernelCreator:
         samples = []
         
         for stage_name, data in chapter_alignment.items():
+            if sections and stage_name not in sections:
+                continue
             primary_chapter = data.get('primary_chapter', 1)
             extract = self._extract_text_from_chapter_range(
                 str(primary_chapter), 
@@ -494,17 +791,100 @@ class KernelCreator:
         extracted_text = ' '.join(self.book_words[chapter_start:chapter_end])
         return extracted_text
     
-    def _extract_devices_from_section(self, section: str, chapter_range: str, 
-                                       primary_chapter: int, chapter_text: str) -> list:
+    def _section_taxonomy(self, section: str):
+        """Device taxonomy text and example device names for one section's prompt
+        
+        With Config.SECTION_TAXONOMY_SLICES, only the Artifact 1 entries whose
+        tier maps to this section (plus untiered entries) are sent; devices from
+        other tiers would be relocated or deduplicated away afterwards anyway.
+        """
+        full_taxonomy = self.protocols.get('artifact_1', '')
+        sliced = section_slice(full_taxonomy, section, DEVICE_TIER_MAP, TIER_TO_FREYTAG) \
+            if Config.SECTION_TAXONOMY_SLICES else None
+        
+        if sliced is None:
+            return full_taxonomy, "\n".join([
+                "- Metaphor, Simile, Personification, Symbolism",
+                "- Foreshadowing, Flashback, Dramatic Irony, Verbal Irony, Situational Irony",
+                "- First-Person Narration, Third-Person Limited, Unreliable Narrator",
+                "- Imagery, Dialogue, Juxtaposition, Motif",
+                "- Alliteration, Parallelism, Hyperbole, Understatement",
+            ])
+        
+        index = get_taxonomy_index(full_taxonomy, DEVICE_TIER_MAP)
+        names = [alias for entry in section_entries(index, section, TIER_TO_FREYTAG) for alias in entry['aliases']]
+        names += [name for name, tier in DEVICE_TIER_MAP.items() if TIER_TO_FREYTAG.get(tier) == section]
+        names = list(dict.fromkeys(names))
+        valid_names = "\n".join(f"- {', '.join(names[i:i + 6])}" for i in range(0, len(names), 6))
+        print(f"  📚 {section}: taxonomy slice {len(sliced.split()):,} words (full: {len(full_taxonomy.split()):,})")
+        return sliced, valid_names
+    
+    async def _aextract_devices_from_section(self, section: str, chapter_range: str, 
+                                             primary_chapter: int, chapter_text: str) -> list:
         """Extract devices from a single section's full chapter.
         
         ISSUE_001 fix: Process one section at a time with full chapter text
         to prevent hallucination of quotes.
         ISSUE_003 fix: Include device taxonomy in prompt to prevent invented device names.
+        
+        Each section is its own call; stage2b_tag_devices runs them concurrently.
         """
+        prompt, system_prompt = self._build_device_prompt(section, primary_chapter, chapter_text)
+        
+        with call_context(section=section):
+            result = await self._acall_claude_structured(prompt, system_prompt, 'stage2b_devices', 'stage2b_section')
+        if not result:
+            print(f"  Failed to parse devices for {section}")
+            return []
+        
+        return self._tag_section_devices(result['devices'], section, chapter_range, primary_chapter)
+    
+    def _tag_section_devices(self, devices: list, section: str, chapter_range: str, primary_chapter: int) -> list:
+        """Add section metadata to one section call's devices"""
+        for d in devices:
+            d['assigned_section'] = section
+            d['chapter'] = primary_chapter
+            d['chapter_range'] = chapter_range
+        return devices
+    
+    def pending_device_sections(self) -> List[dict]:
+        """Stage 2B section calls still needed, with their prompts (for batch_runner.py)
         
-        # Get device taxonomy
-        device_taxonomy = self.protocols.get('artifact_1', '')
+        Loads the Stage 0/1 checkpoints; a book without them, or whose merged
+        Stage 2B checkpoint already exists, has nothing pending.
+        """
+        stage0 = self._load_checkpoint('kernel_stage0')
+        self.stage1_extracts = self._load_checkpoint('kernel_stage1')
+        if not stage0 or not self.stage1_extracts or self._get_checkpoint_path('kernel_stage2b').exists():
+            return []
+        self.structure_alignment = stage0
+        self.total_chapters = stage0.get('structure_detection', {}).get('total_units', self.total_chapters)
+        
+        pending = []
+        for section, data in self.stage1_extracts.get('extracts', {}).items():
+            if self._get_checkpoint_path(f"kernel_stage2b_{section}").exists():
+                continue
+            chapter_range = data.get('chapter_range', '')
+            primary_chapter = data.get('primary_chapter', 1)
+            chapter_text = self._extract_text_from_chapter_range(chapter_range, primary_chapter)
+            prompt, system_prompt = self._build_device_prompt(section, primary_chapter, chapter_text)
+            pending.append({
+                "section": section,
+                "chapter_range": chapter_range,
+                "primary_chapter": primary_chapter,
+                "prompt": prompt,
+                "system_prompt": system_prompt,
+            })
+        return pending
+    
+    def save_section_devices(self, section: str, chapter_range: str, primary_chapter: int, devices: list):
+        """Write one section's devices produced outside stage2b_tag_devices (batch results)"""
+        devices = self._tag_section_devices(devices, section, chapter_range, primary_chapter)
+        self._save_checkpoint(f"kernel_stage2b_{section}", devices)
+    
+    def _build_device_prompt(self, section: str, primary_chapter: int, chapter_text: str):
+        """Stage 2B prompt and system prompt for one section's chapter"""
+        device_taxonomy, valid_names = self._section_taxonomy(section)
         
         prompt = f"""You are analyzing Chapter {primary_chapter} of {self.title} for the {section.upper()} section.
 
@@ -531,50 +911,10 @@ CRITICAL CONSTRAINTS:
 5. If you cannot find a good example, skip that device
 
 Valid device names include:
-- Metaphor, Simile, Personification, Symbolism
-- Foreshadowing, Flashback, Dramatic Irony, Verbal Irony, Situational Irony
-- First-Person Narration, Third-Person Limited, Unreliable Narrator
-- Imagery, Dialogue, Juxtaposition, Motif
-- Alliteration, Parallelism, Hyperbole, Understatement
-
-Return ONLY a JSON array:
-[
-  {{
-    "name": "Foreshadowing",
-    "anchor_phrase": "exact words from chapter",
-    "location_percent": 35,
-    "scene": "brief scene description", 
-    "effect": "what device accomplishes"
-  }}
-]"""
+{valid_names}"""
 
         system_prompt = "You are a literary analysis expert. Only quote exact text from the provided chapter. Never hallucinate quotes."
-        
-        result = self._call_claude(prompt, system_prompt)
-        
-        if result:
-            try:
-                # Clean JSON if wrapped in markdown
-                result = result.strip()
-                if result.startswith("```"):
-                    result = result.split("```")[1]
-                    if result.startswith("json"):
-                        result = result[4:]
-                
-                devices = json.loads(result)
-                
-                # Add section metadata
-                for d in devices:
-                    d['assigned_section'] = section
-                    d['chapter'] = primary_chapter
-                    d['chapter_range'] = chapter_range
-                    
-                return devices
-                
-            except json.JSONDecodeError as e:
-                print(f"  Failed to parse devices for {section}: {e}")
-                return []
-        return []
+        return prompt, system_prompt
     
     def stage0_structure_alignment(self):
         """Stage 0: Book Structure Alignment Protocol v1.1"""
@@ -590,10 +930,86 @@ Return ONLY a JSON array:
         print("STAGE 0: BOOK STRUCTURE ALIGNMENT")
         print("="*80)
         
-        # Create book sample for structure detection
-        book_sample = self._create_book_sample()
+        # Detect chapter headings locally first
+        detection = detect_structure(self.book_text)
+        status = "confident" if detection['confident'] else "not confident"
+        print(f"\n🔎 Local structure detection: {detection['total_units']} chapters, {status} ({detection['reason']})")
+        
+        if detection['confident'] and self.local_structure:
+            print("  ✓ --local-structure: using conventional distribution, skipping Stage 0 model call")
+            alignment_json = self._local_structure_alignment(detection)
+        else:
+            if self.local_structure:
+                print("  ⚠️ --local-structure needs a confident detection - falling back to the model")
+            alignment_json = self._call_stage0_model(detection if detection['confident'] else None)
+            if alignment_json is None:
+                return False
+        
+        return self._finish_stage0(alignment_json)
+    
+    def _local_structure_alignment(self, detection: dict) -> dict:
+        """Stage 0 output from local heading detection alone (no model call)"""
+        total = detection['total_units']
+        return {
+            "structure_detection": {
+                "structure_type": detection['structure_type'],
+                "total_units": total,
+                "special_elements": detection['special_elements'],
+                "notes": f"Detected locally from {total} {detection['heading_kind']} headings",
+                "method": "local_heading_detection",
+                "chapter_word_offsets": [c['start_word'] for c in detection['chapters']]
+            },
+            "chapter_alignment": conventional_alignment(total),
+            "validation": {
+                "method": "local_conventional_distribution",
+                "fit_score": None,
+                "status": "UNVERIFIED",
+                "notes": "Conventional distribution from detected chapters; climax not verified by the model."
+            }
+        }
+    
+    def _create_detected_structure_sample(self, detection: dict) -> str:
+        """Compact Stage 0 input: detected chapter list plus windows around candidate climax chapters"""
+        total = detection['total_units']
+        lines = [f"DETECTED CHAPTERS (local heading detection: {total} chapters, {detection['structure_type']}):"]
+        for chapter in detection['chapters']:
+            lines.append(f"  Chapter {chapter['number']} (heading \"{chapter['label']}\"): {chapter['words']:,} words")
+        
+        lines.append("\nCONVENTIONAL DISTRIBUTION (starting point, adjust to the actual climax):")
+        for section, data in conventional_alignment(total).items():
+            lines.append(f"  {section}: {data['chapter_range']} (primary: {data['primary_chapter']})")
+        
+        window = Config.STAGE0_CLIMAX_WINDOW_WORDS
+        lines.append(f"\nCANDIDATE CLIMAX CHAPTERS (~{window} words of each: its most climax-like passages, in order):")
+        chapters = {c['number']: c for c in detection['chapters']}
+        for number in climax_candidates(total):
+            start = chapters[number]['start_word']
+            end = start + chapters[number]['words']
+            passages = self.passage_index.search(Config.STAGE0_CLIMAX_QUERY, top=8, start_word=start, end_word=end)
+            if passages:
+                text = format_passages(passages, max_words=window)
+            else:
+                text = ' '.join(self.book_words[start:start + window])
+            lines.append(f"\n=== CHAPTER {number} ===\n{text}")
+        
+        return "\n".join(lines)
+    
+    def _stage0_prompt(self, detection: Optional[dict] = None):
+        """Stage 0 prompt and system prompt; compact input when chapters were detected confidently"""
+        if detection:
+            book_block = self._create_detected_structure_sample(detection)
+            detect_task = f"""1. CONFIRM BOOK STRUCTURE:
+   - Chapter headings were detected locally: total_units is {detection['total_units']}
+   - Use structure_type "{detection['structure_type']}" unless the chapter list clearly shows otherwise"""
+        else:
+            # Create book sample for structure detection
+            book_sample = self._create_book_sample()
+            book_block = f"BOOK SAMPLE (beginning, middle, end):\n{book_sample}"
+            detect_task = """1. DETECT BOOK STRUCTURE:
+   - Analyze the book sample to determine the total number of chapters
+   - Identify the structure type (numbered chapters, parts, etc.)
+   - Set total_units to the total chapter count"""
         
-        # Use Claude to detect structure and identify actual climax
         prompt = f"""You are performing the Book Structure Alignment Protocol v1.1.
 
 TASK: Detect the book structure (total chapters) and identify the actual climax chapter(s), then create a validated alignment.
@@ -604,17 +1020,13 @@ BOOK METADATA:
 - Edition: {self.edition}
 
 PROTOCOL TO FOLLOW:
-{self.protocols['structure_alignment']}
+{self.stage_protocols['stage0']['structure_alignment']}
 
-BOOK SAMPLE (beginning, middle, end):
-{book_sample}
+{book_block}
 
 CRITICAL TASKS:
 
-1. DETECT BOOK STRUCTURE:
-   - Analyze the book sample to determine the total number of chapters
-   - Identify the structure type (numbered chapters, parts, etc.)
-   - Set total_units to the total chapter count
+{detect_task}
 
 2. IDENTIFY THE ACTUAL CLIMAX:
    - Find THE pivotal moment: highest tension, irreversible change, key decision/revelation
@@ -625,6 +1037,7 @@ CRITICAL TASKS:
    - Adjust boundaries if needed (especially for extended rising action)
    - Ensure climax is tight (1-3 chapters)
    - Ensure all chapters are covered with no gaps
+   - Give a 2-3 sentence rationale for each section's boundaries
 
 4. OUTPUT VALIDATED ALIGNMENT:
    Provide a JSON object with this structure:
@@ -640,31 +1053,36 @@ CRITICAL TASKS:
          "chapter_range": "1-X",
          "chapters": [1, 2, ...],
          "primary_chapter": 1,
-         "percentage": 15
+         "percentage": 15,
+         "rationale": "why these chapters represent exposition (2-3 sentences)"
        }},
        "rising_action": {{
          "chapter_range": "X-Y",
          "chapters": [...],
          "primary_chapter": X,
-         "percentage": 35
+         "percentage": 35,
+         "rationale": "why these chapters represent rising action (2-3 sentences)"
        }},
        "climax": {{
          "chapter_range": "Y",
          "chapters": [Y],
          "primary_chapter": Y,
-         "percentage": 5
+         "percentage": 5,
+         "rationale": "why these chapters represent climax (2-3 sentences)"
        }},
        "falling_action": {{
          "chapter_range": "Y+1-Z",
          "chapters": [...],
          "primary_chapter": X,
-         "percentage": 30
+         "percentage": 30,
+         "rationale": "why these chapters represent falling action (2-3 sentences)"
        }},
        "resolution": {{
          "chapter_range": "Z+1-<total_chapters>",
          "chapters": [...],
          "primary_chapter": <total_chapters>,
-         "percentage": 15
+         "percentage": 15,
+         "rationale": "why these chapters represent resolution (2-3 sentences)"
        }}
      }},
      "validation": {{
@@ -686,20 +1104,31 @@ CRITICAL: Output ONLY valid JSON. No additional text before or after.
 """
         
         system_prompt = "You are a literary analysis expert following the Book Structure Alignment Protocol v1.1 to establish validated chapter-to-Freytag mapping."
+        return prompt, system_prompt
+    
+    def _call_stage0_model(self, detection: Optional[dict] = None) -> Optional[dict]:
+        """Stage 0 model call; compact input when chapters were detected confidently"""
+        if detection:
+            print(f"  ✓ Sending detected chapter list + {len(climax_candidates(detection['total_units']))} climax windows instead of the 45K-word sample")
         
-        result = self._call_claude(prompt, system_prompt)
-        
-        # Clean markdown formatting if present
-        result = result.replace('```json\n', '').replace('```\n', '').replace('```', '').strip()
+        # Use Claude to detect structure and identify actual climax
+        prompt, system_prompt = self._stage0_prompt(detection)
+        alignment_json = self._call_claude_structured(prompt, system_prompt, 'stage0_alignment', 'stage0')
+        if alignment_json is None:
+            return None
         
-        # Validate JSON
-        try:
-            alignment_json = json.loads(result)
-        except json.JSONDecodeError as e:
-            print(f"\n❌ Error: Invalid JSON response from Claude")
-            print(f"Error details: {e}")
-            return False
+        if detection:
+            structure = alignment_json.setdefault('structure_detection', {})
+            if structure.get('total_units') != detection['total_units']:
+                print(f"  ⚠️ Model reported {structure.get('total_units')} chapters; keeping detected {detection['total_units']}")
+                structure['total_units'] = detection['total_units']
+            structure['method'] = "local_heading_detection"
+            structure['chapter_word_offsets'] = [c['start_word'] for c in detection['chapters']]
         
+        return alignment_json
+    
+    def _finish_stage0(self, alignment_json: dict) -> bool:
+        """Validate Stage 0 output, review and checkpoint it"""
         # Extract total_units and set as total_chapters
         if 'structure_detection' in alignment_json and 'total_units' in alignment_json['structure_detection']:
             self.total_chapters = alignment_json['structure_detection']['total_units']
@@ -735,34 +1164,36 @@ CRITICAL: Output ONLY valid JSON. No additional text before or after.
             return True
         return False
     
-    def stage1_extract_freytag(self):
-        """Stage 1: Extract 5 Freytag sections with chapter ranges"""
-        # Check for existing checkpoint
-        cached = self._load_checkpoint('kernel_stage1')
-        if cached:
-            self.stage1_extracts = cached
-            return True
-        
-        print("\n" + "="*80)
-        print("STAGE 1: FREYTAG EXTRACT SELECTION (with chapter mapping)")
-        print("="*80)
-        
-        if not self.structure_alignment:
-            print("❌ Error: Stage 0 structure alignment not completed")
-            return False
+    def _stage1_prompt(self, targets: Optional[List[str]] = None):
+        """Stage 1 prompt and system prompt (only the target sections when given)"""
+        sections = targets or FREYTAG_SECTIONS
         
         # Get validated chapter alignment
         chapter_alignment = self.structure_alignment.get('chapter_alignment', {})
         
-        book_sample = self._create_chapter_samples()
+        book_sample = self._create_chapter_samples(targets)
         
         # Build chapter range context from validated alignment
         alignment_context = ""
         for stage, data in chapter_alignment.items():
+            if targets and stage not in targets:
+                continue
             chapter_range = data.get('chapter_range', '')
             primary_chapter = data.get('primary_chapter', 1)
             alignment_context += f"- {stage}: {chapter_range} (primary: {primary_chapter})\n"
         
+        scope_note = ""
+        if targets:
+            scope_note = f"\n\nSCOPE: Only these sections are being regenerated: {', '.join(targets)}. Return extracts for these sections only."
+        
+        extracts_format = ",\n".join(
+            f"""    "{section}": {{
+      "chapter_range": "[use validated range from Stage 0]",
+      "primary_chapter": [use validated primary from Stage 0],
+      "rationale": "why this represents {section.replace('_', ' ')} (2-3 sentences)"
+    }}""" for section in sections
+        )
+        
         prompt = f"""You are performing Stage 1 of the Kernel Validation Protocol v3.4.
 
 IMPORTANT: Use the VALIDATED chapter alignment from Stage 0 (Book Structure Alignment Protocol).
@@ -773,7 +1204,7 @@ TASK: Extract the 5 Freytag dramatic structure sections from this book:
 2. Rising Action - Conflict development
 3. Climax - Turning point/peak tension
 4. Falling Action - Consequences unfold
-5. Resolution - Final outcome/thematic closure
+5. Resolution - Final outcome/thematic closure{scope_note}
 
 BOOK METADATA:
 - Title: {self.title}
@@ -811,31 +1242,7 @@ Provide a JSON object with this structure:
     "extraction_date": "{datetime.now().isoformat()}"
   }},
   "extracts": {{
-    "exposition": {{
-      "chapter_range": "[use validated range from Stage 0]",
-      "primary_chapter": [use validated primary from Stage 0],
-      "rationale": "why this represents exposition (2-3 sentences)"
-    }},
-    "rising_action": {{
-      "chapter_range": "[use validated range from Stage 0]",
-      "primary_chapter": [use validated primary from Stage 0],
-      "rationale": "why this represents rising action (2-3 sentences)"
-    }},
-    "climax": {{
-      "chapter_range": "[use validated range from Stage 0]",
-      "primary_chapter": [use validated primary from Stage 0],
-      "rationale": "why this represents climax (2-3 sentences)"
-    }},
-    "falling_action": {{
-      "chapter_range": "[use validated range from Stage 0]",
-      "primary_chapter": [use validated primary from Stage 0],
-      "rationale": "why this represents falling action (2-3 sentences)"
-    }},
-    "resolution": {{
-      "chapter_range": "[use validated range from Stage 0]",
-      "primary_chapter": [use validated primary from Stage 0],
-      "rationale": "why this represents resolution (2-3 sentences)"
-    }}
+{extracts_format}
   }}
 }}
 
@@ -855,20 +1262,40 @@ DO NOT extract or reproduce any text passages from the book.
 """
         
         system_prompt = "You are a literary analysis expert following the Kernel Validation Protocol v3.4 for extracting Freytag dramatic structure sections from novels."
+        return prompt, system_prompt
+    
+    def stage1_extract_freytag(self):
+        """Stage 1: Extract 5 Freytag sections with chapter ranges"""
+        targets = self.section_targets.get('kernel_stage1')
         
-        result = self._call_claude(prompt, system_prompt)
+        # Check for existing checkpoint
+        cached = self._load_checkpoint('kernel_stage1')
+        if cached and not targets:
+            self.stage1_extracts = cached
+            return True
+        if targets and not cached:
+            print("  ⚠️ No Stage 1 checkpoint to merge sections into - regenerating all sections")
+            targets = None
         
-        # Clean markdown formatting if present
-        result = result.replace('```json\n', '').replace('```\n', '').replace('```', '').strip()
+        if self.local_stage1:
+            return self._build_local_extracts(cached, targets)
         
-        # Validate JSON
-        try:
-            extracts_json = json.loads(result)
-            result_formatted = json.dumps(extracts_json, indent=2)
-        except json.JSONDecodeError as e:
-            print(f"\nâŒ Error: Invalid JSON response from Claude")
-            print(f"Error details: {e}")
+        print("\n" + "="*80)
+        print("STAGE 1: FREYTAG EXTRACT SELECTION (with chapter mapping)")
+        if targets:
+            print(f"Sections: {', '.join(targets)} (others kept from checkpoint)")
+        print("="*80)
+        
+        if not self.structure_alignment:
+            print("❌ Error: Stage 0 structure alignment not completed")
+            return False
+        
+        prompt, system_prompt = self._stage1_prompt(targets)
+        
+        extracts_json = self._call_claude_structured(prompt, system_prompt, 'stage1_extracts', 'stage1', sections=targets)
+        if extracts_json is None:
             return False
+        result_formatted = json.dumps(extracts_json, indent=2)
         
         # Validate required fields
         narrative_sections = extracts_json.get('extracts', {})
@@ -890,23 +1317,30 @@ DO NOT extract or reproduce any text passages from the book.
             print("\nStage 1 must include chapter_range and primary_chapter for each section.")
             return False
         
+        # Merge regenerated sections back into the checkpointed extracts
+        if targets:
+            missing_targets = [section for section in targets if section not in narrative_sections]
+            if missing_targets:
+                print(f"\n❌ Error: Response is missing requested sections: {missing_targets}")
+                return False
+            merged = copy.deepcopy(cached)
+            merged_extracts = merged.setdefault('extracts', {})
+            for section in targets:
+                merged_extracts[section] = narrative_sections[section]
+            extracts_json = merged
+            narrative_sections = merged_extracts
+            result_formatted = json.dumps(extracts_json, indent=2)
+            print(f"\n✓ Merged {len(targets)} regenerated section(s) into Stage 1 extracts")
+        
         # Normalize chapter_range format: remove "Chapters " prefix if present
         # Expected format: "1-3" not "Chapters 1-3"
         normalized = False
         for section_name, section_data in narrative_sections.items():
             chapter_range = section_data.get('chapter_range', '')
             if chapter_range:
-                original = chapter_range
-                # Remove "Chapters " prefix if present
-                if chapter_range.startswith('Chapters '):
-                    chapter_range = chapter_range.replace('Chapters ', '', 1).strip()
-                    normalized = True
-                elif chapter_range.startswith('Chapter '):
-                    chapter_range = chapter_range.replace('Chapter ', '', 1).strip()
-                    normalized = True
-                # Update the normalized value
-                if chapter_range != original:
-                    section_data['chapter_range'] = chapter_range
+                clean_range = _normalize_chapter_range(chapter_range)
+                if clean_range != chapter_range:
+                    section_data['chapter_range'] = clean_range
                     normalized = True
         
         if normalized:
@@ -921,22 +1355,75 @@ DO NOT extract or reproduce any text passages from the book.
             return True
         return False
     
-    def stage2a_tag_macro(self):
-        """Stage 2A: Tag 84 macro alignment variables"""
-        # Check for existing checkpoint
-        cached = self._load_checkpoint('kernel_stage2a')
-        if cached:
-            self.stage2a_macro = cached
-            return True
+    def _local_extracts(self, cached: Optional[dict] = None, targets: Optional[List[str]] = None) -> Optional[dict]:
+        """Stage 1 extracts copied from the Stage 0 alignment (None if it lacks sections)"""
+        chapter_alignment = self.structure_alignment.get('chapter_alignment', {})
+        missing = [section for section in FREYTAG_SECTIONS if section not in chapter_alignment]
+        if missing:
+            print(f"❌ Error: Stage 0 alignment is missing sections: {missing}")
+            return None
+        
+        extracts = {}
+        for section in FREYTAG_SECTIONS:
+            data = chapter_alignment[section]
+            chapter_range = data.get('chapter_range') or data.get('chapters', [])
+            extracts[section] = {
+                "chapter_range": _normalize_chapter_range(chapter_range),
+                "primary_chapter": data.get('primary_chapter', 1),
+                "rationale": data.get('rationale', '')
+            }
+        
+        if targets and cached:
+            merged = copy.deepcopy(cached)
+            for section in targets:
+                merged.setdefault('extracts', {})[section] = extracts[section]
+            extracts_json = merged
+        else:
+            extracts_json = {
+                "metadata": {
+                    "title": self.title,
+                    "author": self.author,
+                    "edition": self.edition,
+                    "total_chapters": self.total_chapters,
+                    "extraction_date": datetime.now().isoformat(),
+                    "extraction_method": "local_from_stage0"
+                },
+                "extracts": extracts
+            }
+        return extracts_json
+    
+    def _build_local_extracts(self, cached: Optional[dict] = None, targets: Optional[List[str]] = None) -> bool:
+        """Stage 1 without a model call: extracts straight from the Stage 0 alignment.
         
+        The model-based Stage 1 is told to copy Stage 0's ranges and primary
+        chapters verbatim, so the only new content it adds is the rationale.
+        Stage 0 now returns a rationale per section; older Stage 0 checkpoints
+        without one get an empty rationale (the ReasoningDoc covers sections).
+        """
         print("\n" + "="*80)
-        print("STAGE 2A: MACRO ALIGNMENT TAGGING")
+        print("STAGE 1: FREYTAG EXTRACT SELECTION (local, from Stage 0 alignment)")
         print("="*80)
         
-        if not self.stage1_extracts:
-            print("âŒ Error: Stage 1 extracts not available")
+        if not self.structure_alignment:
+            print("❌ Error: Stage 0 structure alignment not completed")
+            return False
+        
+        extracts_json = self._local_extracts(cached, targets)
+        if extracts_json is None:
             return False
         
+        no_rationale = [s for s, d in extracts_json['extracts'].items() if not d.get('rationale')]
+        if no_rationale:
+            print(f"  ⚠️ No Stage 0 rationale for: {', '.join(no_rationale)}")
+        
+        if self._review_and_approve("Stage 1: Freytag Extracts (local)", json.dumps(extracts_json, indent=2)):
+            self.stage1_extracts = extracts_json
+            self._save_checkpoint('kernel_stage1', self.stage1_extracts)
+            return True
+        return False
+    
+    def _stage2a_prompt(self):
+        """Stage 2A prompt and system prompt from the Stage 1 extracts"""
         # Extract text from book using chapter ranges
         extracts_text = ""
         for section, data in self.stage1_extracts.get('extracts', {}).items():
@@ -951,22 +1438,34 @@ DO NOT extract or reproduce any text passages from the book.
             )
             extracts_text += f"\n### {section.upper()}\n{section_text}\n"
         
-        prompt = f"""You are performing Stage 2A of the Kernel Validation Protocol v3.4.\n\nTASK: Analyze the 5 Freytag extracts and tag all 84 macro alignment variables:\n- Narrative variables (voice, structure, etc.)\n- Rhetorical variables (alignment type, mechanisms, etc.)\n\nBOOK METADATA:\n- Title: {self.title}\n- Author: {self.author}\n\nPROTOCOL TO FOLLOW:\n{self.protocols['kernel_validation']}\n\nTAGGING PROTOCOL:\n{self.protocols['artifact_2']}\n\nFREYTAG EXTRACTS:\n{extracts_text}\n\nOUTPUT FORMAT:\nProvide a JSON object with this structure:\n{{"narrative": {{"voice": {{"pov": "CODE", ...}}, "structure": {{...}}}}, "rhetoric": {{...}}, "device_mediation": {{...}}}}\n\nCRITICAL: Output ONLY valid JSON. Use the exact codes from the protocol.\n"""
+        prompt = f"""You are performing Stage 2A of the Kernel Validation Protocol v3.4.\n\nTASK: Analyze the 5 Freytag extracts and tag all 84 macro alignment variables:\n- Narrative variables (voice, structure, etc.)\n- Rhetorical variables (alignment type, mechanisms, etc.)\n\nBOOK METADATA:\n- Title: {self.title}\n- Author: {self.author}\n\nPROTOCOL TO FOLLOW:\n{self.stage_protocols['stage2a']['kernel_validation']}\n\nTAGGING PROTOCOL:\n{self.stage_protocols['stage2a']['artifact_2']}\n\nFREYTAG EXTRACTS:\n{extracts_text}\n\nOUTPUT FORMAT:\nProvide a JSON object with this structure:\n{{"narrative": {{"voice": {{"pov": "CODE", ...}}, "structure": {{...}}}}, "rhetoric": {{...}}, "device_mediation": {{...}}}}\n\nCRITICAL: Output ONLY valid JSON. Use the exact codes from the protocol.\n"""
         
         system_prompt = "You are a literary analysis expert tagging macro alignment variables according to Kernel Validation Protocol v3.4."
+        return prompt, system_prompt
+    
+    def stage2a_tag_macro(self):
+        """Stage 2A: Tag 84 macro alignment variables"""
+        # Check for existing checkpoint
+        cached = self._load_checkpoint('kernel_stage2a')
+        if cached:
+            # Older checkpoints spell the POV out ("THIRD_LIMITED")
+            self.stage2a_macro = coerce('stage2a_macro', cached)
+            return True
+        
+        print("\n" + "="*80)
+        print("STAGE 2A: MACRO ALIGNMENT TAGGING")
+        print("="*80)
         
-        result = self._call_claude(prompt, system_prompt)
+        if not self.stage1_extracts:
+            print("âŒ Error: Stage 1 extracts not available")
+            return False
         
-        # Clean and validate
-        result = result.replace('```json\n', '').replace('```\n', '').replace('```', '').strip()
+        prompt, system_prompt = self._stage2a_prompt()
         
-        try:
-            macro_json = json.loads(result)
-            result_formatted = json.dumps(macro_json, indent=2)
-        except json.JSONDecodeError as e:
-            print(f"\n❌ Error: Invalid JSON response from Claude")
-            print(f"Error details: {e}")
+        macro_json = self._call_claude_structured(prompt, system_prompt, 'stage2a_macro', 'stage2a')
+        if macro_json is None:
             return False
+        result_formatted = json.dumps(macro_json, indent=2)
         
         # Review
         if self._review_and_approve("Stage 2A: Macro Variables", result_formatted):
@@ -976,79 +1475,149 @@ DO NOT extract or reproduce any text passages from the book.
         return False
     
     def stage2b_tag_devices(self):
-        """Stage 2B: Tag micro devices with examples.\n        \n        ISSUE_001 fix: Process one section at a time with full chapter\n        instead of single call with 400-word samples.\n        """
+        """Stage 2B: Tag micro devices with examples.
+        
+        ISSUE_001 fix: Process one section at a time with full chapter
+        instead of single call with 400-word samples.
+        
+        Each section's raw devices are checkpointed on their own
+        (kernel_stage2b_<section>), so an interrupted run resumes per section
+        and --sections re-calls only the targeted sections before re-running
+        the post-processing on the merged list.
+        """
+        targets = self.section_targets.get('kernel_stage2b')
+        
         # Check for existing checkpoint
         cached = self._load_checkpoint('kernel_stage2b')
-        if cached:
+        if cached and not targets:
             self.stage2b_devices = cached
             return True
         
         print("\n" + "="*80)
         print("STAGE 2B: MICRO DEVICE INVENTORY")
+        if targets:
+            print(f"Sections: {', '.join(targets)} (others kept from checkpoint)")
         print("="*80)
         
         if not self.stage1_extracts:
             print("❌ Error: Stage 1 extracts not available")
             return False
         
-        all_devices = []
+        section_devices = {}
+        to_extract = []
         
         for section, data in self.stage1_extracts.get('extracts', {}).items():
             chapter_range = data.get('chapter_range', '')
             primary_chapter = data.get('primary_chapter', 1)
+            section_checkpoint = f"kernel_stage2b_{section}"
             
-            print(f"  Processing {section} (Chapter {primary_chapter})...")
+            devices = None
+            if not targets or section not in targets:
+                devices = self._load_checkpoint(section_checkpoint)
+                if devices is None and cached:
+                    devices = self._section_devices_from_stage2b(cached, chapter_range, primary_chapter)
+                    if devices:
+                        print(f"  ✓ Reusing {len(devices)} {section} devices from merged Stage 2B checkpoint")
             
-            # Extract FULL chapter text
-            chapter_text = self._extract_text_from_chapter_range(
-                chapter_range, 
-                primary_chapter
-            )
-            
-            # Call API for this section
-            devices = self._extract_devices_from_section(
-                section, 
-                chapter_range, 
-                primary_chapter,
-                chapter_text
+            if devices is None:
+                print(f"  Processing {section} (Chapter {primary_chapter})...")
+                
+                # Extract FULL chapter text
+                chapter_text = self._extract_text_from_chapter_range(
+                    chapter_range, 
+                    primary_chapter
+                )
+                
+                to_extract.append((section, chapter_range, primary_chapter, chapter_text))
+            section_devices[section] = devices
+        
+        # Section calls are independent: run them concurrently on the async core.
+        # Finished sections are checkpointed even if another section fails.
+        if to_extract:
+            self._wait_before_first_call()
+            results = run_concurrently(
+                (self._aextract_devices_from_section(*args) for args in to_extract),
+                return_exceptions=True
             )
-            
+            errors = []
+            for (section, *_), devices in zip(to_extract, results):
+                if isinstance(devices, BaseException):
+                    errors.append(devices)
+                    continue
+                if devices:
+                    self._save_checkpoint(f"kernel_stage2b_{section}", devices)
+                section_devices[section] = devices
+            if errors:
+                raise errors[0]
+        
+        all_devices = []
+        for section, devices in section_devices.items():
             if devices:
                 all_devices.extend(devices)
-                print(f"    Found {len(devices)} devices")
+                print(f"    {section}: found {len(devices)} devices")
             else:
                 print(f"    ⚠ No devices found for {section}")
         
-        # Store results
+        print(f"  Total devices: {len(all_devices)}")
+        
+        all_devices = self._postprocess_devices(all_devices)
+        
+        # Update stored devices
         self.stage2b_devices = all_devices
+        result_formatted = json.dumps(all_devices, indent=2)
         
-        print(f"  Total devices: {len(all_devices)}")
+        # Review
+        if self._review_and_approve("Stage 2B: Micro Devices", result_formatted):
+            self._save_checkpoint('kernel_stage2b', self.stage2b_devices)
+            return len(all_devices) > 0
+        return False
+    
+    def _section_devices_from_stage2b(self, devices: list, chapter_range: str, primary_chapter: int) -> list:
+        """Recover one section's devices from a merged Stage 2B checkpoint.
         
+        Checkpoints written before per-section checkpoints existed only hold
+        the post-processed list; devices keep the chapter/chapter_range of the
+        section call that produced them, even after Tier 5 relocation.
+        """
+        return [
+            copy.deepcopy(d) for d in devices
+            if d.get('chapter') == primary_chapter and d.get('chapter_range') == chapter_range
+        ]
+    
+    def _postprocess_devices(self, all_devices: list) -> list:
+        """Tier relocation and deduplication (needs nothing from Stage 2A)"""
         # Relocate Tier 5 devices to resolution (they're pervasive but should be taught last)
         all_devices = self._relocate_tier5_devices(all_devices)
         
         # Remove duplicate devices, keeping tier-appropriate ones
         all_devices = self._deduplicate_devices(all_devices)
         
+        return all_devices
+    
+    def join_stage2(self):
+        """Post-join step once Stage 2A and 2B are both done.
+        
+        POV filtering needs Stage 2A's narrative voice; both steps are
+        idempotent, so re-applying them to an older checkpoint is harmless.
+        """
+        if self.stage2a_macro is None or self.stage2b_devices is None:
+            print("❌ Error: Stage 2A and 2B must both complete before the join")
+            return False
+        
+        all_devices = self.stage2b_devices
+        
         # Filter out POV devices that contradict the text's actual POV
-        if self.stage2a_macro:
-            macro_pov = self.stage2a_macro.get('narrative', {}).get('voice', {}).get('pov', 'TPO')
-            all_devices = self._filter_contradictory_pov_devices(all_devices, macro_pov)
+        macro_pov = self.stage2a_macro.get('narrative', {}).get('voice', {}).get('pov', 'TPO')
+        all_devices = self._filter_contradictory_pov_devices(all_devices, macro_pov)
         
         # Add pedagogical_tier to each device
         for device in all_devices:
             device_name = device.get("name", "")
             device["pedagogical_tier"] = DEVICE_TIER_MAP.get(device_name, 0)
         
-        # Update stored devices
         self.stage2b_devices = all_devices
-        result_formatted = json.dumps(all_devices, indent=2)
-        
-        # Review
-        if self._review_and_approve("Stage 2B: Micro Devices", result_formatted):
-            self._save_checkpoint('kernel_stage2b', self.stage2b_devices)
-            return len(all_devices) > 0
-        return False
+        print(f"  ✓ Stage 2 join: {len(all_devices)} devices after POV filter ({macro_pov})")
+        return len(all_devices) > 0
     
     def assemble_kernel(self):
         """Assemble final kernel JSON"""
@@ -1078,7 +1647,8 @@ DO NOT extract or reproduce any text passages from the book.
                 "protocol_version": "3.3",
                 "kernel_version": "4.0",
                 "chapter_aware": True,
-                "structure_alignment_protocol": "v1.1"
+                "structure_alignment_protocol": "v1.1",
+                "source_book": str(self.book_path)
             },
             "text_structure": {
                 "has_chapters": True,
@@ -1121,14 +1691,39 @@ DO NOT extract or reproduce any text passages from the book.
         # Ensure directory exists
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
+        # A --sections re-run is also stored as a patch against the kernel it replaces
+        sections = sorted({s for targets in self.section_targets.values() for s in targets})
+        if sections and output_path.exists():
+            self._save_section_patch(output_path, sections)
+        
         # Save
+        check_cancelled()
         with open(output_path, 'w', encoding='utf-8') as f:
             json.dump(self.kernel, f, indent=2)
         
+        self.kernel_path = output_path
         print(f"\nâœ… Kernel saved to: {output_path}")
         print(f"   Size: {output_path.stat().st_size:,} bytes")
         return True
 
+    def _save_section_patch(self, kernel_path: Path, sections: List[str]) -> Optional[Path]:
+        """Write kernels/patches/<kernel>_<sections>_<time>.patch.json: the operations
+        that turn the previous kernel into this one (see kernel_patch.py)"""
+        try:
+            with open(kernel_path, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"  ⚠️ Previous kernel unreadable, no section patch written: {e}")
+            return None
+        patch = make_patch(previous, self.kernel, description=f"create_kernel.py --sections {','.join(sections)}")
+        if not patch["operations"]:
+            print("  ✓ Section re-run left the kernel unchanged")
+            return None
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        path = save_patch(patch, Config.KERNELS_DIR / "patches" / f"{kernel_path.stem}_{'_'.join(sections)}_{stamp}.patch.json")
+        print(f"  🧩 Section patch saved: {path} ({len(patch['operations'])} operations)")
+        return path
+    
     def save_reasoning_document(self, output_path: Optional[Path] = None):
         """Generate reasoning document following Stage 3 protocol (CPEA methodology)."""
         if not self.kernel:
@@ -1143,10 +1738,102 @@ DO NOT extract or reproduce any text passages from the book.
     
         output_path.parent.mkdir(parents=True, exist_ok=True)
     
+        prompt, system_prompt = self._reasoning_doc_prompt(self.kernel)
+        if not self._stream_reasoning_document(output_path, prompt, system_prompt):
+            return False
+    
+        self.reasoning_doc_path = output_path
+        print(f"\nâœ… Reasoning document saved: {output_path}")
+        print(f"   Size: {output_path.stat().st_size:,} bytes")
+        return True
+    
+    def _stream_reasoning_document(self, output_path: Path, prompt: str, system_prompt: str) -> bool:
+        """Stream the ReasoningDoc into <name>.<prompt hash>.partial, then move it into place.
+        
+        The partial file is kept if generation fails; the next run with the
+        same prompt sends its text as the start of the assistant turn and the
+        model continues from there (likewise when a generation stops at
+        max_tokens). Partials for other prompts are discarded. The partial is
+        only ever appended to (or trimmed of trailing whitespace), so a crash
+        while resuming never loses the text already streamed.
+        """
+        key = hashlib.sha256(f"{system_prompt}\n{prompt}".encode('utf-8')).hexdigest()[:12]
+        partial_path = output_path.with_name(f"{output_path.name}.{key}.partial")
+        for stale in output_path.parent.glob(f"{output_path.name}.*.partial"):
+            if stale != partial_path:
+                stale.unlink()
+        
+        # A crash mid-write can leave a cut multi-byte character at the end; it is dropped
+        text = partial_path.read_bytes().decode('utf-8', errors='ignore').rstrip() if partial_path.exists() else ""
+        if text:
+            print(f"  ♻️  Resuming partial ReasoningDoc ({len(text):,} characters)")
+        written = [text]
+        progress = {"chars": len(text), "reported": 0}
+        
+        with open(partial_path, 'ab') as f:
+            def on_text(chunk):
+                check_cancelled()
+                f.write(chunk.encode('utf-8'))
+                f.flush()
+                written.append(chunk)
+                progress["chars"] += len(chunk)
+                tokens = int(progress["chars"] / Config.CHARS_PER_TOKEN)
+                if tokens - progress["reported"] >= Config.STREAM_PROGRESS_TOKENS:
+                    progress["reported"] = tokens
+                    print(f"  ✍️  ReasoningDoc: ~{tokens:,} tokens")
+            
+            for continuation in range(Config.REASONING_DOC_CONTINUATIONS + 1):
+                messages = [{"role": "user", "content": prompt}]
+                text = "".join(written).rstrip()
+                if text:
+                    # Continue the assistant turn (it may not end in whitespace);
+                    # the file keeps the same prefix, minus trailing whitespace
+                    written[:] = [text]
+                    progress["chars"] = len(text)
+                    f.truncate(len(text.encode('utf-8')))
+                    messages.append({"role": "assistant", "content": text})
+                try:
+                    response = self._stream_claude(messages, system_prompt, 'reasoning_doc', on_text)
+                except Exception as e:
+                    print(f"\n❌ ReasoningDoc generation failed: {type(e).__name__}: {e}")
+                    print(f"   Partial output kept ({progress['chars']:,} characters): {partial_path}")
+                    print("   Re-run to continue from it")
+                    return False
+                if getattr(response, "stop_reason", None) != "max_tokens":
+                    break
+                if continuation < Config.REASONING_DOC_CONTINUATIONS:
+                    print(f"  ⚠️ ReasoningDoc hit max_tokens - continuing ({continuation + 1}/{Config.REASONING_DOC_CONTINUATIONS})")
+            else:
+                print(f"\n❌ ReasoningDoc still at max_tokens after {Config.REASONING_DOC_CONTINUATIONS} continuation(s) - incomplete")
+                print(f"   Partial output kept ({progress['chars']:,} characters): {partial_path}")
+                print("   Raise reasoning_doc.max_tokens (--profile) or re-run to continue from it")
+                return False
+            os.fsync(f.fileno())
+        
+        check_cancelled()
+        os.replace(partial_path, output_path)
+        output_tokens = getattr(getattr(response, "usage", None), "output_tokens", None)
+        print(f"  âœ“ Received {progress['chars']:,} characters"
+              + (f" ({output_tokens:,} output tokens in the last call)" if output_tokens else ""))
+        return True
+    
+    def _stream_claude(self, messages: list, system_prompt: str, profile: str, on_text):
+        """Streamed model call (api_client.stream_message) with rate-limit spacing"""
+        self._wait_before_first_call()
+        print(f"\n🤖 Calling Claude API (streaming {profile})...")
+        kwargs = {"system": system_prompt} if system_prompt else {}
+        try:
+            return stream_message(self.client, self.call_profiles[profile], on_text, messages=messages, **kwargs)
+        finally:
+            with self._rate_limit_lock:
+                self._last_api_call = time.monotonic()
+    
+    def _reasoning_doc_prompt(self, kernel: dict):
+        """ReasoningDoc prompt and system prompt for an assembled kernel"""
         # Format kernel data
-        macro_text = self._format_macro_for_prompt(self.kernel.get('macro_variables', {}))
-        devices_text = self._format_devices_for_prompt(self.kernel.get('micro_devices', []))
-        chapter_text = self._format_chapter_alignment(self.kernel.get('chapter_alignment', {}))
+        macro_text = self._format_macro_for_prompt(kernel.get('macro_variables', {}))
+        devices_text = self._format_devices_for_prompt(kernel.get('micro_devices', []))
+        chapter_text = self._format_chapter_alignment(kernel.get('chapter_alignment', {}))
 
         prompt = f"""Create a reasoning document for "{self.title}" by {self.author}.
 
@@ -1211,14 +1898,7 @@ One paragraph: What does this alignment achieve? How do codes + devices combine
 Reference actual codes and device names throughout."""
 
         system_prompt = "You are documenting literary analysis using CPEA methodology. Derive patterns from code synthesis—do not invent frames independently."
-        result = self._call_claude(prompt, system_prompt)
-    
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(result)
-    
-        print(f"\nâœ… Reasoning document saved: {output_path}")
-        print(f"   Size: {output_path.stat().st_size:,} bytes")
-        return True
+        return prompt, system_prompt
     
     def _format_macro_for_prompt(self, macro_vars: dict) -> str:
         """Format macro variables for Stage 3 prompt."""
@@ -1285,8 +1965,53 @@ Reference actual codes and device names throughout."""
                 lines.append(f"  {section.upper().replace('_', ' ')}: Ch.{data.get('chapter_range')} (primary: {data.get('primary_chapter')})")
         return "\n".join(lines)
     
-    def run(self):
-        """Run the complete kernel creation pipeline"""
+    def run_stage_graph(self, dag: Optional[Dict] = None) -> bool:
+        """Run kernel stages as a DAG, starting each stage once its dependencies succeed.
+        
+        Independent stages (2A and 2B) run on separate threads, each in a copy
+        of the caller's context (e.g. the job's priority class). A stage waits
+        out the rate-limit spacing only if it actually calls the API, and
+        holds its checkpoint lock while it runs (see _checkpoint_lock). Its
+        model calls are recorded in the usage ledger under the stage name.
+        """
+        dag = dag or STAGE_DAG
+        done, running = set(), {}
+        
+        def run_stage(stage_name):
+            check_cancelled()
+            self._stage_local.wait_before_call = True
+            checkpoint = STAGE_CHECKPOINTS.get(stage_name)
+            with call_context(book=self.title, run_id=self.run_id, stage=stage_name):
+                if checkpoint is None:
+                    return getattr(self, dag[stage_name][0])()
+                with self._checkpoint_lock(checkpoint):
+                    return getattr(self, dag[stage_name][0])()
+        
+        with ThreadPoolExecutor(max_workers=len(dag)) as executor:
+            while len(done) < len(dag):
+                for stage_name, (_, deps) in dag.items():
+                    if stage_name not in done and stage_name not in running and all(d in done for d in deps):
+                        running[stage_name] = executor.submit(contextvars.copy_context().run, run_stage, stage_name)
+                
+                finished, _ = wait(running.values(), return_when=FIRST_COMPLETED)
+                for stage_name, future in list(running.items()):
+                    if future not in finished:
+                        continue
+                    del running[stage_name]
+                    if not future.result():
+                        print(f"\n❌ Pipeline failed at {stage_name}")
+                        wait(running.values())
+                        return False
+                    done.add(stage_name)
+        return True
+    
+    def run(self, reasoning_doc: bool = True):
+        """Run the complete kernel creation pipeline
+        
+        With reasoning_doc=False the run ends once the kernel JSON is saved
+        and the caller calls generate_reasoning_document() itself
+        (run_pipeline.py overlaps it with Stage 1A/1B).
+        """
         print("\n" + "="*80)
         print(f"KERNEL CREATION PIPELINE - {self.title}")
         print("="*80)
@@ -1294,39 +2019,15 @@ Reference actual codes and device names throughout."""
         print(f"Author: {self.author}")
         print(f"Edition: {self.edition}")
         
-        # Stage 0: Structure Alignment
-        if not self.stage0_structure_alignment():
-            print("\n❌ Pipeline failed at Stage 0")
-            return False
-        
-        # Rate limit protection: wait between API calls
-        print("\n⏳ Waiting 60 seconds (rate limit protection)...")
-        time.sleep(60)
-        
-        # Stage 1
-        if not self.stage1_extract_freytag():
-            print("\nâŒ Pipeline failed at Stage 1")
+        # Stages 0 -> 1 -> (2A || 2B)
+        if not self.run_stage_graph():
             return False
         
-        print("\n⏳ Waiting 60 seconds (rate limit protection)...")
-        time.sleep(60)
-
-        # Stage 2A
-        if not self.stage2a_tag_macro():
-            print("\nâŒ Pipeline failed at Stage 2A")
+        # Post-join: POV filter and tier annotation (no API call)
+        if not self.join_stage2():
+            print("\n❌ Pipeline failed at Stage 2 join")
             return False
         
-        print("\n⏳ Waiting 60 seconds (rate limit protection)...")
-        time.sleep(60)
-
-        # Stage 2B
-        if not self.stage2b_tag_devices():
-            print("\nâŒ Pipeline failed at Stage 2B")
-            return False
-        
-        print("\n⏳ Waiting 60 seconds (rate limit protection)...")
-        time.sleep(60)
-        
         # Assemble (no API call - no delay needed)
         if not self.assemble_kernel():
             print("\nâŒ Pipeline failed at assembly")
@@ -1338,18 +2039,41 @@ Reference actual codes and device names throughout."""
             return False
 
         # ReasoningDoc generation (final API call)
-        if not self.save_reasoning_document():
-            print("\nÃ¢Å’ Pipeline failed at reasoning document")
+        if reasoning_doc and not self.generate_reasoning_document():
             return False
         
         print("\n" + "="*80)
-        print("âœ… KERNEL CREATION COMPLETE!")
+        print("âœ… KERNEL CREATION COMPLETE!" if reasoning_doc else "âœ… KERNEL SAVED (ReasoningDoc to follow)")
         print("="*80)
+        telemetry = format_summary()
+        if telemetry and reasoning_doc:
+            print(f"\n📊 Model calls:\n{telemetry}")
+        return True
+    
+    def generate_reasoning_document(self) -> bool:
+        """ReasoningDoc for the saved kernel, after the usual rate-limit spacing"""
+        self._stage_local.wait_before_call = True
+        with call_context(book=self.title, run_id=self.run_id, stage='ReasoningDoc'):
+            saved = self.save_reasoning_document()
+        if not saved:
+            print("\nÃ¢Å’ Pipeline failed at reasoning document")
+            return False
         return True
 
 
-def main():
-    """Main entry point"""
+def parse_sections(value: Optional[str], fresh: bool = False) -> Optional[List[str]]:
+    """--sections value as a list of Freytag sections (ValueError if invalid)"""
+    sections = [s.strip() for s in value.split(',') if s.strip()] if value else None
+    if sections and fresh:
+        raise ValueError('--sections cannot be combined with --fresh')
+    unknown = [s for s in sections or [] if s not in FREYTAG_SECTIONS]
+    if unknown:
+        raise ValueError(f"unknown sections {unknown} (choose from {', '.join(FREYTAG_SECTIONS)})")
+    return sections
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    """create_kernel.py's command line (also used by job_scheduler.parse_invocation)"""
     parser = argparse.ArgumentParser(
         description='Create kernel JSON for literary analysis',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -1358,6 +2082,9 @@ Examples:
   python create_kernel.py books/TKAM.pdf 'To Kill a Mockingbird' 'Harper Lee' 'Harper Perennial Modern Classics, 2006'
   python create_kernel.py books/TKAM.pdf 'To Kill a Mockingbird' 'Harper Lee' 'Harper Perennial Modern Classics, 2006' --from-stage kernel_stage2b
   python create_kernel.py books/TKAM.pdf 'To Kill a Mockingbird' 'Harper Lee' 'Harper Perennial Modern Classics, 2006' --fresh
+  python create_kernel.py books/TKAM.pdf 'To Kill a Mockingbird' 'Harper Lee' 'Harper Perennial Modern Classics, 2006' --sections climax,resolution
+  python create_kernel.py books/TKAM.pdf 'To Kill a Mockingbird' 'Harper Lee' 'Harper Perennial Modern Classics, 2006' --from-stage kernel_stage2b --sections climax
+  python create_kernel.py books/TKAM.pdf 'To Kill a Mockingbird' 'Harper Lee' 'Harper Perennial Modern Classics, 2006' --plan
   
 Note: Chapter count is now auto-detected in Stage 0
         """
@@ -1366,18 +2093,59 @@ Note: Chapter count is now auto-detected in Stage 0
     parser.add_argument('title', help='Book title')
     parser.add_argument('author', help='Book author')
     parser.add_argument('edition', help='Book edition')
-    parser.add_argument('--from-stage', type=str, choices=['kernel_stage0', 'kernel_stage1', 'kernel_stage2a', 'kernel_stage2b'],
+    parser.add_argument('--from-stage', type=str, choices=CHECKPOINT_STAGES,
                         help='Force restart from this stage (clears later checkpoints)')
     parser.add_argument('--fresh', action='store_true',
                         help='Clear all checkpoints and start fresh')
-    
+    parser.add_argument('--local-stage1', action='store_true',
+                        help='Build Stage 1 extracts from the Stage 0 alignment without a model call')
+    parser.add_argument('--local-structure', action='store_true',
+                        help='Skip the Stage 0 model call when chapter headings are detected confidently '
+                             '(conventional Freytag distribution, climax unverified)')
+    add_profile_arguments(parser)
+    parser.add_argument('--sections', type=str,
+                        help='Regenerate only these Freytag sections in Stage 1 and Stage 2B, e.g. climax,resolution '
+                             '(with --from-stage, only sectioned stages from that stage on; no checkpoints are cleared). '
+                             'The change is also saved as a patch in kernels/patches/ (see kernel_patch.py)')
+    parser.add_argument('--plan', action='store_true',
+                        help='Estimate calls, tokens, cost and wall time without calling the model '
+                             '(see pipeline_planner.py)')
+    return parser
+
+
+def main():
+    """Main entry point"""
+    parser = build_arg_parser()
     args = parser.parse_args()
     
+    try:
+        sections = parse_sections(args.sections, args.fresh)
+        call_profiles = profiles_from_args(args)
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+    
     # Create kernel creator
-    creator = KernelCreator(args.book_path, args.title, args.author, args.edition)
+    creator = KernelCreator(args.book_path, args.title, args.author, args.edition,
+                            local_stage1=args.local_stage1, local_structure=args.local_structure,
+                            call_profiles=call_profiles, plan_only=args.plan)
+    
+    if args.plan:
+        import pipeline_planner
+        if sections:
+            creator.set_section_targets(sections, args.from_stage)
+        counter = pipeline_planner.token_counter()
+        from_stage = None if sections else ('kernel_stage0' if args.fresh else args.from_stage)
+        plan = pipeline_planner.plan_kernel(creator, counter, from_stage)
+        counter.save()
+        pipeline_planner.print_plan(plan, counter=counter)
+        sys.exit(0)
+    
+    enable_ledger(Config.OUTPUTS_DIR / "usage.db")
     
-    # Clear checkpoints if --fresh or --from-stage specified
-    if args.fresh:
+    # Target sections, or clear checkpoints if --fresh or --from-stage specified
+    if sections:
+        creator.set_section_targets(sections, args.from_stage)
+    elif args.fresh:
         creator._clear_checkpoints_from('kernel_stage0')
     elif args.from_stage:
         creator._clear_checkpoints_from(args.from_stage)
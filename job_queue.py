@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+JOB QUEUE
+Shared job queue for running the pipeline on several hosts at once
+
+Workers on any number of machines pull kernel, Stage 1B and Stage 2 jobs from
+one queue and write checkpoints, kernels and packages to shared storage
+(--shared-dir). Each job is held under a lease that its worker renews with a
+heartbeat; if a worker dies, its lease runs out and the next worker to poll
+picks the job up again, resuming from the checkpoints already written.
+
+Every job carries a lock key naming the title's stage it builds (the
+create_kernel.checkpoint_key name, e.g. The_Giver_kernel). A job is only
+handed out while no other live lease holds the same key, so two workers
+never build the same title's stage at once.
+
+Backends are pluggable (QUEUE_BACKENDS). The bundled one is SQLiteJobQueue: a
+single SQLite file on the shared filesystem, updated in immediate
+transactions. Leases use wall-clock time, so hosts need reasonably synced
+clocks (well within LEASE_SECONDS). A worker that loses a job's lease cancels
+the job (job_scheduler.CANCEL_EVENT): its next model call or write to shared
+storage raises JobCancelled, so only the new lease holder keeps working.
+Relative paths in job params are resolved against --shared-dir. Workers
+record their model calls in the shared usage ledger
+(<shared-dir>/outputs/usage.db, see usage_ledger.py).
+
+Usage:
+    python3 job_queue.py enqueue "create_kernel.py books/Giver.pdf 'The Giver' 'Lois Lowry' 2014" --queue /mnt/shared/jobs.db
+    python3 job_queue.py worker --queue /mnt/shared/jobs.db --shared-dir /mnt/shared
+    python3 job_queue.py status --queue /mnt/shared/jobs.db
+"""
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from job_scheduler import CANCEL_EVENT, CURRENT_CLASS, PRIORITY_CLASSES, cancel_gate, job_class, parse_invocation
+from usage_ledger import DEFAULT_LEDGER_PATH, enable_ledger
+
+DEFAULT_QUEUE_PATH = Path("outputs") / "jobs.db"
+
+# A lease not renewed for this long is considered abandoned
+LEASE_SECONDS = 120
+
+# Heartbeats per lease period
+HEARTBEATS_PER_LEASE = 4
+
+# Attempts before a job whose workers keep dying is marked failed
+MAX_ATTEMPTS = 3
+
+# Seconds between polls of an empty queue
+POLL_INTERVAL = 10
+
+# Job params holding file paths (resolved against the shared directory)
+JOB_PATH_PARAMS = ('book_path', 'stage1a_path', 'stage1b_path', 'profiles_file')
+
+
+def _title_prefix(path: str, marker: str) -> str:
+    """'outputs/The_Giver_stage1a_v6_0.json' -> 'The_Giver'"""
+    return Path(path).name.split(marker)[0]
+
+
+def lock_key(kind: str, params: Dict) -> str:
+    """The title's stage a job builds; at most one live lease per key"""
+    from create_kernel import checkpoint_key
+    if kind == 'kernel':
+        return checkpoint_key(params.get('title', ''), 'kernel')
+    if kind == 'stage1b':
+        return f"{_title_prefix(params.get('stage1a_path', ''), '_stage1a')}_stage1b"
+    if kind == 'stage2':
+        return f"{_title_prefix(params.get('stage1b_path', ''), '_stage1b')}_stage2"
+    raise ValueError(f"Unknown job kind: {kind}")
+
+
+# ============================================================================
+# BACKENDS
+# ============================================================================
+
+class JobQueueBackend(ABC):
+    """Interface of a shared job queue backend
+
+    Job records are dicts with the pipeline_worker.py fields (id, kind,
+    params, priority, status, submitted, started, finished, result, error)
+    plus lock_key, worker, lease_expires and attempts. A backend missing any
+    method fails when it is instantiated, not partway through a job.
+    """
+
+    @abstractmethod
+    def enqueue(self, kind: str, params: Dict, priority: Optional[str] = None) -> Dict:
+        raise NotImplementedError
+
+    @abstractmethod
+    def claim(self, worker_id: str, lease_seconds: float = LEASE_SECONDS) -> Optional[Dict]:
+        """Lease the next runnable job to worker_id, or return None"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float = LEASE_SECONDS) -> bool:
+        """Extend the lease; False if worker_id no longer holds it"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def finish(self, job_id: str, worker_id: str, result: Optional[Dict] = None,
+               error: Optional[str] = None) -> bool:
+        """Record the outcome; False if worker_id no longer holds the lease"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_jobs(self) -> List[Dict]:
+        raise NotImplementedError
+
+
+class SQLiteJobQueue(JobQueueBackend):
+    """Job queue in a SQLite file on shared storage"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT UNIQUE NOT NULL,
+            kind TEXT NOT NULL,
+            params TEXT NOT NULL,
+            priority TEXT NOT NULL,
+            rank INTEGER NOT NULL,
+            lock_key TEXT NOT NULL,
+            status TEXT NOT NULL,
+            worker TEXT,
+            lease_expires REAL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            submitted TEXT,
+            started TEXT,
+            finished TEXT,
+            result TEXT,
+            error TEXT
+        )
+    """
+
+    def __init__(self, path=DEFAULT_QUEUE_PATH, max_attempts: int = MAX_ATTEMPTS):
+        self.path = Path(path)
+        self.max_attempts = max_attempts
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute(self.SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per call: heartbeats run on their own thread
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _transaction(self, conn: sqlite3.Connection):
+        conn.execute("BEGIN IMMEDIATE")
+
+    @staticmethod
+    def _record(row: sqlite3.Row) -> Dict:
+        job = dict(row)
+        job.pop('seq')
+        job.pop('rank')
+        job['params'] = json.loads(job['params'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def enqueue(self, kind: str, params: Dict, priority: Optional[str] = None) -> Dict:
+        """Add a job, or return the identical job already queued or running"""
+        priority = job_class(kind, priority)
+        key = lock_key(kind, params)
+        encoded = json.dumps(params, sort_keys=True)
+        conn = self._connect()
+        try:
+            self._transaction(conn)
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE lock_key = ? AND kind = ? AND params = ? "
+                "AND status IN ('queued', 'running')", (key, kind, encoded)).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT INTO jobs (id, kind, params, priority, rank, lock_key, status, submitted) "
+                    "VALUES (?, ?, ?, ?, ?, ?, 'queued', ?)",
+                    (uuid.uuid4().hex[:12], kind, encoded, priority, PRIORITY_CLASSES[priority]['priority'],
+                     key, datetime.now().isoformat()))
+                row = conn.execute("SELECT * FROM jobs WHERE seq = last_insert_rowid()").fetchone()
+            conn.execute("COMMIT")
+            return self._record(row)
+        finally:
+            conn.close()
+
+    def claim(self, worker_id: str, lease_seconds: float = LEASE_SECONDS) -> Optional[Dict]:
+        now = time.time()
+        conn = self._connect()
+        try:
+            self._transaction(conn)
+            # Abandoned jobs that have used up their attempts
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', finished = ?, "
+                "error = 'Lease expired ' || attempts || ' time(s); worker presumed dead' "
+                "WHERE status = 'running' AND lease_expires < ? AND attempts >= ?",
+                (datetime.now().isoformat(), now, self.max_attempts))
+            held = {r['lock_key'] for r in conn.execute(
+                "SELECT lock_key FROM jobs WHERE status = 'running' AND lease_expires >= ?", (now,))}
+            candidates = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' OR (status = 'running' AND lease_expires < ?) "
+                "ORDER BY rank, seq", (now,)).fetchall()
+            row = next((r for r in candidates if r['lock_key'] not in held), None)
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            if row['status'] == 'running':
+                print(f"  ♻️  Reclaiming job {row['id']} from {row['worker']} (lease expired)")
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, lease_expires = ?, attempts = attempts + 1, "
+                "started = ? WHERE seq = ?",
+                (worker_id, now + lease_seconds, datetime.now().isoformat(), row['seq']))
+            row = conn.execute("SELECT * FROM jobs WHERE seq = ?", (row['seq'],)).fetchone()
+            conn.execute("COMMIT")
+            return self._record(row)
+        finally:
+            conn.close()
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float = LEASE_SECONDS) -> bool:
+        conn = self._connect()
+        try:
+            updated = conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (time.time() + lease_seconds, job_id, worker_id)).rowcount
+            return updated == 1
+        finally:
+            conn.close()
+
+    def finish(self, job_id: str, worker_id: str, result: Optional[Dict] = None,
+               error: Optional[str] = None) -> bool:
+        conn = self._connect()
+        try:
+            updated = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished = ?, lease_expires = NULL "
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                ('failed' if error else 'succeeded', json.dumps(result) if result is not None else None,
+                 error, datetime.now().isoformat(), job_id, worker_id)).rowcount
+            return updated == 1
+        finally:
+            conn.close()
+
+    def list_jobs(self) -> List[Dict]:
+        conn = self._connect()
+        try:
+            return [self._record(r) for r in conn.execute("SELECT * FROM jobs ORDER BY seq")]
+        finally:
+            conn.close()
+
+
+# Backend name -> class; --backend picks one
+QUEUE_BACKENDS = {
+    'sqlite': SQLiteJobQueue,
+}
+
+
+def open_queue(path=DEFAULT_QUEUE_PATH, backend: str = 'sqlite') -> JobQueueBackend:
+    if backend not in QUEUE_BACKENDS:
+        raise ValueError(f"Unknown queue backend '{backend}' (choose from {', '.join(QUEUE_BACKENDS)})")
+    return QUEUE_BACKENDS[backend](path)
+
+
+# ============================================================================
+# SHARED STORAGE
+# ============================================================================
+
+def use_shared_storage(root):
+    """Point checkpoints, kernels, packages and worksheets at a shared directory"""
+    import create_kernel
+    import run_stage1b
+    import run_stage2
+    root = Path(root)
+    create_kernel.Config.OUTPUTS_DIR = root / "outputs"
+    create_kernel.Config.KERNELS_DIR = root / "kernels"
+    run_stage1b.OUTPUTS_DIR = root / "outputs"
+    run_stage2.KERNELS_DIR = root / "kernels"
+    run_stage2.WORKSHEETS_DIR = root / "outputs" / "worksheets"
+    for path in (root / "outputs", root / "kernels"):
+        path.mkdir(parents=True, exist_ok=True)
+
+
+def resolve_job_paths(params: Dict, root) -> Dict:
+    """Job params with relative file paths resolved against the shared directory
+
+    A job submitted as outputs/X.json on one host must read the shared
+    copy on every other host, not whatever is in the worker's working directory.
+    """
+    if not root:
+        return params
+    resolved = dict(params)
+    for name in JOB_PATH_PARAMS:
+        value = resolved.get(name)
+        if value and not Path(value).is_absolute():
+            resolved[name] = str(Path(root) / value)
+    return resolved
+
+
+# ============================================================================
+# WORKER
+# ============================================================================
+
+class DistributedWorker:
+    """Pulls jobs from a shared queue and runs them with pipeline_worker's handlers"""
+
+    def __init__(self, queue: JobQueueBackend, worker_id: Optional[str] = None,
+                 lease_seconds: float = LEASE_SECONDS, handlers: Optional[Dict] = None, state=None,
+                 shared_dir=None):
+        import pipeline_worker
+        from api_client import add_request_gate
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.handlers = handlers or pipeline_worker.JOB_HANDLERS
+        self.state = state if state is not None else pipeline_worker.WarmState()
+        self.shared_dir = shared_dir
+        add_request_gate(cancel_gate)
+
+    def _heartbeat(self, job_id: str, done: threading.Event, cancel: threading.Event):
+        while not done.wait(self.lease_seconds / HEARTBEATS_PER_LEASE):
+            if not self.queue.heartbeat(job_id, self.worker_id, self.lease_seconds):
+                print(f"  ⚠️  Lost the lease on job {job_id}; cancelling it (another worker may own it now)")
+                cancel.set()
+                return
+
+    def run_one(self) -> Optional[Dict]:
+        """Claim and run one job; returns its final record, or None if none was runnable"""
+        job = self.queue.claim(self.worker_id, self.lease_seconds)
+        if job is None:
+            return None
+
+        print(f"\n▶️  Running {job['kind']} job {job['id']} [{job['lock_key']}] "
+              f"(attempt {job['attempts']}) on {self.worker_id}")
+        done, cancel = threading.Event(), threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job['id'], done, cancel), daemon=True)
+        heartbeat.start()
+        token = CURRENT_CLASS.set(job['priority'])
+        cancel_token = CANCEL_EVENT.set(cancel)
+        try:
+            params = resolve_job_paths(job['params'], self.shared_dir)
+            result, error = self.handlers[job['kind']](self.state, params), None
+        except Exception as e:
+            if not cancel.is_set():
+                traceback.print_exc()
+            result, error = None, f"{type(e).__name__}: {e}"
+        finally:
+            CANCEL_EVENT.reset(cancel_token)
+            CURRENT_CLASS.reset(token)
+            done.set()
+            heartbeat.join()
+
+        recorded = self.queue.finish(job['id'], self.worker_id, result, error)
+        status = 'failed' if error else 'succeeded'
+        print(f"{'✅' if not error else '❌'} Job {job['id']} {status}"
+              f"{'' if recorded else ' (lease lost; not recorded)'}")
+        return {**job, 'status': status, 'result': result, 'error': error}
+
+    def run_forever(self, poll_interval: float = POLL_INTERVAL, drain: bool = False):
+        """Run jobs until interrupted (or, with drain, until none is runnable)"""
+        print(f"\n🚀 Worker {self.worker_id} polling {getattr(self.queue, 'path', self.queue)}")
+        while True:
+            if self.run_one() is None:
+                if drain:
+                    return
+                time.sleep(poll_interval)
+
+
+def print_status(queue: JobQueueBackend):
+    jobs = queue.list_jobs()
+    if not jobs:
+        print("No jobs")
+        return
+    now = time.time()
+    for job in jobs:
+        lease = ""
+        if job['status'] == 'running':
+            remaining = (job['lease_expires'] or 0) - now
+            lease = f" {job['worker']} lease {remaining:.0f}s" if remaining > 0 else f" {job['worker']} lease EXPIRED"
+        print(f"{job['id']}  {job['status']:<9} {job['priority']:<11} {job['lock_key']:<40}"
+              f" attempts={job['attempts']}{lease}")
+        if job['error']:
+            print(f"    ❌ {job['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Shared job queue and distributed pipeline worker',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('command', choices=['enqueue', 'worker', 'status'])
+    parser.add_argument('invocation', nargs='?', help='Stage script command line to enqueue')
+    parser.add_argument('--queue', default=str(DEFAULT_QUEUE_PATH), help=f'Queue location (default: {DEFAULT_QUEUE_PATH})')
+    parser.add_argument('--backend', default='sqlite', choices=sorted(QUEUE_BACKENDS))
+    parser.add_argument('--priority', choices=sorted(PRIORITY_CLASSES), help='Priority class for enqueue')
+    parser.add_argument('--shared-dir', help='Shared storage root for outputs/ and kernels/ (worker)')
+    parser.add_argument('--lease', type=float, default=LEASE_SECONDS, help=f'Lease seconds (default: {LEASE_SECONDS})')
+    parser.add_argument('--poll', type=float, default=POLL_INTERVAL, help=f'Idle poll seconds (default: {POLL_INTERVAL})')
+    parser.add_argument('--drain', action='store_true', help='Worker exits once no job is runnable')
+    args = parser.parse_args()
+
+    queue = open_queue(args.queue, args.backend)
+
+    if args.command == 'enqueue':
+        if not args.invocation:
+            parser.error('enqueue needs a stage script command line')
+        try:
+            kind, params = parse_invocation(args.invocation)
+            job = queue.enqueue(kind, params, args.priority)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"📥 {job['kind']} job {job['id']} [{job['lock_key']}] {job['status']} ({job['priority']})")
+    elif args.command == 'worker':
+        if args.shared_dir:
+            use_shared_storage(args.shared_dir)
+        enable_ledger(Path(args.shared_dir) / DEFAULT_LEDGER_PATH if args.shared_dir else DEFAULT_LEDGER_PATH)
+        worker = DistributedWorker(queue, lease_seconds=args.lease, shared_dir=args.shared_dir)
+        worker.state.protocols
+        try:
+            worker.run_forever(args.poll, drain=args.drain)
+        except KeyboardInterrupt:
+            print("\n👋 Shutting down (unfinished job will be reclaimed when its lease expires)")
+    else:
+        print_status(queue)
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
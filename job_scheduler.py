@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+JOB SCHEDULER
+Priority classes for pipeline jobs: per-class concurrency, API rate shares
+and queue-jumping ahead of bulk work
+
+Teacher-triggered Stage 2 re-renders and single-book Stage 1B runs used to
+wait in the same FIFO queue as nightly kernel builds, and share the same API
+rate budget. pipeline_worker.py now schedules jobs through JobScheduler:
+
+- Each job has a priority class (PRIORITY_CLASSES). Kernel builds default to
+  "bulk"; Stage 1B and Stage 2 jobs default to "interactive".
+- Queued jobs start in class priority order, so an interactive job submitted
+  behind queued bulk jobs runs first (queued bulk work is preempted; running
+  jobs are never interrupted).
+- Each class has its own concurrency limit, so bulk jobs can never occupy
+  the slots interactive jobs need.
+- Each class gets a share of the API request budget (RateShares, enforced
+  before every model call in api_client). A class may borrow a
+  higher-priority class's unused share while that class has no jobs.
+
+Jobs can also be given as create_kernel.py / run_stage1b.py / run_stage2.py
+invocations (parse_invocation), e.g.
+    {"invoke": "run_stage2.py outputs/The_Giver_stage1b_v6_0.json --week 1"}
+
+Usage:
+    python3 pipeline_worker.py --interactive-workers 2 --bulk-workers 1 --rate-budget 50
+    python3 job_scheduler.py "create_kernel.py books/Giver.pdf 'The Giver' 'Lois Lowry' 2014 --fresh"
+"""
+
+import argparse
+import asyncio
+import contextvars
+import heapq
+import itertools
+import json
+import shlex
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+# class -> priority (lower runs first), concurrent jobs, share of the API request budget
+PRIORITY_CLASSES = {
+    'interactive': {'priority': 0, 'max_concurrent': 1, 'rate_share': 0.7},
+    'bulk': {'priority': 1, 'max_concurrent': 1, 'rate_share': 0.3},
+}
+
+DEFAULT_CLASS_BY_KIND = {
+    'kernel': 'bulk',
+    'stage1b': 'interactive',
+    'stage2': 'interactive',
+}
+
+# Model requests per minute across all classes
+RATE_BUDGET_RPM = 50
+
+# Priority class of the job running in this context (set by the worker;
+# carried into the api_client core loop by run_sync)
+CURRENT_CLASS = contextvars.ContextVar('job_priority_class', default=None)
+
+# Cancel event of the job running in this context (set by job_queue.py's
+# worker when it loses the job's lease). Model calls (cancel_gate) and writes
+# to shared storage (check_cancelled) stop once it is set.
+CANCEL_EVENT = contextvars.ContextVar('job_cancel_event', default=None)
+
+
+class JobCancelled(Exception):
+    """The running job was cancelled (its lease passed to another worker)"""
+
+
+def check_cancelled():
+    """Raise JobCancelled if the job running in this context was cancelled"""
+    event = CANCEL_EVENT.get()
+    if event is not None and event.is_set():
+        raise JobCancelled("job cancelled: its lease was lost to another worker")
+
+
+async def cancel_gate():
+    """api_client request gate: no model calls for a cancelled job"""
+    check_cancelled()
+
+
+def job_class(kind: str, requested: Optional[str] = None, classes: Optional[Dict] = None) -> str:
+    """Priority class for a job: the requested one, or the kind's default"""
+    classes = classes or PRIORITY_CLASSES
+    name = requested or DEFAULT_CLASS_BY_KIND.get(kind, 'bulk')
+    if name not in classes:
+        raise ValueError(f"Unknown priority class '{name}' (choose from {', '.join(classes)})")
+    return name
+
+
+# ============================================================================
+# SCHEDULER
+# ============================================================================
+
+class JobScheduler:
+    """Priority queue of job IDs with per-class concurrency limits
+
+    Worker threads call acquire() for the next runnable job and release()
+    when it finishes.
+    """
+
+    def __init__(self, classes: Optional[Dict] = None):
+        self.classes = classes or PRIORITY_CLASSES
+        self._heap: List[Tuple[int, int, str, str]] = []
+        self._seq = itertools.count()
+        self._running = {name: 0 for name in self.classes}
+        self._cond = threading.Condition()
+
+    @property
+    def total_slots(self) -> int:
+        return sum(c['max_concurrent'] for c in self.classes.values())
+
+    def submit(self, job_id: str, class_name: str):
+        with self._cond:
+            heapq.heappush(self._heap, (self.classes[class_name]['priority'], next(self._seq), class_name, job_id))
+            self._cond.notify_all()
+
+    def _next_runnable(self) -> Optional[int]:
+        """Index of the highest-priority queued job whose class has a free slot"""
+        for index in sorted(range(len(self._heap)), key=lambda i: self._heap[i][:2]):
+            class_name = self._heap[index][2]
+            if self._running[class_name] < self.classes[class_name]['max_concurrent']:
+                return index
+        return None
+
+    def acquire(self, timeout: Optional[float] = None) -> Optional[Tuple[str, str]]:
+        """Block until a job can start; returns (job_id, class) or None on timeout"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._next_runnable() is not None, timeout):
+                return None
+            index = self._next_runnable()
+            _, _, class_name, job_id = self._heap[index]
+            self._heap[index] = self._heap[-1]
+            self._heap.pop()
+            heapq.heapify(self._heap)
+            self._running[class_name] += 1
+            return job_id, class_name
+
+    def release(self, class_name: str):
+        with self._cond:
+            self._running[class_name] -= 1
+            self._cond.notify_all()
+
+    def active(self, class_name: str) -> bool:
+        """True if the class has queued or running jobs"""
+        with self._cond:
+            return self._running[class_name] > 0 or any(item[2] == class_name for item in self._heap)
+
+    def qsize(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+    def summary(self) -> Dict:
+        with self._cond:
+            return {
+                name: {
+                    "queued": sum(1 for item in self._heap if item[2] == name),
+                    "running": self._running[name],
+                    "max_concurrent": self.classes[name]['max_concurrent'],
+                }
+                for name in self.classes
+            }
+
+
+# ============================================================================
+# RATE SHARES
+# ============================================================================
+
+class RateShares:
+    """Per-class token buckets over the API request budget
+
+    Each class refills at rate_share * rpm. A class that runs out may take a
+    token from a higher-priority class that has no queued or running jobs
+    (work-conserving at night, protected during the day). Calls made outside
+    a scheduled job (CURRENT_CLASS unset) are not limited.
+    """
+
+    def __init__(self, scheduler: JobScheduler, rpm: float = RATE_BUDGET_RPM):
+        self.scheduler = scheduler
+        self.rpm = rpm
+        self._lock = threading.Lock()
+        now = time.monotonic()
+        self._buckets = {
+            name: {'rate': c['rate_share'] * rpm / 60, 'capacity': max(1.0, c['rate_share'] * rpm / 6),
+                   'tokens': max(1.0, c['rate_share'] * rpm / 6), 'updated': now}
+            for name, c in scheduler.classes.items()
+        }
+
+    def _refill(self, bucket: Dict, now: float):
+        bucket['tokens'] = min(bucket['capacity'], bucket['tokens'] + (now - bucket['updated']) * bucket['rate'])
+        bucket['updated'] = now
+
+    def try_acquire(self, class_name: str) -> float:
+        """Take a token for class_name; returns 0 on success, else seconds to wait"""
+        priority = self.scheduler.classes[class_name]['priority']
+        lenders = [name for name, c in self.scheduler.classes.items()
+                   if c['priority'] < priority and not self.scheduler.active(name)]
+        with self._lock:
+            now = time.monotonic()
+            for name in [class_name] + lenders:
+                bucket = self._buckets[name]
+                self._refill(bucket, now)
+                if bucket['tokens'] >= 1:
+                    bucket['tokens'] -= 1
+                    return 0.0
+            own = self._buckets[class_name]
+            return (1 - own['tokens']) / own['rate'] if own['rate'] else 1.0
+
+    async def gate(self):
+        """api_client request gate: wait for the current job class's share"""
+        class_name = CURRENT_CLASS.get()
+        if class_name is None or class_name not in self._buckets:
+            return
+        while True:
+            delay = self.try_acquire(class_name)
+            if not delay:
+                return
+            await asyncio.sleep(min(delay, 5.0))
+
+
+# ============================================================================
+# INVOCATIONS
+# ============================================================================
+
+def _stage2_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='run_stage2.py', add_help=False)
+    parser.add_argument('stage1b_path')
+    parser.add_argument('--week', type=int)
+    parser.add_argument('--all-weeks', action='store_true')
+    return parser
+
+
+def _profile_params(args) -> Dict:
+    """--profile / --profiles-file as worker job params"""
+    from call_profiles import parse_profile_overrides
+    return {"profiles": parse_profile_overrides(args.profile) or None, "profiles_file": args.profiles_file}
+
+
+def _reject_plan(args, script: str):
+    if args.plan:
+        raise ValueError(f"--plan is a dry run; run {script}.py --plan locally instead of as a job")
+
+
+def parse_invocation(command: Union[str, List[str]]) -> Tuple[str, Dict]:
+    """Map a stage script command line to a worker job: (kind, params)
+
+    Accepts an optional leading python/python3 and the script with or
+    without .py. Raises ValueError on unknown scripts or invalid arguments,
+    and on --plan: a plan is a local dry run, never a job that calls the API.
+    """
+    argv = shlex.split(command) if isinstance(command, str) else list(command)
+    if argv and Path(argv[0]).name.startswith('python'):
+        argv = argv[1:]
+    if not argv:
+        raise ValueError("Empty invocation")
+    script, argv = Path(argv[0]).stem, argv[1:]
+
+    try:
+        if script == 'create_kernel':
+            from create_kernel import build_arg_parser, parse_sections
+            args = build_arg_parser().parse_args(argv)
+            _reject_plan(args, script)
+            params = {
+                "book_path": args.book_path, "title": args.title,
+                "author": args.author, "edition": args.edition,
+                "from_stage": args.from_stage, "fresh": args.fresh,
+                "local_stage1": args.local_stage1, "local_structure": args.local_structure,
+                "sections": parse_sections(args.sections, args.fresh),
+                **_profile_params(args),
+            }
+            return 'kernel', {k: v for k, v in params.items() if v not in (None, False)}
+        if script == 'run_stage1b':
+            from run_stage1b import build_arg_parser
+            args = build_arg_parser().parse_args(argv)
+            _reject_plan(args, script)
+            params = {"stage1a_path": args.stage1a_path, "defer_worksheets": args.defer_worksheets,
+                      "book_path": args.book, **_profile_params(args)}
+            return 'stage1b', {k: v for k, v in params.items() if v not in (None, False)}
+        if script == 'run_stage2':
+            args = _stage2_parser().parse_args(argv)
+            params = {"stage1b_path": args.stage1b_path, "week": args.week, "all_weeks": args.all_weeks}
+            return 'stage2', {k: v for k, v in params.items() if v not in (None, False)}
+    except SystemExit:
+        raise ValueError(f"Invalid arguments for {script}.py: {' '.join(argv)}")
+    raise ValueError(f"Unknown script '{script}' (expected create_kernel, run_stage1b or run_stage2)")
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    try:
+        kind, params = parse_invocation(sys.argv[1] if len(sys.argv) == 2 else sys.argv[1:])
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(json.dumps({"kind": kind, "params": params, "priority": job_class(kind)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
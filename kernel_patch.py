@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+KERNEL PATCH ENGINE
+Structural diffs between kernels, applied and stored as small deltas
+
+Generalizes patch_tkam_kernel.py to any kernel:
+1. diff_kernels() computes JSON-patch-style operations between two kernels.
+   Dict sections are diffed key by key; micro_devices are matched by
+   (Freytag section, canonical device name) instead of list position.
+2. apply_patch() applies operations in a single pass (device lookups go
+   through an index, not nested loops) on a deep copy of the base kernel.
+3. Patch files store only the operations plus the hash of the kernel they
+   apply to, so regenerating one section stores a few KB instead of a new
+   full kernel copy. Chains of patches are verified hash by hash.
+
+Paths are JSON pointers. Devices are addressed by section and canonical name:
+    /extracts/climax/rationale
+    /micro_devices/climax/dramatic irony/effect
+
+Usage:
+    # Diff two kernels (optionally only some sections) into a patch file
+    python3 kernel_patch.py diff kernels/Book_kernel_v4_0.json new_kernel.json -o kernels/patches/Book_climax.patch.json
+    python3 kernel_patch.py diff old.json new.json --sections climax,resolution -o climax.patch.json
+
+    # Materialize a kernel from a base plus a chain of patches
+    python3 kernel_patch.py apply kernels/Book_kernel_v4_0.json p1.patch.json p2.patch.json -o kernels/Book_kernel_v4_1.json
+
+    # Summarize a patch
+    python3 kernel_patch.py show kernels/patches/Book_climax.patch.json
+"""
+
+import argparse
+import copy
+import hashlib
+import json
+import re
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+PATCH_FORMAT_VERSION = "1.0"
+
+DEVICES_KEY = "micro_devices"
+UNASSIGNED_SECTION = "unassigned"
+
+FREYTAG_SECTIONS = ['exposition', 'rising_action', 'climax', 'falling_action', 'resolution']
+
+# Kernel sections whose immediate children are keyed by Freytag section
+SECTION_KEYED = {'extracts', 'chapter_alignment', 'narrative_position_mapping'}
+
+
+class PatchError(ValueError):
+    """Raised when a patch cannot be applied to a kernel"""
+
+
+# ============================================================================
+# KEYS AND POINTERS
+# ============================================================================
+
+def canonical_device_name(name: str) -> str:
+    """Normalize a device name for matching: 'First-Person  Narration' -> 'first person narration'"""
+    return re.sub(r'[\s_\-]+', ' ', (name or '').strip().lower())
+
+
+def device_section(device: dict) -> str:
+    """Freytag section a device belongs to (assigned_section, else its first example's)"""
+    section = device.get('assigned_section')
+    if not section:
+        examples = device.get('examples') or []
+        if examples and isinstance(examples[0], dict):
+            section = examples[0].get('freytag_section')
+    return section or UNASSIGNED_SECTION
+
+
+def device_key(device: dict) -> Tuple[str, str]:
+    return device_section(device), canonical_device_name(device.get('name', ''))
+
+
+def index_devices(devices: Iterable[dict]) -> Dict[Tuple[str, str], dict]:
+    """Map (section, canonical name) -> device; repeated keys get a '#n' suffix"""
+    index = {}
+    for device in devices:
+        section, name = device_key(device)
+        key, n = (section, name), 2
+        while key in index:
+            key = (section, f"{name}#{n}")
+            n += 1
+        index[key] = device
+    return index
+
+
+def _escape(segment: str) -> str:
+    return str(segment).replace('~', '~0').replace('/', '~1')
+
+
+def _unescape(segment: str) -> str:
+    return segment.replace('~1', '/').replace('~0', '~')
+
+
+def make_pointer(*segments) -> str:
+    return '/' + '/'.join(_escape(s) for s in segments)
+
+
+def parse_pointer(pointer: str) -> List[str]:
+    if not pointer.startswith('/'):
+        raise PatchError(f"Invalid pointer: {pointer!r}")
+    return [_unescape(s) for s in pointer[1:].split('/')]
+
+
+# ============================================================================
+# DIFF
+# ============================================================================
+
+def _diff_values(old, new, path: List[str], ops: List[dict]):
+    """Recursive diff: dicts key by key, everything else (lists included) as a whole"""
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": make_pointer(*path, key)})
+        for key, value in new.items():
+            if key not in old:
+                ops.append({"op": "add", "path": make_pointer(*path, key), "value": value})
+            else:
+                _diff_values(old[key], value, path + [key], ops)
+    elif old != new:
+        ops.append({"op": "replace", "path": make_pointer(*path), "value": new})
+
+
+def _diff_devices(old_devices: list, new_devices: list, ops: List[dict]):
+    old_index = index_devices(old_devices)
+    new_index = index_devices(new_devices)
+
+    for key in old_index:
+        if key not in new_index:
+            ops.append({"op": "remove", "path": make_pointer(DEVICES_KEY, *key)})
+    for key, device in new_index.items():
+        if key not in old_index:
+            ops.append({"op": "add", "path": make_pointer(DEVICES_KEY, *key), "value": device})
+        else:
+            _diff_values(old_index[key], device, [DEVICES_KEY, *key], ops)
+
+    # Order only needs recording when appending new devices would not reproduce it
+    natural_order = [k for k in old_index if k in new_index] + [k for k in new_index if k not in old_index]
+    new_order = list(new_index)
+    if natural_order != new_order:
+        ops.append({"op": "reorder", "path": make_pointer(DEVICES_KEY), "value": [list(k) for k in new_order]})
+
+
+def _op_sections(op: dict) -> Optional[str]:
+    """Freytag section an operation belongs to, or None if it is not section-scoped"""
+    segments = parse_pointer(op["path"])
+    if len(segments) >= 2 and (segments[0] == DEVICES_KEY or segments[0] in SECTION_KEYED):
+        return segments[1]
+    return None
+
+
+def _whole_device_name(op: dict) -> Optional[str]:
+    """Device name of an add/remove of a whole device, else None"""
+    segments = parse_pointer(op["path"])
+    if op["op"] in ("add", "remove") and len(segments) == 3 and segments[0] == DEVICES_KEY:
+        return segments[2]
+    return None
+
+
+def diff_kernels(old_kernel: dict, new_kernel: dict, sections: Optional[Iterable[str]] = None) -> List[dict]:
+    """Compute operations that turn old_kernel into new_kernel.
+
+    Args:
+        old_kernel: Base kernel
+        new_kernel: Target kernel
+        sections: If given, only keep operations scoped to these Freytag
+            sections (extracts/alignment entries and devices). Use this to
+            store just the part of a kernel that was regenerated. A device
+            that moved between sections (a remove under one, an add under the
+            other) keeps both halves if either is in a wanted section.
+
+    Returns:
+        List of operation dicts (add / remove / replace / reorder)
+    """
+    ops = []
+    for key in old_kernel:
+        if key not in new_kernel:
+            ops.append({"op": "remove", "path": make_pointer(key)})
+    for key, value in new_kernel.items():
+        if key not in old_kernel:
+            ops.append({"op": "add", "path": make_pointer(key), "value": value})
+        elif key == DEVICES_KEY and isinstance(value, list) and isinstance(old_kernel[key], list):
+            _diff_devices(old_kernel[key], value, ops)
+        else:
+            _diff_values(old_kernel[key], value, [key], ops)
+
+    if sections is not None:
+        wanted = set(sections)
+        kept = [op for op in ops if op["op"] != "reorder" and _op_sections(op) in wanted]
+        moved = {_whole_device_name(op) for op in kept} - {None}
+        ops = [op for op in ops if op["op"] != "reorder"
+               and (_op_sections(op) in wanted or _whole_device_name(op) in moved)]
+    return ops
+
+
+# ============================================================================
+# APPLY
+# ============================================================================
+
+def _apply_to_container(root, segments: List[str], op: dict):
+    parent = root
+    for segment in segments[:-1]:
+        if isinstance(parent, dict) and segment in parent:
+            parent = parent[segment]
+        elif isinstance(parent, list) and segment.isdigit() and int(segment) < len(parent):
+            parent = parent[int(segment)]
+        else:
+            raise PatchError(f"Path not found: {op['path']}")
+
+    leaf = segments[-1]
+    if isinstance(parent, list):
+        if not leaf.isdigit():
+            raise PatchError(f"List index expected in {op['path']}")
+        leaf = int(leaf)
+    elif not isinstance(parent, dict):
+        raise PatchError(f"Cannot index into {type(parent).__name__} at {op['path']}")
+
+    kind = op["op"]
+    if kind in ("add", "replace"):
+        if kind == "replace" and isinstance(parent, dict) and leaf not in parent:
+            raise PatchError(f"Cannot replace missing key: {op['path']}")
+        parent[leaf] = copy.deepcopy(op["value"])
+    elif kind == "remove":
+        try:
+            del parent[leaf]
+        except (KeyError, IndexError):
+            raise PatchError(f"Cannot remove missing path: {op['path']}")
+    else:
+        raise PatchError(f"Unsupported op: {kind}")
+
+
+def apply_patch(kernel: dict, ops: List[dict], in_place: bool = False) -> dict:
+    """Apply operations to a kernel in one pass.
+
+    The kernel is deep-copied first unless in_place=True, so the base
+    version is never modified through shared nested dicts.
+    """
+    result = kernel if in_place else copy.deepcopy(kernel)
+
+    devices = result.get(DEVICES_KEY)
+    index = index_devices(devices) if isinstance(devices, list) else {}
+    order = list(index)
+    removed = set()
+    reorder = None
+
+    for op in ops:
+        segments = parse_pointer(op["path"])
+
+        if segments[0] != DEVICES_KEY or len(segments) == 1 and op["op"] != "reorder":
+            _apply_to_container(result, segments, op)
+            if segments[0] == DEVICES_KEY:
+                # Whole device list replaced/added: rebuild the index
+                devices = result.get(DEVICES_KEY)
+                index = index_devices(devices) if isinstance(devices, list) else {}
+                order, removed = list(index), set()
+            continue
+
+        if op["op"] == "reorder":
+            reorder = [tuple(k) for k in op["value"]]
+            continue
+
+        if len(segments) < 3:
+            raise PatchError(f"Device path needs section and name: {op['path']}")
+        key = (segments[1], segments[2])
+
+        if len(segments) == 3:
+            if op["op"] == "add":
+                if key in index and key not in removed:
+                    raise PatchError(f"Device already exists: {op['path']}")
+                index[key] = copy.deepcopy(op["value"])
+                removed.discard(key)
+                if key not in order:
+                    order.append(key)
+            elif op["op"] == "remove":
+                if key not in index or key in removed:
+                    raise PatchError(f"Device not found: {op['path']}")
+                removed.add(key)
+            elif op["op"] == "replace":
+                if key not in index or key in removed:
+                    raise PatchError(f"Device not found: {op['path']}")
+                index[key] = copy.deepcopy(op["value"])
+            else:
+                raise PatchError(f"Unsupported op: {op['op']}")
+        else:
+            if key not in index or key in removed:
+                raise PatchError(f"Device not found: {op['path']}")
+            _apply_to_container(index[key], segments[3:], op)
+
+    if isinstance(devices, list):
+        final_order = reorder if reorder is not None else order
+        result[DEVICES_KEY] = [index[k] for k in final_order if k in index and k not in removed]
+
+    return result
+
+
+# ============================================================================
+# PATCH FILES
+# ============================================================================
+
+def kernel_hash(kernel: dict) -> str:
+    """Content hash of a kernel (independent of key order and formatting)"""
+    canonical = json.dumps(kernel, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def make_patch(base_kernel: dict, new_kernel: dict, description: str = "",
+               sections: Optional[Iterable[str]] = None) -> dict:
+    """Build a patch document: operations plus the hashes it connects"""
+    ops = diff_kernels(base_kernel, new_kernel, sections)
+    return {
+        "patch_format": PATCH_FORMAT_VERSION,
+        "created": datetime.now().isoformat(),
+        "description": description,
+        "sections": sorted(sections) if sections is not None else None,
+        "base_hash": kernel_hash(base_kernel),
+        "result_hash": kernel_hash(apply_patch(base_kernel, ops)),
+        "operations": ops,
+    }
+
+
+def save_patch(patch: dict, path: Path) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(patch, f, indent=2)
+    return path
+
+
+def load_patch(path: Path) -> dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        patch = json.load(f)
+    if "operations" not in patch:
+        raise PatchError(f"Not a kernel patch file: {path}")
+    return patch
+
+
+def apply_patch_chain(base_kernel: dict, patches: List[dict], verify: bool = True) -> dict:
+    """Materialize a kernel from a base version plus patches, in order"""
+    kernel = base_kernel
+    for i, patch in enumerate(patches, 1):
+        if verify and patch.get("base_hash") and patch["base_hash"] != kernel_hash(kernel):
+            raise PatchError(f"Patch {i} was made against a different kernel version")
+        kernel = apply_patch(kernel, patch["operations"])
+        if verify and patch.get("result_hash") and patch["result_hash"] != kernel_hash(kernel):
+            raise PatchError(f"Patch {i} produced an unexpected result")
+    return kernel
+
+
+def summarize_ops(ops: List[dict]) -> Dict[str, int]:
+    summary = {}
+    for op in ops:
+        segments = parse_pointer(op["path"])
+        area = segments[0] if segments[0] != DEVICES_KEY or len(segments) < 2 else f"{DEVICES_KEY}/{segments[1]}"
+        label = f"{op['op']} {area}"
+        summary[label] = summary.get(label, 0) + 1
+    return summary
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def _load_json(path) -> dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Diff, store and apply kernel patches',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    sub = parser.add_subparsers(dest='command')
+
+    diff_p = sub.add_parser('diff', help='Diff two kernels into a patch file')
+    diff_p.add_argument('base', help='Base kernel JSON')
+    diff_p.add_argument('new', help='New kernel JSON')
+    diff_p.add_argument('-o', '--output', help='Patch file to write (default: print summary only)')
+    diff_p.add_argument('--sections', help='Comma-separated Freytag sections to keep (e.g. climax,resolution)')
+    diff_p.add_argument('--description', default='', help='Description stored in the patch')
+
+    apply_p = sub.add_parser('apply', help='Apply a chain of patches to a base kernel')
+    apply_p.add_argument('base', help='Base kernel JSON')
+    apply_p.add_argument('patches', nargs='+', help='Patch files, applied in order')
+    apply_p.add_argument('-o', '--output', required=True, help='Kernel JSON to write')
+    apply_p.add_argument('--no-verify', action='store_true', help='Skip base/result hash checks')
+
+    show_p = sub.add_parser('show', help='Summarize a patch file')
+    show_p.add_argument('patch', help='Patch file')
+
+    args = parser.parse_args()
+
+    if args.command == 'diff':
+        sections = [s.strip() for s in args.sections.split(',')] if args.sections else None
+        unknown = [s for s in sections or [] if s not in FREYTAG_SECTIONS]
+        if unknown:
+            print(f"❌ Error: Unknown sections: {unknown}")
+            sys.exit(1)
+        patch = make_patch(_load_json(args.base), _load_json(args.new), args.description, sections)
+        print(f"\n🔍 {len(patch['operations'])} operation(s)")
+        for label, count in sorted(summarize_ops(patch['operations']).items()):
+            print(f"  - {label}: {count}")
+        if args.output:
+            path = save_patch(patch, Path(args.output))
+            print(f"\n💾 Patch saved: {path} ({path.stat().st_size:,} bytes)")
+
+    elif args.command == 'apply':
+        patches = [load_patch(Path(p)) for p in args.patches]
+        try:
+            kernel = apply_patch_chain(_load_json(args.base), patches, verify=not args.no_verify)
+        except PatchError as e:
+            print(f"❌ Error: {e}")
+            sys.exit(1)
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(kernel, f, indent=2)
+        print(f"\n✅ Applied {len(patches)} patch(es) -> {output}")
+
+    elif args.command == 'show':
+        patch = load_patch(Path(args.patch))
+        print(f"\nPatch: {args.patch}")
+        print(f"  Created: {patch.get('created')}")
+        print(f"  Description: {patch.get('description') or '-'}")
+        print(f"  Sections: {', '.join(patch['sections']) if patch.get('sections') else 'all'}")
+        print(f"  Base hash: {patch.get('base_hash', '?')[:12]}")
+        print(f"  Operations: {len(patch['operations'])}")
+        for label, count in sorted(summarize_ops(patch['operations']).items()):
+            print(f"    - {label}: {count}")
+
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+OUTPUT SCHEMAS
+JSON schemas for every structured model output in the pipeline
+
+Each stage used to ask for "ONLY valid JSON", strip ``` fences and call
+json.loads, failing the stage (create_kernel.py) or regenerating the whole
+response (run_stage1b.py) when the model's JSON was malformed. The shapes are
+now defined once here. api_client.call_structured sends a schema as a forced
+tool, so the response arrives already parsed. The result is checked with
+validate(), and only the listed errors are sent back in a short repair call.
+
+validate() implements the subset of JSON Schema these schemas use (type,
+properties, required, items, enum, minItems); no jsonschema dependency.
+
+Usage:
+    python3 output_schemas.py                 # list schemas
+    python3 output_schemas.py stage2b_devices # print one schema
+"""
+
+import json
+import sys
+from typing import Dict, List, Optional
+
+FREYTAG_SECTIONS = ['exposition', 'rising_action', 'climax', 'falling_action', 'resolution']
+
+POV_CODES = ['FP', 'SP', 'TPL', 'TPO']
+
+# Spelled-out POV values written by older kernels and Stage 2A checkpoints
+LEGACY_POV_CODES = {
+    'FIRST_PERSON': 'FP', 'SECOND_PERSON': 'SP',
+    'THIRD_LIMITED': 'TPL', 'THIRD_PERSON_LIMITED': 'TPL',
+    'THIRD_OMNISCIENT': 'TPO', 'THIRD_PERSON_OMNISCIENT': 'TPO',
+}
+
+_CHAPTER_RANGE = {"type": ["string", "integer"], "description": 'Numeric-only range, e.g. "1-3" or "15"'}
+
+_ALIGNMENT_SECTION = {
+    "type": "object",
+    "properties": {
+        "chapter_range": _CHAPTER_RANGE,
+        "chapters": {"type": "array", "items": {"type": "integer"}},
+        "primary_chapter": {"type": "integer"},
+        "percentage": {"type": "number"},
+        "rationale": {"type": "string"},
+    },
+    "required": ["chapter_range", "chapters", "primary_chapter"],
+}
+
+_EXTRACT_SECTION = {
+    "type": "object",
+    "properties": {
+        "chapter_range": _CHAPTER_RANGE,
+        "primary_chapter": {"type": "integer"},
+        "rationale": {"type": "string"},
+    },
+    "required": ["chapter_range", "primary_chapter"],
+}
+
+_DEVICE = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "anchor_phrase": {"type": "string"},
+        "location_percent": {"type": "number"},
+        "scene": {"type": "string"},
+        "effect": {"type": "string"},
+    },
+    "required": ["name", "anchor_phrase"],
+}
+
+
+def _sections_object(section_schema: Dict, sections: Optional[List[str]] = None) -> Dict:
+    """Object keyed by Freytag section, requiring the given sections (default: all five)"""
+    sections = list(sections or FREYTAG_SECTIONS)
+    return {
+        "type": "object",
+        "properties": {section: section_schema for section in sections},
+        "required": sections,
+    }
+
+
+def _stage0_alignment(sections=None):
+    return {
+        "type": "object",
+        "properties": {
+            "structure_detection": {
+                "type": "object",
+                "properties": {
+                    "structure_type": {"type": "string"},
+                    "total_units": {"type": "integer"},
+                    "special_elements": {"type": "array"},
+                    "notes": {"type": "string"},
+                },
+                "required": ["total_units"],
+            },
+            "chapter_alignment": _sections_object(_ALIGNMENT_SECTION),
+            "validation": {"type": "object"},
+        },
+        "required": ["structure_detection", "chapter_alignment"],
+    }
+
+
+def _stage1_extracts(sections=None):
+    return {
+        "type": "object",
+        "properties": {
+            "metadata": {"type": "object"},
+            "extracts": _sections_object(_EXTRACT_SECTION, sections),
+        },
+        "required": ["extracts"],
+    }
+
+
+def _stage2a_macro(sections=None):
+    return {
+        "type": "object",
+        "properties": {
+            "narrative": {
+                "type": "object",
+                "properties": {
+                    "voice": {
+                        "type": "object",
+                        "properties": {"pov": {"type": "string", "enum": POV_CODES}},
+                        "required": ["pov"],
+                    },
+                    "structure": {"type": "object"},
+                },
+                "required": ["voice", "structure"],
+            },
+            "rhetoric": {"type": "object"},
+            "device_mediation": {"type": "object"},
+        },
+        "required": ["narrative", "rhetoric", "device_mediation"],
+    }
+
+
+def _stage2b_devices(sections=None):
+    # Tool inputs must be objects, so the device array is wrapped
+    return {
+        "type": "object",
+        "properties": {"devices": {"type": "array", "items": _DEVICE}},
+        "required": ["devices"],
+    }
+
+
+def _worksheet_content(sections=None):
+    text = {"type": "string"}
+    return {
+        "type": "object",
+        "properties": {
+            "mc_question": text,
+            "mc_options": {
+                "type": "object",
+                "properties": {key: text for key in "ABCD"},
+                "required": list("ABCD"),
+            },
+            "mc_correct": {"type": "string", "enum": list("ABCD")},
+            "mc_explanation": text,
+            "sequencing_steps": {
+                "type": "object",
+                "properties": {f"step_{n}": text for n in (1, 2, 3)},
+                "required": ["step_1", "step_2", "step_3"],
+            },
+            "sequencing_order": text,
+            "location_hint": text,
+            "detail_sample": text,
+        },
+        "required": ["mc_question", "mc_options", "mc_correct", "mc_explanation",
+                     "sequencing_steps", "sequencing_order", "location_hint", "detail_sample"],
+    }
+
+
+# name -> (schema builder, tool description)
+SCHEMAS = {
+    "stage0_alignment": (_stage0_alignment, "Record the detected book structure and validated chapter-to-Freytag alignment"),
+    "stage1_extracts": (_stage1_extracts, "Record the Freytag section extracts"),
+    "stage2a_macro": (_stage2a_macro, "Record the macro alignment variable tags"),
+    "stage2b_devices": (_stage2b_devices, "Record the literary devices found in the chapter"),
+    "worksheet_content": (_worksheet_content, "Record the worksheet content for one device"),
+}
+
+
+def get_schema(name: str, sections: Optional[List[str]] = None) -> Dict:
+    """JSON schema for a named output; sections narrows section-keyed outputs"""
+    if name not in SCHEMAS:
+        raise KeyError(f"Unknown output schema '{name}' (choose from {', '.join(SCHEMAS)})")
+    return SCHEMAS[name][0](sections)
+
+
+def tool_for(name: str, sections: Optional[List[str]] = None) -> Dict:
+    """Tool definition that forces the model to emit this schema"""
+    return {
+        "name": f"record_{name}",
+        "description": SCHEMAS[name][1],
+        "input_schema": get_schema(name, sections),
+    }
+
+
+_JSON_TYPES = {
+    "object": dict, "array": list, "string": str, "boolean": bool,
+    "integer": int, "number": (int, float), "null": type(None),
+}
+
+
+def _type_matches(value, expected: str) -> bool:
+    if expected in ("integer", "number") and isinstance(value, bool):
+        return False
+    return isinstance(value, _JSON_TYPES[expected])
+
+
+def validate(instance, schema: Dict, path: str = "$") -> List[str]:
+    """Return a list of "path: problem" strings (empty when valid)"""
+    errors = []
+    expected = schema.get("type")
+    if expected:
+        types = expected if isinstance(expected, list) else [expected]
+        if not any(_type_matches(instance, t) for t in types):
+            return [f"{path}: expected {' or '.join(types)}, got {type(instance).__name__}"]
+    if "enum" in schema and instance not in schema["enum"]:
+        errors.append(f"{path}: {instance!r} is not one of {schema['enum']}")
+    if isinstance(instance, dict):
+        for key in schema.get("required", []):
+            if key not in instance:
+                errors.append(f"{path}: missing required field '{key}'")
+        for key, sub_schema in schema.get("properties", {}).items():
+            if key in instance:
+                errors.extend(validate(instance[key], sub_schema, f"{path}.{key}"))
+    if isinstance(instance, list):
+        if len(instance) < schema.get("minItems", 0):
+            errors.append(f"{path}: expected at least {schema['minItems']} items")
+        if "items" in schema:
+            for i, item in enumerate(instance):
+                errors.extend(validate(item, schema["items"], f"{path}[{i}]"))
+    return errors
+
+
+def normalize_pov(pov):
+    """POV code for a legacy spelled-out value ('THIRD_LIMITED' -> 'TPL'); other values unchanged"""
+    if not isinstance(pov, str):
+        return pov
+    return LEGACY_POV_CODES.get(pov.strip().upper().replace('-', '_').replace(' ', '_'), pov)
+
+
+def coerce(name: str, data):
+    """Adapt a response (or an older checkpoint) to the schema's shape
+
+    A text-mode Stage 2B response may be a bare device array, which the
+    schema wraps; a spelled-out Stage 2A POV is mapped to its code.
+    """
+    if name == "stage2b_devices" and isinstance(data, list):
+        return {"devices": data}
+    if name == "stage2a_macro" and isinstance(data, dict):
+        narrative = data.get("narrative")
+        voice = narrative.get("voice") if isinstance(narrative, dict) else None
+        if isinstance(voice, dict) and "pov" in voice:
+            voice["pov"] = normalize_pov(voice["pov"])
+    return data
+
+
+def main():
+    if len(sys.argv) > 1:
+        print(json.dumps(get_schema(sys.argv[1]), indent=2))
+        return
+    for name, (_, description) in SCHEMAS.items():
+        print(f"  {name:<20} {description}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+PASSAGE INDEX
+Paragraph-level BM25 index over a book's extracted text
+
+The stages that send book text used to pick it by position only: fixed
+beginning/middle/end windows, the opening words of each candidate climax
+chapter, or nothing at all (worksheet prompts only saw the kernel's quote
+snippet). This module splits the book into paragraph passages (short
+paragraphs merged, long ones windowed) and ranks them against a query with
+BM25, so a stage can send the few passages that matter: the most climax-like
+passages of each candidate chapter in Stage 0, or the scene around a device's
+quote for worksheet content in Stage 1B.
+
+Indexes are cached in memory per text version (hash of the text) and on disk
+per book file (books/.passages/<stem>.<key>.json, keyed by path, size and
+mtime). The disk cache holds the passages themselves, so a later stage can
+search a PDF without extracting it again.
+
+Usage:
+    python3 passage_index.py books/Giver.pdf "release of the twins"
+    python3 passage_index.py books/Giver.pdf "the river sled" --top 5 --chapter-words 12000-15000
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Disk cache of extracted passages, next to the books
+CACHE_DIR = Path("books") / ".passages"
+
+# Bump when passage splitting changes so stale disk caches are rebuilt
+INDEX_FORMAT = 1
+
+# Passage sizing: short paragraphs (dialogue lines) are merged up to MIN words,
+# paragraphs longer than MAX (or PDF text without blank lines) are windowed
+MIN_PASSAGE_WORDS = 80
+MAX_PASSAGE_WORDS = 220
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+PARAGRAPH_RE = re.compile(r'\n\s*\n')
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by for from had has have he her hers him his i if in into is it its me my no
+not of on or our she so than that the their them then there they this to up was we were what when which who
+will with would you your
+""".split())
+
+# Parsed indexes keyed by text version
+_INDEX_CACHE: Dict[str, "PassageIndex"] = {}
+
+
+def text_version(text: str) -> str:
+    """Short hash identifying an extracted book text"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens without stopwords"""
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def split_passages(text: str) -> List[Dict]:
+    """Paragraph passages with their offsets into text.split()
+
+    start_word indexes the same word list KernelCreator.book_words and
+    structure_detection use, so passages map onto chapter word ranges.
+    """
+    passages = []
+    pending, pending_start = [], 0
+    offset = 0
+
+    def emit(words, start):
+        for i in range(0, len(words), MAX_PASSAGE_WORDS):
+            passages.append({"start_word": start + i, "text": ' '.join(words[i:i + MAX_PASSAGE_WORDS])})
+
+    for paragraph in PARAGRAPH_RE.split(text):
+        words = paragraph.split()
+        if not words:
+            continue
+        if not pending:
+            pending_start = offset
+        pending.extend(words)
+        offset += len(words)
+        if len(pending) >= MIN_PASSAGE_WORDS:
+            emit(pending, pending_start)
+            pending = []
+    if pending:
+        emit(pending, pending_start)
+    return passages
+
+
+class PassageIndex:
+    """BM25 over a book's passages"""
+
+    def __init__(self, passages: List[Dict], version: str):
+        self.passages = passages
+        self.version = version
+        self.postings: Dict[str, List[tuple]] = {}
+        self.lengths = []
+        for i, passage in enumerate(passages):
+            counts = Counter(tokenize(passage["text"]))
+            self.lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((i, tf))
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+    def _idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.passages) - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, top: int = 3, start_word: int = 0,
+               end_word: Optional[int] = None) -> List[Dict]:
+        """Best passages for a query, optionally within a word range
+
+        Returns passage dicts with a "score", best first; passages sharing no
+        term with the query are never returned.
+        """
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self._idf(term)
+            for i, tf in self.postings.get(term, ()):
+                start = self.passages[i]["start_word"]
+                if start < start_word or (end_word is not None and start >= end_word):
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[i] / self.avg_length)
+                scores[i] = scores.get(i, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        best = sorted(scores, key=lambda i: (-scores[i], i))[:top]
+        return [{**self.passages[i], "score": round(scores[i], 3)} for i in best]
+
+
+def get_passage_index(text: str) -> PassageIndex:
+    """Index for an extracted text, cached per text version"""
+    version = text_version(text)
+    if version not in _INDEX_CACHE:
+        _INDEX_CACHE[version] = PassageIndex(split_passages(text), version)
+    return _INDEX_CACHE[version]
+
+
+def cache_path(book_path, cache_dir: Path = CACHE_DIR) -> Optional[Path]:
+    """Disk cache file for a book, or None if the book file does not exist"""
+    path = Path(book_path).resolve()
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    key = hashlib.sha256(f"{path}:{stat.st_size}:{stat.st_mtime_ns}:{INDEX_FORMAT}".encode('utf-8'))
+    return Path(cache_dir) / f"{path.stem}.{key.hexdigest()[:12]}.json"
+
+
+def _save(index: PassageIndex, path: Path, book_path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"source": str(book_path), "version": index.version, "passages": index.passages}, f)
+    os.replace(tmp_path, path)
+
+
+def index_for_book(book_path, text: Optional[str] = None, cache_dir: Path = CACHE_DIR) -> PassageIndex:
+    """Index for a book file: memory cache, then disk cache, then extraction
+
+    Pass text when the caller already extracted it; the disk cache is still
+    written so later stages can skip extraction.
+    """
+    path = cache_path(book_path, cache_dir)
+    if text is not None:
+        index = get_passage_index(text)
+        if path is not None and not path.exists():
+            _save(index, path, book_path)
+        return index
+
+    if path is not None and path.exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached["version"] not in _INDEX_CACHE:
+            _INDEX_CACHE[cached["version"]] = PassageIndex(cached["passages"], cached["version"])
+        print(f"  ✓ Passage index cache hit: {Path(book_path).name}")
+        return _INDEX_CACHE[cached["version"]]
+
+    from create_kernel import load_book_text
+    index = get_passage_index(load_book_text(book_path))
+    if path is not None:
+        _save(index, path, book_path)
+    return index
+
+
+def format_passages(passages: List[Dict], max_words: Optional[int] = None) -> str:
+    """Prompt text for ranked passages (best first, as search returns them)
+
+    Passages are chosen in rank order until max_words is used (the last one
+    trimmed), then the chosen ones are shown in book order.
+    """
+    chosen, used = [], 0
+    for passage in passages:
+        words = passage["text"].split()
+        if max_words is not None:
+            words = words[:max_words - used]
+            if not words:
+                break
+        used += len(words)
+        chosen.append((passage["start_word"], ' '.join(words)))
+    return "\n[...]\n".join(text for _, text in sorted(chosen))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Search a book for the passages most relevant to a query (BM25)',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('book_path', help='Book PDF or text file')
+    parser.add_argument('query', help='Search text, e.g. a quote or scene description')
+    parser.add_argument('--top', type=int, default=3, help='Passages to show (default: 3)')
+    parser.add_argument('--chapter-words', help='Only search word offsets START-END (see structure_detection.py)')
+    args = parser.parse_args()
+
+    start, end = 0, None
+    if args.chapter_words:
+        try:
+            start, end = (int(n) for n in args.chapter_words.split('-'))
+        except ValueError:
+            parser.error('--chapter-words must look like 12000-15000')
+
+    index = index_for_book(args.book_path)
+    print(f"\n🔎 {len(index.passages):,} passages indexed ({len(index.postings):,} terms)")
+    results = index.search(args.query, args.top, start, end)
+    if not results:
+        print("  No passage shares a term with the query")
+        sys.exit(1)
+    for result in results:
+        print(f"\n=== word {result['start_word']:,} (score {result['score']}) ===\n{result['text']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -21,8 +21,12 @@ Example:
 Options:
     --version <version>  Specify target version (e.g., "3.5"). If not provided, auto-increments.
     --no-backup         Don't create backup of existing kernel
+
+For other books, or to store a regenerated section as a small delta instead of
+a full kernel copy, use kernel_patch.py (diff / apply / show).
 """
 
+import copy
 import json
 import sys
 import re
@@ -51,7 +55,7 @@ def patch_device(existing_device, new_device):
     """Patch a single device with missing fields from new device"""
     
     # Preserve existing fields
-    patched = existing_device.copy()
+    patched = copy.deepcopy(existing_device)
     
     # Add missing taxonomy fields from new device
     taxonomy_fields = [
@@ -177,7 +181,7 @@ def patch_kernel(existing_kernel_path, new_kernel_path, target_version=None, cre
         print(f"  ✓ Backup saved: {backup_path}")
     
     # Start with existing kernel
-    patched_kernel = existing_kernel.copy()
+    patched_kernel = copy.deepcopy(existing_kernel)
     
     # Update metadata
     print("\n🔧 Updating metadata...")
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+PIPELINE PLANNER
+Dry-run cost and latency estimate for kernel and Stage 1B runs
+
+`create_kernel.py ... --plan` and `run_stage1b.py ... --plan` build every
+prompt the run would send - with the same prompt builders and checkpoint
+loading as a real run - but send nothing. For each stage the plan shows
+whether it would be served from a checkpoint (or the Stage 1B worksheet
+journal), built locally, or need model calls. It then estimates calls,
+input/output tokens, cost and wall time under the configured rate-limit
+spacing, request budget and concurrency.
+
+Input tokens are counted with the API's token counting endpoint when an API
+key is set (it does not bill tokens) and estimated from prompt length
+otherwise. Counts are cached in outputs/.token_counts.json, keyed by the
+exact request, so re-planning a library is fast.
+
+Prompts after a stage that still needs a model call are built from a local
+stand-in for its output (the conventional Stage 0 alignment, Stage 1 extracts
+copied from it, no devices yet); such stages are marked as estimated. Output
+tokens are typical sizes per call profile (EXPECTED_OUTPUT_TOKENS), capped at
+the profile's max_tokens.
+
+Usage:
+    python3 create_kernel.py books/Giver.pdf 'The Giver' 'Lois Lowry' 2014 --plan
+    python3 run_stage1b.py outputs/The_Giver_stage1a_v6_0.json --plan
+    python3 pipeline_planner.py --books library.json --stage1a outputs/*_stage1a_v6_0.json --rate-budget 50
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from api_client import MAX_IN_FLIGHT
+from call_profiles import load_call_profiles
+from create_kernel import FREYTAG_SECTIONS, Config, KernelCreator, CHECKPOINT_STAGES
+from job_scheduler import RATE_BUDGET_RPM
+from output_schemas import tool_for
+from structure_detection import conventional_alignment, detect_structure
+from usage_ledger import call_cost as token_cost
+
+TOKEN_CACHE_PATH = Config.OUTPUTS_DIR / ".token_counts.json"
+
+# Typical output tokens per call profile (capped at the profile's max_tokens)
+EXPECTED_OUTPUT_TOKENS = {
+    'stage0': 1500,
+    'stage1': 1000,
+    'stage2a': 2500,
+    'stage2b_section': 1800,
+    'reasoning_doc': 2500,
+    'worksheet_content': 700,
+}
+
+# Offline token estimate
+CHARS_PER_TOKEN = Config.CHARS_PER_TOKEN
+
+# Latency model: time to first token plus generation speed
+BASE_LATENCY_SECONDS = 2.0
+OUTPUT_TOKENS_PER_SECOND = 50
+
+# Chapters assumed for stand-in prompts when no chapter headings are detected
+FALLBACK_CHAPTERS = 20
+
+
+# ============================================================================
+# TOKEN COUNTING
+# ============================================================================
+
+class TokenCounter:
+    """Input token counts per request, cached on disk
+
+    With a client (sync anthropic.Anthropic), counts come from
+    messages.count_tokens; without one, or if counting fails, from prompt
+    length. The method is part of the cache key, so estimates never stand in
+    for real counts.
+    """
+
+    def __init__(self, client=None, cache_path=TOKEN_CACHE_PATH):
+        self.client = client
+        self.cache_path = Path(cache_path)
+        self.hits = 0
+        self.misses = 0
+        self._cache = {}
+        if self.cache_path.exists():
+            try:
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    self._cache = json.load(f)
+            except (json.JSONDecodeError, OSError):
+                self._cache = {}
+
+    @property
+    def method(self) -> str:
+        return 'api' if self.client is not None else 'estimate'
+
+    def count(self, model: str, prompt: str, system: str = "", tools: Optional[List[Dict]] = None) -> int:
+        request = json.dumps([self.method, model, system, prompt, tools], sort_keys=True)
+        key = hashlib.sha256(request.encode('utf-8')).hexdigest()[:32]
+        if key in self._cache:
+            self.hits += 1
+            return self._cache[key]
+        self.misses += 1
+
+        tokens = None
+        if self.client is not None:
+            params = {"model": model, "messages": [{"role": "user", "content": prompt}]}
+            if system:
+                params["system"] = system
+            if tools:
+                params["tools"] = tools
+            try:
+                tokens = self.client.messages.count_tokens(**params).input_tokens
+            except Exception as e:
+                print(f"  ⚠️  Token counting failed ({type(e).__name__}: {e}) - estimating from length instead")
+                self.client = None
+        if tokens is None:
+            chars = len(prompt) + len(system) + (len(json.dumps(tools)) if tools else 0)
+            tokens = math.ceil(chars / CHARS_PER_TOKEN)
+            key = hashlib.sha256(json.dumps(['estimate', model, system, prompt, tools],
+                                            sort_keys=True).encode('utf-8')).hexdigest()[:32]
+        self._cache[key] = tokens
+        return tokens
+
+    def save(self):
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._cache, f)
+        os.replace(tmp_path, self.cache_path)
+
+
+def planned_call(counter: TokenCounter, profiles: Dict, profile_name: str, prompt: str, system: str,
+                 schema: Optional[str] = None, sections: Optional[List[str]] = None, label: str = "") -> Dict:
+    """One model call as the planner records it"""
+    profile = profiles[profile_name]
+    tools = [tool_for(schema, sections)] if schema else None
+    return {
+        "label": label or profile_name,
+        "profile": profile_name,
+        "model": profile['model'],
+        "input_tokens": counter.count(profile['model'], prompt, system, tools),
+        "output_tokens": min(profile['max_tokens'], EXPECTED_OUTPUT_TOKENS.get(profile_name, profile['max_tokens'])),
+    }
+
+
+def call_cost(call: Dict) -> float:
+    return token_cost(call['model'], call['input_tokens'], call['output_tokens'])
+
+
+def call_latency(call: Dict) -> float:
+    return BASE_LATENCY_SECONDS + call['output_tokens'] / OUTPUT_TOKENS_PER_SECOND
+
+
+def _stage(name: str, phase: int, source: str, calls: Optional[List[Dict]] = None,
+           estimated: bool = False, concurrency: int = 1, cached_calls: int = 0) -> Dict:
+    return {"stage": name, "phase": phase, "source": source, "calls": calls or [],
+            "estimated": estimated, "concurrency": concurrency, "cached_calls": cached_calls}
+
+
+# ============================================================================
+# KERNEL PLAN
+# ============================================================================
+
+def plan_kernel(creator: KernelCreator, counter: TokenCounter, from_stage: Optional[str] = None) -> Dict:
+    """Plan a create_kernel run; checkpoints at or after from_stage are treated as cleared"""
+    profiles = creator.call_profiles
+    skip_from = CHECKPOINT_STAGES.index(from_stage) if from_stage in CHECKPOINT_STAGES else len(CHECKPOINT_STAGES)
+
+    def checkpoint(name: str):
+        base = next((stage for stage in CHECKPOINT_STAGES if name == stage or name.startswith(f"{stage}_")), name)
+        if CHECKPOINT_STAGES.index(base) >= skip_from:
+            return None
+        return creator._load_checkpoint(name)
+
+    stages = []
+    estimated = False
+
+    # Stage 0
+    structure = checkpoint('kernel_stage0')
+    if structure:
+        stages.append(_stage('Stage 0', 0, 'checkpoint'))
+    else:
+        detection = detect_structure(creator.book_text)
+        if detection['confident'] and creator.local_structure:
+            structure = creator._local_structure_alignment(detection)
+            stages.append(_stage('Stage 0', 0, 'local'))
+        else:
+            prompt, system = creator._stage0_prompt(detection if detection['confident'] else None)
+            stages.append(_stage('Stage 0', 0, 'model', [
+                planned_call(counter, profiles, 'stage0', prompt, system, 'stage0_alignment')]))
+            total = detection['total_units'] or FALLBACK_CHAPTERS
+            structure = {"structure_detection": {"total_units": total},
+                         "chapter_alignment": conventional_alignment(total)}
+            estimated = True
+    creator.structure_alignment = structure
+    creator.total_chapters = structure.get('structure_detection', {}).get('total_units', creator.total_chapters)
+
+    # Stage 1
+    targets = creator.section_targets.get('kernel_stage1')
+    cached = checkpoint('kernel_stage1')
+    if cached and not targets:
+        extracts = cached
+        stages.append(_stage('Stage 1', 1, 'checkpoint'))
+    else:
+        if targets and not cached:
+            targets = None
+        extracts = creator._local_extracts(cached, targets) or {"extracts": {}}
+        if creator.local_stage1:
+            stages.append(_stage('Stage 1', 1, 'local', estimated=estimated))
+        else:
+            prompt, system = creator._stage1_prompt(targets)
+            stages.append(_stage('Stage 1', 1, 'model', [
+                planned_call(counter, profiles, 'stage1', prompt, system, 'stage1_extracts', targets)],
+                estimated=estimated))
+            estimated = True
+    creator.stage1_extracts = extracts
+
+    # Stage 2A
+    macro = checkpoint('kernel_stage2a')
+    if macro:
+        stages.append(_stage('Stage 2A', 2, 'checkpoint'))
+    else:
+        prompt, system = creator._stage2a_prompt()
+        stages.append(_stage('Stage 2A', 2, 'model', [
+            planned_call(counter, profiles, 'stage2a', prompt, system, 'stage2a_macro')], estimated=estimated))
+        macro = {}
+
+    # Stage 2B: one call per section without a section checkpoint
+    targets = creator.section_targets.get('kernel_stage2b')
+    merged = checkpoint('kernel_stage2b')
+    devices = []
+    if merged and not targets:
+        devices = merged
+        stages.append(_stage('Stage 2B', 2, 'checkpoint'))
+    else:
+        calls, reused = [], 0
+        for section, data in extracts.get('extracts', {}).items():
+            chapter_range = data.get('chapter_range', '')
+            primary_chapter = data.get('primary_chapter', 1)
+            section_devices = None
+            if not targets or section not in targets:
+                section_devices = checkpoint(f"kernel_stage2b_{section}")
+                if section_devices is None and merged:
+                    section_devices = creator._section_devices_from_stage2b(merged, chapter_range, primary_chapter)
+            if section_devices is not None:
+                reused += 1
+                devices.extend(section_devices)
+                continue
+            chapter_text = creator._extract_text_from_chapter_range(chapter_range, primary_chapter)
+            prompt, system = creator._build_device_prompt(section, primary_chapter, chapter_text)
+            calls.append(planned_call(counter, profiles, 'stage2b_section', prompt, system,
+                                      'stage2b_devices', label=f"stage2b_{section}"))
+        source = 'model' if calls else 'checkpoint'
+        stages.append(_stage('Stage 2B', 2, source, calls, estimated=estimated and bool(calls),
+                             concurrency=MAX_IN_FLIGHT, cached_calls=reused))
+
+    # ReasoningDoc (always regenerated); pending 2A/2B output stands in for its kernel data
+    kernel = {"macro_variables": {k: macro.get(k, {}) for k in ('narrative', 'rhetoric', 'device_mediation')},
+              "micro_devices": devices,
+              "chapter_alignment": structure.get('chapter_alignment', {})}
+    prompt, system = creator._reasoning_doc_prompt(kernel)
+    call = planned_call(counter, profiles, 'reasoning_doc', prompt, system)
+    pending = [c for s in stages if s['stage'] in ('Stage 2A', 'Stage 2B') for c in s['calls']]
+    call['input_tokens'] += sum(c['output_tokens'] for c in pending)
+    stages.append(_stage('ReasoningDoc', 3, 'model', [call], estimated=estimated or bool(pending)))
+
+    return {"title": creator.title, "kind": "kernel", "stages": stages,
+            "rate_limit_delay": Config.RATE_LIMIT_DELAY}
+
+
+# ============================================================================
+# STAGE 1B PLAN
+# ============================================================================
+
+def plan_stage1b(stage1a_path, counter: TokenCounter, call_profiles: Optional[Dict] = None,
+                 defer_worksheets: bool = False, book_path=None) -> Dict:
+    """Plan a run_stage1b run: one worksheet call per device not already in the journal"""
+    import run_stage1b
+    profiles = call_profiles or load_call_profiles()
+    with open(stage1a_path, 'r', encoding='utf-8') as f:
+        stage1a = json.load(f)
+    title = stage1a.get("metadata", {}).get("text_title", "Unknown")
+    safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).strip().replace(' ', '_')
+    journal = run_stage1b.WorksheetJournal(run_stage1b.OUTPUTS_DIR / f"{safe_title}_stage1b_journal.jsonl")
+
+    passages = None if defer_worksheets else run_stage1b.book_passages(stage1a, book_path)
+
+    stages = []
+    for week_num, week_data in run_stage1b.stage1a_weeks(stage1a):
+        package = run_stage1b.create_week_package(week_data, week_num, passages=passages)
+        calls, replayed = [], 0
+        for device in package['micro_devices']:
+            prompt, system = run_stage1b.build_worksheet_prompt(device, package['macro_focus'], package['text_title'])
+            if journal.get(week_num, device['name'], run_stage1b.WorksheetJournal.prompt_hash(prompt, system)):
+                replayed += 1
+                continue
+            calls.append(planned_call(counter, profiles, 'worksheet_content', prompt, system,
+                                      'worksheet_content', label=f"week{week_num} {device['name']}"))
+        name = f"Week {week_num}"
+        if defer_worksheets:
+            stages.append(_stage(name, week_num, 'deferred', cached_calls=replayed))
+        else:
+            stages.append(_stage(name, week_num, 'model' if calls else 'journal', calls,
+                                 concurrency=MAX_IN_FLIGHT, cached_calls=replayed))
+    return {"title": title, "kind": "stage1b", "stages": stages, "rate_limit_delay": 0}
+
+
+# ============================================================================
+# ESTIMATES
+# ============================================================================
+
+def summarize(plan: Dict, rpm: float = RATE_BUDGET_RPM) -> Dict:
+    """Totals for one plan; wall time follows the stage phases, spacing and request budget"""
+    calls = [c for s in plan['stages'] for c in s['calls']]
+    phases = sorted({s['phase'] for s in plan['stages']})
+    wall, called_before = 0.0, False
+    for phase in phases:
+        durations = []
+        for s in plan['stages']:
+            if s['phase'] != phase or not s['calls']:
+                continue
+            waves = math.ceil(len(s['calls']) / max(1, s['concurrency']))
+            durations.append(waves * max(call_latency(c) for c in s['calls']))
+        if durations:
+            wall += (plan['rate_limit_delay'] if called_before else 0) + max(durations)
+            called_before = True
+    if rpm and calls:
+        wall = max(wall, len(calls) * 60 / rpm)
+    return {
+        "calls": len(calls),
+        "cached_calls": sum(s['cached_calls'] for s in plan['stages']),
+        "input_tokens": sum(c['input_tokens'] for c in calls),
+        "output_tokens": sum(c['output_tokens'] for c in calls),
+        "cost": sum(call_cost(c) for c in calls),
+        "wall_seconds": wall,
+        "estimated": any(s['estimated'] for s in plan['stages']),
+    }
+
+
+def _duration(seconds: float) -> str:
+    return f"{seconds / 60:.1f} min" if seconds >= 60 else f"{seconds:.0f}s"
+
+
+def print_plan(plan: Dict, rpm: float = RATE_BUDGET_RPM, counter: Optional[TokenCounter] = None) -> Dict:
+    totals = summarize(plan, rpm)
+    print("\n" + "="*80)
+    print(f"📐 PLAN: {plan['title']} ({plan['kind']}) - nothing will be sent")
+    print("="*80)
+    print(f"{'Stage':<14} {'Source':<11} {'Calls':>5} {'Cached':>6} {'In tok':>9} {'Out tok':>8} {'Cost':>8}")
+    print("-" * 66)
+    for s in plan['stages']:
+        cost = sum(call_cost(c) for c in s['calls'])
+        mark = " *" if s['estimated'] else ""
+        print(f"{s['stage']:<14} {s['source']:<11} {len(s['calls']):>5} {s['cached_calls']:>6} "
+              f"{sum(c['input_tokens'] for c in s['calls']):>9,} {sum(c['output_tokens'] for c in s['calls']):>8,} "
+              f"{'$' + format(cost, '.3f'):>8}{mark}")
+    print("-" * 66)
+    print(f"Total: {totals['calls']} call(s), {totals['input_tokens']:,} input / {totals['output_tokens']:,} output "
+          f"tokens, ~${totals['cost']:.2f}, ~{_duration(totals['wall_seconds'])} wall time")
+    print(f"       (rate-limit spacing {plan['rate_limit_delay']}s, budget {rpm:g} requests/min, "
+          f"{MAX_IN_FLIGHT} in flight)")
+    if totals['estimated']:
+        print("  * Built from local stand-ins for outputs of earlier stages that still need model calls")
+    if counter is not None:
+        print(f"  Token counts: {counter.method} ({counter.hits} cached, {counter.misses} new)")
+    return totals
+
+
+def token_counter(offline: bool = False) -> TokenCounter:
+    """Counter using the API's token counting when a key is set (and not offline)"""
+    client = None
+    if not offline and os.getenv("ANTHROPIC_API_KEY"):
+        from api_client import get_client
+        client = get_client()
+    return TokenCounter(client)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Estimate calls, tokens, cost and wall time for a library run without calling the model',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('--books', help='Library JSON of kernel builds (batch_runner.py format)')
+    parser.add_argument('--stage1a', nargs='*', default=[], help='Stage 1A outputs to plan Stage 1B for')
+    parser.add_argument('--rate-budget', type=float, default=RATE_BUDGET_RPM,
+                        help=f'Model requests per minute (default: {RATE_BUDGET_RPM})')
+    parser.add_argument('--workers', type=int, default=1, help='Books processed at once (default: 1)')
+    parser.add_argument('--offline', action='store_true', help='Estimate tokens from length; never call the API')
+    args = parser.parse_args()
+    if not args.books and not args.stage1a:
+        parser.error('give --books and/or --stage1a')
+
+    counter = token_counter(args.offline)
+    profiles = load_call_profiles()
+    plans = []
+    if args.books:
+        from batch_runner import load_library
+        for book in load_library(args.books):
+            creator = KernelCreator(book["book_path"], book["title"], book["author"], book["edition"],
+                                    call_profiles=profiles, plan_only=True)
+            plans.append(plan_kernel(creator, counter))
+    for path in args.stage1a:
+        plans.append(plan_stage1b(path, counter, profiles))
+    counter.save()
+
+    totals = [print_plan(plan, args.rate_budget) for plan in plans]
+    calls = sum(t['calls'] for t in totals)
+    serial = sum(t['wall_seconds'] for t in totals) / max(1, args.workers)
+    wall = max(serial, calls * 60 / args.rate_budget) if args.rate_budget else serial
+    print("\n" + "="*80)
+    print(f"LIBRARY: {len(plans)} run(s), {calls} call(s), "
+          f"{sum(t['input_tokens'] for t in totals):,} input / {sum(t['output_tokens'] for t in totals):,} output tokens")
+    print(f"  ~${sum(t['cost'] for t in totals):.2f}, ~{_duration(wall)} with {args.workers} worker(s) "
+          f"at {args.rate_budget:g} requests/min")
+    print(f"  Token counts: {counter.method} ({counter.hits} cached, {counter.misses} new)")
+    print("="*80)
+
+
+if __name__ == "__main__":
+    main()
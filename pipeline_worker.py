@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+PIPELINE WORKER
+Long-running worker that serves kernel, Stage 1B and Stage 2 jobs over local HTTP
+
+A fresh `python create_kernel.py ...` process re-imports anthropic/PyPDF2,
+reloads every protocol, re-extracts the PDF and re-creates the API client.
+The worker does all of that once and keeps it warm between jobs:
+- Protocol files (reloaded only when a file changes on disk)
+- The shared API client and its connection pool (api_client.py)
+- Recently used book texts (LRU, keyed by path + mtime)
+
+Jobs are scheduled by priority class (job_scheduler.py): Stage 1B and
+Stage 2 jobs are "interactive" and start ahead of queued "bulk" kernel
+builds, each class has its own concurrent-job limit, and each gets a share
+of the model request budget (--rate-budget requests/minute).
+
+Usage:
+    python3 pipeline_worker.py
+    python3 pipeline_worker.py --port 8765 --interactive-workers 2 --bulk-workers 1 --book-cache 4
+
+Submitting jobs:
+    curl -X POST localhost:8765/jobs -d '{"kind": "stage2", "params": {"stage1b_path": "outputs/The_Giver_stage1b_v6_0.json", "week": 1}}'
+    curl -X POST localhost:8765/jobs -d '{"kind": "stage1b", "params": {"stage1a_path": "outputs/The_Giver_stage1a_v6_0.json"}}'
+    curl -X POST localhost:8765/jobs -d '{"kind": "kernel", "params": {"book_path": "books/Giver.pdf", "title": "The Giver", "author": "Lois Lowry", "edition": "2014"}}'
+    curl -X POST localhost:8765/jobs -d '{"invoke": "run_stage2.py outputs/The_Giver_stage1b_v6_0.json --week 1"}'
+    curl -X POST localhost:8765/jobs -d '{"kind": "stage1b", "priority": "bulk", "params": {...}}'
+
+Kernel and Stage 1B jobs accept "profiles": {"worksheet_content": {"max_tokens": 1500}}
+and "profiles_file" to override call profiles for that job (see call_profiles.py).
+
+Job status:
+    curl localhost:8765/jobs            # all jobs
+    curl localhost:8765/jobs/<job_id>   # one job
+    curl localhost:8765/health          # scheduler queues and per-profile call telemetry
+"""
+
+import argparse
+import copy
+import json
+import sys
+import threading
+import traceback
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional
+
+import create_kernel
+import run_stage1b
+import run_stage2
+from api_client import add_request_gate, get_async_client
+from call_profiles import load_call_profiles
+from call_telemetry import TELEMETRY
+from usage_ledger import enable_ledger
+from job_scheduler import (
+    CURRENT_CLASS, PRIORITY_CLASSES, RATE_BUDGET_RPM, JobScheduler, RateShares, job_class, parse_invocation,
+)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+# ============================================================================
+# WARM STATE
+# ============================================================================
+
+class WarmState:
+    """Resources shared by every job the worker runs"""
+
+    def __init__(self, book_cache_size: int = 4):
+        self.book_cache_size = book_cache_size
+        self._lock = threading.Lock()
+        self._protocols = None
+        self._protocol_mtimes = None
+        self._books = OrderedDict()  # (resolved path, mtime) -> text
+        self._client = None
+        self._client_error = None
+        self._client_lock = threading.Lock()  # concurrent HTTP requests must not build two clients
+
+    def _current_protocol_mtimes(self) -> Dict[str, float]:
+        protocols_dir = create_kernel.Config.PROTOCOLS_DIR
+        if not protocols_dir.exists():
+            return {}
+        return {p.name: p.stat().st_mtime for p in protocols_dir.iterdir() if p.is_file()}
+
+    @property
+    def protocols(self) -> Dict[str, str]:
+        """Protocol texts, reloaded only when a protocol file changed"""
+        with self._lock:
+            mtimes = self._current_protocol_mtimes()
+            if self._protocols is None or mtimes != self._protocol_mtimes:
+                self._protocols = create_kernel.load_protocols()
+                self._protocol_mtimes = mtimes
+            return self._protocols
+
+    @property
+    def client(self):
+        """Shared API client, or None if no API key is configured"""
+        with self._client_lock:
+            if self._client is None and self._client_error is None:
+                try:
+                    self._client = get_async_client()
+                except ValueError as e:
+                    self._client_error = str(e)
+                    print(f"  ⚠️  {e} - model-calling jobs will run without a client")
+            return self._client
+
+    def book_text(self, book_path) -> str:
+        """Return book text, extracting it only on a cache miss"""
+        path = Path(book_path).resolve()
+        key = (str(path), path.stat().st_mtime)
+
+        with self._lock:
+            if key in self._books:
+                self._books.move_to_end(key)
+                print(f"  ✓ Book text cache hit: {path.name}")
+                return self._books[key]
+
+        text = create_kernel.load_book_text(path)
+
+        with self._lock:
+            self._books[key] = text
+            self._books.move_to_end(key)
+            while len(self._books) > self.book_cache_size:
+                self._books.popitem(last=False)
+        return text
+
+    def summary(self) -> dict:
+        return {
+            "protocols_loaded": self._protocols is not None,
+            "client_ready": self._client is not None,
+            "client_error": self._client_error,
+            "cached_books": [Path(p).name for p, _ in self._books.keys()],
+            "model_calls": TELEMETRY.snapshot(),
+        }
+
+
+# ============================================================================
+# JOB HANDLERS
+# ============================================================================
+
+def _require(params: dict, *names):
+    missing = [n for n in names if not params.get(n)]
+    if missing:
+        raise ValueError(f"Missing required params: {missing}")
+
+
+def run_kernel_job(state: WarmState, params: dict) -> dict:
+    """Run create_kernel.py's pipeline with warm protocols, client and book text"""
+    _require(params, "book_path", "title", "author", "edition")
+    if state.client is None:
+        raise ValueError("Kernel jobs need ANTHROPIC_API_KEY")
+
+    creator = create_kernel.KernelCreator(
+        params["book_path"], params["title"], params["author"], params["edition"],
+        client=state.client,
+        protocols=state.protocols,
+        book_text=state.book_text(params["book_path"]),
+        local_stage1=bool(params.get("local_stage1")),
+        local_structure=bool(params.get("local_structure")),
+        call_profiles=load_call_profiles(params.get("profiles"), params.get("profiles_file")),
+    )
+    if params.get("sections"):
+        creator.set_section_targets(params["sections"], params.get("from_stage"))
+    elif params.get("fresh"):
+        creator._clear_checkpoints_from('kernel_stage0')
+    elif params.get("from_stage"):
+        creator._clear_checkpoints_from(params["from_stage"])
+
+    if not creator.run():
+        raise RuntimeError("Kernel creation pipeline failed")
+    return {"title": creator.title}
+
+
+def run_stage1b_job(state: WarmState, params: dict) -> dict:
+    """Run Stage 1B packaging with the warm API client"""
+    _require(params, "stage1a_path")
+    stage1a_path = Path(params["stage1a_path"])
+    if not stage1a_path.exists():
+        raise FileNotFoundError(f"Stage 1A file not found: {stage1a_path}")
+
+    output_path = run_stage1b.run_stage1b(
+        stage1a_path, client=state.client,
+        call_profiles=load_call_profiles(params.get("profiles"), params.get("profiles_file")),
+        defer_worksheets=bool(params.get("defer_worksheets")),
+        book_path=params.get("book_path"),
+    )
+    return {"output_path": str(output_path)}
+
+
+def run_stage2_job(state: WarmState, params: dict) -> dict:
+    """Run Stage 2 worksheet extraction (no API calls)"""
+    _require(params, "stage1b_path")
+    stage1b_path = Path(params["stage1b_path"])
+    if not stage1b_path.exists():
+        raise FileNotFoundError(f"Stage 1B file not found: {stage1b_path}")
+
+    files = run_stage2.run_stage2(
+        stage1b_path,
+        week_num=params.get("week"),
+        all_weeks=bool(params.get("all_weeks")),
+    )
+    return {"generated_files": [str(f) for f in files]}
+
+
+JOB_HANDLERS = {
+    "kernel": run_kernel_job,
+    "stage1b": run_stage1b_job,
+    "stage2": run_stage2_job,
+}
+
+
+# ============================================================================
+# WORKER
+# ============================================================================
+
+class PipelineWorker:
+    """In-process job scheduler with a worker thread per concurrent-job slot"""
+
+    def __init__(self, interactive_workers: int = 1, bulk_workers: int = 1, book_cache_size: int = 4,
+                 rate_budget: float = RATE_BUDGET_RPM):
+        self.state = WarmState(book_cache_size=book_cache_size)
+        classes = copy.deepcopy(PRIORITY_CLASSES)
+        classes['interactive']['max_concurrent'] = max(1, interactive_workers)
+        classes['bulk']['max_concurrent'] = max(1, bulk_workers)
+        self.scheduler = JobScheduler(classes)
+        self.rate_shares = RateShares(self.scheduler, rate_budget) if rate_budget else None
+        self._jobs = {}
+        self._jobs_lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._worker_loop, name=f"pipeline-worker-{i + 1}", daemon=True)
+            for i in range(self.scheduler.total_slots)
+        ]
+
+    def start(self):
+        # Warm up before the first job arrives
+        self.state.protocols
+        self.state.client
+        if self.rate_shares:
+            add_request_gate(self.rate_shares.gate)
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, kind: str, params: Optional[dict] = None, priority: Optional[str] = None) -> dict:
+        """Queue a job and return its status record"""
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind} (expected one of {sorted(JOB_HANDLERS)})")
+        priority = job_class(kind, priority, self.scheduler.classes)
+
+        job = {
+            "id": uuid.uuid4().hex[:12],
+            "kind": kind,
+            "priority": priority,
+            "params": params or {},
+            "status": "queued",
+            "submitted": datetime.now().isoformat(),
+            "started": None,
+            "finished": None,
+            "result": None,
+            "error": None,
+        }
+        with self._jobs_lock:
+            self._jobs[job["id"]] = job
+        self.scheduler.submit(job["id"], priority)
+        print(f"\n📥 Queued {kind} job {job['id']} ({priority})")
+        return dict(job)
+
+    def submit_invocation(self, command, priority: Optional[str] = None) -> dict:
+        """Queue a job given as a create_kernel.py / run_stage1b.py / run_stage2.py command line"""
+        kind, params = parse_invocation(command)
+        return self.submit(kind, params, priority)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._jobs_lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list_jobs(self) -> list:
+        with self._jobs_lock:
+            return [dict(job) for job in self._jobs.values()]
+
+    def _worker_loop(self):
+        while True:
+            job_id, priority = self.scheduler.acquire()
+            with self._jobs_lock:
+                job = self._jobs[job_id]
+                job["status"] = "running"
+                job["started"] = datetime.now().isoformat()
+
+            print(f"\n▶️  Running {job['kind']} job {job_id} ({priority})")
+            token = CURRENT_CLASS.set(priority)
+            try:
+                result = JOB_HANDLERS[job["kind"]](self.state, job["params"])
+                status, error = "succeeded", None
+            except Exception as e:
+                traceback.print_exc()
+                result, status, error = None, "failed", f"{type(e).__name__}: {e}"
+            finally:
+                CURRENT_CLASS.reset(token)
+                self.scheduler.release(priority)
+
+            with self._jobs_lock:
+                job["status"] = status
+                job["result"] = result
+                job["error"] = error
+                job["finished"] = datetime.now().isoformat()
+            print(f"{'✅' if status == 'succeeded' else '❌'} Job {job_id} {status}")
+
+
+# ============================================================================
+# HTTP INTERFACE
+# ============================================================================
+
+def make_handler(worker: PipelineWorker):
+    """Build a request handler bound to a worker"""
+
+    class JobRequestHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, payload):
+            body = json.dumps(payload, indent=2).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            parts = [p for p in self.path.split('?')[0].split('/') if p]
+            if parts == ["health"]:
+                self._send_json(200, {"status": "ok", "queued": worker.scheduler.qsize(),
+                                      "scheduler": worker.scheduler.summary(), **worker.state.summary()})
+            elif parts == ["jobs"]:
+                self._send_json(200, worker.list_jobs())
+            elif len(parts) == 2 and parts[0] == "jobs":
+                job = worker.get(parts[1])
+                if job:
+                    self._send_json(200, job)
+                else:
+                    self._send_json(404, {"error": f"Unknown job: {parts[1]}"})
+            else:
+                self._send_json(404, {"error": f"Unknown path: {self.path}"})
+
+        def do_POST(self):
+            if self.path.rstrip('/') != "/jobs":
+                self._send_json(404, {"error": f"Unknown path: {self.path}"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if payload.get("invoke"):
+                    job = worker.submit_invocation(payload["invoke"], payload.get("priority"))
+                else:
+                    job = worker.submit(payload.get("kind", ""), payload.get("params"), payload.get("priority"))
+            except (ValueError, json.JSONDecodeError) as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            self._send_json(202, job)
+
+        def log_message(self, format, *args):
+            # Job progress is already printed by the stages themselves
+            pass
+
+    return JobRequestHandler
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, interactive_workers: int = 1, bulk_workers: int = 1,
+          book_cache_size: int = 4, rate_budget: float = RATE_BUDGET_RPM):
+    """Start the worker threads and block serving HTTP requests"""
+    print("\n" + "="*80)
+    print("PIPELINE WORKER")
+    print("="*80)
+
+    enable_ledger(create_kernel.Config.OUTPUTS_DIR / "usage.db")
+    worker = PipelineWorker(interactive_workers=interactive_workers, bulk_workers=bulk_workers,
+                            book_cache_size=book_cache_size, rate_budget=rate_budget)
+    worker.start()
+
+    server = ThreadingHTTPServer((host, port), make_handler(worker))
+    print(f"\n🚀 Listening on http://{host}:{port} "
+          f"({interactive_workers} interactive + {bulk_workers} bulk worker thread(s))")
+    if rate_budget:
+        shares = ', '.join(f"{name} {c['rate_share']:.0%}" for name, c in worker.scheduler.classes.items())
+        print(f"   Rate budget: {rate_budget:g} requests/min ({shares})")
+    print(f"   Job kinds: {', '.join(sorted(JOB_HANDLERS))}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Shutting down")
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Resident worker serving pipeline jobs over local HTTP',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('--host', default=DEFAULT_HOST, help='Interface to bind (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Port to listen on (default: 8765)')
+    parser.add_argument('--interactive-workers', type=int, default=1,
+                        help='Concurrent interactive (Stage 1B / Stage 2) jobs (default: 1)')
+    parser.add_argument('--bulk-workers', '--workers', type=int, default=1,
+                        help='Concurrent bulk (kernel) jobs (default: 1)')
+    parser.add_argument('--rate-budget', type=float, default=RATE_BUDGET_RPM,
+                        help=f'Model requests per minute shared between classes, 0 for no limit (default: {RATE_BUDGET_RPM})')
+    parser.add_argument('--book-cache', type=int, default=4, help='Number of book texts kept in memory (default: 4)')
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.interactive_workers, args.bulk_workers, args.book_cache, args.rate_budget)
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+PROTOCOL COMPILER
+Minify protocol markdown and extract the sections each kernel stage needs
+
+Prompts used to embed the protocol files verbatim: bold markers, table
+padding, horizontal rules, blank lines and sections no stage reads (the
+Stage 0 protocol's appendix, the Stage 1/2B/3 parts of the validation
+protocol inside the Stage 2A prompt). This module compiles each protocol
+per stage:
+
+- STAGE_PROTOCOL_SECTIONS says which headings a stage keeps (include) or
+  drops (exclude); headings inside code fences are ignored
+- minify_markdown strips presentation-only markdown and collapses
+  whitespace; list nesting, table cells and code block contents are kept
+
+Compiled text is cached on disk (Config.PROTOCOL_CACHE_DIR) keyed by the
+source file's SHA-256, so it is rebuilt only when a protocol changes. The
+protocol sources themselves are never modified.
+
+Usage:
+    python3 protocol_compiler.py                  # token report per stage
+    python3 protocol_compiler.py --show stage2a   # print a stage's compiled protocols
+    python3 protocol_compiler.py --clear-cache
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import shutil
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Bump when minify/extract output changes so old cache entries are ignored
+COMPILER_VERSION = 1
+
+# stage -> protocol key -> section selection (heading prefixes, case-insensitive)
+STAGE_PROTOCOL_SECTIONS = {
+    'stage0': {
+        'structure_alignment': {'exclude': ['INTEGRATION WITH KERNEL CREATION', 'APPENDIX']},
+    },
+    'stage2a': {
+        'kernel_validation': {'include': ['Stage 2A']},
+        'artifact_2': {},
+    },
+}
+
+HEADING_RE = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+RULE_RE = re.compile(r'^([-*_])(\s*\1){2,}$')
+TABLE_SEPARATOR_RE = re.compile(r'^\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?$')
+EMPHASIS_RE = re.compile(r'(\*\*|__)(.+?)\1')
+CODE_SPAN_RE = re.compile(r'`([^`\n]+)`')
+LINK_RE = re.compile(r'!?\[([^\]]*)\]\([^)]*\)')
+HTML_COMMENT_RE = re.compile(r'<!--.*?-->', re.DOTALL)
+
+# Compiled protocols keyed by (stage, key, source hash), for long-running workers
+_MEMORY_CACHE: Dict[tuple, Dict] = {}
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate token count (1 token ≈ 4 characters)
+
+    Character-based rather than the word-based estimate in
+    test_stage1_token_limit.py, because markup (pipes, asterisks, rules)
+    costs tokens without adding words.
+    """
+    return len(text) // 4
+
+
+def source_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _split_sections(text: str) -> List[Dict]:
+    """Split markdown into heading-delimited blocks: [{level, title, lines}]
+
+    Text before the first heading is a level-0 block. Headings inside code
+    fences are treated as content.
+    """
+    blocks = [{'level': 0, 'title': '', 'lines': []}]
+    in_code = False
+    for line in text.splitlines():
+        if line.strip().startswith('```'):
+            in_code = not in_code
+        heading = None if in_code else HEADING_RE.match(line)
+        if heading:
+            blocks.append({'level': len(heading.group(1)), 'title': heading.group(2), 'lines': [line]})
+        else:
+            blocks[-1]['lines'].append(line)
+    return blocks
+
+
+def extract_sections(text: str, include: Optional[List[str]] = None,
+                     exclude: Optional[List[str]] = None) -> str:
+    """Keep only sections whose heading starts with an include prefix (with
+    their subsections), then drop sections matching an exclude prefix.
+    Returns '' if include matched nothing."""
+    def matches(title, prefixes):
+        title = title.strip().lower()
+        return any(title.startswith(p.lower()) for p in prefixes)
+
+    kept = []
+    active_level = None   # level of the include/exclude section we are inside
+    for block in _split_sections(text):
+        level = block['level']
+        if active_level is not None and 0 < level <= active_level:
+            active_level = None
+        if include:
+            if active_level is None and level and matches(block['title'], include):
+                active_level = level
+            if active_level is not None and not (exclude and matches(block['title'], exclude)):
+                kept.append(block)
+        else:
+            if active_level is None and level and exclude and matches(block['title'], exclude):
+                active_level = level
+            if active_level is None:
+                kept.append(block)
+
+    return "\n".join(line for block in kept for line in block['lines'])
+
+
+def minify_markdown(text: str) -> str:
+    """Strip presentation-only markdown and collapse whitespace"""
+    text = HTML_COMMENT_RE.sub('', text)
+    lines = []
+    in_code = False
+    for raw in text.splitlines():
+        line = raw.rstrip()
+        stripped = line.strip()
+        if stripped.startswith('```'):
+            in_code = not in_code
+            lines.append('```')
+            continue
+        if in_code:
+            if stripped:
+                lines.append(line)
+            continue
+        if not stripped or RULE_RE.match(stripped) or TABLE_SEPARATOR_RE.match(stripped):
+            continue
+
+        indent = ' ' * ((len(line) - len(line.lstrip())) // 2)
+        if stripped.startswith('|'):
+            stripped = ' | '.join(cell.strip() for cell in stripped.strip('|').split('|'))
+        heading = HEADING_RE.match(stripped)
+        if heading:
+            stripped = f"{heading.group(1)} {heading.group(2)}"
+        stripped = EMPHASIS_RE.sub(r'\2', stripped)
+        stripped = CODE_SPAN_RE.sub(r'\1', stripped)
+        stripped = LINK_RE.sub(r'\1', stripped)
+        stripped = re.sub(r'[ \t]{2,}', ' ', stripped)
+        lines.append(indent + stripped)
+    return "\n".join(lines)
+
+
+def compile_protocol(text: str, selection: Optional[Dict] = None) -> str:
+    """Extract the selected sections of one protocol and minify them"""
+    selection = selection or {}
+    extracted = text
+    if selection.get('include') or selection.get('exclude'):
+        extracted = extract_sections(text, selection.get('include'), selection.get('exclude'))
+        if not extracted.strip():
+            print(f"  ⚠️ No sections matched {selection} - using the full protocol")
+            extracted = text
+    return minify_markdown(extracted)
+
+
+def _cache_path(cache_dir: Path, stage: str, key: str, digest: str) -> Path:
+    return cache_dir / f"{stage}.{key}.{digest[:16]}.json"
+
+
+def compile_stage_protocols(protocols: Dict[str, str], cache_dir: Optional[Path] = None,
+                            stages: Optional[Dict] = None, verbose: bool = True) -> Dict[str, Dict[str, str]]:
+    """Compile protocols for every stage in STAGE_PROTOCOL_SECTIONS
+
+    Returns {stage: {protocol_key: compiled_text}}. Missing protocols compile
+    to ''. With a cache_dir, results are read from / written to disk keyed by
+    the source hash.
+    """
+    stages = stages or STAGE_PROTOCOL_SECTIONS
+    compiled = {}
+    for stage, selections in stages.items():
+        compiled[stage] = {}
+        before = after = 0
+        for key, selection in selections.items():
+            text = protocols.get(key, '')
+            digest = source_hash(f"{COMPILER_VERSION}:{json.dumps(selection, sort_keys=True)}:{text}")
+            entry = _MEMORY_CACHE.get((stage, key, digest))
+
+            path = _cache_path(cache_dir, stage, key, digest) if cache_dir else None
+            if entry is None and path and path.exists():
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        entry = json.load(f)
+                except (OSError, json.JSONDecodeError):
+                    entry = None
+            if entry is None:
+                compiled_text = compile_protocol(text, selection)
+                entry = {
+                    "stage": stage,
+                    "protocol": key,
+                    "source_sha256": source_hash(text),
+                    "source_tokens": estimate_tokens(text),
+                    "tokens": estimate_tokens(compiled_text),
+                    "text": compiled_text,
+                }
+                if path:
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    with open(path, 'w', encoding='utf-8') as f:
+                        json.dump(entry, f, indent=2, ensure_ascii=False)
+            _MEMORY_CACHE[(stage, key, digest)] = entry
+
+            compiled[stage][key] = entry["text"]
+            before += entry["source_tokens"]
+            after += entry["tokens"]
+        if verbose:
+            saved = (1 - after / before) * 100 if before else 0
+            print(f"  ✓ Compiled {stage} protocols: ~{before:,} → ~{after:,} tokens ({saved:.0f}% smaller)")
+    return compiled
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compile protocol markdown per kernel stage and report token savings',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('--show', type=str, choices=list(STAGE_PROTOCOL_SECTIONS),
+                        help="Print a stage's compiled protocols")
+    parser.add_argument('--clear-cache', action='store_true', help='Delete the compiled protocol cache')
+    args = parser.parse_args()
+
+    from create_kernel import Config, load_protocols
+    if args.clear_cache:
+        shutil.rmtree(Config.PROTOCOL_CACHE_DIR, ignore_errors=True)
+        print(f"✓ Cleared {Config.PROTOCOL_CACHE_DIR}")
+        return
+
+    protocols = load_protocols()
+    print()
+    compiled = compile_stage_protocols(protocols, Config.PROTOCOL_CACHE_DIR, verbose=not args.show)
+    if args.show:
+        for key, text in compiled[args.show].items():
+            print(f"\n=== {args.show}: {key} ===\n{text}")
+        return
+
+    print(f"\n{'Stage':<10} {'Protocol':<22} {'Source':>9} {'Compiled':>9}")
+    print("-" * 54)
+    for stage, selections in STAGE_PROTOCOL_SECTIONS.items():
+        for key in selections:
+            print(f"{stage:<10} {key:<22} {estimate_tokens(protocols.get(key, '')):>9,} "
+                  f"{estimate_tokens(compiled[stage][key]):>9,}")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+END-TO-END PIPELINE
+Kernel -> Stage 1A -> Stage 1B -> Stage 2 for a new book, with the
+ReasoningDoc generated alongside Stage 1A/1B
+
+The ReasoningDoc is the last and one of the longest model calls of a kernel
+build, but only Stage 2 (thesis alignment) reads it. This script saves the
+kernel, starts the ReasoningDoc call in the background, and runs Stage 1A and
+the Stage 1B worksheet calls while it generates. Stage 2 waits for both
+Stage 1B and the ReasoningDoc.
+
+Takes the same arguments as create_kernel.py, plus the Stage 1B and Stage 2
+options below.
+
+Usage:
+    python3 run_pipeline.py books/Giver.pdf 'The Giver' 'Lois Lowry' 2014
+    python3 run_pipeline.py books/Giver.pdf 'The Giver' 'Lois Lowry' 2014 --local-structure --week 1
+    python3 run_pipeline.py books/Giver.pdf 'The Giver' 'Lois Lowry' 2014 --defer-worksheets   # no Stage 2
+"""
+
+import contextvars
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from call_profiles import profiles_from_args
+from call_telemetry import format_summary
+from create_kernel import KernelCreator, build_arg_parser, parse_sections
+from run_stage1a import generate_validation_report, run_stage1a
+from run_stage1b import run_stage1b
+from run_stage2 import run_stage2
+from usage_ledger import enable_ledger
+
+
+def run_pipeline(creator: KernelCreator, call_profiles: Optional[Dict] = None, defer_worksheets: bool = False,
+                 week: Optional[int] = None) -> bool:
+    """Build the kernel, then overlap the ReasoningDoc with Stage 1A/1B before Stage 2
+
+    Stage 2 is skipped when worksheets are deferred (batch_runner.py fills
+    them in first). week=None renders every week.
+    """
+    start = time.monotonic()
+    if not creator.run(reasoning_doc=False):
+        return False
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="reasoning-doc") as executor:
+        doc_started = time.monotonic()
+        reasoning_doc = executor.submit(contextvars.copy_context().run, creator.generate_reasoning_document)
+        print("\n🧵 ReasoningDoc generating in the background; continuing with Stage 1A/1B")
+
+        creator.passage_index  # built from the loaded text and cached on disk for Stage 1B's worksheet grounding
+        stage1a_path, stage1a = run_stage1a(creator.kernel_path)
+        generate_validation_report(stage1a, stage1a.get("metadata", {}).get("text_title", creator.title))
+        stage1b_path = run_stage1b(stage1a_path, client=creator.client, call_profiles=call_profiles,
+                                   defer_worksheets=defer_worksheets)
+        stage1b_done = time.monotonic()
+
+        if not reasoning_doc.done():
+            print("\n⏳ Stage 1B done; waiting for the ReasoningDoc before Stage 2...")
+        try:
+            doc_ok = reasoning_doc.result()
+        except Exception as e:
+            print(f"\n❌ ReasoningDoc failed: {type(e).__name__}: {e}")
+            doc_ok = False
+        doc_done = time.monotonic()
+
+    if not doc_ok:
+        print(f"\n❌ Stopping before Stage 2 (it needs the ReasoningDoc). Stage 1B output: {stage1b_path}")
+        return False
+
+    overlap = min(doc_done, stage1b_done) - doc_started
+    print(f"\n⏱️  ReasoningDoc {doc_done - doc_started:.0f}s, overlapped with Stage 1A/1B for {overlap:.0f}s")
+
+    if defer_worksheets:
+        print(f"\n⏳ Worksheets deferred - fill them in, then run: python3 run_stage2.py {stage1b_path} --all-weeks")
+    else:
+        run_stage2(stage1b_path, week_num=week, all_weeks=week is None)
+
+    print("\n" + "="*80)
+    print(f"✅ PIPELINE COMPLETE - {creator.title} ({time.monotonic() - start:.0f}s)")
+    print("="*80)
+    telemetry = format_summary()
+    if telemetry:
+        print(f"\n📊 Model calls:\n{telemetry}")
+    return True
+
+
+def main():
+    parser = build_arg_parser()
+    parser.description = 'Kernel, Stage 1A, Stage 1B and Stage 2 for one book, with the ReasoningDoc off the critical path'
+    parser.epilog = __doc__
+    parser.add_argument('--defer-worksheets', action='store_true',
+                        help='Skip Stage 1B worksheet calls (fill in with batch_runner.py) and Stage 2')
+    parser.add_argument('--week', type=int, choices=range(1, 6), help='Render only this week in Stage 2')
+    args = parser.parse_args()
+    if args.plan:
+        parser.error('--plan: use create_kernel.py --plan and run_stage1b.py --plan')
+
+    try:
+        sections = parse_sections(args.sections, args.fresh)
+        call_profiles = profiles_from_args(args)
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+
+    enable_ledger()
+    creator = KernelCreator(args.book_path, args.title, args.author, args.edition,
+                            local_stage1=args.local_stage1, local_structure=args.local_structure,
+                            call_profiles=call_profiles)
+    if sections:
+        creator.set_section_targets(sections, args.from_stage)
+    elif args.fresh:
+        creator._clear_checkpoints_from('kernel_stage0')
+    elif args.from_stage:
+        creator._clear_checkpoints_from(args.from_stage)
+
+    sys.exit(0 if run_pipeline(creator, call_profiles, args.defer_worksheets, args.week) else 1)
+
+
+if __name__ == "__main__":
+    main()
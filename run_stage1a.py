@@ -12,6 +12,8 @@ import sys
 from pathlib import Path
 from datetime import datetime
 
+from output_schemas import normalize_pov
+
 
 def normalize_device_examples(device):
     """Convert new kernel format to expected examples array format.
@@ -233,7 +235,8 @@ def extract_macro_elements(kernel):
     # Fixed: kernel v3.3 uses "macro_variables" not "narrative"
     macro_vars = kernel.get("macro_variables", {})
     narrative = macro_vars.get("narrative", {})
-    voice = narrative.get("voice", {})
+    # v3.4 kernels keep the voice variables directly under "narrative"
+    voice = narrative.get("voice") or (narrative if "pov" in narrative else {})
     structure = narrative.get("structure", {})
     
     return {
@@ -260,7 +263,7 @@ def extract_macro_elements(kernel):
             "element_type": "Voice",
             "description": "Narrative perspective and narration",
             "variables": {
-                "pov": voice.get("pov", ""),
+                "pov": normalize_pov(voice.get("pov", "")),
                 "focalization": voice.get("focalization", ""),
                 "reliability": voice.get("reliability", ""),
                 "temporal_distance": voice.get("temporal_distance", "")
@@ -417,7 +420,8 @@ def run_stage1a(kernel_path):
             "author": kernel.get("metadata", {}).get("author", "Unknown"),
             "extraction_version": "6.0",
             "extraction_date": datetime.now().isoformat(),
-            "source_kernel": str(kernel_path)
+            "source_kernel": str(kernel_path),
+            "source_book": kernel.get("metadata", {}).get("source_book")
         },
         "narrative_chapter_ranges": narrative_ranges,
         "macro_elements": macro_elements,
@@ -5,16 +5,46 @@ Package macro-micro extracts into 5-week teaching progression
 
 Usage:
     python3 run_stage1b.py outputs/Book_stage1a_v5.0.json
+    python3 run_stage1b.py outputs/Book_stage1a_v5.0.json --profile worksheet_content.max_tokens=1500
+    python3 run_stage1b.py outputs/Book_stage1a_v5.0.json --defer-worksheets   # then batch_runner.py
+    python3 run_stage1b.py outputs/Book_stage1a_v5.0.json --plan   # calls, tokens and cost; sends nothing
+    python3 run_stage1b.py outputs/Book_stage1a_v5.0.json --book books/Giver.pdf   # kernel predates source_book
+
+Worksheet content is journaled to outputs/<Title>_stage1b_journal.jsonl as
+each device completes; an interrupted run replays it on restart and only
+calls the API for the remaining devices. The journal is removed once the
+Stage 1B JSON is saved.
+
+Each worksheet prompt is grounded in the book passages around the device's
+quote, retrieved from the book named in the kernel metadata (source_book) or
+--book with passage_index.py. Without a book the prompt has the quote alone.
 """
 
+import argparse
+import asyncio
+import hashlib
 import json
 import sys
 import re
 import os
-import time
+import threading
+import uuid
 from pathlib import Path
 from datetime import datetime
-import anthropic
+
+from api_client import StructuredOutputError, acall_structured, get_async_client, run_concurrently, run_sync
+from call_profiles import CALL_PROFILES, add_profile_arguments, profiles_from_args
+from call_telemetry import format_summary
+from job_scheduler import JobCancelled, check_cancelled
+from passage_index import format_passages, index_for_book
+from usage_ledger import call_context, enable_ledger
+
+# Stage 1B packages, journals and validation reports (job_queue.py points this at shared storage)
+OUTPUTS_DIR = Path("outputs")
+
+# Worksheet grounding: book passages retrieved for each device's quote
+WORKSHEET_CONTEXT_PASSAGES = 2
+WORKSHEET_CONTEXT_WORDS = 350
 
 # ============================================================================
 # SYNONYM SYSTEM FOR EFFECT VARIATIONS
@@ -314,14 +344,16 @@ def generate_effects_for_device(device, macro_focus):
 # ============================================================================
 
 def initialize_api_client():
-    """Initialize Anthropic API client"""
-    api_key = os.getenv("ANTHROPIC_API_KEY")
-    if not api_key:
-        raise ValueError("ANTHROPIC_API_KEY environment variable not set")
-    return anthropic.Anthropic(api_key=api_key)
+    """Initialize Anthropic API client (the shared async client)"""
+    return get_async_client()
+
 
+def generate_worksheet_content(device, macro_focus, text_title, client, profile=None):
+    """Sync façade for agenerate_worksheet_content"""
+    return run_sync(agenerate_worksheet_content(device, macro_focus, text_title, client, profile))
 
-def generate_worksheet_content(device, macro_focus, text_title, client):
+
+async def agenerate_worksheet_content(device, macro_focus, text_title, client, profile=None):
     """
     Generate complete worksheet content for a device via API.
     
@@ -330,6 +362,7 @@ def generate_worksheet_content(device, macro_focus, text_title, client):
         macro_focus: The week's macro focus (e.g., "Exposition")
         text_title: Title of the text being analyzed
         client: Anthropic API client
+        profile: Call profile (default: CALL_PROFILES['worksheet_content'])
     
     Returns:
         Dictionary with worksheet_content fields:
@@ -343,10 +376,69 @@ def generate_worksheet_content(device, macro_focus, text_title, client):
         - detail_sample: Model answer for Step 5
     """
     
+    device_name = device.get("name", "Unknown Device")
+    prompt, system_prompt = build_worksheet_prompt(device, macro_focus, text_title)
+
+    try:
+        # Call API, retrying on API errors
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                # Forced tool call: the response arrives parsed and schema-checked;
+                # schema errors get one repair call, not a full regeneration
+                with call_context(retry=f"attempt {attempt + 1}" if attempt else None):
+                    return await acall_structured(
+                        client, prompt, "worksheet_content",
+                        profile or CALL_PROFILES['worksheet_content'],
+                        system=system_prompt
+                    )
+                
+            except (StructuredOutputError, JobCancelled):
+                raise
+            except Exception as e:
+                if attempt < max_retries - 1:
+                    print(f"    ⚠️  API error, retrying... ({attempt + 1}/{max_retries})")
+                    await asyncio.sleep(2)
+                    continue
+                else:
+                    raise
+        
+    except JobCancelled:
+        raise
+    except Exception as e:
+        print(f"    ⚠️  Warning: Failed to generate worksheet content: {e}")
+        return fallback_worksheet_content(device_name)
+
+
+def book_passages(stage1a, book_path=None):
+    """Passage index for the Stage 1A output's book (or book_path), or None if there is no book file"""
+    book_path = book_path or stage1a.get("metadata", {}).get("source_book")
+    if not book_path:
+        print("  ⚠️  No source book in the kernel metadata (pass --book) - worksheets get the quote only")
+        return None
+    if not Path(book_path).exists():
+        print(f"  ⚠️  Source book not found: {book_path} - worksheets get the quote only")
+        return None
+    return index_for_book(book_path)
+
+
+def quote_context(passages, device):
+    """Book passages around the device's first example quote, or None if none match"""
+    examples = device.get("examples") or []
+    if not passages or not examples:
+        return None
+    quote = examples[0].get("quote_snippet", examples[0].get("text", ""))
+    results = passages.search(quote, top=WORKSHEET_CONTEXT_PASSAGES)
+    return format_passages(results, max_words=WORKSHEET_CONTEXT_WORDS) if results else None
+
+
+def build_worksheet_prompt(device, macro_focus, text_title):
+    """Worksheet content prompt and system prompt for one device (also used by batch_runner.py)"""
     device_name = device.get("name", "Unknown Device")
     examples = device.get("examples", [])
     tvode = device.get("tvode_components", {})
     effects = device.get("effects") or []
+    source_context = device.get("source_context")
     
     # Get example text and chapter info
     example_text = ""
@@ -372,6 +464,13 @@ TVODE Components:
 - Object: {tvode.get('object', 'N/A')}
 - Detail: {tvode.get('detail', 'N/A')}
 - Effect: {tvode.get('effect', 'N/A')}
+"""
+    
+    # Passages from the book around the example (see quote_context)
+    if source_context:
+        tvode_context += f"""
+SOURCE PASSAGES (from the book, around the example; use these for scene details and quotes):
+{source_context}
 """
     
     prompt = f"""You are creating worksheet content for teaching literary analysis of "{text_title}".
@@ -450,86 +549,92 @@ CRITICAL:
 
     system_prompt = "You are an expert literary analysis educator creating student worksheet content. Generate text-specific, pedagogically sound worksheet materials."
 
-    try:
-        # Call API with retry logic
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                response = client.messages.create(
-                    model="claude-sonnet-4-20250514",
-                    max_tokens=2000,
-                    messages=[{"role": "user", "content": prompt}],
-                    system=system_prompt
-                )
-                
-                result = response.content[0].text.strip()
-                
-                # Clean markdown formatting if present
-                result = result.replace('```json\n', '').replace('```\n', '').replace('```', '').strip()
-                
-                # Parse JSON
-                worksheet_content = json.loads(result)
-                
-                # Validate required fields
-                required_fields = [
-                    'mc_question', 'mc_options', 'mc_correct', 'mc_explanation',
-                    'sequencing_steps', 'sequencing_order', 'location_hint', 'detail_sample'
-                ]
-                missing = [f for f in required_fields if f not in worksheet_content]
-                if missing:
-                    raise ValueError(f"Missing required fields: {missing}")
-                
-                # Validate mc_options has A, B, C, D
-                if not all(k in worksheet_content['mc_options'] for k in ['A', 'B', 'C', 'D']):
-                    raise ValueError("mc_options must contain A, B, C, D")
-                
-                # Validate sequencing_steps has step_1, step_2, step_3
-                if not all(k in worksheet_content['sequencing_steps'] for k in ['step_1', 'step_2', 'step_3']):
-                    raise ValueError("sequencing_steps must contain step_1, step_2, step_3")
-                
-                return worksheet_content
-                
-            except json.JSONDecodeError as e:
-                if attempt < max_retries - 1:
-                    print(f"    ⚠️  JSON parse error, retrying... ({attempt + 1}/{max_retries})")
-                    time.sleep(2)
-                    continue
-                else:
-                    raise ValueError(f"Failed to parse JSON after {max_retries} attempts: {e}")
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    print(f"    ⚠️  API error, retrying... ({attempt + 1}/{max_retries})")
-                    time.sleep(2)
-                    continue
-                else:
-                    raise
-        
-    except Exception as e:
-        print(f"    ⚠️  Warning: Failed to generate worksheet content: {e}")
-        # Return fallback content
-        return {
-            "mc_question": f"What does {device_name} DO in this text?",
-            "mc_options": {
-                "A": "Creates meaning through its specific application in the text",
-                "B": "Reveals important themes through literary technique",
-                "C": "Functions as a literary device to convey meaning",
-                "D": "Establishes connections between text elements"
-            },
-            "mc_correct": "C",
-            "mc_explanation": "Option C most accurately describes the device's function.",
-            "sequencing_steps": {
-                "step_1": f"Reader encounters {device_name} in the text",
-                "step_2": f"{device_name} processes the textual elements",
-                "step_3": "This creates meaning and effect for the reader"
-            },
-            "sequencing_order": "1-B, 2-C, 3-A",
-            "location_hint": "Check the assigned reading chapters for this week",
-            "detail_sample": f"shown through the device's application in the text"
-        }
+    return prompt, system_prompt
+
 
+def fallback_worksheet_content(device_name):
+    """Generic worksheet content used when generation fails"""
+    return {
+        "mc_question": f"What does {device_name} DO in this text?",
+        "mc_options": {
+            "A": "Creates meaning through its specific application in the text",
+            "B": "Reveals important themes through literary technique",
+            "C": "Functions as a literary device to convey meaning",
+            "D": "Establishes connections between text elements"
+        },
+        "mc_correct": "C",
+        "mc_explanation": "Option C most accurately describes the device's function.",
+        "sequencing_steps": {
+            "step_1": f"Reader encounters {device_name} in the text",
+            "step_2": f"{device_name} processes the textual elements",
+            "step_3": "This creates meaning and effect for the reader"
+        },
+        "sequencing_order": "1-B, 2-C, 3-A",
+        "location_hint": "Check the assigned reading chapters for this week",
+        "detail_sample": f"shown through the device's application in the text"
+    }
+
+
+# ============================================================================
+# WORKSHEET JOURNAL
+# ============================================================================
 
-def create_week_package(week_data, week_num, client=None):
-    """Create detailed week package with pedagogical scaffolding"""
+class WorksheetJournal:
+    """Append-only JSONL of generated worksheet content, keyed by week, device and prompt hash
+    
+    Entries are flushed and fsynced as each device completes. A changed prompt
+    (new examples, effects or macro focus) has a new hash, so stale entries are
+    never replayed. A truncated last line from a crash is ignored. record()
+    runs in worker threads (off the async core's loop), so appends are locked.
+    """
+    
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = {}
+        self._lock = threading.Lock()
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        key = (entry["week"], entry["device"], entry["prompt_hash"])
+                        self.entries[key] = entry["worksheet_content"]
+                    except (json.JSONDecodeError, KeyError, TypeError):
+                        continue
+    
+    @staticmethod
+    def prompt_hash(prompt, system_prompt):
+        return hashlib.sha256(f"{system_prompt}\n{prompt}".encode('utf-8')).hexdigest()[:16]
+    
+    def get(self, week, device_name, prompt_hash):
+        return self.entries.get((week, device_name, prompt_hash))
+    
+    def record(self, week, device_name, prompt_hash, worksheet_content):
+        check_cancelled()
+        with self._lock:
+            self.entries[(week, device_name, prompt_hash)] = worksheet_content
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({
+                    "week": week,
+                    "device": device_name,
+                    "prompt_hash": prompt_hash,
+                    "worksheet_content": worksheet_content,
+                    "written": datetime.now().isoformat(),
+                }) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+    
+    def remove(self):
+        self.path.unlink(missing_ok=True)
+
+
+def create_week_package(week_data, week_num, client=None, call_profiles=None, journal=None, passages=None):
+    """Create detailed week package with pedagogical scaffolding
+    
+    passages (a passage_index.PassageIndex) grounds each device's worksheet
+    prompt in the book text around its quote.
+    """
     
     scaffolding_levels = {
         1: "High - Teacher models everything",
@@ -597,6 +702,7 @@ def create_week_package(week_data, week_num, client=None):
         package["macro_variables"] = week_data["macro_variables"]
     
     # Process devices with teaching notes and worksheet content
+    pending = []  # (device_package, prompt_hash) still needing an API call
     for device in week_data.get("micro_devices", []):
         device_package = {
             "device_name": device.get("name", ""),
@@ -617,25 +723,60 @@ def create_week_package(week_data, week_num, client=None):
             }
         }
         
+        source_context = quote_context(passages, device_package)
+        if source_context:
+            device_package["source_context"] = source_context
+        
+        package["micro_devices"].append(device_package)
+        
+        # Replay worksheet content journaled by an interrupted run
+        prompt_hash = None
+        if journal is not None:
+            prompt_hash = WorksheetJournal.prompt_hash(
+                *build_worksheet_prompt(device_package, package['macro_focus'], package['text_title'])
+            )
+            replayed = journal.get(week_num, device_package['name'], prompt_hash)
+            if replayed:
+                print(f"    ♻️  Replayed worksheet content for: {device_package['name']}")
+                device_package["worksheet_content"] = replayed
+                continue
+        
         # Generate worksheet content via API if client provided
         if client:
             print(f"    Generating worksheet content for: {device_package['name']}")
-            try:
-                worksheet_content = generate_worksheet_content(
-                    device_package,  # Changed: use device_package which has effects
-                    package['macro_focus'],
-                    package['text_title'],
-                    client
-                )
-                device_package["worksheet_content"] = worksheet_content
-            except Exception as e:
-                print(f"    ⚠️  Warning: Failed to generate worksheet content for {device_package['name']}: {e}")
-                # Continue without worksheet_content - will be validated later
+            pending.append((device_package, prompt_hash))
         else:
             # No client provided - worksheet_content will be None (validation will catch this)
             device_package["worksheet_content"] = None
-        
-        package["micro_devices"].append(device_package)
+    
+    async def generate(device_package, prompt_hash):
+        with call_context(device=device_package['name']):
+            worksheet_content = await agenerate_worksheet_content(
+                device_package,  # Changed: use device_package which has effects
+                package['macro_focus'],
+                package['text_title'],
+                client,
+                profile=(call_profiles or CALL_PROFILES)['worksheet_content']
+            )
+        # Journal real content as each device completes; fallback content is
+        # not journaled, so failed devices are retried on restart. The fsync
+        # runs in a thread so it never stalls other coroutines on the loop
+        if journal is not None and worksheet_content != fallback_worksheet_content(device_package['name']):
+            await asyncio.to_thread(journal.record, week_num, device_package['name'], prompt_hash, worksheet_content)
+        return worksheet_content
+    
+    # The week's devices are generated concurrently on the async core
+    results = run_concurrently((generate(*item) for item in pending), return_exceptions=True)
+    for (device_package, _), result in zip(pending, results):
+        if isinstance(result, JobCancelled):
+            raise result
+        elif isinstance(result, Exception):
+            print(f"    ⚠️  Warning: Failed to generate worksheet content for {device_package['name']}: {result}")
+            # Continue without worksheet_content - will be validated later
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            device_package["worksheet_content"] = result
     
     return package
 
@@ -811,7 +952,7 @@ def generate_validation_report(output_data, book_name):
         
         for device in devices:
             name = device.get('name', '?')
-            ws = device.get('worksheet_content', {})
+            ws = device.get('worksheet_content') or {}
             examples = device.get('examples', [])
             ex_ch = examples[0].get('chapter', '?') if examples else '?'
             
@@ -826,7 +967,7 @@ def generate_validation_report(output_data, book_name):
         
         report_lines.append("")
     
-    report_path = Path("outputs") / f"{book_name}_stage1b_v6_0_validation.md"
+    report_path = OUTPUTS_DIR / f"{book_name}_stage1b_v6_0_validation.md"
     report_path.parent.mkdir(exist_ok=True)
     
     with open(report_path, 'w', encoding='utf-8') as f:
@@ -867,22 +1008,47 @@ def validate_worksheet_content(device):
     return True, "Valid"
 
 
-def run_stage1b(stage1a_path):
-    """Main Stage 1B processing"""
+def stage1a_weeks(stage1a):
+    """(week_num, week_data) for weeks 1-5 of a Stage 1A output, with title and author filled in"""
+    title = stage1a.get("metadata", {}).get("text_title", "Unknown")
+    author = stage1a.get("metadata", {}).get("author", "Unknown")
+    packages = stage1a.get("macro_micro_packages", {})
+    for week_num in range(1, 6):
+        week_key = [k for k in packages.keys() if f"week{week_num}" in k][0]
+        week_data = packages[week_key]
+        week_data["text_title"] = title
+        week_data["text_author"] = author
+        yield week_num, week_data
+
+
+def run_stage1b(stage1a_path, client=None, call_profiles=None, defer_worksheets=False, book_path=None):
+    """Main Stage 1B processing
+    
+    Args:
+        stage1a_path: Path to Stage 1A JSON output
+        client: Optional pre-initialized API client (e.g. from pipeline_worker.py)
+        call_profiles: Optional call profiles (call_profiles.load_call_profiles)
+        defer_worksheets: Package without worksheet content; batch_runner.py fills it in later
+        book_path: Book for worksheet grounding (default: source_book in the kernel metadata)
+    """
     
     print("\n" + "="*80)
     print("STAGE 1B: WEEKLY PACKAGING")
     print("="*80)
     
     # Initialize API client
-    print("\n🔧 Initializing API client...")
-    try:
-        client = initialize_api_client()
-        print("  ✅ API client initialized")
-    except Exception as e:
-        print(f"  ❌ Error initializing API client: {e}")
-        print("  ⚠️  Continuing without worksheet content generation")
+    if defer_worksheets:
+        print("\n⏳ Worksheet content deferred (fill in with: python3 batch_runner.py run --stage1b <output>)")
         client = None
+    elif client is None:
+        print("\n🔧 Initializing API client...")
+        try:
+            client = initialize_api_client()
+            print("  ✅ API client initialized")
+        except Exception as e:
+            print(f"  ❌ Error initializing API client: {e}")
+            print("  ⚠️  Continuing without worksheet content generation")
+            client = None
     
     # Load Stage 1A output
     print(f"\nðŸ“– Loading Stage 1A output: {stage1a_path}")
@@ -893,19 +1059,26 @@ def run_stage1b(stage1a_path):
     author = stage1a.get("metadata", {}).get("author", "Unknown")
     print(f"  âœ“ Loaded: {title} by {author}")
     
-    # Get packages
-    packages = stage1a.get("macro_micro_packages", {})
+    output_dir = OUTPUTS_DIR
+    safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).strip().replace(' ', '_')
+    
+    # Usage ledger rows for this run's worksheet calls share one run ID
+    run_id = uuid.uuid4().hex[:12]
+    
+    # Book passages for worksheet grounding (kept in the package for batch_runner.py);
+    # a run that generates no worksheets never extracts or indexes the book
+    passages = book_passages(stage1a, book_path) if client is not None or defer_worksheets else None
+    
+    # Per-device journal: resume an interrupted run without repeating API calls
+    journal = WorksheetJournal(output_dir / f"{safe_title}_stage1b_journal.jsonl")
+    if journal.entries:
+        print(f"  ♻️  Journal has {len(journal.entries)} completed worksheet(s) from an interrupted run")
     
     # Create week packages
     print("\nðŸ“¦ Creating weekly packages...")
     week_packages = []
     
-    for week_num in range(1, 6):
-        week_key = [k for k in packages.keys() if f"week{week_num}" in k][0]
-        week_data = packages[week_key]
-        week_data["text_title"] = title
-        week_data["text_author"] = author
-        
+    for week_num, week_data in stage1a_weeks(stage1a):
         # Add teaching approach
         teaching_approaches = {
         1: "How do devices establish characters and setting in exposition?",
@@ -917,7 +1090,8 @@ def run_stage1b(stage1a_path):
         week_data["teaching_approach"] = teaching_approaches.get(week_num, "")
         
         print(f"\n  📋 Week {week_num}: {week_data.get('macro_element', 'Unknown')}")
-        package = create_week_package(week_data, week_num, client)
+        with call_context(book=title, run_id=run_id, stage='Stage 1B', section=f"week{week_num}"):
+            package = create_week_package(week_data, week_num, client, call_profiles, journal, passages)
         package["teaching_approach"] = teaching_approaches.get(week_num, "")
         week_packages.append(package)
         
@@ -950,15 +1124,16 @@ def run_stage1b(stage1a_path):
     }
     
     # Save outputs
-    output_dir = Path("outputs")
+    check_cancelled()
     output_dir.mkdir(exist_ok=True)
     
-    safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).strip().replace(' ', '_')
-    
-    # Save JSON
+    # Save JSON (written whole, then swapped in, so a crash never leaves it truncated)
     output_path = output_dir / f"{safe_title}_stage1b_v6_0.json"
-    with open(output_path, 'w', encoding='utf-8') as f:
+    tmp_path = output_path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
         json.dump(output, f, indent=2)
+    os.replace(tmp_path, output_path)
+    journal.remove()
     
     print(f"\nâœ… Stage 1B JSON saved!")
     print(f"   Output: {output_path}")
@@ -985,6 +1160,9 @@ def run_stage1b(stage1a_path):
     print("="*80)
     for pkg in week_packages:
         print(f"Week {pkg['week']}: {pkg['macro_focus']} - {len(pkg['micro_devices'])} devices")
+    telemetry = format_summary()
+    if telemetry:
+        print(f"\n📊 Model calls:\n{telemetry}")
     
     print("\n" + "="*80)
     print("ðŸ“‹ REVIEW PROGRESSION DOCUMENT BEFORE GENERATING WORKSHEETS")
@@ -994,18 +1172,49 @@ def run_stage1b(stage1a_path):
     
     return output_path
 
+def build_arg_parser() -> argparse.ArgumentParser:
+    """run_stage1b.py's command line (also used by job_scheduler.parse_invocation)"""
+    parser = argparse.ArgumentParser(
+        description='Stage 1B: package Stage 1A output into weekly teaching packages',
+        usage='python3 run_stage1b.py outputs/Book_stage1a_v5.0.json [--profile PROFILE.FIELD=VALUE]'
+    )
+    parser.add_argument('stage1a_path', help='Stage 1A JSON output')
+    parser.add_argument('--defer-worksheets', action='store_true',
+                        help='Skip worksheet content API calls; fill them in later with batch_runner.py')
+    parser.add_argument('--plan', action='store_true',
+                        help='Estimate calls, tokens, cost and wall time without calling the model')
+    parser.add_argument('--book', help='Book PDF or text file for worksheet grounding '
+                                       '(default: source_book in the kernel metadata)')
+    add_profile_arguments(parser)
+    return parser
+
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python3 run_stage1b.py outputs/Book_stage1a_v5.0.json")
-        sys.exit(1)
+    parser = build_arg_parser()
+    args = parser.parse_args()
     
-    stage1a_path = Path(sys.argv[1])
+    try:
+        call_profiles = profiles_from_args(args)
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+    
+    stage1a_path = Path(args.stage1a_path)
     
     if not stage1a_path.exists():
         print(f"âŒ Error: Stage 1A file not found: {stage1a_path}")
         sys.exit(1)
     
-    output_path = run_stage1b(stage1a_path)
+    if args.plan:
+        import pipeline_planner
+        counter = pipeline_planner.token_counter()
+        plan = pipeline_planner.plan_stage1b(stage1a_path, counter, call_profiles, args.defer_worksheets, args.book)
+        counter.save()
+        pipeline_planner.print_plan(plan, counter=counter)
+        sys.exit(0)
+    
+    enable_ledger(OUTPUTS_DIR / "usage.db")
+    
+    output_path = run_stage1b(stage1a_path, call_profiles=call_profiles,
+                              defer_worksheets=args.defer_worksheets, book_path=args.book)
     
     print("\n" + "="*80)
     print("NEXT STEP:")
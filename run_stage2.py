@@ -15,14 +15,33 @@ from pathlib import Path
 from datetime import datetime
 import re
 
+from job_scheduler import check_cancelled
+
 # ============================================================================
 # TEMPLATE LOADING
 # ============================================================================
 
+# Templates are re-read only when they change on disk, so a resident
+# pipeline_worker.py process does not hit the filesystem for every week.
+_TEMPLATE_CACHE = {}
+
+# Kernels are read from, and worksheets written to, these directories
+# (job_queue.py points them at shared storage)
+KERNELS_DIR = Path("kernels")
+WORKSHEETS_DIR = Path("outputs/worksheets")
+
 def load_template(template_path):
     """Load template file"""
+    template_path = Path(template_path)
+    mtime = template_path.stat().st_mtime
+    cached = _TEMPLATE_CACHE.get(template_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    
     with open(template_path, 'r', encoding='utf-8') as f:
-        return f.read()
+        content = f.read()
+    _TEMPLATE_CACHE[template_path] = (mtime, content)
+    return content
 
 # ============================================================================
 # THESIS ALIGNMENT SECTION GENERATION
@@ -30,7 +49,7 @@ def load_template(template_path):
 
 def find_kernel_path(text_title):
     """Find kernel JSON file for a given text title"""
-    kernels_dir = Path("kernels")
+    kernels_dir = KERNELS_DIR
     if not kernels_dir.exists():
         return None
     
@@ -44,7 +63,7 @@ def find_kernel_path(text_title):
 
 def find_reasoning_doc_path(text_title):
     """Find reasoning document for a given text title"""
-    kernels_dir = Path("kernels")
+    kernels_dir = KERNELS_DIR
     if not kernels_dir.exists():
         return None
     
@@ -423,7 +442,7 @@ This worksheet guides you through analyzing literary devices in *{title}*.
 def extract_worksheet_data_from_stage1b(device, macro_focus, text_title, chapter_num):
     """Extract pre-generated worksheet content from Stage 1B."""
     
-    ws = device.get('worksheet_content', {})
+    ws = device.get('worksheet_content') or {}  # None when Stage 1B ran without an API key
     tvode = device.get('tvode_components', {})
     effects = device.get('effects', [])
     examples = device.get('examples', [])
@@ -702,6 +721,7 @@ def process_week(week_package, template_dir, output_dir, stage1b_source=None):
     teacher_key = fill_teacher_key_template(teacher_key_template, week_package, enriched_devices, thesis_alignment, instructions)
     
     # Save outputs
+    check_cancelled()
     output_dir.mkdir(parents=True, exist_ok=True)
     
     title_safe = week_package.get('text_title', 'Book').replace(' ', '_')
@@ -719,25 +739,18 @@ def process_week(week_package, template_dir, output_dir, stage1b_source=None):
     
     return worksheet_path, teacher_key_path
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python3 run_stage2.py outputs/Book_stage1b_v5_0.json --week 1")
-        print("       python3 run_stage2.py outputs/Book_stage1b_v5_0.json --all-weeks")
-        sys.exit(1)
-    
-    stage1b_path = Path(sys.argv[1])
+def run_stage2(stage1b_path, week_num=None, all_weeks=False):
+    """Generate worksheets and teacher keys from a Stage 1B JSON
     
-    # Parse options
-    all_weeks = '--all-weeks' in sys.argv
-    week_num = None
-    if '--week' in sys.argv:
-        week_idx = sys.argv.index('--week')
-        if week_idx + 1 < len(sys.argv):
-            week_num = int(sys.argv[week_idx + 1])
+    Args:
+        stage1b_path: Path to Stage 1B JSON output
+        week_num: Week to generate (defaults to 1)
+        all_weeks: Generate every week instead of a single one
     
-    if not stage1b_path.exists():
-        print(f"❌ Error: Stage 1B file not found: {stage1b_path}")
-        sys.exit(1)
+    Returns:
+        List of generated file paths
+    """
+    stage1b_path = Path(stage1b_path)
     
     print("\n" + "="*80)
     print("STAGE 2: PURE EXTRACTION FROM STAGE 1B")
@@ -754,17 +767,17 @@ def main():
     
     # Setup paths
     template_dir = Path(__file__).parent
-    output_dir = Path("outputs/worksheets")
+    output_dir = WORKSHEETS_DIR
     
     # Get source filename for version metadata
     stage1b_source = stage1b_path.name
     
     # Process weeks
     week_packages = stage1b['week_packages']
+    generated_files = []
     
     if all_weeks:
         print(f"\n📚 Generating worksheets for all {len(week_packages)} weeks...")
-        generated_files = []
         
         for week_package in week_packages:
             files = process_week(week_package, template_dir, output_dir, stage1b_source)
@@ -785,6 +798,7 @@ def main():
         
         week_package = week_packages[week_num - 1]
         worksheet_path, teacher_key_path = process_week(week_package, template_dir, output_dir, stage1b_source)
+        generated_files.extend([worksheet_path, teacher_key_path])
         
         print("\n" + "="*80)
         print("✅ STAGE 2 COMPLETE!")
@@ -795,6 +809,30 @@ def main():
     
     print(f"\n📂 All worksheets saved to: {output_dir}")
     print(f"\n💰 API cost: $0.00 (pure extraction, no generation)")
+    
+    return generated_files
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python3 run_stage2.py outputs/Book_stage1b_v5_0.json --week 1")
+        print("       python3 run_stage2.py outputs/Book_stage1b_v5_0.json --all-weeks")
+        sys.exit(1)
+    
+    stage1b_path = Path(sys.argv[1])
+    
+    # Parse options
+    all_weeks = '--all-weeks' in sys.argv
+    week_num = None
+    if '--week' in sys.argv:
+        week_idx = sys.argv.index('--week')
+        if week_idx + 1 < len(sys.argv):
+            week_num = int(sys.argv[week_idx + 1])
+    
+    if not stage1b_path.exists():
+        print(f"❌ Error: Stage 1B file not found: {stage1b_path}")
+        sys.exit(1)
+    
+    run_stage2(stage1b_path, week_num=week_num, all_weeks=all_weeks)
 
 if __name__ == "__main__":
     main()
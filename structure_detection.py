@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+STRUCTURE DETECTION
+Local chapter-heading detection and conventional Freytag alignment for Stage 0
+
+Stage 0 used to send a 45,000-word book sample just so the model could count
+chapters. This module finds the heading sequence in the extracted book text
+first (the same patterns as test_structure_alignment.detect_structure:
+"Chapter N", bare numbers, word numbers, Part/Book and Prologue/Epilogue
+markers). It reports whether the sequence is confident: chapters 1..N in order,
+with no implausibly short or long chapters. create_kernel.py then either
+sends only the chapter list plus short windows around the candidate climax
+chapters, or (with --local-structure) skips the Stage 0 call entirely.
+
+Usage:
+    python3 structure_detection.py books/Giver.pdf
+    python3 structure_detection.py book.txt --json
+"""
+
+import argparse
+import json
+import re
+import statistics
+import sys
+from typing import Dict, List, Optional
+
+FREYTAG_SECTIONS = ['exposition', 'rising_action', 'climax', 'falling_action', 'resolution']
+
+# A "chapter" shorter than this is a table-of-contents entry or page number
+MIN_CHAPTER_WORDS = 300
+
+# Fewest chapters a conventional Freytag alignment can be built from; fewer
+# detected chapters are never confident (Stage 0 sends the sample instead)
+MIN_ALIGNMENT_CHAPTERS = 5
+
+# Longest chapter allowed relative to the median before detection is distrusted
+MAX_CHAPTER_RATIO = 5.0
+
+WORD_NUMBERS = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7,
+    'eight': 8, 'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12, 'thirteen': 13,
+    'fourteen': 14, 'fifteen': 15, 'sixteen': 16, 'seventeen': 17, 'eighteen': 18,
+    'nineteen': 19, 'twenty': 20, 'thirty': 30, 'forty': 40, 'fifty': 50,
+}
+
+ROMAN_VALUES = {'i': 1, 'v': 5, 'x': 10, 'l': 50, 'c': 100}
+
+CHAPTER_RE = re.compile(r'^chapter\s+([\w-]+)\b', re.IGNORECASE)
+BARE_NUMBER_RE = re.compile(r'^(\d{1,3})$')
+PART_RE = re.compile(r'^(part|book)\s+([\w-]+)\b', re.IGNORECASE)
+SPECIAL_RE = re.compile(r'^(prologue|epilogue|interlude|afterword)\b', re.IGNORECASE)
+
+# Where a heading glued to the previous line can start: after sentence-ending
+# punctuation, or at a lowercase->Uppercase join ("futur eOne")
+GLUE_RE = re.compile(r'[.!?"\u201d\u2019)\]]|(?<=[a-z])(?=[A-Z])')
+
+
+def parse_number(token: str) -> Optional[int]:
+    """Parse '12', 'Twelve', 'twenty-one' or 'XII' into an int"""
+    token = token.strip().strip('.:').lower()
+    if token.isdigit():
+        return int(token)
+    if token in WORD_NUMBERS:
+        return WORD_NUMBERS[token]
+    if '-' in token:
+        parts = token.split('-')
+        if len(parts) == 2 and parts[0] in WORD_NUMBERS and parts[1] in WORD_NUMBERS:
+            return WORD_NUMBERS[parts[0]] + WORD_NUMBERS[parts[1]]
+    if token and all(c in ROMAN_VALUES for c in token):
+        total = 0
+        for i, c in enumerate(token):
+            value = ROMAN_VALUES[c]
+            if i + 1 < len(token) and ROMAN_VALUES[token[i + 1]] > value:
+                total -= value
+            else:
+                total += value
+        return total
+    return None
+
+
+def _classify_heading(candidate: str) -> Optional[Dict]:
+    """Classify a short string as a chapter/number/part/special heading"""
+    m = CHAPTER_RE.match(candidate)
+    if m and parse_number(m.group(1)) is not None:
+        return {'kind': 'chapter', 'number': parse_number(m.group(1))}
+    if BARE_NUMBER_RE.match(candidate):
+        return {'kind': 'number', 'number': int(candidate)}
+    # PDF extraction splits words ("T wenty-thr ee"), so compare without spaces
+    squashed = re.sub(r'\s+', '', candidate).lower()
+    if squashed in WORD_NUMBERS or (re.fullmatch(r'[a-z]+-[a-z]+', squashed) and parse_number(squashed)):
+        return {'kind': 'word', 'number': parse_number(squashed)}
+    m = PART_RE.match(candidate)
+    if m:
+        return {'kind': 'part', 'number': parse_number(m.group(2))}
+    if SPECIAL_RE.match(candidate):
+        return {'kind': 'special', 'number': None}
+    return None
+
+
+def find_heading_markers(text: str) -> List[Dict]:
+    """Find candidate heading lines with their word offsets in the text.
+
+    PDF text extraction often glues a heading onto the end of the previous
+    page's last line ("...he told Jonas.T welve"), so besides whole lines the
+    short tail after the last sentence break or lowercase/Uppercase join of
+    each line is checked too.
+    """
+    markers = []
+    word_offset = 0
+    for line in text.split('\n'):
+        clean = ' '.join(line.split())
+        marker = None
+        if clean and len(clean) <= 60:
+            marker = _classify_heading(clean)
+        if marker is None and clean:
+            breaks = list(GLUE_RE.finditer(clean))
+            if breaks:
+                tail = clean[breaks[-1].end():].strip()
+                if tail and len(tail) <= 25:
+                    marker = _classify_heading(tail)
+                    if marker and marker['kind'] == 'special':
+                        marker = None
+                    if marker:
+                        clean = tail
+        if marker:
+            marker.update(label=clean, word_offset=word_offset + len(line.split()) - len(clean.split()))
+            markers.append(marker)
+        word_offset += len(line.split())
+    return markers
+
+
+def _longest_chapter_sequence(markers: List[Dict], min_words: int) -> List[Dict]:
+    """Longest chain of markers numbered 1, 2, ..., N in text order.
+
+    Consecutive headings must be at least min_words apart, which drops
+    table-of-contents runs and page numbers. Ties prefer the latest
+    predecessor, so chapter 1 is the real heading rather than its TOC entry.
+    """
+    best = [0] * len(markers)
+    prev = [None] * len(markers)
+    for i, marker in enumerate(markers):
+        if marker['number'] == 1:
+            best[i] = 1
+            continue
+        for j in range(i - 1, -1, -1):
+            candidate = markers[j]
+            if (candidate['number'] == marker['number'] - 1 and best[j] == candidate['number']
+                    and marker['word_offset'] - candidate['word_offset'] >= min_words
+                    and best[j] + 1 > best[i]):
+                best[i] = best[j] + 1
+                prev[i] = j
+    if not markers or max(best) == 0:
+        return []
+
+    end = max(range(len(markers)), key=lambda i: (best[i], markers[i]['word_offset']))
+    chain = []
+    while end is not None:
+        chain.append(markers[end])
+        end = prev[end]
+    return list(reversed(chain))
+
+
+def detect_structure(text: str, min_chapter_words: int = MIN_CHAPTER_WORDS) -> Dict:
+    """Detect the chapter sequence in book text.
+
+    Returns a dict with structure_type, total_units, confident, reason,
+    chapters (number, label, start_word, words) and special_elements.
+    """
+    total_words = len(text.split())
+    markers = find_heading_markers(text)
+
+    # Prefer explicit "Chapter N" headings, then bare numbers, then word numbers
+    chapters, heading_kind = [], None
+    for kind in ('chapter', 'number', 'word'):
+        chain = _longest_chapter_sequence([m for m in markers if m['kind'] == kind], min_chapter_words)
+        if len(chain) > len(chapters):
+            chapters, heading_kind = chain, kind
+
+    result_chapters = []
+    for i, marker in enumerate(chapters):
+        end = chapters[i + 1]['word_offset'] if i + 1 < len(chapters) else total_words
+        result_chapters.append({
+            'number': marker['number'],
+            'label': marker['label'],
+            'start_word': marker['word_offset'],
+            'words': end - marker['word_offset'],
+        })
+
+    special_elements = sorted({m['label'].split()[0].upper() for m in markers if m['kind'] == 'special'})
+    has_parts = any(m['kind'] == 'part' for m in markers)
+    structure_type = 'NEST' if has_parts else ('HYBRID' if special_elements else 'NUM')
+    if not result_chapters:
+        structure_type = 'UNMARK'
+
+    confident, reason = _assess_confidence(result_chapters, total_words)
+
+    return {
+        'structure_type': structure_type,
+        'total_units': len(result_chapters),
+        'heading_kind': heading_kind,
+        'confident': confident,
+        'reason': reason,
+        'chapters': result_chapters,
+        'special_elements': special_elements,
+        'total_words': total_words,
+    }
+
+
+def _assess_confidence(chapters: List[Dict], total_words: int):
+    if len(chapters) < MIN_ALIGNMENT_CHAPTERS:
+        return False, f"only {len(chapters)} chapter heading(s) in sequence (need {MIN_ALIGNMENT_CHAPTERS})"
+    lengths = [c['words'] for c in chapters]
+    median = statistics.median(lengths)
+    longest = max(lengths)
+    if longest > MAX_CHAPTER_RATIO * median:
+        where = chapters[lengths.index(longest)]['number']
+        return False, f"chapter {where} is {longest / median:.1f}x the median length (headings likely missed)"
+    if chapters[0]['start_word'] > 0.2 * total_words:
+        return False, "first chapter heading starts after 20% of the text"
+    return True, f"{len(chapters)} contiguous chapter headings"
+
+
+def conventional_alignment(total_units: int) -> Dict:
+    """Conventional Freytag distribution (protocol v1.1) in Stage 0 chapter_alignment format.
+
+    Same proportions as test_structure_alignment.apply_conventional_distribution
+    (12% / 50% / 55% / 85%), with the climax narrowed to at most 3 chapters
+    and boundaries adjusted so ranges are sequential with no gaps or overlaps.
+    """
+    n = total_units
+    if n < MIN_ALIGNMENT_CHAPTERS:
+        raise ValueError(f"Need at least {MIN_ALIGNMENT_CHAPTERS} chapters for a Freytag alignment, got {n}")
+
+    exp_end = max(1, int(n * 0.12))
+    climax_start = max(exp_end + 2, int(n * 0.50))
+    climax_end = max(climax_start, int(n * 0.55))
+    climax_end = min(climax_end, climax_start + 2, n - 2)
+    fa_end = min(max(climax_end + 1, int(n * 0.85)), n - 1)
+
+    bounds = {
+        'exposition': (1, exp_end),
+        'rising_action': (exp_end + 1, climax_start - 1),
+        'climax': (climax_start, climax_end),
+        'falling_action': (climax_end + 1, fa_end),
+        'resolution': (fa_end + 1, n),
+    }
+    primary = {
+        'exposition': 1,
+        'rising_action': (exp_end + 1 + climax_start - 1) // 2,
+        'climax': climax_start,
+        'falling_action': (climax_end + 1 + fa_end) // 2,
+        'resolution': n,
+    }
+
+    alignment = {}
+    for section in FREYTAG_SECTIONS:
+        start, end = bounds[section]
+        chapters = list(range(start, end + 1))
+        alignment[section] = {
+            'chapter_range': str(start) if start == end else f"{start}-{end}",
+            'chapters': chapters,
+            'primary_chapter': primary[section],
+            'percentage': round(len(chapters) / n * 100),
+        }
+    return alignment
+
+
+def climax_candidates(total_units: int, max_chapters: int = 6) -> List[int]:
+    """Chapters around the conventional climax position (45%-70% of the book)"""
+    start = max(1, int(total_units * 0.45))
+    end = min(total_units, max(start, int(round(total_units * 0.70))))
+    candidates = list(range(start, end + 1))
+    if len(candidates) > max_chapters:
+        center = int(total_units * 0.55)
+        lo = max(start, center - max_chapters // 2)
+        candidates = list(range(lo, min(end, lo + max_chapters - 1) + 1))
+    return candidates
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Detect chapter structure locally and print the conventional Freytag alignment',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('book_path', help='Book PDF or text file')
+    parser.add_argument('--json', action='store_true', help='Print the detection result as JSON')
+    args = parser.parse_args()
+
+    from create_kernel import load_book_text
+    detection = detect_structure(load_book_text(args.book_path))
+
+    if args.json:
+        print(json.dumps(detection, indent=2))
+        return
+
+    print(f"\n=== STRUCTURE DETECTION: {args.book_path} ===")
+    print(f"Structure type: {detection['structure_type']}")
+    print(f"Heading kind: {detection['heading_kind']}")
+    print(f"Total units: {detection['total_units']}")
+    print(f"Confident: {'✓' if detection['confident'] else '✗'} ({detection['reason']})")
+    for chapter in detection['chapters']:
+        print(f"  {chapter['number']:>3}. {chapter['label'][:40]:<40} {chapter['words']:>7,} words")
+
+    if detection['total_units'] >= 5:
+        print(f"\n=== CONVENTIONAL DISTRIBUTION (N={detection['total_units']}) ===")
+        for section, data in conventional_alignment(detection['total_units']).items():
+            print(f"  {section.upper():<16} Chapters {data['chapter_range']:<8} (primary {data['primary_chapter']}, {data['percentage']}%)")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
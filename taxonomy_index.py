@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+TAXONOMY INDEX
+Structured index of the Artifact 1 device taxonomy, sliced by Freytag section
+
+Every Stage 2B prompt used to embed the whole Artifact 1 taxonomy, although
+DEVICE_TIER_MAP / TIER_TO_FREYTAG already decide which tiers belong in each
+section and _relocate_tier5_devices / _deduplicate_devices discard the
+off-tier picks afterwards. This module parses the taxonomy markdown once into
+entries (number, name, category, aliases, tiers) and renders a per-section
+slice: the entries whose tier maps to that section, plus the always-allowed
+entries that have no tier (e.g. Rhythm/Meter), which post-processing never
+moves. Parsed indexes are cached per taxonomy version (hash of the taxonomy
+text and tier map).
+
+Both Artifact 1 layouts are supported: the condensed file ("### CATEGORY"
+headings, "N. Name - description" entries) and the full .md file (ALL-CAPS
+category lines, entry lines followed by Classification/Definition text).
+
+Usage:
+    python3 taxonomy_index.py
+    python3 taxonomy_index.py --section climax
+    python3 taxonomy_index.py --taxonomy protocols/Artifact_1_-_Device_Taxonomy_by_Alignment_Function.md
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+from typing import Dict, List, Optional
+
+HEADING_RE = re.compile(r'^(#{1,6})\s+(.+?)\s*$')
+ENTRY_RE = re.compile(r'^(\d+)\.\s+(.+?)\s*$')
+
+# Parsed indexes keyed by taxonomy version
+_INDEX_CACHE: Dict[str, Dict] = {}
+
+
+def taxonomy_version(taxonomy_text: str, tier_map: Dict[str, int]) -> str:
+    """Short hash identifying a taxonomy text + tier map combination"""
+    digest = hashlib.sha256(taxonomy_text.encode('utf-8'))
+    digest.update(json.dumps(tier_map, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+
+def _is_caps_heading(line: str) -> bool:
+    """Full-layout category lines: 'NARRATIVE VOICE DEVICES'"""
+    letters = [c for c in line if c.isalpha()]
+    return len(letters) >= 4 and line.upper() == line and not line[0].isdigit()
+
+
+def device_aliases(name: str) -> List[str]:
+    """Candidate device names for one taxonomy entry name
+
+    'Flashback (Analepsis)' -> ['Flashback', 'Analepsis']
+    'Circular/Spiral Structure' -> ['Circular/Spiral Structure', 'Circular', 'Circular Structure', 'Spiral Structure']
+    """
+    aliases = []
+    base = re.sub(r'\s*\(([^)]*)\)', '', name).strip()
+    inner = re.findall(r'\(([^)]*)\)', name)
+    for text in [base] + inner:
+        aliases.append(text)
+        parts = [p.strip() for p in text.split('/') if p.strip()]
+        if len(parts) > 1:
+            tail = parts[-1].split()[1:]
+            for part in parts:
+                aliases.append(part)
+                if tail and len(part.split()) == 1 and part != parts[-1]:
+                    aliases.append(f"{part} {' '.join(tail)}")
+    return list(dict.fromkeys(aliases))
+
+
+def parse_taxonomy(taxonomy_text: str, tier_map: Dict[str, int]) -> Dict:
+    """Parse Artifact 1 markdown into {"version", "entries": [...]}
+
+    A category only counts as a device category if its first non-blank line is
+    a numbered entry, so trailing sections such as OUTPUT FORMAT or USAGE
+    GUIDELINES (which also contain numbered lists) are ignored.
+    """
+    tiers_by_name = {name.lower(): tier for name, tier in tier_map.items()}
+    entries = []
+    category = None
+    in_list = False
+    awaiting_first = False
+    current = None
+
+    for raw in taxonomy_text.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+
+        heading = HEADING_RE.match(line)
+        if heading or (not ENTRY_RE.match(line) and _is_caps_heading(line)):
+            current = None
+            if heading and len(heading.group(1)) <= 2:
+                category, in_list, awaiting_first = None, False, False
+            else:
+                category = heading.group(2) if heading else line
+                in_list, awaiting_first = False, True
+            continue
+
+        entry = ENTRY_RE.match(line)
+        if entry and category and (in_list or awaiting_first):
+            in_list, awaiting_first = True, False
+            name, _, description = entry.group(2).partition(' - ')
+            aliases = device_aliases(name.strip())
+            matched = [a for a in aliases if a.lower() in tiers_by_name]
+            current = {
+                "number": int(entry.group(1)),
+                "name": name.strip(),
+                "description": description.strip(),
+                "category": category,
+                "aliases": matched,
+                "tiers": sorted({tiers_by_name[a.lower()] for a in matched}),
+                "lines": [line],
+            }
+            entries.append(current)
+            continue
+
+        if awaiting_first:
+            # Category whose first line is prose, not a device list
+            category, awaiting_first = None, False
+        elif current is not None and in_list:
+            current["lines"].append(line)
+
+    return {"version": taxonomy_version(taxonomy_text, tier_map), "entries": entries}
+
+
+def get_taxonomy_index(taxonomy_text: str, tier_map: Dict[str, int]) -> Dict:
+    """Parsed taxonomy, cached per taxonomy version"""
+    version = taxonomy_version(taxonomy_text, tier_map)
+    if version not in _INDEX_CACHE:
+        _INDEX_CACHE[version] = parse_taxonomy(taxonomy_text, tier_map)
+    return _INDEX_CACHE[version]
+
+
+def section_entries(index: Dict, section: str, tier_to_section: Dict[int, str]) -> List[Dict]:
+    """Entries for a section's tiers plus the always-allowed (untiered) entries"""
+    section_tiers = {tier for tier, name in tier_to_section.items() if name == section}
+    return [e for e in index["entries"] if not e["tiers"] or section_tiers & set(e["tiers"])]
+
+
+def render_entries(entries: List[Dict]) -> str:
+    """Render entries back to markdown, grouped under their category headings"""
+    lines = []
+    category = None
+    for entry in entries:
+        if entry["category"] != category:
+            category = entry["category"]
+            if lines:
+                lines.append("")
+            lines.append(f"### {category}")
+        lines.extend(entry["lines"])
+    return "\n".join(lines)
+
+
+def section_slice(taxonomy_text: str, section: str, tier_map: Dict[str, int],
+                  tier_to_section: Dict[int, str]) -> Optional[str]:
+    """Taxonomy markdown for one section, or None if no device entries could be parsed"""
+    index = get_taxonomy_index(taxonomy_text, tier_map)
+    if not index["entries"]:
+        return None
+    key = f"slice:{section}"
+    if key not in index:
+        index[key] = render_entries(section_entries(index, section, tier_to_section))
+    return index[key]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Show the per-section Artifact 1 taxonomy slices used by Stage 2B',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('--taxonomy', type=str, help='Taxonomy file (default: Config.ARTIFACT_1)')
+    parser.add_argument('--section', type=str, help='Print the full slice for one section')
+    args = parser.parse_args()
+
+    from create_kernel import Config, DEVICE_TIER_MAP, FREYTAG_SECTIONS, TIER_TO_FREYTAG
+    path = args.taxonomy or str(Config.PROTOCOLS_DIR / Config.ARTIFACT_1)
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+
+    index = get_taxonomy_index(text, DEVICE_TIER_MAP)
+    if args.section:
+        print(section_slice(text, args.section, DEVICE_TIER_MAP, TIER_TO_FREYTAG))
+        return
+
+    print(f"\n=== TAXONOMY INDEX: {path} (version {index['version']}) ===")
+    print(f"Entries: {len(index['entries'])}, full taxonomy: {len(text.split()):,} words")
+    untiered = [e['name'] for e in index['entries'] if not e['tiers']]
+    print(f"Always allowed (no tier): {', '.join(untiered) or 'none'}")
+    for section in FREYTAG_SECTIONS:
+        entries = section_entries(index, section, TIER_TO_FREYTAG)
+        words = len(section_slice(text, section, DEVICE_TIER_MAP, TIER_TO_FREYTAG).split())
+        print(f"  {section.upper():<16} {len(entries):>3} entries {words:>6,} words")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
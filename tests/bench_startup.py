@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+STARTUP BENCHMARK
+Measures import/startup cost of the stage scripts with `python -X importtime`
+
+Checks that the heavy dependencies (anthropic, PyPDF2) are NOT imported at
+module import time, and reports median import and `--help` wall times.
+
+Usage:
+    python3 tests/bench_startup.py
+    python3 tests/bench_startup.py --runs 10 > bench_output.txt
+"""
+
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Modules that must only be imported on first use
+LAZY_MODULES = ["anthropic", "PyPDF2"]
+
+# Stage scripts and the CLI invocation used for the wall-clock check
+SCRIPTS = {
+    "create_kernel": ["create_kernel.py", "--help"],
+    "run_stage1b": ["run_stage1b.py"],
+    "run_stage2": ["run_stage2.py"],
+    "pipeline_worker": ["pipeline_worker.py", "--help"],
+}
+
+
+class Colors:
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    END = '\033[0m'
+
+
+def print_header(text):
+    print(f"\n{Colors.BLUE}{'='*80}{Colors.END}")
+    print(f"{Colors.BLUE}{text}{Colors.END}")
+    print(f"{Colors.BLUE}{'='*80}{Colors.END}\n")
+
+
+def parse_importtime(stderr):
+    """Parse `-X importtime` output into {module: (self_us, cumulative_us)}"""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            _, self_us, cumulative_us, name = [part.strip() for part in line.replace("import time:", "|", 1).split("|")]
+            times[name] = (int(self_us), int(cumulative_us))
+        except ValueError:
+            continue
+    return times
+
+
+def measure_import(module):
+    """Import a module in a fresh interpreter and return its importtime table"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    return parse_importtime(result.stderr)
+
+
+def measure_cli(argv):
+    """Wall-clock time of a short CLI invocation (seconds)"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *argv], cwd=REPO_ROOT, capture_output=True, text=True)
+    return time.perf_counter() - start
+
+
+def main():
+    runs = 5
+    if "--runs" in sys.argv:
+        runs = int(sys.argv[sys.argv.index("--runs") + 1])
+
+    print_header(f"STARTUP BENCHMARK ({runs} runs per script)")
+    print(f"{'Script':<18} {'import (ms)':>12} {'self (ms)':>10} {'CLI (ms)':>10}  Lazy deps")
+    print("-" * 80)
+
+    failures = []
+    for module, argv in SCRIPTS.items():
+        import_ms, self_ms, cli_ms = [], [], []
+        eager = set()
+        for _ in range(runs):
+            times = measure_import(module)
+            if module in times:
+                self_ms.append(times[module][0] / 1000)
+                import_ms.append(times[module][1] / 1000)
+            eager.update(m for m in LAZY_MODULES if m in times)
+            cli_ms.append(measure_cli(argv) * 1000)
+
+        status = f"{Colors.GREEN}✓ deferred{Colors.END}"
+        if eager:
+            status = f"{Colors.RED}✗ eager: {', '.join(sorted(eager))}{Colors.END}"
+            failures.append(module)
+
+        print(f"{module:<18} {statistics.median(import_ms):>12.1f} {statistics.median(self_ms):>10.2f} "
+              f"{statistics.median(cli_ms):>10.1f}  {status}")
+
+    if failures:
+        print(f"\n{Colors.RED}Heavy imports at startup in: {', '.join(failures)}{Colors.END}")
+        return 1
+    print(f"\n{Colors.GREEN}All heavy dependencies are imported on first use{Colors.END}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Tests for archive_versioning.py - blob dedup, legacy JSON import, restore and --compact
+
+Usage:
+    python3 tests/test_archive_versioning.py
+    python3 -m pytest tests/test_archive_versioning.py
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import archive_versioning  # noqa: E402
+from archive_versioning import (  # noqa: E402
+    archive_file, compact_archive, connect_index, load_metadata, migrate_legacy_metadata, restore_file,
+)
+
+PATHS = ("ARCHIVE_DIR", "METADATA_FILE", "INDEX_DB", "OBJECTS_DIR")
+
+
+def _with_archive(test):
+    """Run test(tmp) with the archive under a temporary directory"""
+    saved = {name: getattr(archive_versioning, name) for name in PATHS}
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "archive"
+        archive_versioning.ARCHIVE_DIR = root
+        archive_versioning.METADATA_FILE = root / "archive_metadata.json"
+        archive_versioning.INDEX_DB = root / "archive_index.db"
+        archive_versioning.OBJECTS_DIR = root / "objects"
+        try:
+            test(Path(tmp))
+        finally:
+            for name, value in saved.items():
+                setattr(archive_versioning, name, value)
+
+
+def _objects():
+    return sorted(p for p in archive_versioning.OBJECTS_DIR.rglob("*") if p.is_file())
+
+
+def _write_legacy(tmp):
+    """archive_metadata.json with two plain-file entries, as the pre-index archive kept them"""
+    root = archive_versioning.ARCHIVE_DIR
+    root.mkdir()
+    (root / "run_stage1a_v5_0_old.py").write_text("print('v5.0')\n")
+    (root / "run_stage1a_v5_1_fix.py").write_text("print('v5.1')\n")
+    (root / "README.md").write_text("archive notes")
+    entries = [{"archived_name": name, "original_name": "run_stage1a.py", "version": version,
+                "archived_date": f"2025-01-0{i + 1}T00:00:00", "reason": "Replaced", "file_size": 14}
+               for i, (name, version) in enumerate((("run_stage1a_v5_0_old.py", "5.0"),
+                                                     ("run_stage1a_v5_1_fix.py", "5.1")))]
+    archive_versioning.METADATA_FILE.write_text(json.dumps({"created": "2025-01-01", "files": {"run_stage1a": entries}}))
+
+
+def test_identical_content_is_stored_once():
+    def check(tmp):
+        source = tmp / "run_stage2.py"
+        source.write_text("print('stage 2')\n")
+        first = archive_file(source, "6.0", "Replaced by v6.1")
+        second = archive_file(source, "6.1", "Replaced by v6.2")
+        assert first != second
+        assert len(_objects()) == 1, "same bytes, one blob"
+
+        source.write_text("print('stage 2, revised')\n")
+        archive_file(source, "6.2", "Replaced by v6.3")
+        assert len(_objects()) == 2
+        assert [e["version"] for e in load_metadata()["files"]["run_stage2"]] == ["6.0", "6.1", "6.2"]
+    _with_archive(check)
+
+
+def test_legacy_json_is_imported_once():
+    def check(tmp):
+        _write_legacy(tmp)
+        metadata = load_metadata()
+        entries = metadata["files"]["run_stage1a"]
+        assert [e["archived_name"] for e in entries] == ["run_stage1a_v5_0_old.py", "run_stage1a_v5_1_fix.py"]
+        assert all(e["sha256"] for e in entries), "plain files are hashed on import"
+        assert metadata["created"] == "2025-01-01"
+
+        conn = connect_index()
+        assert migrate_legacy_metadata(conn) == 0, "importing again adds nothing"
+        conn.close()
+        assert (archive_versioning.ARCHIVE_DIR / "run_stage1a_v5_0_old.py").exists(), "import never moves files"
+    _with_archive(check)
+
+
+def test_restore_blob_and_legacy_entries():
+    def check(tmp):
+        _write_legacy(tmp)
+        source = tmp / "run_stage1b.py"
+        source.write_bytes(b"stage 1b\x00bytes")
+        name = archive_file(source, "5.0", "Replaced by v5.1")
+
+        assert restore_file(name, tmp / "out" / "blob.py").read_bytes() == b"stage 1b\x00bytes"
+        assert restore_file("run_stage1a_v5_1_fix.py", tmp / "out" / "plain.py").read_text() == "print('v5.1')\n"
+        try:
+            restore_file("never_archived.py", tmp / "out" / "missing.py")
+            assert False, "expected FileNotFoundError"
+        except FileNotFoundError:
+            pass
+    _with_archive(check)
+
+
+def test_compact_moves_plain_files_into_blobs():
+    def check(tmp):
+        _write_legacy(tmp)
+        root = archive_versioning.ARCHIVE_DIR
+        duplicate = tmp / "run_stage1a.py"
+        duplicate.write_text("print('v5.0')\n")
+        archive_file(duplicate, "5.0.1", "Same content as v5.0")
+        assert len(_objects()) == 1
+
+        assert compact_archive() == 2
+        assert not (root / "run_stage1a_v5_0_old.py").exists() and not (root / "run_stage1a_v5_1_fix.py").exists()
+        assert (root / "README.md").read_text() == "archive notes", "untracked files are left alone"
+        assert len(_objects()) == 2, "v5.0's plain copy dedups against the existing blob"
+
+        assert restore_file("run_stage1a_v5_0_old.py", tmp / "a.py").read_text() == "print('v5.0')\n"
+        assert restore_file("run_stage1a_v5_1_fix.py", tmp / "b.py").read_text() == "print('v5.1')\n"
+        assert compact_archive() == 0, "nothing left to compact"
+    _with_archive(check)
+
+
+def test_compact_keeps_plain_file_when_blob_does_not_verify():
+    def check(tmp):
+        _write_legacy(tmp)
+        root = archive_versioning.ARCHIVE_DIR
+        original = archive_versioning.read_blob
+        archive_versioning.read_blob = lambda conn, sha256: b"corrupt"
+        try:
+            assert compact_archive() == 0
+        finally:
+            archive_versioning.read_blob = original
+        assert (root / "run_stage1a_v5_0_old.py").read_text() == "print('v5.0')\n"
+        conn = connect_index()
+        assert conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 0, "the unverified blob row is rolled back"
+        conn.close()
+        assert restore_file("run_stage1a_v5_1_fix.py", tmp / "b.py").read_text() == "print('v5.1')\n"
+    _with_archive(check)
+
+
+if __name__ == "__main__":
+    failures = 0
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            try:
+                func()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    sys.exit(1 if failures else 0)
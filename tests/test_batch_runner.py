@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Tests for batch_runner.py - worksheet batches through LocalBatchClient
+
+Usage:
+    python3 tests/test_batch_runner.py
+    python3 -m pytest tests/test_batch_runner.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from batch_runner import (  # noqa: E402
+    LocalBatchClient, collect_worksheet_requests, load_states, poll, submit,
+)
+from call_profiles import load_call_profiles  # noqa: E402
+from run_stage1b import fallback_worksheet_content  # noqa: E402
+
+WORKSHEET = {
+    "mc_question": "What does the simile do?",
+    "mc_options": {k: f"Option {k}" for k in "ABCD"},
+    "mc_correct": "B",
+    "mc_explanation": "B names the effect.",
+    "sequencing_steps": {"step_1": "a", "step_2": "b", "step_3": "c"},
+    "sequencing_order": "1-A, 2-B, 3-C",
+    "location_hint": "Chapter 2",
+    "detail_sample": "the comparison",
+}
+
+
+class FakeMessages:
+    """messages.create returning a worksheet tool call; fails for names in `failing`"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = 0
+
+    def create(self, **params):
+        self.calls += 1
+        prompt = params["messages"][0]["content"]
+        if any(name in prompt for name in self.failing):
+            raise RuntimeError("overloaded")
+        block = SimpleNamespace(type="tool_use", name=params["tools"][0]["name"], input=dict(WORKSHEET))
+        return SimpleNamespace(content=[block])
+
+
+def _package(path: Path):
+    devices = [
+        {"name": "Simile", "examples": [], "effects": []},
+        {"name": "Metaphor", "examples": [], "effects": [], "worksheet_content": fallback_worksheet_content("Metaphor")},
+        {"name": "Irony", "examples": [], "effects": [], "worksheet_content": dict(WORKSHEET)},
+    ]
+    package = {
+        "metadata": {"text_title": "Test Book"},
+        "week_packages": [{"week": 1, "macro_focus": "Exposition", "text_title": "Test Book",
+                           "micro_devices": devices}],
+    }
+    path.write_text(json.dumps(package), encoding="utf-8")
+
+
+def _run(test):
+    profiles = load_call_profiles()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # validation reports are written to ./outputs
+        try:
+            stage1b = Path(tmp) / "Test_Book_stage1b_v6_0.json"
+            _package(stage1b)
+            test(stage1b, Path(tmp) / "batches", profiles)
+        finally:
+            os.chdir(cwd)
+
+
+def test_collects_missing_and_fallback_worksheets():
+    def check(stage1b, batch_dir, profiles):
+        requests = collect_worksheet_requests([str(stage1b)], profiles)
+        assert [r["target"]["device_name"] for r in requests] == ["Simile", "Metaphor"]
+        params = requests[0]["params"]
+        assert params["tool_choice"]["name"] == "record_worksheet_content"
+        assert "timeout" not in params
+    _run(check)
+
+
+def test_submit_poll_applies_results_once():
+    def check(stage1b, batch_dir, profiles):
+        fake = FakeMessages()
+        batch_client = LocalBatchClient(SimpleNamespace(messages=fake), polls_until_ended=1)
+        submit(batch_client, collect_worksheet_requests([str(stage1b)], profiles), batch_dir)
+        # Resubmitting while the batch is in flight sends nothing new
+        assert submit(batch_client, collect_worksheet_requests([str(stage1b)], profiles), batch_dir) is None
+
+        assert poll(batch_client, profiles, batch_dir)["in_progress"] == 1
+        totals = poll(batch_client, profiles, batch_dir)
+        assert totals["applied"] == 2 and totals["failed"] == 0
+        devices = json.loads(stage1b.read_text())["week_packages"][0]["micro_devices"]
+        assert all(d["worksheet_content"] == WORKSHEET for d in devices)
+        assert poll(batch_client, profiles, batch_dir)["applied"] == 0, "results are applied once"
+        assert collect_worksheet_requests([str(stage1b)], profiles) == []
+        assert fake.calls == 2
+    _run(check)
+
+
+def test_failed_requests_stay_pending():
+    def check(stage1b, batch_dir, profiles):
+        batch_client = LocalBatchClient(SimpleNamespace(messages=FakeMessages(failing=["Simile"])))
+        submit(batch_client, collect_worksheet_requests([str(stage1b)], profiles), batch_dir)
+        totals = poll(batch_client, profiles, batch_dir)
+        assert totals["applied"] == 1 and totals["failed"] == 1
+        statuses = sorted(e["status"] for e in load_states(batch_dir)[0]["requests"].values())
+        assert statuses == ["applied", "failed"]
+
+        retry = collect_worksheet_requests([str(stage1b)], profiles)
+        assert [r["target"]["device_name"] for r in retry] == ["Simile"]
+        batch_client = LocalBatchClient(SimpleNamespace(messages=FakeMessages()))
+        assert submit(batch_client, retry, batch_dir) is not None
+        assert poll(batch_client, profiles, batch_dir)["applied"] == 1
+    _run(check)
+
+
+if __name__ == "__main__":
+    failures = 0
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            try:
+                func()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Tests for call_profiles.py and api_client.create_message (fake client, no API calls)
+
+Usage:
+    python3 tests/test_call_profiles.py
+    python3 -m pytest tests/test_call_profiles.py
+"""
+
+import sys
+import types
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from api_client import create_message  # noqa: E402
+from call_profiles import CALL_PROFILES, load_call_profiles, parse_profile_overrides  # noqa: E402
+
+
+class Overloaded(Exception):
+    status_code = 529
+
+
+class FakeClient:
+    def __init__(self, fail_models=()):
+        self.fail_models = set(fail_models)
+        self.calls = []
+        self.messages = self
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if kwargs["model"] in self.fail_models:
+            raise Overloaded("overloaded")
+        return types.SimpleNamespace(content=[types.SimpleNamespace(text="ok")])
+
+
+def test_overrides_are_typed_and_do_not_touch_defaults():
+    profiles = load_call_profiles(parse_profile_overrides(
+        ["worksheet_content.max_tokens=1500", "stage0.temperature=0.2", "stage0.fallback_model=none"]))
+    assert profiles["worksheet_content"]["max_tokens"] == 1500
+    assert profiles["stage0"]["temperature"] == 0.2
+    assert profiles["stage0"]["fallback_model"] is None
+    assert CALL_PROFILES["worksheet_content"]["max_tokens"] == 2000
+
+
+def test_unknown_profile_or_field_is_rejected():
+    for items in (["stage9.model=x"], ["stage0.colour=x"], ["stage0model=x"]):
+        try:
+            load_call_profiles(parse_profile_overrides(items))
+        except ValueError:
+            continue
+        raise AssertionError(f"{items} should be rejected")
+
+
+def test_create_message_applies_profile_and_falls_back():
+    profile = {"model": "fast", "max_tokens": 100, "timeout": 30, "temperature": 0.0, "fallback_model": "big"}
+    client = FakeClient(fail_models={"fast"})
+    create_message(client, profile, messages=[])
+    assert [call["model"] for call in client.calls] == ["fast", "big"]
+    assert client.calls[1]["timeout"] == 30 and client.calls[1]["temperature"] == 0.0
+
+
+if __name__ == "__main__":
+    failures = 0
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            try:
+                func()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Tests for call_telemetry.py and hedged / coalesced requests in api_client.create_message
+
+Usage:
+    python3 tests/test_call_telemetry.py
+    python3 -m pytest tests/test_call_telemetry.py
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from api_client import create_message  # noqa: E402
+from call_telemetry import MIN_SAMPLES, TELEMETRY, CallTelemetry  # noqa: E402
+
+
+class SlowFirstClient:
+    """The first request hangs; later ones answer at once"""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+        self.messages = self
+        self._lock = threading.Lock()
+
+    def create(self, **kwargs):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        if call == 1:
+            self.release.wait(5)
+        return types.SimpleNamespace(content=[types.SimpleNamespace(text=f"call {call}")])
+
+
+def test_percentile_needs_min_samples():
+    telemetry = CallTelemetry()
+    for latency in range(1, MIN_SAMPLES):
+        telemetry.record("stage2b_section", "ok", float(latency))
+    assert telemetry.percentile("stage2b_section", 95) is None
+    for latency in range(MIN_SAMPLES, 21):
+        telemetry.record("stage2b_section", "ok", float(latency))
+    telemetry.record("stage2b_section", "timeout")
+    assert telemetry.percentile("stage2b_section", 50) == 10.0
+    assert telemetry.percentile("stage2b_section", 95) == 19.0
+    snapshot = telemetry.snapshot()["stage2b_section"]
+    assert snapshot["calls"] == 21 and snapshot["timeouts"] == 1
+
+
+def test_hedge_wins_over_straggler():
+    TELEMETRY.reset()
+    for _ in range(MIN_SAMPLES):
+        TELEMETRY.record("hedged", "ok", 0.05)
+    profile = {"name": "hedged", "model": "m", "max_tokens": 10, "hedge_percentile": 90}
+    client = SlowFirstClient()
+    start = time.monotonic()
+    response = create_message(client, profile, messages=[])
+    assert time.monotonic() - start < 2, "the hedge answered without waiting for the straggler"
+    assert response.content[0].text == "call 2"
+    client.release.set()
+    stats = TELEMETRY.snapshot()["hedged"]
+    assert stats["hedges"] == 1 and stats["hedge_wins"] == 1
+
+
+def test_unhedged_profile_sends_one_request():
+    TELEMETRY.reset()
+    for _ in range(MIN_SAMPLES):
+        TELEMETRY.record("plain", "ok", 0.01)
+    client = SlowFirstClient()
+    client.release.set()
+    create_message(client, {"name": "plain", "model": "m", "max_tokens": 10}, messages=[])
+    assert client.calls == 1
+    assert TELEMETRY.snapshot()["plain"]["hedges"] == 0
+
+
+def test_hedge_cancels_losing_async_request():
+    TELEMETRY.reset()
+    for _ in range(MIN_SAMPLES):
+        TELEMETRY.record("async", "ok", 0.05)
+    cancelled = []
+
+    class AsyncMessages:
+        calls = 0
+
+        async def create(self, **kwargs):
+            AsyncMessages.calls += 1
+            call = AsyncMessages.calls
+            try:
+                await asyncio.sleep(5 if call == 1 else 0)
+            except asyncio.CancelledError:
+                cancelled.append(call)
+                raise
+            return types.SimpleNamespace(content=[types.SimpleNamespace(text=f"call {call}")])
+
+    client = types.SimpleNamespace(messages=AsyncMessages())
+    profile = {"name": "async", "model": "m", "max_tokens": 10, "hedge_percentile": 90}
+    assert create_message(client, profile, messages=[]).content[0].text == "call 2"
+    for _ in range(50):  # cancellation is delivered on the core loop
+        if cancelled:
+            break
+        time.sleep(0.02)
+    assert cancelled == [1], "the straggler is cancelled, not left running"
+
+
+def test_concurrent_identical_requests_share_one_call():
+    TELEMETRY.reset()
+    client = SlowFirstClient()
+    profile = {"name": "shared", "model": "m", "max_tokens": 10}
+    results = []
+
+    def call(prompt):
+        results.append(create_message(client, profile, messages=[{"role": "user", "content": prompt}]))
+
+    threads = [threading.Thread(target=call, args=("same",)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    client.release.set()
+    for thread in threads:
+        thread.join()
+    assert client.calls == 1
+    assert {r.content[0].text for r in results} == {"call 1"}
+    assert TELEMETRY.snapshot()["shared"]["coalesced"] == 2
+
+    call("different")
+    assert client.calls == 2, "requests are only shared while one is in flight"
+
+
+if __name__ == "__main__":
+    failures = 0
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            try:
+                func()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Tests for create_kernel.py checkpoint envelopes and checkpoint locks between concurrent runs
+
+Usage:
+    python3 tests/test_checkpoint_lock.py
+    python3 -m pytest tests/test_checkpoint_lock.py
+"""
+
+import json
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import create_kernel  # noqa: E402
+from create_kernel import Config, KernelCreator  # noqa: E402
+
+STAGE0 = {"structure_detection": {"total_units": 12}, "chapter_alignment": {}}
+
+
+def _creator():
+    return KernelCreator("books/Test.txt", "Test Book", "A. Author", "1st", client=object(),
+                         protocols={}, book_text="Chapter 1 text")
+
+
+def _with_outputs(test):
+    original = Config.OUTPUTS_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.OUTPUTS_DIR = Path(tmp)
+        try:
+            test(Path(tmp))
+        finally:
+            Config.OUTPUTS_DIR = original
+
+
+def test_checkpoint_records_run_id_and_loads_legacy_files():
+    def check(outputs):
+        creator = _creator()
+        creator._save_checkpoint('kernel_stage0', STAGE0)
+        saved = json.loads((outputs / "Test_Book_kernel_stage0.json").read_text())
+        assert saved["_checkpoint"]["run_id"] == creator.run_id
+        assert _creator()._load_checkpoint('kernel_stage0') == STAGE0
+
+        (outputs / "Test_Book_kernel_stage2a.json").write_text(json.dumps({"narrative": {}}))
+        assert creator._load_checkpoint('kernel_stage2a') == {"narrative": {}}
+    _with_outputs(check)
+
+
+def test_second_run_waits_and_reuses_checkpoint():
+    if create_kernel.fcntl is None:
+        return
+
+    def check(outputs):
+        first, second = _creator(), _creator()
+        holding = threading.Event()
+
+        def build():
+            with first._checkpoint_lock('kernel_stage0'):
+                holding.set()
+                time.sleep(0.3)
+                first._save_checkpoint('kernel_stage0', STAGE0)
+
+        thread = threading.Thread(target=build)
+        thread.start()
+        holding.wait(5)
+        assert second.run_stage_graph({'Stage 0': ('stage0_structure_alignment', [])})
+        thread.join()
+        assert second.structure_alignment == STAGE0, "the waiting run reused the first run's checkpoint"
+        assert second.total_chapters == 12
+    _with_outputs(check)
+
+
+def test_fresh_waits_for_the_stage_being_built():
+    if create_kernel.fcntl is None:
+        return
+
+    def check(outputs):
+        builder, fresh = _creator(), _creator()
+        holding = threading.Event()
+        seen = []
+
+        def build():
+            with builder._checkpoint_lock('kernel_stage0'):
+                holding.set()
+                builder._save_checkpoint('kernel_stage0', STAGE0)
+                time.sleep(0.3)
+                seen.append(builder._load_checkpoint('kernel_stage0'))
+
+        thread = threading.Thread(target=build)
+        thread.start()
+        holding.wait(5)
+        fresh._clear_checkpoints_from('kernel_stage0')
+        thread.join()
+        assert seen == [STAGE0], "the checkpoint was not deleted while its stage held the lock"
+        assert not (outputs / "Test_Book_kernel_stage0.json").exists(), "--fresh still clears it afterwards"
+    _with_outputs(check)
+
+
+def test_lock_files_stay_out_of_outputs():
+    if create_kernel.fcntl is None:
+        return
+
+    def check(outputs):
+        creator = _creator()
+        with creator._checkpoint_lock('kernel_stage0'):
+            creator._save_checkpoint('kernel_stage0', STAGE0)
+        assert sorted(p.name for p in outputs.iterdir()) == [".locks", "Test_Book_kernel_stage0.json"]
+        assert [p.name for p in (outputs / ".locks").iterdir()] == ["Test_Book_kernel_stage0.lock"]
+    _with_outputs(check)
+
+
+if __name__ == "__main__":
+    failures = 0
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            try:
+                func()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    sys.exit(1 if failures else 0)
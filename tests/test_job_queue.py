@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Tests for job_queue.py - leases, lock keys and reclaiming a dead worker's job
+
+Usage:
+    python3 tests/test_job_queue.py
+    python3 -m pytest tests/test_job_queue.py
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from api_client import create_message  # noqa: E402
+from job_queue import DistributedWorker, JobQueueBackend, SQLiteJobQueue, lock_key  # noqa: E402
+from job_scheduler import CANCEL_EVENT, JobCancelled, check_cancelled  # noqa: E402
+
+KERNEL = {"book_path": "books/Giver.pdf", "title": "The Giver", "author": "Lois Lowry", "edition": "2014"}
+
+
+def test_lock_keys_name_the_title_stage():
+    assert lock_key("kernel", KERNEL) == "The_Giver_kernel"
+    assert lock_key("stage1b", {"stage1a_path": "/mnt/out/The_Giver_stage1a_v6_0.json"}) == "The_Giver_stage1b"
+    assert lock_key("stage2", {"stage1b_path": "The_Giver_stage1b_v6_0.json", "week": 2}) == "The_Giver_stage2"
+
+
+def test_partial_backend_fails_on_instantiation():
+    class NoHeartbeat(JobQueueBackend):
+        enqueue = claim = finish = list_jobs = lambda self, *args, **kwargs: None
+
+    try:
+        NoHeartbeat()
+        assert False, "a backend without heartbeat() should not instantiate"
+    except TypeError:
+        pass
+
+
+def test_same_title_stage_never_leased_twice():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = SQLiteJobQueue(Path(tmp) / "jobs.db")
+        first = queue.enqueue("kernel", KERNEL)
+        assert queue.enqueue("kernel", KERNEL)["id"] == first["id"], "identical pending jobs are merged"
+        queue.enqueue("kernel", {**KERNEL, "sections": ["climax"]})
+        other = queue.enqueue("stage2", {"stage1b_path": "Wonder_stage1b_v6_0.json"})
+
+        assert queue.claim("host-a")["id"] == other["id"], "interactive work is handed out first"
+        assert queue.claim("host-a")["id"] == first["id"]
+        assert queue.claim("host-b") is None, "the second Giver kernel job waits for the lease"
+        assert queue.finish(first["id"], "host-a", {"title": "The Giver"})
+        assert queue.claim("host-b")["params"]["sections"] == ["climax"]
+
+
+def test_expired_lease_is_reclaimed():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = SQLiteJobQueue(Path(tmp) / "jobs.db", max_attempts=2)
+        job = queue.enqueue("kernel", KERNEL)
+        assert queue.claim("dead-host", lease_seconds=0.05)["id"] == job["id"]
+        assert queue.claim("host-b") is None
+        time.sleep(0.1)
+
+        ran = []
+        worker = DistributedWorker(queue, "host-b", handlers={"kernel": lambda state, params: ran.append(1) or {}},
+                                   state=object())
+        record = worker.run_one()
+        assert record["status"] == "succeeded" and record["attempts"] == 2 and ran == [1]
+        assert not queue.finish(job["id"], "dead-host", {}), "the dead worker's late result is ignored"
+        assert queue.list_jobs()[0]["worker"] == "host-b"
+
+
+def test_job_failed_after_max_attempts():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = SQLiteJobQueue(Path(tmp) / "jobs.db", max_attempts=1)
+        queue.enqueue("kernel", KERNEL)
+        queue.claim("dead-host", lease_seconds=0.01)
+        time.sleep(0.05)
+        assert queue.claim("host-b") is None
+        job = queue.list_jobs()[0]
+        assert job["status"] == "failed" and "Lease expired" in job["error"]
+
+
+def test_relative_job_paths_resolve_against_shared_dir():
+    with tempfile.TemporaryDirectory() as tmp:
+        shared = Path(tmp) / "shared"
+        (shared / "outputs").mkdir(parents=True)
+        (shared / "outputs" / "Wonder_stage1b_v6_0.json").write_text("{}")
+        queue = SQLiteJobQueue(Path(tmp) / "jobs.db")
+        queue.enqueue("stage2", {"stage1b_path": "outputs/Wonder_stage1b_v6_0.json", "week": 1})
+        queue.enqueue("kernel", {**KERNEL, "book_path": "/library/Giver.pdf"})
+
+        seen = {}
+        handlers = {"stage2": lambda state, params: seen.update(stage2=params) or {},
+                    "kernel": lambda state, params: seen.update(kernel=params) or {}}
+        worker = DistributedWorker(queue, "host-a", handlers=handlers, state=object(), shared_dir=shared)
+        assert worker.run_one()["status"] == "succeeded" and worker.run_one()["status"] == "succeeded"
+        assert Path(seen["stage2"]["stage1b_path"]) == shared / "outputs" / "Wonder_stage1b_v6_0.json"
+        assert Path(seen["stage2"]["stage1b_path"]).exists()
+        assert seen["kernel"]["book_path"] == "/library/Giver.pdf", "absolute paths are left alone"
+        assert queue.list_jobs()[0]["params"]["stage1b_path"] == "outputs/Wonder_stage1b_v6_0.json"
+
+
+def test_lost_lease_cancels_the_running_job():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = SQLiteJobQueue(Path(tmp) / "jobs.db")
+        queue.enqueue("kernel", KERNEL)
+        queue.heartbeat = lambda *args, **kwargs: False  # another worker took the job over
+        calls, wrote = [], []
+        client = SimpleNamespace(messages=SimpleNamespace(create=lambda **params: calls.append(params)))
+
+        def handler(state, params):
+            assert CANCEL_EVENT.get().wait(5), "the heartbeat cancels the job"
+            try:
+                create_message(client, {"name": "stage1", "model": "m", "max_tokens": 10},
+                               messages=[{"role": "user", "content": "hi"}])
+            except JobCancelled:
+                pass
+            check_cancelled()
+            wrote.append(params)
+            return {}
+
+        worker = DistributedWorker(queue, "host-a", lease_seconds=0.2, handlers={"kernel": handler}, state=object())
+        record = worker.run_one()
+        assert record["status"] == "failed" and "JobCancelled" in record["error"]
+        assert calls == [], "no model call after the lease was lost"
+        assert wrote == [], "no write after the lease was lost"
+        assert CANCEL_EVENT.get() is None
+
+
+if __name__ == "__main__":
+    failures = 0
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            try:
+                func()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for job_scheduler.py - priority ordering, per-class limits, rate shares and invocations
+
+Usage:
+    python3 tests/test_job_scheduler.py
+    python3 -m pytest tests/test_job_scheduler.py
+"""
+
+import copy
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from job_scheduler import PRIORITY_CLASSES, JobScheduler, RateShares, job_class, parse_invocation  # noqa: E402
+
+
+def _classes(interactive=1, bulk=1):
+    classes = copy.deepcopy(PRIORITY_CLASSES)
+    classes['interactive']['max_concurrent'] = interactive
+    classes['bulk']['max_concurrent'] = bulk
+    return classes
+
+
+def test_interactive_jobs_start_before_queued_bulk():
+    scheduler = JobScheduler(_classes(interactive=1, bulk=2))
+    scheduler.submit("kernel-1", "bulk")
+    scheduler.submit("kernel-2", "bulk")
+    scheduler.submit("stage2-1", "interactive")
+    assert scheduler.acquire(timeout=0) == ("stage2-1", "interactive")
+    assert scheduler.acquire(timeout=0) == ("kernel-1", "bulk")
+
+
+def test_class_limits_keep_slots_for_interactive():
+    scheduler = JobScheduler(_classes(interactive=1, bulk=1))
+    scheduler.submit("kernel-1", "bulk")
+    scheduler.submit("kernel-2", "bulk")
+    assert scheduler.acquire(timeout=0) == ("kernel-1", "bulk")
+    assert scheduler.acquire(timeout=0) is None, "the second bulk job waits for the bulk slot"
+
+    scheduler.submit("stage1b-1", "interactive")
+    assert scheduler.acquire(timeout=0) == ("stage1b-1", "interactive")
+    scheduler.release("bulk")
+    assert scheduler.acquire(timeout=0) == ("kernel-2", "bulk")
+    assert scheduler.summary()["bulk"] == {"queued": 0, "running": 1, "max_concurrent": 1}
+
+
+def test_bulk_borrows_idle_interactive_share():
+    scheduler = JobScheduler(_classes())
+    shares = RateShares(scheduler, rpm=10)  # bulk bucket holds 1 token, interactive 1
+    assert shares.try_acquire("bulk") == 0
+    assert shares.try_acquire("bulk") == 0, "borrowed from the idle interactive class"
+    assert shares.try_acquire("bulk") > 0
+
+    scheduler = JobScheduler(_classes())
+    shares = RateShares(scheduler, rpm=10)
+    scheduler.submit("stage2-1", "interactive")
+    assert shares.try_acquire("bulk") == 0
+    assert shares.try_acquire("bulk") > 0, "no borrowing while interactive work is queued"
+    assert shares.try_acquire("interactive") == 0
+
+
+def test_parse_invocations():
+    kind, params = parse_invocation(
+        "python3 create_kernel.py books/Giver.pdf 'The Giver' 'Lois Lowry' 2014 "
+        "--from-stage kernel_stage2b --sections climax --profile stage2b_section.max_tokens=9000")
+    assert kind == "kernel" and job_class(kind) == "bulk"
+    assert params["title"] == "The Giver" and params["sections"] == ["climax"]
+    assert params["profiles"] == {"stage2b_section": {"max_tokens": "9000"}}
+
+    assert parse_invocation(["run_stage1b.py", "out/A_stage1a.json", "--defer-worksheets"]) == (
+        "stage1b", {"stage1a_path": "out/A_stage1a.json", "defer_worksheets": True})
+    assert parse_invocation("run_stage1b.py out/A_stage1a.json --book books/A.pdf") == (
+        "stage1b", {"stage1a_path": "out/A_stage1a.json", "book_path": "books/A.pdf"})
+    assert parse_invocation("run_stage2 out/A_stage1b.json --week 3") == (
+        "stage2", {"stage1b_path": "out/A_stage1b.json", "week": 3})
+
+    for bad in ("run_stage3.py x", "run_stage2.py --week 1",
+                "create_kernel.py b.pdf T A E --fresh --sections climax",
+                "create_kernel.py books/X.pdf 'T' 'A' 1 --plan", "run_stage1b.py out/A_stage1a.json --plan"):
+        try:
+            parse_invocation(bad)
+            assert False, f"expected ValueError for {bad!r}"
+        except ValueError:
+            pass
+
+
+if __name__ == "__main__":
+    failures = 0
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            try:
+                func()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    sys.exit(1 if failures else 0)
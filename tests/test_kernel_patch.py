@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Tests for kernel_patch.py - diff/apply round trips on synthetic and real kernels
+
+Usage:
+    python3 tests/test_kernel_patch.py
+    python3 -m pytest tests/test_kernel_patch.py
+"""
+
+import copy
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from create_kernel import Config, KernelCreator  # noqa: E402
+from kernel_patch import (  # noqa: E402
+    PatchError, apply_patch, apply_patch_chain, canonical_device_name,
+    diff_kernels, kernel_hash, load_patch, make_patch,
+)
+
+
+def _device(name, section, effect="effect"):
+    return {"name": name, "assigned_section": section, "effect": effect,
+            "examples": [{"freytag_section": section, "quote_snippet": "..."}]}
+
+
+def _kernel():
+    return {
+        "metadata": {"title": "Book", "kernel_version": "4.0"},
+        "extracts": {
+            "climax": {"chapter_range": "20-21", "rationale": "old"},
+            "resolution": {"chapter_range": "22-23", "rationale": "old"},
+        },
+        "micro_devices": [
+            _device("Dramatic Irony", "climax"),
+            _device("Imagery", "resolution"),
+            _device("Foreshadowing", "exposition"),
+        ],
+    }
+
+
+def test_canonical_device_name():
+    assert canonical_device_name("First-Person  Narration") == "first person narration"
+    assert canonical_device_name("first_person narration") == "first person narration"
+
+
+def test_identical_kernels_produce_no_ops():
+    assert diff_kernels(_kernel(), _kernel()) == []
+
+
+def test_round_trip_with_field_change_add_and_remove():
+    base = _kernel()
+    new = copy.deepcopy(base)
+    new["extracts"]["climax"]["rationale"] = "new"
+    new["micro_devices"][0]["effect"] = "sharper"
+    new["micro_devices"].pop(1)
+    new["micro_devices"].append(_device("Symbolism", "resolution"))
+
+    ops = diff_kernels(base, new)
+    assert apply_patch(base, ops) == new
+    assert base == _kernel(), "apply_patch must not modify the base kernel"
+    # Changed device field is a targeted replace, not a whole-device rewrite
+    assert {"op": "replace", "path": "/micro_devices/climax/dramatic irony/effect", "value": "sharper"} in ops
+
+
+def test_device_reorder_is_preserved():
+    base = _kernel()
+    new = copy.deepcopy(base)
+    new["micro_devices"].reverse()
+    ops = diff_kernels(base, new)
+    assert [op["op"] for op in ops] == ["reorder"]
+    assert apply_patch(base, ops) == new
+
+
+def test_section_filter_keeps_only_that_section():
+    base = _kernel()
+    new = copy.deepcopy(base)
+    new["extracts"]["climax"]["rationale"] = "new climax"
+    new["extracts"]["resolution"]["rationale"] = "new resolution"
+    new["micro_devices"][0]["effect"] = "changed"
+
+    ops = diff_kernels(base, new, sections=["climax"])
+    patched = apply_patch(base, ops)
+    assert patched["extracts"]["climax"]["rationale"] == "new climax"
+    assert patched["extracts"]["resolution"]["rationale"] == "old"
+    assert patched["micro_devices"][0]["effect"] == "changed"
+
+
+def test_section_filter_keeps_devices_moved_out_of_the_section():
+    # Regenerating climax relocated a device to resolution: remove under climax, add under resolution
+    base = _kernel()
+    new = copy.deepcopy(base)
+    new["micro_devices"].pop(0)
+    new["micro_devices"].append(_device("Dramatic Irony", "resolution", effect="relocated"))
+
+    ops = diff_kernels(base, new, sections=["climax"])
+    assert {op["path"] for op in ops} == {"/micro_devices/climax/dramatic irony",
+                                          "/micro_devices/resolution/dramatic irony"}
+    assert apply_patch(base, ops) == new, "the moved device must not be dropped"
+
+
+def test_patch_chain_verifies_base_hash():
+    v1 = _kernel()
+    v2 = copy.deepcopy(v1)
+    v2["metadata"]["kernel_version"] = "4.1"
+    v3 = copy.deepcopy(v2)
+    v3["micro_devices"][2]["effect"] = "later"
+
+    chain = [make_patch(v1, v2), make_patch(v2, v3)]
+    assert kernel_hash(apply_patch_chain(v1, chain)) == kernel_hash(v3)
+
+    try:
+        apply_patch_chain(v2, chain)
+    except PatchError:
+        pass
+    else:
+        raise AssertionError("Applying a chain to the wrong base should fail")
+
+
+def test_sections_rerun_saves_a_patch_against_the_previous_kernel():
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.KERNELS_DIR, saved = Path(tmp), Config.KERNELS_DIR
+        try:
+            kernel_path = Path(tmp) / "Book_kernel_v4_0.json"
+            previous = _kernel()
+            kernel_path.write_text(json.dumps(previous))
+            creator = KernelCreator("books/Book.txt", "Book", "A. Author", "1st", client=object(),
+                                    protocols={}, book_text="Chapter 1 text")
+            creator.set_section_targets(["climax"])
+            creator.kernel = copy.deepcopy(previous)
+            creator.kernel["extracts"]["climax"]["rationale"] = "new"
+            assert creator.save_kernel(kernel_path)
+        finally:
+            Config.KERNELS_DIR = saved
+        patches = list((Path(tmp) / "patches").glob("Book_kernel_v4_0_climax_*.patch.json"))
+        assert len(patches) == 1
+        patch = load_patch(patches[0])
+        assert [op["path"] for op in patch["operations"]] == ["/extracts/climax/rationale"]
+        assert apply_patch_chain(previous, [patch]) == json.loads(kernel_path.read_text())
+
+
+def test_round_trip_on_real_kernels():
+    kernels = sorted((REPO_ROOT / "kernels").glob("*_kernel_*.json"))
+    pairs = 0
+    for old_path, new_path in zip(kernels, kernels[1:]):
+        with open(old_path) as f:
+            old = json.load(f)
+        with open(new_path) as f:
+            new = json.load(f)
+        ops = diff_kernels(old, new)
+        assert apply_patch(old, ops) == new, f"{old_path.name} -> {new_path.name}"
+        pairs += 1
+    print(f"  ✓ {pairs} real kernel pairs round-tripped")
+
+
+if __name__ == "__main__":
+    failures = 0
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            try:
+                func()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    sys.exit(1 if failures else 0)
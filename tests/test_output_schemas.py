@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for output_schemas.py and api_client.call_structured (fake client, no API calls)
+
+Usage:
+    python3 tests/test_output_schemas.py
+    python3 -m pytest tests/test_output_schemas.py
+"""
+
+import sys
+import types
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from api_client import StructuredOutputError, call_structured  # noqa: E402
+from output_schemas import coerce, get_schema, validate  # noqa: E402
+from run_stage1a import extract_macro_elements  # noqa: E402
+
+
+class FakeClient:
+    """Returns queued responses: dicts as tool_use blocks, strings as text blocks"""
+
+    def __init__(self, *outputs):
+        self.outputs = list(outputs)
+        self.prompts = []
+        self.messages = self
+
+    def create(self, **kwargs):
+        self.prompts.append(kwargs["messages"][0]["content"])
+        out = self.outputs.pop(0)
+        if isinstance(out, str):
+            block = types.SimpleNamespace(type="text", text=out)
+        else:
+            block = types.SimpleNamespace(type="tool_use", name=kwargs["tool_choice"]["name"], input=out)
+        return types.SimpleNamespace(content=[block])
+
+
+def _call(client, name="stage2b_devices"):
+    return call_structured(client, "PROMPT", name, {"model": "m", "max_tokens": 100})
+
+
+def test_validate_reports_paths():
+    errors = validate({"devices": [{"name": "Imagery"}]}, get_schema("stage2b_devices"))
+    assert errors == ["$.devices[0]: missing required field 'anchor_phrase'"]
+
+
+def test_sections_narrow_stage1_schema():
+    schema = get_schema("stage1_extracts", sections=["climax"])
+    assert validate({"extracts": {"climax": {"chapter_range": "12", "primary_chapter": 12}}}, schema) == []
+
+
+def test_tool_output_is_returned_without_repair():
+    client = FakeClient({"devices": [{"name": "Imagery", "anchor_phrase": "cold"}]})
+    assert _call(client)["devices"][0]["name"] == "Imagery"
+    assert len(client.prompts) == 1
+
+
+def test_text_array_is_wrapped_for_stage2b():
+    client = FakeClient('```json\n[{"name": "Motif", "anchor_phrase": "x"}]\n```')
+    assert _call(client) == {"devices": [{"name": "Motif", "anchor_phrase": "x"}]}
+
+
+def test_legacy_pov_is_mapped_to_its_code():
+    macro = {"narrative": {"voice": {"pov": "THIRD_LIMITED"}, "structure": {}}, "rhetoric": {}, "device_mediation": {}}
+    assert validate(macro, get_schema("stage2a_macro")), "the spelled-out POV is outside the enum"
+    macro = coerce("stage2a_macro", macro)
+    assert macro["narrative"]["voice"]["pov"] == "TPL"
+    assert validate(macro, get_schema("stage2a_macro")) == []
+    assert coerce("stage2a_macro", {"narrative": {"voice": {"pov": "FP"}}})["narrative"]["voice"]["pov"] == "FP"
+
+    v3_4 = {"macro_variables": {"narrative": {"pov": "THIRD_LIMITED", "focalization": "INTERNAL"}}}
+    voice = extract_macro_elements(v3_4)["voice"]["variables"]
+    assert voice["pov"] == "TPL" and voice["focalization"] == "INTERNAL", "v3.4 kernels keep their voice"
+
+
+def test_invalid_output_gets_one_targeted_repair():
+    client = FakeClient({"devices": [{"name": "Imagery"}]},
+                        {"devices": [{"name": "Imagery", "anchor_phrase": "cold"}]})
+    assert _call(client)["devices"][0]["anchor_phrase"] == "cold"
+    assert "missing required field 'anchor_phrase'" in client.prompts[1]
+    assert "PROMPT" not in client.prompts[1], "repair call must not resend the original prompt"
+
+
+def test_failed_repair_raises():
+    client = FakeClient("not json", "still not json")
+    try:
+        _call(client)
+    except StructuredOutputError:
+        pass
+    else:
+        raise AssertionError("expected StructuredOutputError")
+
+
+if __name__ == "__main__":
+    failures = 0
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            try:
+                func()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Tests for passage_index.py - passage splitting, BM25 retrieval, disk cache and prompt grounding
+
+Usage:
+    python3 tests/test_passage_index.py
+    python3 -m pytest tests/test_passage_index.py
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import passage_index  # noqa: E402
+import run_stage1b  # noqa: E402
+from passage_index import PassageIndex, format_passages, index_for_book, split_passages, text_version  # noqa: E402
+from create_kernel import Config, KernelCreator  # noqa: E402
+from run_stage1b import build_worksheet_prompt, create_week_package  # noqa: E402
+from structure_detection import detect_structure  # noqa: E402
+
+FILLER = "The village went about its ordinary day while the neighbours talked over the garden wall. "
+
+
+def _book(chapters=10):
+    """Numbered chapters of filler; chapter 6 also holds the climax scene"""
+    parts = []
+    for number in range(1, chapters + 1):
+        body = [FILLER * 8 for _ in range(4)]
+        if number == 6:
+            body.insert(2, "Jonas suddenly realized the truth. He screamed and ran, terrified, his heart "
+                           "pounding, and fled across the river in the sled before the death of the baby.")
+        parts.append(f"Chapter {number}\n\n" + "\n\n".join(body))
+    return "\n\n".join(parts)
+
+
+def test_passages_keep_word_offsets():
+    text = "Short line.\n\n" + "Another short line.\n\n" + ("word " * 500) + "\n\n" + ("tail " * 90)
+    passages = split_passages(text)
+    words = text.split()
+    for passage in passages:
+        start = passage["start_word"]
+        assert passage["text"].split() == words[start:start + len(passage["text"].split())]
+    assert all(len(p["text"].split()) <= passage_index.MAX_PASSAGE_WORDS for p in passages)
+    assert passages[0]["text"].startswith("Short line. Another short line. word"), "short paragraphs are merged"
+    assert sum(len(p["text"].split()) for p in passages) == len(words)
+
+
+def test_search_ranks_and_filters_by_range():
+    text = _book()
+    index = PassageIndex(split_passages(text), text_version(text))
+    best = index.search("fled across the river in the sled", top=1)[0]
+    assert "sled" in best["text"]
+    assert not index.search("fled across the river in the sled", start_word=0, end_word=best["start_word"])
+    assert index.search("zeppelin") == []
+
+
+def test_budget_goes_to_the_best_passages_first():
+    weak = {"start_word": 0, "text": "He ran home. " + FILLER * 6}
+    strong = {"start_word": 5000, "text": "He screamed and ran, terrified, heart pounding, death behind him. " + FILLER * 6}
+    index = PassageIndex([weak, {"start_word": 2000, "text": FILLER * 7}, strong], "v")
+    results = index.search("screamed ran terrified heart pounding death", top=8)
+    assert results[0]["start_word"] == 5000 and results[1]["start_word"] == 0
+    text = format_passages(results, max_words=len(strong["text"].split()))
+    assert "death behind him" in text, "the top-ranked late passage is kept"
+    assert "He ran home." not in text, "the earlier, lower-ranked passage gets no budget"
+
+    two = format_passages(results, max_words=1000)
+    assert two.index("He ran home.") < two.index("He screamed"), "chosen passages are shown in book order"
+
+
+def test_disk_cache_skips_extraction():
+    with tempfile.TemporaryDirectory() as tmp:
+        book = Path(tmp) / "Book.txt"
+        book.write_text(_book(), encoding="utf-8")
+        cache_dir = Path(tmp) / ".passages"
+        built = index_for_book(book, book.read_text(encoding="utf-8"), cache_dir)
+        assert len(list(cache_dir.glob("Book.*.json"))) == 1
+
+        passage_index._INDEX_CACHE.clear()
+        loaded = index_for_book(book, cache_dir=cache_dir)
+        assert loaded.passages == built.passages
+        assert loaded.search("sled")[0]["start_word"] == built.search("sled")[0]["start_word"]
+
+
+def test_stage0_sends_climax_passages_and_worksheets_get_quote_context():
+    text = _book()
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.PASSAGE_CACHE_DIR, saved = Path(tmp), Config.PASSAGE_CACHE_DIR
+        try:
+            creator = KernelCreator("books/Test.txt", "Test Book", "A. Author", "1st",
+                                    client=object(), protocols={}, book_text=text)
+            sample = creator._create_detected_structure_sample(detect_structure(text))
+        finally:
+            Config.PASSAGE_CACHE_DIR = saved
+    chapter6 = sample.split("=== CHAPTER 6 ===")[1].split("=== CHAPTER")[0]
+    assert "Jonas suddenly realized the truth" in chapter6
+
+    week = {"text_title": "Test Book", "macro_element": "Climax", "micro_devices": [
+        {"name": "Imagery", "examples": [{"quote_snippet": "fled across the river in the sled", "chapter": 6}]}]}
+    package = create_week_package(week, 3, passages=creator.passage_index)
+    device = package["micro_devices"][0]
+    assert "the death of the baby" in device["source_context"]
+    prompt, _ = build_worksheet_prompt(device, package["macro_focus"], "Test Book")
+    assert "SOURCE PASSAGES" in prompt and "the death of the baby" in prompt
+
+
+def test_stage1b_without_a_client_skips_the_index():
+    def no_client():
+        raise ValueError("ANTHROPIC_API_KEY environment variable not set")
+
+    def no_index(*args, **kwargs):
+        raise AssertionError("a client-less run indexed the book")
+
+    stage1a = {"metadata": {"text_title": "Test Book", "author": "A. Author"},
+               "macro_micro_packages": {f"week{n}_package": {"macro_element": "Exposition", "micro_devices": [
+                   {"name": "Simile", "examples": [{"chapter": n, "quote_snippet": "a quote"}]}]}
+                   for n in range(1, 6)}}
+    saved = run_stage1b.OUTPUTS_DIR, run_stage1b.initialize_api_client, run_stage1b.index_for_book
+    with tempfile.TemporaryDirectory() as tmp:
+        book = Path(tmp) / "Test.txt"
+        book.write_text(_book(), encoding="utf-8")
+        stage1a["metadata"]["source_book"] = str(book)
+        stage1a_path = Path(tmp) / "Test_Book_stage1a_v6_0.json"
+        stage1a_path.write_text(json.dumps(stage1a))
+        run_stage1b.OUTPUTS_DIR, run_stage1b.initialize_api_client, run_stage1b.index_for_book = (
+            Path(tmp), no_client, no_index)
+        try:
+            assert Path(run_stage1b.run_stage1b(stage1a_path)).exists()
+        finally:
+            run_stage1b.OUTPUTS_DIR, run_stage1b.initialize_api_client, run_stage1b.index_for_book = saved
+
+
+if __name__ == "__main__":
+    failures = 0
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            try:
+                func()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    sys.exit(1 if failures else 0)
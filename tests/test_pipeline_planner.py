@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Tests for pipeline_planner.py - checkpoint and journal reuse, token count cache
+
+Usage:
+    python3 tests/test_pipeline_planner.py
+    python3 -m pytest tests/test_pipeline_planner.py
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import run_stage1b  # noqa: E402
+from create_kernel import FREYTAG_SECTIONS, Config, KernelCreator  # noqa: E402
+from pipeline_planner import TokenCounter, plan_kernel, plan_stage1b, summarize  # noqa: E402
+
+BOOK = "\n\n".join(f"Chapter {n}\n\n" + " ".join(f"word{n}" for _ in range(300)) for n in range(1, 11))
+
+
+def _kernel_checkpoints(creator):
+    creator._save_checkpoint('kernel_stage0', {"structure_detection": {"total_units": 10}, "chapter_alignment": {}})
+    creator._save_checkpoint('kernel_stage1', {"extracts": {
+        section: {"chapter_range": str(i * 2 + 1), "primary_chapter": i * 2 + 1}
+        for i, section in enumerate(FREYTAG_SECTIONS)}})
+    creator._save_checkpoint('kernel_stage2a', {"narrative": {}, "rhetoric": {}, "device_mediation": {}})
+    for section in FREYTAG_SECTIONS[:-1]:
+        creator._save_checkpoint(f'kernel_stage2b_{section}', [{"name": "Simile", "examples": []}])
+
+
+def test_kernel_plan_reuses_checkpoints():
+    original = Config.OUTPUTS_DIR, Config.PROTOCOL_CACHE_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.OUTPUTS_DIR, Config.PROTOCOL_CACHE_DIR = Path(tmp), Path(tmp) / ".compiled"
+        try:
+            creator = KernelCreator("books/Test.txt", "Test Book", "A. Author", "1st",
+                                    protocols={}, book_text=BOOK, plan_only=True)
+            _kernel_checkpoints(creator)
+            counter = TokenCounter(cache_path=Path(tmp) / "tokens.json")
+            plan = plan_kernel(creator, counter)
+            sources = {s['stage']: (s['source'], len(s['calls']), s['cached_calls']) for s in plan['stages']}
+            assert sources['Stage 0'] == ('checkpoint', 0, 0)
+            assert sources['Stage 2A'] == ('checkpoint', 0, 0)
+            assert sources['Stage 2B'] == ('model', 1, 4), "only the section without a checkpoint is called"
+            assert summarize(plan, rpm=0)['calls'] == 2
+
+            plan = plan_kernel(creator, counter, from_stage='kernel_stage2a')
+            assert summarize(plan, rpm=0)['calls'] == 7, "2A, all five 2B sections and the ReasoningDoc"
+        finally:
+            Config.OUTPUTS_DIR, Config.PROTOCOL_CACHE_DIR = original
+
+
+def test_stage1b_plan_skips_journaled_worksheets():
+    original = run_stage1b.OUTPUTS_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        run_stage1b.OUTPUTS_DIR = Path(tmp)
+        try:
+            stage1a = {
+                "metadata": {"text_title": "Test Book", "author": "A. Author"},
+                "macro_micro_packages": {
+                    f"week{n}_package": {"macro_element": "Exposition", "micro_devices": [
+                        {"name": name, "examples": [{"chapter": n, "quote_snippet": "a quote"}]}
+                        for name in ("Simile", "Metaphor")]}
+                    for n in range(1, 6)},
+            }
+            stage1a_path = Path(tmp) / "Test_Book_stage1a_v6_0.json"
+            stage1a_path.write_text(json.dumps(stage1a))
+
+            package = run_stage1b.create_week_package(dict(stage1a["macro_micro_packages"]["week1_package"],
+                                                           text_title="Test Book"), 1)
+            device = package['micro_devices'][0]
+            prompt, system = run_stage1b.build_worksheet_prompt(device, package['macro_focus'], "Test Book")
+            journal = run_stage1b.WorksheetJournal(Path(tmp) / "Test_Book_stage1b_journal.jsonl")
+            journal.record(1, device['name'], run_stage1b.WorksheetJournal.prompt_hash(prompt, system),
+                           {"mc_question": "What does the simile do?"})
+
+            counter = TokenCounter(cache_path=Path(tmp) / "tokens.json")
+            totals = summarize(plan_stage1b(stage1a_path, counter), rpm=0)
+            assert totals['calls'] == 9 and totals['cached_calls'] == 1
+            assert summarize(plan_stage1b(stage1a_path, counter, defer_worksheets=True), rpm=0)['calls'] == 0
+        finally:
+            run_stage1b.OUTPUTS_DIR = original
+
+
+def test_token_counts_are_cached_per_request():
+    class FakeMessages:
+        calls = 0
+
+        def count_tokens(self, **params):
+            FakeMessages.calls += 1
+            return SimpleNamespace(input_tokens=1234)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = Path(tmp) / "tokens.json"
+        counter = TokenCounter(SimpleNamespace(messages=FakeMessages()), cache_path)
+        assert counter.count("m", "prompt", "system") == 1234
+        assert counter.count("m", "prompt", "system") == 1234
+        assert FakeMessages.calls == 1 and counter.hits == 1
+        counter.save()
+
+        reloaded = TokenCounter(SimpleNamespace(messages=FakeMessages()), cache_path)
+        assert reloaded.count("m", "prompt", "system") == 1234 and FakeMessages.calls == 1
+        assert TokenCounter(cache_path=cache_path).count("m", "prompt", "system") == 4, \
+            "estimates are cached separately from API counts"
+
+
+if __name__ == "__main__":
+    failures = 0
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            try:
+                func()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    sys.exit(1 if failures else 0)
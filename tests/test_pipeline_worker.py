@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Tests for pipeline_worker.py - warm state, job handlers and the HTTP interface
+
+Usage:
+    python3 tests/test_pipeline_worker.py
+    python3 -m pytest tests/test_pipeline_worker.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from types import SimpleNamespace
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import create_kernel  # noqa: E402
+import pipeline_worker  # noqa: E402
+import run_stage1b  # noqa: E402
+from pipeline_worker import PipelineWorker, WarmState, make_handler, run_kernel_job, run_stage1b_job, run_stage2_job  # noqa: E402
+
+WORKSHEET = {
+    "mc_question": "What does the simile do?",
+    "mc_options": {k: f"Option {k}" for k in "ABCD"},
+    "mc_correct": "B",
+    "mc_explanation": "B names the effect.",
+    "sequencing_steps": {"step_1": "a", "step_2": "b", "step_3": "c"},
+    "sequencing_order": "1-A, 2-B, 3-C",
+    "location_hint": "Chapter 2",
+    "detail_sample": "the comparison",
+}
+
+STAGE1A = {
+    "metadata": {"text_title": "Test Book", "author": "A. Author"},
+    "macro_micro_packages": {
+        f"week{n}_package": {"macro_element": "Exposition", "micro_devices": [
+            {"name": "Simile", "examples": [{"chapter": n, "quote_snippet": "a quote"}]}]}
+        for n in range(1, 6)},
+}
+
+
+class FakeMessages:
+    """Answers every worksheet tool call with WORKSHEET"""
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def create(self, **params):
+        with self._lock:
+            self.calls += 1
+        block = SimpleNamespace(type="tool_use", name=params["tools"][0]["name"], input=dict(WORKSHEET))
+        return SimpleNamespace(content=[block])
+
+
+class FakeClient:
+    def __init__(self):
+        self.messages = FakeMessages()
+
+
+def _warm_state(client=None):
+    state = WarmState()
+    state._client = client
+    state._client_error = None if client else "no API key"
+    return state
+
+
+def _with_outputs(test):
+    """Run test(tmp) with Stage 1B writing into a temporary outputs directory"""
+    original = run_stage1b.OUTPUTS_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        run_stage1b.OUTPUTS_DIR = Path(tmp)
+        try:
+            test(Path(tmp))
+        finally:
+            run_stage1b.OUTPUTS_DIR = original
+
+
+def test_client_is_created_once_under_concurrent_access():
+    created = []
+
+    def slow_client():
+        time.sleep(0.05)
+        created.append(object())
+        return created[-1]
+
+    original = pipeline_worker.get_async_client
+    pipeline_worker.get_async_client = slow_client
+    try:
+        state = WarmState()
+        seen = []
+        threads = [threading.Thread(target=lambda: seen.append(state.client)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        pipeline_worker.get_async_client = original
+    assert len(created) == 1, "every request shares one client"
+    assert all(client is created[0] for client in seen)
+
+
+def test_book_text_is_cached_until_the_file_changes():
+    loads = []
+    original = create_kernel.load_book_text
+    create_kernel.load_book_text = lambda path: loads.append(Path(path).name) or Path(path).read_text()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            first, second = Path(tmp) / "first.txt", Path(tmp) / "second.txt"
+            first.write_text("one")
+            second.write_text("two")
+            state = WarmState(book_cache_size=1)
+            assert state.book_text(first) == "one" and state.book_text(first) == "one"
+            assert loads == ["first.txt"]
+
+            first.write_text("one, revised")
+            os.utime(first, (time.time() + 5, time.time() + 5))
+            assert state.book_text(first) == "one, revised", "a changed file is extracted again"
+            state.book_text(second)
+            state.book_text(first)
+            assert loads == ["first.txt", "first.txt", "second.txt", "first.txt"], "LRU of one book"
+    finally:
+        create_kernel.load_book_text = original
+
+
+def test_handlers_validate_params():
+    state = _warm_state()
+    for handler, params, error in (
+            (run_kernel_job, {"title": "Test Book"}, ValueError),
+            (run_kernel_job, {"book_path": "b.txt", "title": "T", "author": "A", "edition": "E"}, ValueError),
+            (run_stage1b_job, {"stage1a_path": "/nonexistent/stage1a.json"}, FileNotFoundError),
+            (run_stage2_job, {}, ValueError),
+            (run_stage2_job, {"stage1b_path": "/nonexistent/stage1b.json"}, FileNotFoundError)):
+        try:
+            handler(state, params)
+            assert False, f"{handler.__name__}({params}) should raise {error.__name__}"
+        except error:
+            pass
+
+
+def test_stage1b_job_uses_the_warm_client():
+    def check(tmp):
+        stage1a_path = tmp / "Test_Book_stage1a_v6_0.json"
+        stage1a_path.write_text(json.dumps(STAGE1A))
+        client = FakeClient()
+        result = run_stage1b_job(_warm_state(client), {"stage1a_path": str(stage1a_path)})
+        with open(result["output_path"], encoding="utf-8") as f:
+            package = json.load(f)
+        assert client.messages.calls == 5
+        assert all(d["worksheet_content"] == WORKSHEET
+                   for week in package["week_packages"] for d in week["micro_devices"])
+    _with_outputs(check)
+
+
+def test_stage1b_job_grounds_worksheets_in_the_book():
+    def check(tmp):
+        stage1a_path = tmp / "Test_Book_stage1a_v6_0.json"
+        stage1a_path.write_text(json.dumps(STAGE1A))
+        book = tmp / "Test_Book.txt"
+        book.write_text("Chapter 1\n\n" + "The village slept. " * 40 + "\n\nHe spoke a quote from the old song.")
+        original = run_stage1b.index_for_book
+        run_stage1b.index_for_book = lambda path: original(path, cache_dir=tmp / ".passages")
+        try:
+            result = run_stage1b_job(_warm_state(FakeClient()), {"stage1a_path": str(stage1a_path),
+                                                                 "book_path": str(book)})
+        finally:
+            run_stage1b.index_for_book = original
+        with open(result["output_path"], encoding="utf-8") as f:
+            package = json.load(f)
+        assert all("a quote from the old song" in d["source_context"]
+                   for week in package["week_packages"] for d in week["micro_devices"])
+    _with_outputs(check)
+
+
+def _request(url, payload=None):
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data), timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_http_round_trip():
+    def check(tmp):
+        stage1a_path = tmp / "Test_Book_stage1a_v6_0.json"
+        stage1a_path.write_text(json.dumps(STAGE1A))
+        worker = PipelineWorker(rate_budget=0)
+        worker.state = _warm_state(FakeClient())
+        for thread in worker._threads:
+            thread.start()
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(worker))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            assert _request(f"{base}/jobs", {"kind": "rebuild"})[0] == 400
+            assert _request(f"{base}/jobs/unknown")[0] == 404
+
+            status, job = _request(f"{base}/jobs", {"invoke": f"run_stage1b.py {stage1a_path}"})
+            assert status == 202 and job["kind"] == "stage1b" and job["priority"] == "interactive"
+            deadline = time.time() + 10
+            while job["status"] in ("queued", "running") and time.time() < deadline:
+                time.sleep(0.05)
+                job = _request(f"{base}/jobs/{job['id']}")[1]
+            assert job["status"] == "succeeded", job["error"]
+            assert Path(job["result"]["output_path"]).exists()
+
+            status, health = _request(f"{base}/health")
+            assert status == 200 and health["client_ready"] and health["queued"] == 0
+            assert [j["id"] for j in _request(f"{base}/jobs")[1]] == [job["id"]]
+        finally:
+            server.shutdown()
+            server.server_close()
+    _with_outputs(check)
+
+
+if __name__ == "__main__":
+    failures = 0
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            try:
+                func()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Tests for protocol_compiler.py - section extraction, minification and caching
+
+Usage:
+    python3 tests/test_protocol_compiler.py
+    python3 -m pytest tests/test_protocol_compiler.py
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from protocol_compiler import compile_stage_protocols, extract_sections, minify_markdown  # noqa: E402
+
+PROTOCOL = """# PROTOCOL
+
+## Stage 1: Sections
+
+Stage 1 text.
+
+## Stage 2A: Macro
+
+**Output Structure:**
+
+| Code | Meaning |
+|------|---------|
+| TPL  | Third Person Limited |
+
+```markdown
+## Not a heading
+```
+
+## Stage 2B: Devices
+
+Stage 2B text.
+"""
+
+
+def test_extract_include_stops_at_next_sibling():
+    text = extract_sections(PROTOCOL, include=["Stage 2A"])
+    assert text.startswith("## Stage 2A")
+    assert "## Not a heading" in text, "headings inside code fences are content"
+    assert "Stage 1 text" not in text and "Stage 2B text" not in text
+
+
+def test_extract_exclude_drops_section():
+    text = extract_sections(PROTOCOL, exclude=["Stage 2B"])
+    assert "Stage 1 text" in text and "Stage 2B" not in text
+
+
+def test_minify_strips_markup_and_keeps_content():
+    text = minify_markdown(PROTOCOL)
+    assert "**" not in text and "|---" not in text and "\n\n" not in text
+    assert "Output Structure:" in text
+    assert "TPL | Third Person Limited" in text
+
+
+def test_compiled_protocols_are_cached_on_disk():
+    stages = {"stage2a": {"kernel_validation": {"include": ["Stage 2A"]}}}
+    with tempfile.TemporaryDirectory() as tmp:
+        first = compile_stage_protocols({"kernel_validation": PROTOCOL}, Path(tmp), stages, verbose=False)
+        assert len(list(Path(tmp).glob("*.json"))) == 1
+        second = compile_stage_protocols({"kernel_validation": PROTOCOL}, Path(tmp), stages, verbose=False)
+        assert first == second
+        compile_stage_protocols({"kernel_validation": PROTOCOL + "\nchanged"}, Path(tmp), stages, verbose=False)
+        assert len(list(Path(tmp).glob("*.json"))) == 2, "a changed source gets a new cache entry"
+
+
+if __name__ == "__main__":
+    failures = 0
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            try:
+                func()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    sys.exit(1 if failures else 0)
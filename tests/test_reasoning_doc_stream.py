@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Tests for the streamed ReasoningDoc writer - partial file, resume and max_tokens continuation
+
+Usage:
+    python3 tests/test_reasoning_doc_stream.py
+    python3 -m pytest tests/test_reasoning_doc_stream.py
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from api_client import stream_message  # noqa: E402
+from create_kernel import Config, KernelCreator  # noqa: E402
+
+
+class StreamingMessages:
+    """messages.stream fake: each call streams the next script entry
+
+    An entry is (chunks, stop_reason); an Exception in chunks is raised
+    mid-stream after the chunks before it were delivered.
+    """
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.requests = []
+
+    def stream(self, **params):
+        self.requests.append(params)
+        chunks, stop_reason = self.script.pop(0)
+        return FakeStream(chunks, stop_reason)
+
+
+class FakeStream:
+    def __init__(self, chunks, stop_reason):
+        self.chunks = chunks
+        self.stop_reason = stop_reason
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @property
+    async def text_stream(self):
+        for chunk in self.chunks:
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+
+    async def get_final_message(self):
+        return SimpleNamespace(stop_reason=self.stop_reason, usage=SimpleNamespace(output_tokens=7),
+                               content=[SimpleNamespace(text="".join(self.chunks))])
+
+
+def _save(messages, tmp):
+    creator = KernelCreator("books/Test.txt", "Test Book", "A. Author", "1st",
+                            client=SimpleNamespace(messages=messages), protocols={}, book_text="Chapter 1 text")
+    creator.kernel = {"macro_variables": {}, "micro_devices": [], "chapter_alignment": {}}
+    return creator.save_reasoning_document(Path(tmp) / "Test_Book_ReasoningDoc_v4_1.md")
+
+
+def test_failed_stream_keeps_partial_and_resumes():
+    with tempfile.TemporaryDirectory() as tmp:
+        output = Path(tmp) / "Test_Book_ReasoningDoc_v4_1.md"
+        failing = StreamingMessages([(["# Thesis\n\n", "The novel ", ConnectionError("dropped")], None)])
+        assert not _save(failing, tmp)
+        assert not output.exists()
+        partials = list(Path(tmp).glob("*.partial"))
+        assert len(partials) == 1 and partials[0].read_text() == "# Thesis\n\nThe novel "
+
+        resumed = StreamingMessages([([" argues that memory is power.\n"], "end_turn")])
+        assert _save(resumed, tmp)
+        assert resumed.requests[0]["messages"][-1] == {"role": "assistant", "content": "# Thesis\n\nThe novel"}
+        assert output.read_text() == "# Thesis\n\nThe novel argues that memory is power.\n"
+        assert not list(Path(tmp).glob("*.partial")), "the partial is moved into place"
+
+
+class DiskCheckingMessages(StreamingMessages):
+    """Records the partial file's content on disk as each request starts"""
+
+    def __init__(self, script, tmp):
+        super().__init__(script)
+        self.tmp = Path(tmp)
+        self.on_disk = []
+
+    def stream(self, **params):
+        self.on_disk.append([p.read_text() for p in self.tmp.glob("*.partial")])
+        return super().stream(**params)
+
+
+def test_resumed_partial_is_never_emptied():
+    with tempfile.TemporaryDirectory() as tmp:
+        _save(StreamingMessages([(["# Thesis\n\n", "The novel \n", ConnectionError("dropped")], None)]), tmp)
+        resumed = DiskCheckingMessages([([ConnectionError("dropped again")], None), ([" argues.\n"], "end_turn")], tmp)
+        assert not _save(resumed, tmp)
+        assert resumed.on_disk == [["# Thesis\n\nThe novel"]], "the prefix is on disk while the resumed call runs"
+        assert _save(resumed, tmp)
+        assert (Path(tmp) / "Test_Book_ReasoningDoc_v4_1.md").read_text() == "# Thesis\n\nThe novel argues.\n"
+
+
+def test_max_tokens_stop_is_continued():
+    with tempfile.TemporaryDirectory() as tmp:
+        messages = StreamingMessages([(["Part one "], "max_tokens"), ([" part two."], "end_turn")])
+        assert _save(messages, tmp)
+        assert len(messages.requests) == 2
+        assert messages.requests[1]["messages"][-1]["content"] == "Part one"
+        assert (Path(tmp) / "Test_Book_ReasoningDoc_v4_1.md").read_text() == "Part one part two."
+
+
+def test_out_of_continuations_keeps_partial():
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.REASONING_DOC_CONTINUATIONS, saved = 1, Config.REASONING_DOC_CONTINUATIONS
+        try:
+            messages = StreamingMessages([(["Part one "], "max_tokens"), ([" part two"], "max_tokens")])
+            assert not _save(messages, tmp), "a doc still at max_tokens is not finished"
+        finally:
+            Config.REASONING_DOC_CONTINUATIONS = saved
+        assert len(messages.requests) == 2
+        assert not (Path(tmp) / "Test_Book_ReasoningDoc_v4_1.md").exists()
+        partials = list(Path(tmp).glob("*.partial"))
+        assert len(partials) == 1 and partials[0].read_text() == "Part one part two"
+
+
+def test_stream_message_without_streaming_client():
+    chunks = []
+    client = SimpleNamespace(messages=SimpleNamespace(
+        create=lambda **params: SimpleNamespace(content=[SimpleNamespace(text="whole text")])))
+    response = stream_message(client, {"name": "plain", "model": "m", "max_tokens": 10}, chunks.append,
+                              messages=[{"role": "user", "content": "hi"}])
+    assert chunks == ["whole text"] and response.content[0].text == "whole text"
+
+
+if __name__ == "__main__":
+    failures = 0
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            try:
+                func()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    sys.exit(1 if failures else 0)
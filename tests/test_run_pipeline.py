@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for run_pipeline.py - ReasoningDoc overlapped with Stage 1A/1B, Stage 2 waits for it
+
+Usage:
+    python3 tests/test_run_pipeline.py
+    python3 -m pytest tests/test_run_pipeline.py
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import run_pipeline  # noqa: E402
+
+
+class FakeCreator:
+    """Kernel build whose ReasoningDoc only finishes once Stage 1B has run"""
+
+    title = "Test Book"
+    kernel_path = Path("kernels/Test_Book_kernel_v4_0.json")
+    client = object()
+    passage_index = None
+
+    def __init__(self, events, doc_ok=True):
+        self.events = events
+        self.doc_ok = doc_ok
+        self.stage1b_ran = threading.Event()
+
+    def run(self, reasoning_doc=True):
+        assert reasoning_doc is False, "the pipeline generates the ReasoningDoc itself"
+        self.events.append("kernel")
+        return True
+
+    def generate_reasoning_document(self):
+        self.events.append("doc started")
+        assert self.stage1b_ran.wait(5), "Stage 1B ran while the ReasoningDoc was generating"
+        self.events.append("doc saved")
+        return self.doc_ok
+
+
+def _run(creator, events, **kwargs):
+    stages = {name: getattr(run_pipeline, name)
+              for name in ("run_stage1a", "generate_validation_report", "run_stage1b", "run_stage2")}
+
+    def stage1b(path, client=None, call_profiles=None, defer_worksheets=False):
+        assert client is creator.client
+        events.append("stage1b")
+        creator.stage1b_ran.set()
+        return Path("outputs/Test_Book_stage1b_v6_0.json")
+
+    run_pipeline.run_stage1a = lambda path: (events.append("stage1a"), (Path("a.json"), {"metadata": {}}))[1]
+    run_pipeline.generate_validation_report = lambda data, name: None
+    run_pipeline.run_stage1b = stage1b
+    run_pipeline.run_stage2 = lambda path, week_num=None, all_weeks=False: events.append(("stage2", week_num, all_weeks))
+    try:
+        return run_pipeline.run_pipeline(creator, **kwargs)
+    finally:
+        for name, func in stages.items():
+            setattr(run_pipeline, name, func)
+
+
+def test_stage2_waits_for_overlapped_reasoning_doc():
+    events = []
+    assert _run(FakeCreator(events), events)
+    assert events.index("stage1b") < events.index("doc saved") < events.index(("stage2", None, True))
+    assert events[0] == "kernel"
+
+
+def test_failed_reasoning_doc_stops_before_stage2():
+    events = []
+    assert not _run(FakeCreator(events, doc_ok=False), events, week=2)
+    assert "stage1b" in events and not any(isinstance(e, tuple) for e in events)
+
+
+if __name__ == "__main__":
+    failures = 0
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            try:
+                func()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    sys.exit(1 if failures else 0)
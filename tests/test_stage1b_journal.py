@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Tests for the run_stage1b.py worksheet journal - resume after an interrupted run
+
+Usage:
+    python3 tests/test_stage1b_journal.py
+    python3 -m pytest tests/test_stage1b_journal.py
+"""
+
+import asyncio
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from run_stage1b import WorksheetJournal, create_week_package  # noqa: E402
+
+WORKSHEET = {
+    "mc_question": "What does the simile do?",
+    "mc_options": {k: f"Option {k}" for k in "ABCD"},
+    "mc_correct": "B",
+    "mc_explanation": "B names the effect.",
+    "sequencing_steps": {"step_1": "a", "step_2": "b", "step_3": "c"},
+    "sequencing_order": "1-A, 2-B, 3-C",
+    "location_hint": "Chapter 2",
+    "detail_sample": "the comparison",
+}
+
+WEEK = {
+    "text_title": "Test Book",
+    "macro_element": "Exposition",
+    "micro_devices": [{"name": name, "examples": [{"chapter": 1, "quote_snippet": "a quote"}]}
+                      for name in ("Simile", "Metaphor", "Imagery")],
+}
+
+
+class Crash(BaseException):
+    """Stands in for the process dying mid-run"""
+
+
+class FakeMessages:
+    """Worksheet tool calls; raises Crash after `limit` calls"""
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def create(self, **params):
+        with self._lock:
+            if self.limit is not None and self.calls >= self.limit:
+                raise Crash
+            self.calls += 1
+        block = SimpleNamespace(type="tool_use", name=params["tools"][0]["name"], input=dict(WORKSHEET))
+        return SimpleNamespace(content=[block])
+
+
+def test_journal_ignores_truncated_line():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "journal.jsonl"
+        journal = WorksheetJournal(path)
+        journal.record(1, "Simile", "abc", WORKSHEET)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"week": 1, "device": "Meta')  # crash mid-write
+        reloaded = WorksheetJournal(path)
+        assert reloaded.get(1, "Simile", "abc") == WORKSHEET
+        assert len(reloaded.entries) == 1
+
+
+def test_restart_replays_completed_devices():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "journal.jsonl"
+        interrupted = FakeMessages(limit=2)
+        try:
+            create_week_package(dict(WEEK), 1, SimpleNamespace(messages=interrupted), journal=WorksheetJournal(path))
+            assert False, "expected the run to be interrupted"
+        except Crash:
+            pass
+        assert interrupted.calls == 2
+
+        resumed = FakeMessages()
+        package = create_week_package(dict(WEEK), 1, SimpleNamespace(messages=resumed),
+                                      journal=WorksheetJournal(path))
+        assert resumed.calls == 1, "only the remaining device is generated"
+        assert all(d["worksheet_content"] == WORKSHEET for d in package["micro_devices"])
+
+
+class LoopCheckingJournal(WorksheetJournal):
+    """Records whether each fsync ran on a thread with a running event loop"""
+
+    def record(self, *args):
+        try:
+            asyncio.get_running_loop()
+            self.on_loop = getattr(self, "on_loop", 0) + 1
+        except RuntimeError:
+            pass
+        super().record(*args)
+
+
+def test_journal_writes_stay_off_the_event_loop():
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = LoopCheckingJournal(Path(tmp) / "journal.jsonl")
+        create_week_package(dict(WEEK), 1, SimpleNamespace(messages=FakeMessages()), journal=journal)
+        assert len(journal.entries) == 3
+        assert not getattr(journal, "on_loop", 0), "journal fsyncs ran on the async core's loop"
+
+
+if __name__ == "__main__":
+    failures = 0
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            try:
+                func()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for structure_detection.py - heading detection and conventional alignment
+
+Usage:
+    python3 tests/test_structure_detection.py
+    python3 -m pytest tests/test_structure_detection.py
+"""
+
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from structure_detection import (  # noqa: E402
+    climax_candidates, conventional_alignment, detect_structure, parse_number,
+)
+
+
+def _filler(n):
+    return " ".join(f"word{i}" for i in range(n))
+
+
+def test_parse_number():
+    assert parse_number("12") == 12
+    assert parse_number("Twenty-three") == 23
+    assert parse_number("XIV") == 14
+    assert parse_number("Jonas") is None
+
+
+def test_detects_numbered_chapters():
+    text = "\n".join(f"Chapter {n}\n{_filler(500)}" for n in range(1, 9))
+    result = detect_structure(text)
+    assert result["confident"]
+    assert result["total_units"] == 8
+    assert [c["number"] for c in result["chapters"]] == list(range(1, 9))
+
+
+def test_detects_headings_glued_to_previous_page():
+    # PDF extraction often runs the heading into the previous page's last sentence
+    pages = [f"{_filler(500)} the end.{word}" for word in ["Two", "Three", "Four", "Five"]]
+    text = "One\n" + "\n".join(pages) + "\n" + _filler(500)
+    result = detect_structure(text)
+    assert result["total_units"] == 5
+
+
+def test_unmarked_text_is_not_confident():
+    result = detect_structure(_filler(5000))
+    assert not result["confident"]
+
+
+def test_too_few_chapters_for_an_alignment_are_not_confident():
+    # conventional_alignment needs 5 chapters; Stage 0 must fall back to the sample
+    text = "\n".join(f"Chapter {n}\n{_filler(500)}" for n in range(1, 5))
+    result = detect_structure(text)
+    assert result["total_units"] == 4
+    assert not result["confident"]
+
+
+def test_conventional_alignment_covers_every_chapter():
+    for total in range(5, 61):
+        alignment = conventional_alignment(total)
+        chapters = [c for section in alignment.values() for c in section["chapters"]]
+        assert chapters == list(range(1, total + 1)), f"{total} chapters"
+        assert alignment["climax"]["primary_chapter"] in climax_candidates(total)
+
+
+if __name__ == "__main__":
+    failures = 0
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            try:
+                func()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Tests for taxonomy_index.py - Artifact 1 parsing and per-section slices
+
+Usage:
+    python3 tests/test_taxonomy_index.py
+    python3 -m pytest tests/test_taxonomy_index.py
+"""
+
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from taxonomy_index import device_aliases, get_taxonomy_index, section_slice  # noqa: E402
+
+TIER_MAP = {'Metaphor': 1, 'Flashback': 2, 'Symbolism': 3, 'Circular Structure': 3, 'Narrator': 5}
+TIER_TO_SECTION = {1: 'exposition', 2: 'rising_action', 3: 'climax', 4: 'falling_action', 5: 'resolution'}
+
+TAXONOMY = """# DEVICE TAXONOMY
+
+### FIGURATIVE
+1. Metaphor - Direct comparison
+2. Symbolism - Object representing concept
+3. Circular/Spiral Structure - Returns to beginning
+
+### TEMPORAL
+4. Flashback (Analepsis) - Return to past
+5. Rhythm/Meter - Pattern of stressed syllables
+
+## OUTPUT FORMAT
+1. Not a device
+"""
+
+
+def test_device_aliases():
+    assert device_aliases("Flashback (Analepsis)") == ["Flashback", "Analepsis"]
+    assert "Spiral Structure" in device_aliases("Circular/Spiral Structure")
+    assert "Circular Structure" in device_aliases("Circular/Spiral Structure")
+
+
+def test_parse_skips_non_device_lists():
+    index = get_taxonomy_index(TAXONOMY, TIER_MAP)
+    assert [e["number"] for e in index["entries"]] == [1, 2, 3, 4, 5]
+    assert index["entries"][2]["tiers"] == [3]
+    assert index["entries"][4]["tiers"] == []
+
+
+def test_section_slice_keeps_tier_and_untiered_entries():
+    climax = section_slice(TAXONOMY, "climax", TIER_MAP, TIER_TO_SECTION)
+    assert "Symbolism" in climax and "Circular/Spiral" in climax
+    assert "Rhythm/Meter" in climax, "untiered entries are always allowed"
+    assert "Metaphor" not in climax and "Flashback" not in climax
+    assert "### TEMPORAL" in climax
+
+
+def test_real_taxonomy_covers_every_entry():
+    from create_kernel import Config, DEVICE_TIER_MAP, FREYTAG_SECTIONS, TIER_TO_FREYTAG
+    text = (REPO_ROOT / Config.PROTOCOLS_DIR / Config.ARTIFACT_1).read_text(encoding="utf-8")
+    index = get_taxonomy_index(text, DEVICE_TIER_MAP)
+    sliced = "\n".join(section_slice(text, s, DEVICE_TIER_MAP, TIER_TO_FREYTAG) for s in FREYTAG_SECTIONS)
+    for entry in index["entries"]:
+        assert entry["lines"][0] in sliced, entry["name"]
+
+
+if __name__ == "__main__":
+    failures = 0
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            try:
+                func()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Tests for usage_ledger.py - per-call rows from api_client, call context and aggregation
+
+Usage:
+    python3 tests/test_usage_ledger.py
+    python3 -m pytest tests/test_usage_ledger.py
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from api_client import acreate_message, create_message, run_concurrently  # noqa: E402
+from usage_ledger import call_context, call_cost, disable_ledger, enable_ledger  # noqa: E402
+
+
+class Overloaded(Exception):
+    status_code = 529
+
+
+class FakeMessages:
+    """Answers with usage counts; raises Overloaded for models in `failing`"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+
+    def create(self, **params):
+        if params["model"] in self.failing:
+            raise Overloaded("overloaded")
+        usage = SimpleNamespace(input_tokens=1000, output_tokens=200,
+                                cache_creation_input_tokens=None, cache_read_input_tokens=500)
+        return SimpleNamespace(content=[SimpleNamespace(text="ok")], usage=usage)
+
+
+def _with_ledger(test):
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = enable_ledger(Path(tmp) / "usage.db")
+        try:
+            test(ledger)
+        finally:
+            disable_ledger()
+
+
+def test_calls_are_recorded_under_their_context():
+    def check(ledger):
+        client = SimpleNamespace(messages=FakeMessages())
+        profile = {"name": "stage2b_section", "model": "claude-sonnet-4-20250514", "max_tokens": 10}
+
+        async def section_call(section):
+            with call_context(section=section):
+                return await acreate_message(client, profile, messages=[{"role": "user", "content": section}])
+
+        with call_context(book="Test Book", run_id="run1", stage="Stage 2B"):
+            run_concurrently([section_call("climax"), section_call("resolution")])
+        create_message(client, {**profile, "name": "reasoning_doc"}, messages=[{"role": "user", "content": "doc"}])
+
+        rows = ledger.aggregate(["book", "stage", "section"])
+        assert [(r["book"], r["stage"], r["section"], r["calls"]) for r in rows] == [
+            ("-", "-", "-", 1), ("Test Book", "Stage 2B", "climax", 1), ("Test Book", "Stage 2B", "resolution", 1)]
+        assert rows[1]["input_tokens"] == 1000 and rows[1]["cache_read_tokens"] == 500
+        assert abs(rows[1]["cost_usd"] - call_cost("claude-sonnet-4-20250514", 1000, 200, 0, 500)) < 1e-9
+        assert ledger.aggregate(["run"], book="Test Book")[0]["run"] == "run1"
+    _with_ledger(check)
+
+
+def test_fallback_is_recorded_as_retry():
+    def check(ledger):
+        client = SimpleNamespace(messages=FakeMessages(failing={"primary-model"}))
+        profile = {"name": "worksheet_content", "model": "primary-model", "max_tokens": 10,
+                   "fallback_model": "claude-sonnet-4-20250514"}
+        with call_context(book="Test Book", stage="Stage 1B", device="Simile"):
+            create_message(client, profile, messages=[{"role": "user", "content": "worksheet"}])
+
+        rows = {r["model"]: r for r in ledger.aggregate(["model"], stage="Stage 1B")}
+        assert rows["primary-model"]["failed"] == 1 and rows["primary-model"]["retries"] == 0
+        assert rows["claude-sonnet-4-20250514"]["retries"] == 1
+        assert rows["claude-sonnet-4-20250514"]["output_tokens"] == 200
+    _with_ledger(check)
+
+
+def test_aggregate_filters_by_day():
+    def check(ledger):
+        for day, tokens in (("2026-10-01", 100), ("2026-10-02", 300), ("2026-10-02", 500)):
+            ledger.record({"ts": f"{day}T12:00:00", "day": day, "book": "Test Book", "stage": "Stage 1",
+                           "model": "m", "input_tokens": tokens, "output_tokens": 0, "cache_write_tokens": 0,
+                           "cache_read_tokens": 0, "cost_usd": 0.0, "retry": "", "outcome": "ok", "latency": 1.0})
+        rows = ledger.aggregate(["day"], since="2026-10-02")
+        assert [(r["day"], r["calls"], r["input_tokens"]) for r in rows] == [("2026-10-02", 2, 800)]
+        try:
+            ledger.aggregate(["week"])
+            assert False, "expected ValueError for an unknown grouping"
+        except ValueError:
+            pass
+    _with_ledger(check)
+
+
+if __name__ == "__main__":
+    failures = 0
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            try:
+                func()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+USAGE LEDGER
+Persistent per-call token, cost and latency records, keyed by book, stage,
+section, device and run
+
+Every model request sent through api_client is appended to a SQLite ledger
+(outputs/usage.db) once a CLI or worker has enabled it: model, call profile,
+input/output/cache tokens, latency, retry role and outcome. The book, stage,
+section, device and run ID come from CALL_CONTEXT, which create_kernel.py and
+run_stage1b.py set around their calls (call_context) and which follows the
+request onto the api_client core loop. Rows are written by a background
+thread, so model calls never wait on the disk.
+
+retry is empty for a first request, otherwise 'hedge', 'fallback', 'repair'
+(schema repair call) or 'attempt N' (a caller's own retry). Requests shared
+by coalescing are recorded once; hedge requests cancelled after losing are
+recorded as 'cancelled' without token counts.
+
+Usage:
+    python3 usage_ledger.py                                  # totals by book
+    python3 usage_ledger.py --by stage --book 'The Giver'
+    python3 usage_ledger.py --by day,stage --since 2026-10-01    # spot regressions after prompt changes
+    python3 usage_ledger.py --by run --ledger /mnt/shared/outputs/usage.db
+"""
+
+import argparse
+import atexit
+import contextvars
+import queue
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from call_profiles import DEFAULT_MODEL, FAST_MODEL
+
+DEFAULT_LEDGER_PATH = Path("outputs") / "usage.db"
+
+# USD per million (input, output) tokens; cache writes cost 1.25x input, cache reads 0.1x
+MODEL_PRICING = {
+    DEFAULT_MODEL: (3.00, 15.00),
+    FAST_MODEL: (0.80, 4.00),
+}
+CACHE_WRITE_MULTIPLIER = 1.25
+CACHE_READ_MULTIPLIER = 0.10
+
+# book / stage / section / device / run_id / retry of the calls made in this context
+CALL_CONTEXT = contextvars.ContextVar('usage_call_context', default={})
+
+# Columns --by can group on
+GROUP_COLUMNS = {
+    'book': 'book', 'stage': 'stage', 'section': 'section', 'device': 'device',
+    'run': 'run_id', 'day': 'day', 'model': 'model', 'profile': 'profile',
+}
+
+
+@contextmanager
+def call_context(**fields):
+    """Tag the model calls made inside the block (None values are ignored)"""
+    token = CALL_CONTEXT.set({**CALL_CONTEXT.get(), **{k: v for k, v in fields.items() if v is not None}})
+    try:
+        yield
+    finally:
+        CALL_CONTEXT.reset(token)
+
+
+def call_cost(model: str, input_tokens: int, output_tokens: int,
+              cache_write_tokens: int = 0, cache_read_tokens: int = 0) -> float:
+    """USD cost of one call (unknown models are priced like the default model)"""
+    input_price, output_price = MODEL_PRICING.get(model, MODEL_PRICING[DEFAULT_MODEL])
+    return (input_tokens * input_price + output_tokens * output_price
+            + cache_write_tokens * input_price * CACHE_WRITE_MULTIPLIER
+            + cache_read_tokens * input_price * CACHE_READ_MULTIPLIER) / 1_000_000
+
+
+# ============================================================================
+# LEDGER
+# ============================================================================
+
+class UsageLedger:
+    """Append-only SQLite ledger of model calls with a background writer thread"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS calls (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts TEXT NOT NULL,
+            day TEXT NOT NULL,
+            run_id TEXT,
+            book TEXT,
+            stage TEXT,
+            section TEXT,
+            device TEXT,
+            profile TEXT,
+            model TEXT,
+            input_tokens INTEGER NOT NULL DEFAULT 0,
+            output_tokens INTEGER NOT NULL DEFAULT 0,
+            cache_write_tokens INTEGER NOT NULL DEFAULT 0,
+            cache_read_tokens INTEGER NOT NULL DEFAULT 0,
+            cost_usd REAL NOT NULL DEFAULT 0,
+            latency REAL,
+            retry TEXT NOT NULL DEFAULT '',
+            outcome TEXT NOT NULL,
+            error TEXT
+        )
+    """
+    INDEXES = (
+        "CREATE INDEX IF NOT EXISTS calls_book_stage ON calls (book, stage)",
+        "CREATE INDEX IF NOT EXISTS calls_day ON calls (day)",
+        "CREATE INDEX IF NOT EXISTS calls_run ON calls (run_id)",
+    )
+    COLUMNS = ('ts', 'day', 'run_id', 'book', 'stage', 'section', 'device', 'profile', 'model',
+               'input_tokens', 'output_tokens', 'cache_write_tokens', 'cache_read_tokens', 'cost_usd',
+               'latency', 'retry', 'outcome', 'error')
+
+    def __init__(self, path=DEFAULT_LEDGER_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute(self.SCHEMA)
+            for index in self.INDEXES:
+                conn.execute(index)
+        finally:
+            conn.close()
+        self._queue = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def record(self, row: Dict):
+        """Queue one call row for the writer thread"""
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="usage-ledger", daemon=True)
+                self._writer.start()
+        self._queue.put(row)
+
+    def _write_loop(self):
+        conn = self._connect()
+        warned = False
+        while True:
+            rows = [self._queue.get()]
+            while not self._queue.empty():
+                rows.append(self._queue.get_nowait())
+            try:
+                conn.executemany(
+                    f"INSERT INTO calls ({', '.join(self.COLUMNS)}) VALUES ({', '.join('?' * len(self.COLUMNS))})",
+                    [tuple(row.get(c) for c in self.COLUMNS) for row in rows])
+            except sqlite3.Error as e:
+                if not warned:
+                    print(f"  ⚠️  Usage ledger write failed ({e}); calls are not being recorded")
+                    warned = True
+            finally:
+                for _ in rows:
+                    self._queue.task_done()
+
+    def flush(self):
+        """Wait until every queued row is written"""
+        if self._writer is not None:
+            self._queue.join()
+
+    def aggregate(self, by: List[str], book: Optional[str] = None, stage: Optional[str] = None,
+                  since: Optional[str] = None, until: Optional[str] = None) -> List[Dict]:
+        """Totals per group; by names GROUP_COLUMNS keys"""
+        unknown = [b for b in by if b not in GROUP_COLUMNS]
+        if unknown or not by:
+            raise ValueError(f"Cannot group by {unknown} (choose from {', '.join(GROUP_COLUMNS)})")
+        columns = [GROUP_COLUMNS[b] for b in by]
+        where, args = [], []
+        for column, op, value in (('book', '=', book), ('stage', '=', stage),
+                                  ('day', '>=', since), ('day', '<=', until)):
+            if value:
+                where.append(f"{column} {op} ?")
+                args.append(value)
+        select = ", ".join(f"COALESCE({c}, '-') AS {b}" for b, c in zip(by, columns))
+        sql = (f"SELECT {select}, COUNT(*) AS calls, "
+               "SUM(outcome != 'ok') AS failed, SUM(retry != '') AS retries, "
+               "SUM(input_tokens) AS input_tokens, SUM(output_tokens) AS output_tokens, "
+               "SUM(cache_write_tokens) AS cache_write_tokens, SUM(cache_read_tokens) AS cache_read_tokens, "
+               "SUM(cost_usd) AS cost_usd, AVG(CASE WHEN outcome = 'ok' THEN latency END) AS latency "
+               f"FROM calls {'WHERE ' + ' AND '.join(where) if where else ''} "
+               f"GROUP BY {', '.join(columns)} ORDER BY {', '.join(columns)}")
+        self.flush()
+        conn = self._connect()
+        try:
+            return [dict(row) for row in conn.execute(sql, args)]
+        finally:
+            conn.close()
+
+
+LEDGER: Optional[UsageLedger] = None
+
+
+def enable_ledger(path=DEFAULT_LEDGER_PATH) -> UsageLedger:
+    """Start recording this process's model calls (flushed at exit)"""
+    global LEDGER
+    if LEDGER is None or LEDGER.path != Path(path):
+        if LEDGER is not None:
+            LEDGER.flush()
+        LEDGER = UsageLedger(path)
+        atexit.register(LEDGER.flush)
+    return LEDGER
+
+
+def disable_ledger():
+    global LEDGER
+    if LEDGER is not None:
+        LEDGER.flush()
+    LEDGER = None
+
+
+def record_call(profile: str, model: str, outcome: str, latency: Optional[float] = None,
+                response=None, error: Optional[Exception] = None):
+    """Record one finished request under the current CALL_CONTEXT (no-op until enabled)"""
+    ledger = LEDGER
+    if ledger is None:
+        return
+    usage = getattr(response, "usage", None)
+    tokens = {field: getattr(usage, attr, None) or 0 for field, attr in (
+        ('input_tokens', 'input_tokens'), ('output_tokens', 'output_tokens'),
+        ('cache_write_tokens', 'cache_creation_input_tokens'), ('cache_read_tokens', 'cache_read_input_tokens'))}
+    context = CALL_CONTEXT.get()
+    now = datetime.now()
+    ledger.record({
+        'ts': now.isoformat(), 'day': now.date().isoformat(),
+        'run_id': context.get('run_id'), 'book': context.get('book'), 'stage': context.get('stage'),
+        'section': context.get('section'), 'device': context.get('device'),
+        'profile': profile, 'model': model, **tokens,
+        'cost_usd': call_cost(model, **tokens),
+        'latency': round(latency, 3) if latency is not None else None,
+        'retry': context.get('retry', ''), 'outcome': outcome,
+        'error': f"{type(error).__name__}: {error}"[:500] if error is not None else None,
+    })
+
+
+# ============================================================================
+# REPORT
+# ============================================================================
+
+def print_report(rows: List[Dict], by: List[str]):
+    if not rows:
+        print("No calls recorded")
+        return
+    widths = [max(len(b), *(len(str(r[b])) for r in rows)) for b in by]
+    header = " ".join(f"{b:<{w}}" for b, w in zip(by, widths))
+    print(f"{header} {'Calls':>6} {'Failed':>6} {'Retries':>7} {'In tok':>11} {'Out tok':>10} "
+          f"{'Cache rd':>9} {'Cost':>9} {'Avg lat':>8}")
+    print("-" * (len(header) + 74))
+    for r in rows:
+        latency = f"{r['latency']:.1f}s" if r['latency'] is not None else '-'
+        print(" ".join(f"{str(r[b]):<{w}}" for b, w in zip(by, widths))
+              + f" {r['calls']:>6} {r['failed']:>6} {r['retries']:>7} {r['input_tokens']:>11,} "
+              f"{r['output_tokens']:>10,} {r['cache_read_tokens']:>9,} {'$' + format(r['cost_usd'], '.2f'):>9} "
+              f"{latency:>8}")
+    print("-" * (len(header) + 74))
+    print(f"{'Total':<{len(header)}} {sum(r['calls'] for r in rows):>6} {sum(r['failed'] for r in rows):>6} "
+          f"{sum(r['retries'] for r in rows):>7} {sum(r['input_tokens'] for r in rows):>11,} "
+          f"{sum(r['output_tokens'] for r in rows):>10,} {sum(r['cache_read_tokens'] for r in rows):>9,} "
+          f"{'$' + format(sum(r['cost_usd'] for r in rows), '.2f'):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Aggregate recorded model calls by book, stage, day or run',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('--by', default='book',
+                        help=f"Comma-separated grouping: {', '.join(GROUP_COLUMNS)} (default: book)")
+    parser.add_argument('--book', help='Only this book title')
+    parser.add_argument('--stage', help="Only this stage (e.g. 'Stage 2B')")
+    parser.add_argument('--since', help='First day, YYYY-MM-DD')
+    parser.add_argument('--until', help='Last day, YYYY-MM-DD')
+    parser.add_argument('--ledger', default=str(DEFAULT_LEDGER_PATH), help=f'Ledger file (default: {DEFAULT_LEDGER_PATH})')
+    args = parser.parse_args()
+
+    if not Path(args.ledger).exists():
+        print(f"❌ No usage ledger at {args.ledger}")
+        sys.exit(1)
+    by = [b.strip() for b in args.by.split(',') if b.strip()]
+    try:
+        rows = UsageLedger(args.ledger).aggregate(by, args.book, args.stage, args.since, args.until)
+    except ValueError as e:
+        parser.error(str(e))
+    print_report(rows, by)
+
+
+if __name__ == "__main__":
+    main()